@@ -179,6 +179,39 @@ cloudinary.config(
     secure=os.getenv('CLOUDINARY_SECURE', 'True') == 'True'
 )
 
+# Imágenes de productos: backend de almacenamiento y subida en segundo plano
+IMAGENES_ALMACENAMIENTO = os.getenv(
+    'IMAGENES_ALMACENAMIENTO', 'apps.imagenes.services.almacenamiento.CloudinaryAlmacenamiento'
+)
+# Solo para LocalAlmacenamiento (tests, benchmarks, desarrollo)
+IMAGENES_LOCAL_DIR = os.getenv('IMAGENES_LOCAL_DIR', os.path.join(BASE_DIR, 'media', 'imagenes'))
+IMAGENES_LOCAL_URL = os.getenv('IMAGENES_LOCAL_URL', '/media/imagenes/')
+# Archivos recibidos que esperan subirse
+IMAGENES_SPOOL_DIR = os.getenv('IMAGENES_SPOOL_DIR', os.path.join(BASE_DIR, 'imagenes_spool'))
+IMAGENES_SUBIDA_WORKERS = int(os.getenv('IMAGENES_SUBIDA_WORKERS', '4'))
+IMAGENES_SUBIDA_REINTENTOS = int(os.getenv('IMAGENES_SUBIDA_REINTENTOS', '3'))
+# Subida masiva: subidas en paralelo por request y archivos por request
+IMAGENES_SUBIDA_MASIVA_WORKERS = int(os.getenv('IMAGENES_SUBIDA_MASIVA_WORKERS', '8'))
+IMAGENES_SUBIDA_MASIVA_MAX = int(os.getenv('IMAGENES_SUBIDA_MASIVA_MAX', '50'))
+# Espera antes del primer reintento (segundos); se duplica en cada intento
+IMAGENES_SUBIDA_ESPERA = float(os.getenv('IMAGENES_SUBIDA_ESPERA', '2'))
+# Preprocesado antes de subir: validación, orientación, sin EXIF, tamaño y formato
+IMAGENES_PREPROCESAR = os.getenv('IMAGENES_PREPROCESAR', 'True') == 'True'
+IMAGENES_PREPROCESADO_WORKERS = int(os.getenv('IMAGENES_PREPROCESADO_WORKERS', '2'))
+IMAGENES_MAX_LADO = int(os.getenv('IMAGENES_MAX_LADO', '2048'))
+IMAGENES_MIN_LADO = int(os.getenv('IMAGENES_MIN_LADO', '100'))
+IMAGENES_MAX_PIXELES = int(os.getenv('IMAGENES_MAX_PIXELES', '50000000'))
+IMAGENES_FORMATO_SALIDA = os.getenv('IMAGENES_FORMATO_SALIDA', 'WEBP')  # WEBP o JPEG
+IMAGENES_CALIDAD = int(os.getenv('IMAGENES_CALIDAD', '82'))
+# Limpieza (manage.py limpiar_imagenes): retención de inactivas, lote y pausa entre llamadas
+IMAGENES_GC_RETENCION_DIAS = int(os.getenv('IMAGENES_GC_RETENCION_DIAS', '30'))
+IMAGENES_GC_LOTE = int(os.getenv('IMAGENES_GC_LOTE', '100'))
+IMAGENES_GC_PAUSA = float(os.getenv('IMAGENES_GC_PAUSA', '1'))
+# Anchos del srcset (se omiten los mayores que la imagen)
+IMAGENES_ANCHOS_SRCSET = [
+    int(ancho) for ancho in os.getenv('IMAGENES_ANCHOS_SRCSET', '320,640,960,1280,1600').split(',')
+]
+
 # ==============================================================================
 # VALIDACIÓN DE CONTRASEÑAS
 # ==============================================================================
@@ -436,3 +469,55 @@ LOGGING = {
 }
 
 TRUSTED_PROXY_COUNT = 1
+
+# ==============================================================================
+# REPORTES EN SEGUNDO PLANO
+# ==============================================================================
+
+# Resultados de jobs de reportes (chunks comprimidos en disco)
+REPORTES_DIR = os.getenv('REPORTES_DIR', os.path.join(BASE_DIR, 'reportes_generados'))
+REPORTES_JOB_WORKERS = int(os.getenv('REPORTES_JOB_WORKERS', '2'))
+REPORTES_CHUNK_FILAS = int(os.getenv('REPORTES_CHUNK_FILAS', '5000'))
+# Un job EN_PROCESO sin actualizar por más de este tiempo se considera caído
+REPORTES_JOB_TIMEOUT = int(os.getenv('REPORTES_JOB_TIMEOUT', str(30 * 60)))
+# Un job terminado cuyo rango incluye hoy (o no tiene rango) se reutiliza
+# solo durante este tiempo; los de rangos ya cerrados, siempre
+REPORTES_JOB_TTL_RECIENTE = int(os.getenv('REPORTES_JOB_TTL_RECIENTE', str(5 * 60)))
+# Ventas por página en el detalle del reporte de ventas (/generar/)
+REPORTES_VENTAS_PAGINA = int(os.getenv('REPORTES_VENTAS_PAGINA', '500'))
+
+# Reportes programados (manage.py programador_reportes)
+REPORTES_PROGRAMADOS_INTERVALO = int(os.getenv('REPORTES_PROGRAMADOS_INTERVALO', '60'))
+# Artefactos que se conservan por definición y formato
+REPORTES_PROGRAMADOS_RETENCION = int(os.getenv('REPORTES_PROGRAMADOS_RETENCION', '30'))
+
+# Caché en memoria de reportes generados (por proceso)
+REPORTES_CACHE_MAX_BYTES = int(os.getenv('REPORTES_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+# Rangos cerrados (fecha_hasta anterior a hoy)
+REPORTES_CACHE_TTL_HISTORICO = int(os.getenv('REPORTES_CACHE_TTL_HISTORICO', str(24 * 60 * 60)))
+# Rangos que incluyen hoy o reportes sin rango (inventario, promociones)
+REPORTES_CACHE_TTL_RECIENTE = int(os.getenv('REPORTES_CACHE_TTL_RECIENTE', '60'))
+
+# ==============================================================================
+# CARRITO
+# ==============================================================================
+
+# Compactación (manage.py compactar_carritos): días sin cambios para expirar
+# un carrito ACTIVO, carritos por lote y pausa entre lotes (segundos)
+CARRITO_EXPIRACION_DIAS = int(os.getenv('CARRITO_EXPIRACION_DIAS', '30'))
+CARRITO_COMPACTACION_LOTE = int(os.getenv('CARRITO_COMPACTACION_LOTE', '500'))
+CARRITO_COMPACTACION_PAUSA = float(os.getenv('CARRITO_COMPACTACION_PAUSA', '0'))
+
+# ==============================================================================
+# PROMOCIONES
+# ==============================================================================
+
+# Índice en memoria del motor de precios: se reconstruye al cambiar una
+# promoción y, en cualquier caso, cada este número de segundos (por proceso)
+PROMOCIONES_INDICE_TTL = int(os.getenv('PROMOCIONES_INDICE_TTL', '300'))
+# Promociones por request en POST /api/promociones/bloque/
+PROMOCIONES_BLOQUE_MAX = int(os.getenv('PROMOCIONES_BLOQUE_MAX', '500'))
+
+# Árbol de categorías en memoria (listar_arbol): se descarta con las señales
+# categoria_* y, en cualquier caso, cada este número de segundos (por proceso)
+CATEGORIAS_ARBOL_TTL = int(os.getenv('CATEGORIAS_ARBOL_TTL', '300'))
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 21:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bitacora', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bitacora',
+            name='accion',
+            field=models.CharField(choices=[('LOGIN', 'Inicio de sesión'), ('LOGOUT', 'Cierre de sesión'), ('LOGOUT_ERROR', 'Error al cerrar sesión'), ('FAILED_LOGIN', 'Intento fallido de inicio de sesión'), ('TOKEN_INVALIDATION', 'Invalidación de token'), ('REGISTER', 'Registro de usuario'), ('PASSWORD_CHANGE', 'Cambio de contraseña'), ('PASSWORD_RESET', 'Reseteo de contraseña'), ('PROFILE_UPDATE', 'Actualización de perfil'), ('DELETE_ACCOUNT', 'Eliminación de cuenta'), ('PERMISSION_CHANGE', 'Cambio de permisos'), ('VIEW_ACCESS', 'Acceso a vista'), ('PAGE_VIEW', 'Vista de página'), ('PRODUCT_VIEW', 'Vista de producto'), ('ANONYMOUS_VIEW', 'Vista de usuario anónimo'), ('ANONYMOUS_PRODUCT_VIEW', 'Vista de producto por usuario anónimo'), ('ANONYMOUS_SEARCH', 'Búsqueda por usuario anónimo'), ('CATEGORY_CREATE', 'Creación de categoría'), ('CATEGORY_UPDATE', 'Actualización de categoría'), ('CATEGORY_MOVE', 'Movimiento de categoría'), ('CATEGORY_DELETE', 'Eliminación lógica de categoría'), ('CATEGORY_RESTORE', 'Restauración de categoría'), ('PRODUCT_CREATE', 'Creación de producto'), ('PRODUCT_UPDATE', 'Actualización de producto'), ('PRODUCT_DELETE', 'Eliminación de producto'), ('PRODUCT_STATE_CHANGE', 'Cambio de estado de producto'), ('PRODUCT_STOCK_ADJUST', 'Ajuste de stock de producto'), ('IMAGE_UPLOAD', 'Subida de imagen de producto'), ('IMAGE_DELETE', 'Eliminación de imagen de producto'), ('IMAGE_SET_MAIN', 'Cambio de imagen principal'), ('IMAGE_REORDER', 'Reordenamiento de imágenes'), ('IMAGE_RESTORE', 'Restauración de imagen de producto'), ('IMAGE_UPDATE', 'Actualización de metadatos de imagen'), ('PROVIDER_CREATE', 'Creación de proveedor'), ('PROVIDER_UPDATE', 'Actualización de proveedor'), ('PROVIDER_BLOCK', 'Bloqueo de proveedor'), ('PROVIDER_ACTIVATE', 'Activación de proveedor'), ('PURCHASE_ORDER_CREATE', 'Creación de orden de compra'), ('PURCHASE_RECEIPT', 'Registro de recepción de compra'), ('PURCHASE_ORDER_STATE_CHANGE', 'Cambio de estado de orden de compra'), ('ADDRESS_CREATE', 'Creación de dirección de cliente'), ('ADDRESS_UPDATE', 'Actualización de dirección de cliente'), ('ADDRESS_DELETE', 'Eliminación de dirección de cliente'), ('ADDRESS_SET_PRINCIPAL', 'Cambio de dirección principal'), ('PAYMENT_METHOD_CREATE', 'Creación de método de pago'), ('PAYMENT_METHOD_UPDATE', 'Actualización de método de pago'), ('PAYMENT_METHOD_STATE_CHANGE', 'Cambio de estado de método de pago'), ('SALE_CREATED', 'Creación de venta'), ('SALE_CANCELLED', 'Anulación de venta'), ('ROLE_CREATED', 'Creación de rol'), ('ROLE_UPDATED', 'Actualización de rol'), ('ROLE_DELETED', 'Eliminación de rol'), ('PERMISSION_CREATED', 'Creación de permiso'), ('PERMISSION_UPDATED', 'Actualización de permiso'), ('PERMISSION_DELETED', 'Eliminación de permiso'), ('PERMISSION_ASSIGNED_TO_ROLE', 'Asignación de permiso a rol'), ('PERMISSION_REMOVED_FROM_ROLE', 'Remoción de permiso de rol'), ('PERMISSION_GRANTED_TO_USER', 'Concesión de permiso individual a usuario'), ('PERMISSION_REVOKED_FROM_USER', 'Revocación de permiso individual de usuario'), ('REVIEW_CREATED', 'Resena creada'), ('REVIEW_PUBLISHED', 'Resena publicada'), ('REVIEW_REJECTED', 'Resena rechazada'), ('REVIEW_HIDDEN', 'Resena ocultada'), ('REVIEW_DELETED', 'Resena eliminada'), ('TICKET_CREATED', 'Creación de ticket de soporte'), ('TICKET_RESPONDED', 'Respuesta en ticket de soporte'), ('TICKET_CLOSED', 'Cierre de ticket de soporte'), ('TICKET_REOPENED', 'Reapertura de ticket de soporte'), ('ERROR_404', 'Página no encontrada'), ('ERROR_500', 'Error interno del servidor'), ('SUSPICIOUS_ACTIVITY', 'Actividad sospechosa')], max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='bitacora',
+            index=models.Index(fields=['fecha_hora'], name='bitacora_fecha_hora_idx'),
+        ),
+    ]
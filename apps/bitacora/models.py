@@ -26,6 +26,9 @@ class Bitacora(models.Model):
     class Meta:
         db_table = 'bitacora'
         ordering = ['-fecha_hora']
+        indexes = [
+            models.Index(fields=['fecha_hora'], name='bitacora_fecha_hora_idx'),
+        ]
 
     def __str__(self):
         usuario = self.id_usuario.nombre_usuario if self.id_usuario else "Usuario anónimo"
@@ -50,7 +50,7 @@ producto_estado_cambiado = Signal()  # args: producto, usuario, ip, estado_anter
 producto_stock_ajustado = Signal()   # args: producto, usuario, ip, tipo_ajuste, cantidad, stock_anterior, stock_nuevo, motivo
 
 # --- Señales específicas del módulo de imágenes ---
-imagen_subida = Signal()              # args: imagen, usuario, ip
+imagen_subida = Signal()              # args: imagen, usuario, ip (o imagen=None, imagenes=[...] por lote)
 imagen_eliminada = Signal()           # args: imagen, usuario, ip
 imagen_actualizada = Signal()         # args: imagen, usuario, ip, cambios
 imagen_principal_cambiada = Signal()  # args: imagen, usuario, ip
@@ -483,8 +483,29 @@ def registrar_producto_stock_ajustado(sender, producto, usuario, ip, tipo_ajuste
 # RECEIVERS: GESTIÓN DE IMÁGENES DEL CATÁLOGO
 # =====================================================
 @receiver(imagen_subida)
-def registrar_imagen_subida(sender, imagen, usuario, ip, **kwargs):
-    """Registra la subida de una imagen al catálogo"""
+def registrar_imagen_subida(sender, imagen, usuario, ip, imagenes=None, **kwargs):
+    """Registra la subida de una imagen al catálogo (o de un lote, en un solo evento)"""
+    if imagenes:
+        por_producto = {}
+        for img in imagenes:
+            por_producto.setdefault(img.id_producto_id, []).append(img)
+        detalle = "; ".join(
+            f"{id_producto}: {len(imgs)} (órdenes {', '.join(str(i.orden) for i in imgs)}"
+            + (", con principal" if any(i.es_principal for i in imgs) else "")
+            + ")"
+            for id_producto, imgs in por_producto.items()
+        )
+        AuditoriaLogger.registrar_evento(
+            accion="IMAGE_UPLOAD",
+            descripcion=(
+                f"Subida masiva de {len(imagenes)} imagen(es) para "
+                f"{len(por_producto)} producto(s) | {detalle}"
+            ),
+            ip=ip,
+            usuario=usuario
+        )
+        return
+
     # Validación segura del producto
     nombre_producto = obtener_atributo_seguro(
         imagen.id_producto,
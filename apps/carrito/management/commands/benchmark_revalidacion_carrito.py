@@ -0,0 +1,103 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.carrito.services import revalidacion_service
+from apps.categoria.models import Categoria
+from apps.productos.models import Producto
+from core.constants import ProductStatus
+
+PREFIJO = "Z"
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la revalidación de carritos (un snapshot por carrito) contra la "
+        "validación anterior producto por producto, con varios hilos a la vez. "
+        "Crea productos sintéticos con id Z0000... y los borra al terminar. "
+        "Requiere PostgreSQL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lineas", type=int, default=100, help="Líneas por carrito (máx. 9999).")
+        parser.add_argument("--concurrencia", type=int, default=8, help="Hilos revalidando a la vez.")
+        parser.add_argument("--iteraciones", type=int, default=50, help="Carritos revalidados por hilo.")
+
+    def _anterior(self, lineas):
+        """Réplica del checkout antes del cambio: un SELECT por línea."""
+        for item in lineas:
+            producto = Producto.objects.get(id_producto=item["id_producto"])
+            if producto.stock < item["cantidad"]:
+                return False
+            producto.precio * item["cantidad"]
+        return True
+
+    def _hilo(self, funcion, lineas, iteraciones):
+        tiempos, consultas = [], 0
+        try:
+            for _ in range(iteraciones):
+                with CaptureQueriesContext(connection) as capturadas:
+                    inicio = time.perf_counter()
+                    funcion(lineas)
+                    tiempos.append(time.perf_counter() - inicio)
+                consultas += len(capturadas)
+        finally:
+            connection.close()
+        return tiempos, consultas
+
+    def _medir(self, nombre, funcion, lineas, opts):
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=opts["concurrencia"]) as pool:
+            resultados = list(pool.map(
+                lambda _: self._hilo(funcion, lineas, opts["iteraciones"]),
+                range(opts["concurrencia"]),
+            ))
+        total = time.perf_counter() - inicio
+
+        tiempos = sorted(t for hilo, _ in resultados for t in hilo)
+        consultas = sum(c for _, c in resultados)
+        p50 = statistics.median(tiempos) * 1000
+        p95 = tiempos[int(len(tiempos) * 0.95) - 1] * 1000
+        self.stdout.write(
+            f"{nombre:24} p50={p50:8.2f}ms p95={p95:8.2f}ms "
+            f"consultas/carrito={consultas / len(tiempos):6.1f} "
+            f"carritos/s={len(tiempos) / total:8.1f}"
+        )
+
+    def handle(self, *args, **opts):
+        if connection.vendor != "postgresql":
+            raise CommandError("La revalidación usa JSONB_AGG: requiere PostgreSQL.")
+        n = opts["lineas"]
+        if not 0 < n < 10_000:
+            raise CommandError("--lineas debe estar entre 1 y 9999.")
+        if Producto.objects.filter(id_producto__startswith=PREFIJO).exists():
+            raise CommandError(f"Ya existen productos con id {PREFIJO}...: no se puede usar ese prefijo.")
+
+        # Los hilos usan sus propias conexiones: los datos se confirman y se
+        # borran al final (no sirve una transacción revertida).
+        categoria = Categoria.objects.create(nombre=f"Benchmark {time.time_ns()}")
+        try:
+            Producto.objects.bulk_create([
+                Producto(
+                    id_producto=f"{PREFIJO}{i:04d}", nombre=f"Producto {i}", precio=10 + i % 90,
+                    stock=1_000, descripcion="-", estado_producto=ProductStatus.ACTIVO,
+                    id_categoria=categoria,
+                )
+                for i in range(n)
+            ])
+            lineas = [
+                {"id_producto": f"{PREFIJO}{i:04d}", "cantidad": 1 + i % 3}
+                for i in range(n)
+            ]
+            self.stdout.write(
+                f"{opts['concurrencia']} hilos x {opts['iteraciones']} carritos de {n} líneas"
+            )
+            self._medir("anterior (1 por línea)", self._anterior, lineas, opts)
+            self._medir("snapshot", revalidacion_service.revalidar, lineas, opts)
+        finally:
+            Producto.objects.filter(id_producto__startswith=PREFIJO, id_categoria=categoria).delete()
+            categoria.delete()
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from apps.carrito.services import compactacion_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Expira los carritos ACTIVO sin cambios por más de --dias días y saca "
+        "sus líneas de detalle_carrito por lotes, archivándolas en "
+        "detalle_carrito_archivo (o descartándolas con --sin-archivo). Con "
+        "--dry-run solo informa."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true")
+        parser.add_argument("--dias", type=int, default=None, help="Días (por defecto CARRITO_EXPIRACION_DIAS).")
+        parser.add_argument("--lote", type=int, default=None, help="Carritos por transacción.")
+        parser.add_argument("--pausa", type=float, default=None, help="Segundos entre lotes.")
+        parser.add_argument("--sin-archivo", action="store_true", help="Borra las líneas sin archivarlas.")
+        parser.add_argument("--vacuum", action="store_true", help="VACUUM (ANALYZE) al terminar.")
+
+    def handle(self, *args, **options):
+        resumen = compactacion_service.compactar(
+            dias=options["dias"],
+            lote=options["lote"],
+            archivar=not options["sin_archivo"],
+            dry_run=options["dry_run"],
+            vacuum=options["vacuum"],
+            pausa=options["pausa"],
+        )
+
+        verbo = "Se expirarían" if resumen["dry_run"] else "Expirados"
+        self.stdout.write(f"Carritos escaneados : {resumen['escaneados']} en {resumen['lotes']} lote(s)")
+        self.stdout.write(f"{verbo:20}: {resumen['expirados']}")
+        if resumen["omitidos"]:
+            self.stdout.write(f"Omitidos (en uso)   : {resumen['omitidos']}")
+        self.stdout.write(f"Líneas              : {resumen['lineas']} ({resumen['archivadas']} archivadas)")
+        self.stdout.write(self.style.SUCCESS(
+            f"Bytes liberados     : {resumen['bytes_liberados']:,} en {resumen['duracion_ms']} ms."
+        ))
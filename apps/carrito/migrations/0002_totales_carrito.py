@@ -0,0 +1,50 @@
+from django.db import migrations
+
+# carrito es managed=False: las columnas se agregan a mano, solo si la
+# tabla legada existe (una base de tests creada por migraciones no la tiene).
+AGREGAR = """
+DO $$
+BEGIN
+    IF to_regclass('carrito') IS NOT NULL THEN
+        ALTER TABLE carrito
+            ADD COLUMN IF NOT EXISTS total numeric(12, 2) NOT NULL DEFAULT 0,
+            ADD COLUMN IF NOT EXISTS item_count integer NOT NULL DEFAULT 0,
+            ADD COLUMN IF NOT EXISTS fecha_actualizacion timestamp NULL;
+
+        UPDATE carrito c
+           SET total = s.total,
+               item_count = s.item_count
+          FROM (
+                SELECT id_carrito, SUM(precio_total) AS total, SUM(cantidad) AS item_count
+                  FROM detalle_carrito
+                 GROUP BY id_carrito
+               ) s
+         WHERE s.id_carrito = c.id_carrito;
+
+        UPDATE carrito SET fecha_actualizacion = fecha_creacion WHERE fecha_actualizacion IS NULL;
+    END IF;
+END $$;
+"""
+
+QUITAR = """
+DO $$
+BEGIN
+    IF to_regclass('carrito') IS NOT NULL THEN
+        ALTER TABLE carrito
+            DROP COLUMN IF EXISTS total,
+            DROP COLUMN IF EXISTS item_count,
+            DROP COLUMN IF EXISTS fecha_actualizacion;
+    END IF;
+END $$;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carrito', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(AGREGAR, QUITAR),
+    ]
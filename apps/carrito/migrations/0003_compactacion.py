@@ -0,0 +1,62 @@
+from django.db import migrations, models
+
+# carrito es managed=False: los índices se crean a mano, solo si la tabla
+# legada existe. Antes del índice único se deja un solo carrito ACTIVO por
+# cliente (el de actividad más reciente); los demás quedan EXPIRADO y
+# compactar_carritos archiva sus líneas.
+AGREGAR = """
+DO $$
+BEGIN
+    IF to_regclass('carrito') IS NOT NULL THEN
+        UPDATE carrito c
+           SET estado_carrito = 'EXPIRADO'
+          FROM (
+                SELECT id_carrito,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY id_cliente
+                           ORDER BY COALESCE(fecha_actualizacion, fecha_creacion) DESC, id_carrito DESC
+                       ) AS orden
+                  FROM carrito
+                 WHERE estado_carrito = 'ACTIVO'
+               ) d
+         WHERE d.id_carrito = c.id_carrito AND d.orden > 1;
+
+        CREATE UNIQUE INDEX IF NOT EXISTS carrito_activo_cliente_uniq
+            ON carrito (id_cliente) WHERE estado_carrito = 'ACTIVO';
+        CREATE INDEX IF NOT EXISTS carrito_activo_actualiz_idx
+            ON carrito (fecha_actualizacion) WHERE estado_carrito = 'ACTIVO';
+    END IF;
+END $$;
+"""
+
+QUITAR = """
+DROP INDEX IF EXISTS carrito_activo_cliente_uniq;
+DROP INDEX IF EXISTS carrito_activo_actualiz_idx;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carrito', '0002_totales_carrito'),
+    ]
+
+    operations = [
+        migrations.RunSQL(AGREGAR, QUITAR),
+        migrations.CreateModel(
+            name='DetalleCarritoArchivo',
+            fields=[
+                ('id_detalle', models.IntegerField(primary_key=True, serialize=False)),
+                ('id_carrito', models.IntegerField(db_index=True)),
+                ('id_cliente', models.IntegerField()),
+                ('id_producto', models.CharField(max_length=5)),
+                ('cantidad', models.PositiveIntegerField()),
+                ('precio_total', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('fecha_actualizacion', models.DateTimeField(null=True)),
+                ('fecha_archivo', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'detalle_carrito_archivo',
+            },
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from apps.usuarios.models import Cliente
 from apps.productos.models import Producto  
+from core.constants import CartStatus
 
 class Carrito(models.Model):
     id_carrito = models.AutoField(primary_key=True, db_column='id_carrito')
@@ -11,10 +12,29 @@ class Carrito(models.Model):
         on_delete=models.CASCADE,
         db_column='id_cliente'
     )
+    # Mantenidos por carrito_service en cada cambio de líneas
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0, db_column='total')
+    item_count = models.PositiveIntegerField(default=0, db_column='item_count')
+    fecha_actualizacion = models.DateTimeField(null=True, blank=True, db_column='fecha_actualizacion')
 
     class Meta:
         db_table = 'carrito'
         managed = False
+        # En la base legada los crea la migración 0003_compactacion
+        constraints = [
+            models.UniqueConstraint(
+                fields=['id_cliente'],
+                condition=models.Q(estado_carrito=CartStatus.ACTIVO),
+                name='carrito_activo_cliente_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['fecha_actualizacion'],
+                condition=models.Q(estado_carrito=CartStatus.ACTIVO),
+                name='carrito_activo_actualiz_idx',
+            ),
+        ]
 
   
     def __str__(self):
@@ -48,4 +68,26 @@ class DetalleCarrito(models.Model):
         unique_together = ('id_carrito', 'id_producto')
 
     def __str__(self):
-        return f"{self.id_producto_id} x{self.cantidad}"
\ No newline at end of file
+        return f"{self.id_producto_id} x{self.cantidad}"
+
+
+class DetalleCarritoArchivo(models.Model):
+    """
+    Líneas de carritos expirados por `compactar_carritos`. Sin claves
+    foráneas: el archivo sobrevive a productos y clientes borrados.
+    """
+
+    id_detalle = models.IntegerField(primary_key=True)
+    id_carrito = models.IntegerField(db_index=True)
+    id_cliente = models.IntegerField()
+    id_producto = models.CharField(max_length=5)
+    cantidad = models.PositiveIntegerField()
+    precio_total = models.DecimalField(max_digits=10, decimal_places=2)
+    fecha_actualizacion = models.DateTimeField(null=True)
+    fecha_archivo = models.DateTimeField()
+
+    class Meta:
+        db_table = 'detalle_carrito_archivo'
+
+    def __str__(self):
+        return f"Carrito #{self.id_carrito}: {self.id_producto} x{self.cantidad}"
@@ -1,8 +1,11 @@
+from collections import Counter
+
 from rest_framework import serializers
 from .models import Carrito, DetalleCarrito
 
 
 class DetalleCarritoSerializer(serializers.ModelSerializer):
+    # id_producto viene precargado (carrito_service.con_detalles)
     nombre_producto = serializers.CharField(source='id_producto.nombre', read_only=True)
     precio_unitario = serializers.DecimalField(
         source='id_producto.precio', max_digits=10, decimal_places=2, read_only=True
@@ -21,7 +24,10 @@ class DetalleCarritoSerializer(serializers.ModelSerializer):
 
 class CarritoSerializer(serializers.ModelSerializer):
     detalles = DetalleCarritoSerializer(many=True, read_only=True)
-    total_general = serializers.SerializerMethodField()
+    # Total mantenido en la fila del carrito por carrito_service
+    total_general = serializers.DecimalField(
+        source='total', max_digits=12, decimal_places=2, read_only=True
+    )
 
     class Meta:
         model = Carrito
@@ -29,10 +35,27 @@ class CarritoSerializer(serializers.ModelSerializer):
             'id_carrito',
             'id_cliente',
             'fecha_creacion',
+            'fecha_actualizacion',
             'estado_carrito',
             'detalles',
+            'item_count',
             'total_general'
         ]
 
-    def get_total_general(self, obj):
-        return sum(det.precio_total for det in obj.detalles.all())
\ No newline at end of file
+
+class LineaCarritoSerializer(serializers.Serializer):
+    id_producto = serializers.CharField(max_length=5)
+    cantidad = serializers.IntegerField(min_value=0)
+
+
+class LineasCarritoSerializer(serializers.Serializer):
+    """Cambios de varias líneas en un solo request (PUT /api/carrito/lineas/)."""
+    lineas = LineaCarritoSerializer(many=True, allow_empty=True)
+    reemplazar = serializers.BooleanField(default=False)
+
+    def validate_lineas(self, value):
+        conteo = Counter(linea['id_producto'] for linea in value)
+        repetidos = sorted(i for i, n in conteo.items() if n > 1)
+        if repetidos:
+            raise serializers.ValidationError(f"Productos repetidos: {', '.join(repetidos)}")
+        return value
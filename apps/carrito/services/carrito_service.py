@@ -1,41 +1,192 @@
-from django.db import transaction
+# apps/carrito/services/carrito_service.py
+"""
+Operaciones sobre el carrito activo de un cliente.
+
+Todas las modificaciones pasan por `aplicar_lineas`, que en una sola
+transacción (con el carrito bloqueado):
+
+  1. Lee en una consulta (revalidacion_service.snapshot) los productos de
+     las líneas pedidas y de las que ya están en el carrito.
+  2. Valida todas las líneas; si alguna falla no se aplica ninguna.
+  3. Aplica los cambios con bulk_create / bulk_update / un DELETE, y
+     re-precia las líneas existentes cuyo precio cambió.
+  4. Actualiza `total`, `item_count` y `fecha_actualizacion` del carrito
+     en un único UPDATE.
+
+Así ver el carrito no suma nada en Python: los totales ya están en la fila.
+"""
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
 from apps.carrito.models import Carrito, DetalleCarrito
-from apps.productos.models import Producto
-from .stock_service import verificar_stock
+from core.constants import CartStatus, ProductStatus
 
+from .revalidacion_service import snapshot
 
-def eliminar_producto_de_carrito(cliente, id_producto):
-    try:
-        carrito = Carrito.objects.get(id_cliente=cliente, estado_carrito='activo')
-        detalle = carrito.detalles.get(id_producto_id=id_producto)
-        detalle.delete()
-        return carrito
-    except Carrito.DoesNotExist:
-        raise ValueError("No existe un carrito activo.")
-    except DetalleCarrito.DoesNotExist:
-        raise ValueError("El producto no está en el carrito.")
 
+class CarritoError(Exception):
+    """Líneas inválidas. `errores` trae un dict por línea rechazada."""
 
-@transaction.atomic
-def agregar_producto_a_carrito(cliente, id_producto, cantidad):
-    carrito, _ = Carrito.objects.get_or_create(
-        id_cliente=cliente,
-        estado_carrito='activo',
-        defaults={'fecha_creacion': timezone.now()}
+    def __init__(self, mensaje, errores=None):
+        super().__init__(mensaje)
+        self.errores = errores or []
+
+
+def con_detalles():
+    """Carritos con sus líneas y los productos de cada línea (2 consultas)."""
+    return Carrito.objects.prefetch_related(
+        Prefetch(
+            'detalles',
+            queryset=DetalleCarrito.objects.select_related('id_producto').order_by('id_detalle'),
+        )
     )
 
-    detalle, created = DetalleCarrito.objects.get_or_create(
-        id_carrito=carrito,
-        id_producto_id=id_producto,
-        defaults={'cantidad': 0, 'precio_total': 0}
+
+def _crear_activo(cliente):
+    """
+    Crea el carrito ACTIVO del cliente. Si otra request lo creó primero, el
+    índice único parcial (carrito_activo_cliente_uniq) lo rechaza y se
+    devuelve None para que el llamador lo relea.
+    """
+    try:
+        with transaction.atomic():
+            return Carrito.objects.create(
+                id_cliente=cliente,
+                estado_carrito=CartStatus.ACTIVO,
+                fecha_actualizacion=timezone.now(),
+            )
+    except IntegrityError:
+        return None
+
+
+def obtener_activo(cliente):
+    """Carrito ACTIVO del cliente con sus líneas (lo crea si no existe)."""
+    activo = con_detalles().filter(id_cliente=cliente, estado_carrito=CartStatus.ACTIVO)
+    return activo.first() or _crear_activo(cliente) or activo.get()
+
+
+def _bloquear_activo(cliente):
+    activo = Carrito.objects.select_for_update().filter(
+        id_cliente=cliente, estado_carrito=CartStatus.ACTIVO
     )
+    return activo.first() or _crear_activo(cliente) or activo.get()
+
 
-    nueva_cantidad = detalle.cantidad + cantidad
-    verificar_stock(id_producto, nueva_cantidad)
+def recalcular_totales(id_carrito):
+    """Recalcula total e item_count desde detalle_carrito en un solo UPDATE."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            UPDATE carrito c
+               SET total = COALESCE(s.total, 0),
+                   item_count = COALESCE(s.item_count, 0),
+                   fecha_actualizacion = %s
+              FROM (SELECT SUM(precio_total) AS total, SUM(cantidad) AS item_count
+                      FROM detalle_carrito
+                     WHERE id_carrito = %s) s
+             WHERE c.id_carrito = %s
+            """,
+            [timezone.now(), id_carrito, id_carrito],
+        )
 
-    producto = Producto.objects.get(id_producto=id_producto)
-    detalle.cantidad = nueva_cantidad
-    detalle.precio_total = nueva_cantidad * producto.precio
-    detalle.save()
 
-    return carrito
+def _validar(lineas, productos, actuales, sumar):
+    errores = []
+    for linea in lineas:
+        id_producto, cantidad = linea['id_producto'], linea['cantidad']
+        producto = productos.get(id_producto)
+        if producto is None:
+            errores.append({'id_producto': id_producto, 'error': 'El producto no existe.'})
+            continue
+        if cantidad == 0 and not sumar:
+            continue
+        if producto.estado_producto != ProductStatus.ACTIVO:
+            errores.append({'id_producto': id_producto, 'error': f"'{producto.nombre}' no está disponible."})
+            continue
+        final = cantidad + (actuales[id_producto].cantidad if sumar and id_producto in actuales else 0)
+        if producto.stock is None or producto.stock < final:
+            errores.append({
+                'id_producto': id_producto,
+                'error': f"No hay suficiente stock disponible para '{producto.nombre}' (Stock: {producto.stock or 0})",
+                'stock': producto.stock or 0,
+                'cantidad': final,
+            })
+    return errores
+
+
+@transaction.atomic
+def aplicar_lineas(cliente, lineas, sumar=False, reemplazar=False):
+    """
+    Aplica varias líneas al carrito activo del cliente, todas o ninguna.
+
+    Args:
+        lineas: [{'id_producto', 'cantidad'}]. Con `sumar` la cantidad se
+            agrega a la existente; si no, la fija (0 = quitar la línea).
+        reemplazar: quita las líneas del carrito que no vienen en `lineas`.
+
+    Raises:
+        CarritoError: con el detalle de cada línea rechazada.
+
+    Returns:
+        Carrito con detalles y productos precargados.
+    """
+    carrito = _bloquear_activo(cliente)
+    actuales = {d.id_producto_id: d for d in DetalleCarrito.objects.filter(id_carrito=carrito)}
+    pedidos = {linea['id_producto'] for linea in lineas}
+    productos = snapshot(pedidos | set(actuales))
+
+    errores = _validar(lineas, productos, actuales, sumar)
+    if errores:
+        raise CarritoError("Algunas líneas del carrito no son válidas.", errores)
+
+    nuevos, modificados, quitar = [], set(), set()
+    for linea in lineas:
+        id_producto, cantidad = linea['id_producto'], linea['cantidad']
+        detalle = actuales.get(id_producto)
+        if sumar and detalle is not None:
+            cantidad += detalle.cantidad
+        if cantidad == 0:
+            if detalle is not None:
+                quitar.add(id_producto)
+        elif detalle is None:
+            nuevos.append(DetalleCarrito(
+                id_carrito=carrito,
+                id_producto=productos[id_producto],
+                cantidad=cantidad,
+                precio_total=productos[id_producto].precio * cantidad,
+            ))
+        elif detalle.cantidad != cantidad:
+            detalle.cantidad = cantidad
+            modificados.add(id_producto)
+    if reemplazar:
+        quitar |= set(actuales) - pedidos
+
+    # Lo que queda en el carrito se re-precia con el precio actual
+    for id_producto, detalle in actuales.items():
+        if id_producto in quitar:
+            continue
+        precio_total = productos[id_producto].precio * detalle.cantidad
+        if precio_total != detalle.precio_total:
+            detalle.precio_total = precio_total
+            modificados.add(id_producto)
+
+    if quitar:
+        DetalleCarrito.objects.filter(id_carrito=carrito, id_producto__in=quitar).delete()
+    if modificados:
+        DetalleCarrito.objects.bulk_update(
+            [actuales[id_producto] for id_producto in modificados], ['cantidad', 'precio_total']
+        )
+    if nuevos:
+        DetalleCarrito.objects.bulk_create(nuevos)
+    recalcular_totales(carrito.id_carrito)
+
+    return con_detalles().get(pk=carrito.pk)
+
+
+@transaction.atomic
+def vaciar(cliente):
+    carrito = _bloquear_activo(cliente)
+    DetalleCarrito.objects.filter(id_carrito=carrito).delete()
+    recalcular_totales(carrito.id_carrito)
+    return con_detalles().get(pk=carrito.pk)
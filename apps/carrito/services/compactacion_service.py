@@ -0,0 +1,156 @@
+# apps/carrito/services/compactacion_service.py
+"""
+Compactación de carritos abandonados.
+
+Un carrito ACTIVO sin cambios (`fecha_actualizacion`) por más de
+CARRITO_EXPIRACION_DIAS pasa a EXPIRADO y sus líneas salen de
+detalle_carrito: se copian a detalle_carrito_archivo (o se descartan con
+`archivar=False`). También se recogen los EXPIRADO que aún tienen líneas
+(p. ej. los duplicados que dejó la migración del índice único).
+
+Se trabaja por lotes de CARRITO_COMPACTACION_LOTE carritos, cada uno en
+su transacción:
+
+  1. Se bloquean los carritos del lote con SKIP LOCKED y se vuelve a
+     comprobar que siguen inactivos: un cliente que está modificando su
+     carrito (aplicar_lineas lo tiene bloqueado) no se expira.
+  2. Un único DELETE ... RETURNING con CTE borra las líneas, las archiva
+     y mide sus bytes (pg_column_size).
+  3. Un UPDATE marca los carritos EXPIRADO con total e item_count en 0.
+
+Los bytes liberados quedan disponibles para reutilizar tras el VACUUM
+(automático, o `vacuum=True` al final).
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.carrito.models import Carrito
+from core.constants import CartStatus
+
+logger = logging.getLogger(__name__)
+
+MOVER_LINEAS = """
+WITH borradas AS (
+    DELETE FROM detalle_carrito d
+     WHERE d.id_carrito = ANY(%s)
+    RETURNING d.id_detalle, d.id_carrito, d.id_producto, d.cantidad, d.precio_total,
+              pg_column_size(d.*) AS bytes
+), archivadas AS (
+    INSERT INTO detalle_carrito_archivo
+           (id_detalle, id_carrito, id_cliente, id_producto, cantidad, precio_total,
+            fecha_actualizacion, fecha_archivo)
+    SELECT b.id_detalle, b.id_carrito, c.id_cliente, b.id_producto, b.cantidad, b.precio_total,
+           c.fecha_actualizacion, %s
+      FROM borradas b
+      JOIN carrito c ON c.id_carrito = b.id_carrito
+     WHERE %s
+    RETURNING 1
+)
+SELECT (SELECT COUNT(*) FROM borradas),
+       (SELECT COALESCE(SUM(bytes), 0) FROM borradas),
+       (SELECT COUNT(*) FROM archivadas)
+"""
+
+MEDIR_LINEAS = """
+SELECT COUNT(*), COALESCE(SUM(pg_column_size(d.*)), 0)
+  FROM detalle_carrito d
+ WHERE d.id_carrito = ANY(%s)
+"""
+
+
+def candidatos(dias=None):
+    """Carritos a expirar: ACTIVO inactivos y EXPIRADO que aún tienen líneas."""
+    dias = settings.CARRITO_EXPIRACION_DIAS if dias is None else dias
+    limite = timezone.now() - timedelta(days=dias)
+    inactivo = Q(estado_carrito=CartStatus.ACTIVO) & (
+        Q(fecha_actualizacion__lt=limite)
+        | Q(fecha_actualizacion__isnull=True, fecha_creacion__lt=limite)
+    )
+    pendiente = Q(estado_carrito=CartStatus.EXPIRADO, item_count__gt=0)
+    return Carrito.objects.filter(inactivo | pendiente)
+
+
+def _lotes(queryset, tamano):
+    """Ids por lotes en orden de id_carrito (keyset: no relee lo procesado)."""
+    ultimo = 0
+    while True:
+        ids = list(
+            queryset.filter(id_carrito__gt=ultimo)
+            .order_by('id_carrito').values_list('id_carrito', flat=True)[:tamano]
+        )
+        if not ids:
+            return
+        yield ids
+        ultimo = ids[-1]
+
+
+def compactar(dias=None, lote=None, archivar=True, dry_run=False, vacuum=False,
+              pausa=None, esperar=time.sleep):
+    """
+    Expira carritos inactivos y saca sus líneas de detalle_carrito.
+
+    Returns:
+        dict: escaneados, expirados, omitidos (bloqueados o reactivados
+        durante la corrida), lineas, archivadas, bytes_liberados, lotes y
+        duracion_ms. Con `dry_run` informa lo que haría sin modificar nada.
+    """
+    inicio = time.perf_counter()
+    lote = lote or settings.CARRITO_COMPACTACION_LOTE
+    pausa = settings.CARRITO_COMPACTACION_PAUSA if pausa is None else pausa
+    resumen = {
+        'dry_run': dry_run, 'escaneados': 0, 'expirados': 0, 'omitidos': 0,
+        'lineas': 0, 'archivadas': 0, 'bytes_liberados': 0, 'lotes': 0,
+    }
+
+    for grupo in _lotes(candidatos(dias), lote):
+        if resumen['lotes'] and pausa:
+            esperar(pausa)
+        resumen['lotes'] += 1
+        resumen['escaneados'] += len(grupo)
+
+        if dry_run:
+            with connection.cursor() as cursor:
+                cursor.execute(MEDIR_LINEAS, [grupo])
+                lineas, bytes_ = cursor.fetchone()
+            resumen['expirados'] += len(grupo)
+            resumen['lineas'] += lineas
+            resumen['bytes_liberados'] += bytes_
+            continue
+
+        with transaction.atomic():
+            ids = list(
+                candidatos(dias).select_for_update(skip_locked=True)
+                .filter(id_carrito__in=grupo).values_list('id_carrito', flat=True)
+            )
+            resumen['omitidos'] += len(grupo) - len(ids)
+            if not ids:
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute(MOVER_LINEAS, [ids, timezone.now(), archivar])
+                lineas, bytes_, archivadas = cursor.fetchone()
+            Carrito.objects.filter(id_carrito__in=ids).update(
+                estado_carrito=CartStatus.EXPIRADO, total=0, item_count=0
+            )
+        resumen['expirados'] += len(ids)
+        resumen['lineas'] += lineas
+        resumen['archivadas'] += archivadas
+        resumen['bytes_liberados'] += bytes_
+
+    if vacuum and not dry_run and resumen['expirados']:
+        # VACUUM no puede correr dentro de una transacción
+        with connection.cursor() as cursor:
+            cursor.execute("VACUUM (ANALYZE) detalle_carrito, carrito")
+
+    resumen['duracion_ms'] = int((time.perf_counter() - inicio) * 1000)
+    if not dry_run and resumen['expirados']:
+        logger.info(
+            f"Compactación de carritos: {resumen['expirados']} expirado(s), "
+            f"{resumen['lineas']} línea(s), {resumen['bytes_liberados']} bytes"
+        )
+    return resumen
@@ -0,0 +1,138 @@
+# apps/carrito/services/revalidacion_service.py
+"""
+Revalidación de precio y stock de un carrito (o de cualquier lista de
+líneas, como el pedido del checkout) contra el estado actual de los
+productos.
+
+`snapshot()` trae en UNA consulta todos los productos referenciados con
+precio, stock y estado; las promociones vigentes salen del índice en
+memoria del motor de precios (apps.promocion). `revalidar()` compara cada
+línea con ese snapshot y devuelve deltas por línea:
+
+    estado   OK | PRECIO (cambió el precio) | STOCK (no alcanza)
+             | NO_DISPONIBLE (producto inactivo) | NO_EXISTE
+    delta    precio_total nuevo - anterior
+
+Lo usan la vista del carrito (re-precia y avisa) y el checkout online
+(rechaza si alguna línea no es válida).
+"""
+from datetime import date
+
+from apps.carrito.models import DetalleCarrito
+from apps.productos.models import Producto
+from apps.promocion.services import precios_service
+from core.constants import ProductStatus
+
+
+class EstadoLinea:
+    OK = 'OK'
+    PRECIO = 'PRECIO'
+    STOCK = 'STOCK'
+    NO_DISPONIBLE = 'NO_DISPONIBLE'
+    NO_EXISTE = 'NO_EXISTE'
+
+    # Estados que impiden comprar la línea
+    BLOQUEANTES = (STOCK, NO_DISPONIBLE, NO_EXISTE)
+
+
+def snapshot(ids):
+    """{id_producto: Producto} con precio, stock y estado, en una sola consulta."""
+    return (
+        Producto.objects.only('id_producto', 'nombre', 'precio', 'stock', 'estado_producto')
+        .in_bulk(set(ids))
+    )
+
+
+def revalidar(lineas, productos=None):
+    """
+    Compara `lineas` con el estado actual de sus productos.
+
+    Args:
+        lineas: dicts con id_producto, cantidad y (opcional) precio_total
+            registrado; sin precio_total no se informa cambio de precio.
+        productos: snapshot ya cargado (si no, se consulta).
+
+    Returns:
+        dict: lineas (deltas por línea), total_anterior, total, delta,
+        valido (ninguna línea bloqueante), cambios (líneas no OK) y
+        productos (el snapshot usado).
+    """
+    if productos is None:
+        productos = snapshot(linea['id_producto'] for linea in lineas)
+    indice, hoy = precios_service.get_indice(), date.today()
+
+    resultado, total_anterior, total = [], 0, 0
+    for linea in lineas:
+        id_producto, cantidad = linea['id_producto'], linea['cantidad']
+        anterior = linea.get('precio_total')
+        producto = productos.get(id_producto)
+        item = {
+            'id_producto': id_producto,
+            'cantidad': cantidad,
+            'precio_total_anterior': anterior,
+        }
+        if producto is None:
+            item.update(estado=EstadoLinea.NO_EXISTE, precio_unitario=None, precio_total=None,
+                        delta=None, stock=0, promociones=[])
+            resultado.append(item)
+            continue
+
+        precio_total = producto.precio * cantidad
+        if producto.estado_producto != ProductStatus.ACTIVO:
+            estado = EstadoLinea.NO_DISPONIBLE
+        elif producto.stock is None or producto.stock < cantidad:
+            estado = EstadoLinea.STOCK
+        elif anterior is not None and anterior != precio_total:
+            estado = EstadoLinea.PRECIO
+        else:
+            estado = EstadoLinea.OK
+        item.update(
+            estado=estado,
+            nombre=producto.nombre,
+            precio_unitario=producto.precio,
+            precio_total=precio_total,
+            delta=None if anterior is None else precio_total - anterior,
+            stock=producto.stock or 0,
+            promociones=[p.como_dict() for p in indice.vigentes(id_producto, hoy)],
+        )
+        resultado.append(item)
+        total += precio_total
+        total_anterior += anterior if anterior is not None else precio_total
+
+    return {
+        'lineas': resultado,
+        'total_anterior': total_anterior,
+        'total': total,
+        'delta': total - total_anterior,
+        'valido': not any(i['estado'] in EstadoLinea.BLOQUEANTES for i in resultado),
+        'cambios': [i for i in resultado if i['estado'] != EstadoLinea.OK],
+        'productos': productos,
+    }
+
+
+def revalidar_carrito(carrito, aplicar=True):
+    """
+    Revalida las líneas de un carrito (detalles ya precargados o no) y, con
+    `aplicar`, guarda los precios nuevos y recalcula los totales.
+    """
+    detalles = list(carrito.detalles.all())
+    revision = revalidar([
+        {'id_producto': d.id_producto_id, 'cantidad': d.cantidad, 'precio_total': d.precio_total}
+        for d in detalles
+    ])
+
+    if aplicar:
+        from .carrito_service import recalcular_totales
+
+        por_producto = {d.id_producto_id: d for d in detalles}
+        repreciados = []
+        for item in revision['lineas']:
+            if item['estado'] == EstadoLinea.PRECIO:
+                detalle = por_producto[item['id_producto']]
+                detalle.precio_total = item['precio_total']
+                repreciados.append(detalle)
+        if repreciados:
+            DetalleCarrito.objects.bulk_update(repreciados, ['precio_total'])
+            recalcular_totales(carrito.id_carrito)
+            carrito.refresh_from_db(fields=['total', 'item_count', 'fecha_actualizacion'])
+    return revision
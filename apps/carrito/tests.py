@@ -1,3 +1,182 @@
-from django.test import TestCase
+import unittest
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.apps import apps
+from django.db import IntegrityError, connection, transaction
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from apps.carrito.models import Carrito, DetalleCarrito, DetalleCarritoArchivo
+from apps.carrito.services import carrito_service, compactacion_service, revalidacion_service
+from apps.carrito.services.carrito_service import CarritoError
+from apps.carrito.services.revalidacion_service import EstadoLinea
+from apps.categoria.models import Categoria
+from apps.promocion.services import precios_service
+from apps.productos.models import Producto
+from apps.usuarios.models import Cliente, Usuario
+from core.constants import CartStatus
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Requiere PostgreSQL')
+class CarritoServiceTests(TransactionTestCase):
+    # carrito, producto, cliente... son managed=False: se crean a mano
+    available_apps = ['apps.carrito', 'apps.productos', 'apps.promocion', 'apps.categoria']
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        existentes = set(connection.introspection.table_names())
+        cls._modelos = [
+            m for m in apps.get_models()
+            if not m._meta.managed and m._meta.db_table not in existentes
+        ]
+        with connection.schema_editor() as editor:
+            for modelo in cls._modelos:
+                editor.create_model(modelo)
+
+    @classmethod
+    def tearDownClass(cls):
+        with connection.schema_editor() as editor:
+            for modelo in reversed(cls._modelos):
+                editor.delete_model(modelo)
+        super().tearDownClass()
+
+    def setUp(self):
+        usuario = Usuario.objects.create(
+            nombre_completo='Cliente Test', nombre_usuario='cliente_carrito',
+            correo='cliente@test.com', sexo='F', password='x',
+        )
+        self.cliente = Cliente.objects.create(id_cliente=usuario)
+        categoria = Categoria.objects.create(nombre='Lentes')
+        self.productos = [
+            Producto.objects.create(
+                id_producto=f'P000{i}', nombre=f'Lente {i}', precio=Decimal('10.00') * i,
+                stock=5, descripcion='-', estado_producto='ACTIVO', id_categoria=categoria,
+            )
+            for i in range(1, 4)
+        ]
+        self.addCleanup(Usuario.objects.filter(pk=usuario.pk).delete)
+        self.addCleanup(Categoria.objects.filter(pk=categoria.pk).delete)
+        self.addCleanup(Producto.objects.all().delete)
+        self.addCleanup(Cliente.objects.all().delete)
+        self.addCleanup(Carrito.objects.all().delete)
+        self.addCleanup(DetalleCarritoArchivo.objects.all().delete)
+
+    def test_lineas_en_bloque_mantienen_total_e_item_count(self):
+        carrito = carrito_service.aplicar_lineas(self.cliente, [
+            {'id_producto': 'P0001', 'cantidad': 2},
+            {'id_producto': 'P0002', 'cantidad': 1},
+            {'id_producto': 'P0003', 'cantidad': 3},
+        ])
+        self.assertEqual((carrito.total, carrito.item_count), (Decimal('130.00'), 6))
+
+        # Cambio de precio: la siguiente operación re-precia todo el carrito
+        Producto.objects.filter(pk='P0003').update(precio=Decimal('20.00'))
+        carrito = carrito_service.aplicar_lineas(self.cliente, [
+            {'id_producto': 'P0001', 'cantidad': 1},
+            {'id_producto': 'P0002', 'cantidad': 0},
+        ])
+        lineas = {d.id_producto_id: (d.cantidad, d.precio_total) for d in carrito.detalles.all()}
+        self.assertEqual(lineas, {'P0001': (1, Decimal('10.00')), 'P0003': (3, Decimal('60.00'))})
+        self.assertEqual((carrito.total, carrito.item_count), (Decimal('70.00'), 4))
+
+        carrito = carrito_service.aplicar_lineas(
+            self.cliente, [{'id_producto': 'P0002', 'cantidad': 2}], reemplazar=True
+        )
+        self.assertEqual([d.id_producto_id for d in carrito.detalles.all()], ['P0002'])
+        self.assertEqual((carrito.total, carrito.item_count), (Decimal('40.00'), 2))
+
+    def test_linea_invalida_no_aplica_ninguna(self):
+        carrito_service.aplicar_lineas(self.cliente, [{'id_producto': 'P0001', 'cantidad': 1}])
+
+        with self.assertRaises(CarritoError) as ctx:
+            carrito_service.aplicar_lineas(self.cliente, [
+                {'id_producto': 'P0002', 'cantidad': 1},
+                {'id_producto': 'P0003', 'cantidad': 9},
+                {'id_producto': 'NOPE', 'cantidad': 1},
+            ])
+        self.assertEqual([e['id_producto'] for e in ctx.exception.errores], ['P0003', 'NOPE'])
+
+        carrito = carrito_service.obtener_activo(self.cliente)
+        self.assertEqual([d.id_producto_id for d in carrito.detalles.all()], ['P0001'])
+        self.assertEqual(carrito.total, Decimal('10.00'))
+
+    def test_ver_carrito_usa_dos_consultas(self):
+        carrito_service.aplicar_lineas(self.cliente, [
+            {'id_producto': p.id_producto, 'cantidad': 1} for p in self.productos
+        ])
+        with self.assertNumQueries(2):
+            carrito = carrito_service.obtener_activo(self.cliente)
+            nombres = [d.id_producto.nombre for d in carrito.detalles.all()]
+        self.assertEqual(len(nombres), 3)
+
+    def test_revalidacion_informa_deltas_por_linea(self):
+        carrito = carrito_service.aplicar_lineas(self.cliente, [
+            {'id_producto': 'P0001', 'cantidad': 2},
+            {'id_producto': 'P0002', 'cantidad': 1},
+            {'id_producto': 'P0003', 'cantidad': 3},
+        ])
+        Producto.objects.filter(pk='P0001').update(precio=Decimal('12.50'))
+        Producto.objects.filter(pk='P0003').update(stock=2)
+
+        carrito = carrito_service.obtener_activo(self.cliente)
+        precios_service.get_indice()  # índice de promociones ya cargado
+        with self.assertNumQueries(1):
+            revision = revalidacion_service.revalidar_carrito(carrito, aplicar=False)
+
+        estados = {i['id_producto']: (i['estado'], i['delta']) for i in revision['lineas']}
+        self.assertEqual(estados, {
+            'P0001': (EstadoLinea.PRECIO, Decimal('5.00')),
+            'P0002': (EstadoLinea.OK, Decimal('0.00')),
+            'P0003': (EstadoLinea.STOCK, Decimal('0.00')),
+        })
+        self.assertFalse(revision['valido'])
+        self.assertEqual(revision['delta'], Decimal('5.00'))
+
+        revalidacion_service.revalidar_carrito(carrito)
+        self.assertEqual(carrito.total, Decimal('135.00'))
+
+    def test_compactacion_expira_inactivos_y_archiva_lineas(self):
+        viejo = carrito_service.aplicar_lineas(self.cliente, [
+            {'id_producto': 'P0001', 'cantidad': 2},
+            {'id_producto': 'P0002', 'cantidad': 1},
+        ])
+        Carrito.objects.filter(pk=viejo.pk).update(
+            fecha_actualizacion=timezone.now() - timedelta(days=45)
+        )
+        # Un solo carrito ACTIVO por cliente
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Carrito.objects.create(id_cliente=self.cliente, estado_carrito=CartStatus.ACTIVO)
+
+        usuario = Usuario.objects.create(
+            nombre_completo='Otro', nombre_usuario='otro_carrito',
+            correo='otro@test.com', sexo='M', password='x',
+        )
+        otro = Cliente.objects.create(id_cliente=usuario)
+        self.addCleanup(Usuario.objects.filter(pk=usuario.pk).delete)
+        self.addCleanup(Cliente.objects.filter(pk=otro.pk).delete)
+        self.addCleanup(Carrito.objects.filter(id_cliente=otro).delete)
+        reciente = carrito_service.aplicar_lineas(otro, [{'id_producto': 'P0003', 'cantidad': 1}])
+
+        self.assertEqual(compactacion_service.compactar(dias=30, dry_run=True)['expirados'], 1)
+        resumen = compactacion_service.compactar(dias=30)
+        self.assertEqual(
+            (resumen['escaneados'], resumen['expirados'], resumen['lineas'], resumen['archivadas']),
+            (1, 1, 2, 2),
+        )
+        self.assertGreater(resumen['bytes_liberados'], 0)
+
+        viejo.refresh_from_db()
+        self.assertEqual((viejo.estado_carrito, viejo.total, viejo.item_count), (CartStatus.EXPIRADO, 0, 0))
+        self.assertFalse(DetalleCarrito.objects.filter(id_carrito=viejo).exists())
+        self.assertEqual(
+            sorted(DetalleCarritoArchivo.objects.filter(id_carrito=viejo.pk).values_list('id_producto', flat=True)),
+            ['P0001', 'P0002'],
+        )
+        self.assertEqual(DetalleCarrito.objects.filter(id_carrito=reciente).count(), 1)
+
+        # El cliente vuelve: carrito nuevo y vacío
+        nuevo = carrito_service.obtener_activo(self.cliente)
+        self.assertNotEqual(nuevo.pk, viejo.pk)
+        self.assertEqual(compactacion_service.compactar(dias=30)['escaneados'], 0)
@@ -3,6 +3,7 @@ from .views import (
     carrito_ver,
     carrito_agregar,
     carrito_actualizar,
+    carrito_lineas,
     carrito_vaciar
 )
 
@@ -10,5 +11,6 @@ urlpatterns = [
     path('', carrito_ver, name='carrito_ver'),
     path('agregar/', carrito_agregar, name='carrito_agregar'),
     path('actualizar/', carrito_actualizar, name='carrito_actualizar'),
+    path('lineas/', carrito_lineas, name='carrito_lineas'),
     path('vaciar/', carrito_vaciar, name='carrito_vaciar'),
 ]
\ No newline at end of file
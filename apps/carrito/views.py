@@ -1,13 +1,20 @@
 # apps/carrito/views.py
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
-from django.db import transaction
-from django.shortcuts import get_object_or_404
 from django.core.exceptions import ObjectDoesNotExist
-from apps.productos.models import Producto
 from .models import Carrito, DetalleCarrito
-from .serializers import CarritoSerializer
-from core.constants import APIResponse 
+from .serializers import CarritoSerializer, LineasCarritoSerializer
+from .services import carrito_service
+from .services.carrito_service import CarritoError
+from .services.revalidacion_service import revalidar_carrito
+from apps.promocion.services import precios_service
+from core.constants import APIResponse, CartStatus
+
+
+def _error_lineas(error):
+    """Respuesta 400 con el detalle de cada línea rechazada."""
+    mensaje = error.errores[0]['error'] if len(error.errores) == 1 else str(error)
+    return APIResponse.bad_request(mensaje, error.errores)
 
 
 # ==============================
@@ -22,12 +29,27 @@ def carrito_ver(request):
     except ObjectDoesNotExist:
         return APIResponse.forbidden("El usuario autenticado no tiene un perfil de cliente asociado.")
 
-    carrito, _ = Carrito.objects.prefetch_related('detalles').get_or_create(
-        id_cliente=cliente,
-        estado_carrito='ACTIVO'
-        # 3. prefetch_related('detalles') OPTIMIZA el serializer
-    )
+    # Carrito + líneas + productos en 2 consultas; el total ya está en la fila.
+    # La revalidación (1 consulta más) re-precia lo que cambió y avisa.
+    carrito = carrito_service.obtener_activo(cliente)
+    revision = revalidar_carrito(carrito)
     data = CarritoSerializer(carrito).data
+    data['revalidacion'] = {
+        'valido': revision['valido'],
+        'total_anterior': revision['total_anterior'],
+        'delta': revision['delta'],
+        'cambios': revision['cambios'],
+    }
+    # Promociones: mismo snapshot, índice en memoria (sin consultas)
+    cotizacion = precios_service.cotizar(
+        [{'id_producto': d.id_producto_id, 'cantidad': d.cantidad} for d in carrito.detalles.all()],
+        productos=revision['productos'],
+    )
+    data['promociones'] = {
+        'descuento': cotizacion['descuento'],
+        'total': cotizacion['total'],
+        'lineas': [l for l in cotizacion['lineas'] if l['promocion']],
+    }
     return APIResponse.success("Carrito obtenido correctamente", data)
 
 
@@ -36,17 +58,16 @@ def carrito_ver(request):
 # ==============================
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
-@transaction.atomic
 def carrito_agregar(request):
     try:
-       
+
         cliente = request.user.cliente
     except ObjectDoesNotExist:
         return APIResponse.forbidden("El usuario autenticado no tiene un perfil de cliente asociado.")
 
     id_producto = request.data.get('id_producto')
-    
-   
+
+
     try:
         cantidad = int(request.data.get('cantidad', 1))
         if cantidad <= 0:
@@ -57,32 +78,12 @@ def carrito_agregar(request):
     if not id_producto:
         return APIResponse.bad_request("Debe indicar un 'id_producto'")
 
-    producto = get_object_or_404(Producto, pk=id_producto)
-
-   
-    if producto.stock is None or producto.stock < cantidad:
-        return APIResponse.bad_request(f"No hay suficiente stock disponible para '{producto.nombre}' (Stock: {producto.stock or 0})")
-
-    carrito, _ = Carrito.objects.prefetch_related('detalles').get_or_create(
-        id_cliente=cliente,
-        estado_carrito='ACTIVO'
-     
-    )
-
-    detalle, creado = DetalleCarrito.objects.get_or_create(
-        id_carrito=carrito,
-        id_producto=producto,
-        defaults={'cantidad': cantidad, 'precio_total': producto.precio * cantidad}
-    )
-
-    if not creado:
-        nueva_cantidad = detalle.cantidad + cantidad
-        if producto.stock < nueva_cantidad:
-            return APIResponse.bad_request(f"Stock insuficiente para '{producto.nombre}' al sumar al carrito (Stock: {producto.stock})")
-        
-        detalle.cantidad = nueva_cantidad
-        detalle.precio_total = detalle.cantidad * producto.precio
-        detalle.save()
+    try:
+        carrito = carrito_service.aplicar_lineas(
+            cliente, [{'id_producto': id_producto, 'cantidad': cantidad}], sumar=True
+        )
+    except CarritoError as e:
+        return _error_lineas(e)
 
     data = CarritoSerializer(carrito).data
     return APIResponse.created("Producto agregado al carrito", data)
@@ -93,16 +94,15 @@ def carrito_agregar(request):
 # ==============================
 @api_view(['PUT'])
 @permission_classes([IsAuthenticated])
-@transaction.atomic
 def carrito_actualizar(request):
     try:
-      
+
         cliente = request.user.cliente
     except ObjectDoesNotExist:
         return APIResponse.forbidden("El usuario autenticado no tiene un perfil de cliente asociado.")
 
     id_producto = request.data.get('id_producto')
-    
+
     try:
         cantidad = int(request.data.get('cantidad', 0))
         if cantidad < 0:
@@ -113,29 +113,59 @@ def carrito_actualizar(request):
     if not id_producto:
         return APIResponse.bad_request("Debe indicar un 'id_producto'")
 
-    producto = get_object_or_404(Producto, pk=id_producto)
-    carrito = get_object_or_404(
-        Carrito.objects.prefetch_related('detalles'), # 3. OPTIMIZAR
-        id_cliente=cliente, 
-        estado_carrito='ACTIVO'
-    )
+    if not DetalleCarrito.objects.filter(
+        id_carrito__id_cliente=cliente,
+        id_carrito__estado_carrito=CartStatus.ACTIVO,
+        id_producto_id=id_producto,
+    ).exists():
+        return APIResponse.not_found("El producto no está en el carrito")
 
     try:
-        detalle = DetalleCarrito.objects.get(id_carrito=carrito, id_producto=producto)
-    except DetalleCarrito.DoesNotExist:
-        return APIResponse.not_found("El producto no está en el carrito")
+        carrito = carrito_service.aplicar_lineas(
+            cliente, [{'id_producto': id_producto, 'cantidad': cantidad}]
+        )
+    except CarritoError as e:
+        return _error_lineas(e)
 
-    if cantidad <= 0:
-        detalle.delete()
-        data = CarritoSerializer(carrito).data # Devolver el carrito actualizado
+    data = CarritoSerializer(carrito).data
+    if cantidad == 0:
         return APIResponse.success("Producto eliminado del carrito", data)
+    return APIResponse.success("Carrito actualizado correctamente", data)
 
-    if producto.stock is None or cantidad > producto.stock:
-        return APIResponse.bad_request(f"No hay suficiente stock disponible (Stock: {producto.stock or 0})")
 
-    detalle.cantidad = cantidad
-    detalle.precio_total = cantidad * producto.precio
-    detalle.save()
+# ==============================
+# FIJAR VARIAS LÍNEAS EN UNA OPERACIÓN
+# ==============================
+@api_view(['PUT'])
+@permission_classes([IsAuthenticated])
+def carrito_lineas(request):
+    """
+    Aplica muchas líneas en una transacción (todas o ninguna).
+    PUT /api/carrito/lineas/
+    {
+        "lineas": [{"id_producto": "P0001", "cantidad": 2}, {"id_producto": "P0002", "cantidad": 0}],
+        "reemplazar": false
+    }
+    cantidad 0 quita la línea; con "reemplazar": true el carrito queda
+    exactamente con las líneas enviadas.
+    """
+    try:
+        cliente = request.user.cliente
+    except ObjectDoesNotExist:
+        return APIResponse.forbidden("El usuario autenticado no tiene un perfil de cliente asociado.")
+
+    serializer = LineasCarritoSerializer(data=request.data)
+    if not serializer.is_valid():
+        return APIResponse.bad_request(errors=serializer.errors)
+
+    try:
+        carrito = carrito_service.aplicar_lineas(
+            cliente,
+            serializer.validated_data['lineas'],
+            reemplazar=serializer.validated_data['reemplazar'],
+        )
+    except CarritoError as e:
+        return _error_lineas(e)
 
     data = CarritoSerializer(carrito).data
     return APIResponse.success("Carrito actualizado correctamente", data)
@@ -146,20 +176,16 @@ def carrito_actualizar(request):
 # ==============================
 @api_view(['DELETE'])
 @permission_classes([IsAuthenticated])
-@transaction.atomic
 def carrito_vaciar(request):
     try:
-      
+
         cliente = request.user.cliente
     except ObjectDoesNotExist:
         return APIResponse.forbidden("El usuario autenticado no tiene un perfil de cliente asociado.")
 
-    carrito = get_object_or_404(
-        Carrito.objects.prefetch_related('detalles'), 
-        id_cliente=cliente, 
-        estado_carrito='ACTIVO'
-    )
-    DetalleCarrito.objects.filter(id_carrito=carrito).delete()
+    if not Carrito.objects.filter(id_cliente=cliente, estado_carrito=CartStatus.ACTIVO).exists():
+        return APIResponse.not_found("No existe un carrito activo.")
 
-    data = CarritoSerializer(carrito).data 
-    return APIResponse.success("Carrito vaciado correctamente", data)
\ No newline at end of file
+    carrito = carrito_service.vaciar(cliente)
+    data = CarritoSerializer(carrito).data
+    return APIResponse.success("Carrito vaciado correctamente", data)
@@ -3,6 +3,8 @@ from rest_framework import serializers
 from apps.productos.models import Producto, ConfiguracionLente, Medida
 from apps.categoria.models import Categoria
 from apps.imagenes.models import ImagenProducto
+from apps.imagenes.services import activas, variantes
+from apps.promocion.services import precios_service
 
 
 class MedidaCatalogoSerializer(serializers.ModelSerializer):
@@ -40,18 +42,44 @@ class ConfiguracionCatalogoSerializer(serializers.ModelSerializer):
 
 class ImagenCatalogoSerializer(serializers.ModelSerializer):
     """Serializer para imágenes en catálogo"""
+    variantes = serializers.SerializerMethodField()
     
     class Meta:
         model = ImagenProducto
-        fields = ['id_imagen', 'url', 'public_id', 'es_principal']
+        fields = ['id_imagen', 'url', 'public_id', 'es_principal', 'variantes']
 
+    def get_variantes(self, obj):
+        return variantes.manifiesto(obj)
 
-class ProductoCatalogoListSerializer(serializers.ModelSerializer):
+
+class PreciosPromocionMixin:
+    """
+    precio_final y promociones vigentes (motor de precios, sin consultas).
+    El listado pasa en context['precios'] los de toda la página.
+    """
+
+    def _precio(self, obj):
+        precios = self.context.get('precios')
+        if precios is None or obj.id_producto not in precios:
+            precios = precios_service.precios_catalogo([obj])
+        return precios[obj.id_producto]
+
+    def get_precio_final(self, obj):
+        # Como texto, igual que `precio`
+        return str(self._precio(obj)['precio_final'])
+
+    def get_promociones(self, obj):
+        return self._precio(obj)['promociones']
+
+
+class ProductoCatalogoListSerializer(PreciosPromocionMixin, serializers.ModelSerializer):
     """Serializer ligero para listado de productos en catálogo"""
     categoria = CategoriaCatalogoSerializer(source='id_categoria', read_only=True)
     imagen_principal = serializers.SerializerMethodField()
     color = serializers.CharField(source='id_configuracion.color', read_only=True)
     tiene_stock = serializers.BooleanField(read_only=True)
+    precio_final = serializers.SerializerMethodField()
+    promociones = serializers.SerializerMethodField()
     
     class Meta:
         model = Producto
@@ -60,6 +88,8 @@ class ProductoCatalogoListSerializer(serializers.ModelSerializer):
             'nombre',
             'descripcion',
             'precio',
+            'precio_final',
+            'promociones',
             'stock',
             'categoria',
             'color',
@@ -68,22 +98,25 @@ class ProductoCatalogoListSerializer(serializers.ModelSerializer):
         ]
     
     def get_imagen_principal(self, obj):
-        """Obtiene la imagen principal del producto"""
-        imagen = obj.imagenes.filter(es_principal=True).first()
+        """Obtiene la imagen principal (ACTIVA) del producto"""
+        imagen = activas.principal(obj)
         if imagen:
             return {
                 'url': imagen.url,
-                'public_id': imagen.public_id
+                'public_id': imagen.public_id,
+                **variantes.resumen(imagen)
             }
         return None
 
 
-class ProductoCatalogoDetalleSerializer(serializers.ModelSerializer):
+class ProductoCatalogoDetalleSerializer(PreciosPromocionMixin, serializers.ModelSerializer):
     """Serializer completo para detalle de producto en catálogo"""
     categoria = CategoriaCatalogoSerializer(source='id_categoria', read_only=True)
     configuracion = ConfiguracionCatalogoSerializer(source='id_configuracion', read_only=True)
-    imagenes = ImagenCatalogoSerializer(many=True, read_only=True)
+    imagenes = serializers.SerializerMethodField()
     tiene_stock = serializers.BooleanField(read_only=True)
+    precio_final = serializers.SerializerMethodField()
+    promociones = serializers.SerializerMethodField()
     
     class Meta:
         model = Producto
@@ -92,6 +125,8 @@ class ProductoCatalogoDetalleSerializer(serializers.ModelSerializer):
             'nombre',
             'descripcion',
             'precio',
+            'precio_final',
+            'promociones',
             'stock',
             'categoria',
             'configuracion',
@@ -100,6 +135,9 @@ class ProductoCatalogoDetalleSerializer(serializers.ModelSerializer):
             'tiene_stock'
         ]
 
+    def get_imagenes(self, obj):
+        """Solo las imágenes ACTIVA: las PENDIENTE o ERROR no tienen URL"""
+        return ImagenCatalogoSerializer(activas.de_producto(obj), many=True).data
 
 class ColorDisponibleSerializer(serializers.Serializer):
     """Serializer para colores disponibles"""
@@ -112,4 +150,4 @@ class MedidaDisponibleSerializer(serializers.Serializer):
     id_medida = serializers.IntegerField()
     medida = serializers.CharField()
     descripcion = serializers.CharField(allow_null=True)
-    productos_disponibles = serializers.IntegerField()
\ No newline at end of file
+    productos_disponibles = serializers.IntegerField()
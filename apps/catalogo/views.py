@@ -9,6 +9,8 @@ import math
 
 from apps.productos.models import Producto, ConfiguracionLente, Medida
 from apps.categoria.models import Categoria
+from apps.imagenes.services import activas
+from apps.promocion.services import precios_service
 from core.constants import APIResponse, Messages, ProductStatus, CategoryStatus, CatalogConfig
 from .serializers import (
     ProductoCatalogoListSerializer,
@@ -318,8 +320,9 @@ def buscar_productos(request):
     ).select_related(
         'id_categoria',
         'id_configuracion',
-        'id_configuracion__id_medida'
-    ).prefetch_related('imagenes')
+        'id_configuracion__id_medida',
+        'velocidad_venta'
+    ).prefetch_related(activas.prefetch())
     
     # === FILTROS ===
     
@@ -397,13 +400,18 @@ def buscar_productos(request):
     start = (page - 1) * page_size
     end = start + page_size
     
-    productos_paginados = queryset[start:end]
+    productos_paginados = list(queryset[start:end])
     
     # Calcular total de páginas
     total_paginas = math.ceil(total_productos / page_size) if total_productos > 0 else 1
     
     # === SERIALIZAR ===
-    serializer = ProductoCatalogoListSerializer(productos_paginados, many=True)
+    # Precios con promociones de toda la página en una llamada (índice en memoria)
+    serializer = ProductoCatalogoListSerializer(
+        productos_paginados,
+        many=True,
+        context={'precios': precios_service.precios_catalogo(productos_paginados)},
+    )
     
     return APIResponse.success(
         data={
@@ -444,8 +452,9 @@ def obtener_detalle_producto(request, id_producto):
         producto = Producto.objects.select_related(
             'id_categoria',
             'id_configuracion',
-            'id_configuracion__id_medida'
-        ).prefetch_related('imagenes').get(
+            'id_configuracion__id_medida',
+            'velocidad_venta'
+        ).prefetch_related(activas.prefetch()).get(
             id_producto=id_producto,
             estado_producto=ProductStatus.ACTIVO
         )
@@ -454,7 +463,9 @@ def obtener_detalle_producto(request, id_producto):
             message=Messages.PRODUCT_NOT_AVAILABLE
         )
     
-    serializer = ProductoCatalogoDetalleSerializer(producto)
+    serializer = ProductoCatalogoDetalleSerializer(
+        producto, context={'precios': precios_service.precios_catalogo([producto])}
+    )
     return APIResponse.success(data=serializer.data)
 
 
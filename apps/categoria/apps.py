@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CategoriaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.categoria'
+
+    def ready(self):
+        # Receivers de la tabla de cierre y del árbol en memoria
+        import apps.categoria.signals
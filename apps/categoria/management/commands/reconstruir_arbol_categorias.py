@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from apps.categoria.services import arbol_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Rehace la tabla de cierre categoria_cierre a partir de id_catpadre. "
+        "Solo hace falta si se cambiaron categorías por fuera del ORM."
+    )
+
+    def handle(self, *args, **options):
+        filas = arbol_service.reconstruir()
+        arbol_service.invalidar()
+        self.stdout.write(self.style.SUCCESS(
+            f"categoria_cierre reconstruida: {filas} fila(s), "
+            f"{arbol_service.profundidad_maxima()} nivel(es)."
+        ))
@@ -0,0 +1,49 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+# La tabla de cierre se llena a partir de id_catpadre de la tabla legada
+# categoria (managed=False), solo si existe. Después la mantienen los
+# receivers de apps.categoria.signals.
+POBLAR = """
+DO $$
+BEGIN
+    IF to_regclass('categoria') IS NOT NULL THEN
+        INSERT INTO categoria_cierre (id_ancestro, id_descendiente, profundidad)
+        WITH RECURSIVE cierre (id_ancestro, id_descendiente, profundidad) AS (
+            SELECT id_categoria, id_categoria, 0
+              FROM categoria
+            UNION ALL
+            SELECT cierre.id_ancestro, c.id_categoria, cierre.profundidad + 1
+              FROM cierre
+              JOIN categoria c ON c.id_catpadre = cierre.id_descendiente
+        )
+        SELECT id_ancestro, id_descendiente, profundidad FROM cierre
+        ON CONFLICT DO NOTHING;
+    END IF;
+END $$;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categoria', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoriaCierre',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('profundidad', models.PositiveSmallIntegerField()),
+                ('ancestro', models.ForeignKey(db_column='id_ancestro', on_delete=django.db.models.deletion.CASCADE, related_name='cierre_descendientes', to='categoria.categoria')),
+                ('descendiente', models.ForeignKey(db_column='id_descendiente', on_delete=django.db.models.deletion.CASCADE, related_name='cierre_ancestros', to='categoria.categoria')),
+            ],
+            options={
+                'db_table': 'categoria_cierre',
+                'indexes': [models.Index(fields=['descendiente', 'profundidad'], name='categoria_cierre_desc_idx')],
+                'constraints': [models.UniqueConstraint(fields=('ancestro', 'descendiente'), name='categoria_cierre_par_uniq')],
+            },
+        ),
+        migrations.RunSQL(POBLAR, migrations.RunSQL.noop),
+    ]
@@ -27,3 +27,32 @@ class Categoria(models.Model):
 
     def __str__(self):
         return self.nombre
+
+
+class CategoriaCierre(models.Model):
+    """
+    Tabla de cierre de la jerarquía: una fila por cada par (ancestro,
+    descendiente), incluida la de cada categoría consigo misma
+    (profundidad 0). La mantiene apps.categoria.signals; ver
+    services/arbol_service.py.
+    """
+
+    ancestro = models.ForeignKey(
+        Categoria, on_delete=models.CASCADE, db_column='id_ancestro', related_name='cierre_descendientes'
+    )
+    descendiente = models.ForeignKey(
+        Categoria, on_delete=models.CASCADE, db_column='id_descendiente', related_name='cierre_ancestros'
+    )
+    profundidad = models.PositiveSmallIntegerField()
+
+    class Meta:
+        db_table = 'categoria_cierre'
+        constraints = [
+            models.UniqueConstraint(fields=['ancestro', 'descendiente'], name='categoria_cierre_par_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['descendiente', 'profundidad'], name='categoria_cierre_desc_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestro_id} > {self.descendiente_id} ({self.profundidad})"
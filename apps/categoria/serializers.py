@@ -1,8 +1,7 @@
 from rest_framework import serializers
-from django.db.models import Count
 from .models import Categoria
-from apps.productos.models import Producto
-from core.constants import CategoryStatus
+from .services import arbol_service
+from core.constants import Messages
 
 
 class CategoriaSerializer(serializers.ModelSerializer):
@@ -19,19 +18,16 @@ class CategoriaSerializer(serializers.ModelSerializer):
             'cantidad_productos',
         ]
 
+    def validate_id_catpadre(self, padre):
+        # Un ciclo rompería la jerarquía (y su tabla de cierre)
+        if self.instance and padre and arbol_service.es_descendiente(
+            padre.id_categoria, self.instance.id_categoria
+        ):
+            raise serializers.ValidationError(Messages.CATEGORY_CANNOT_MOVE_TO_CHILD)
+        return padre
+
     def get_subcategorias(self, obj):
         """
-        Usa un cache local en el contexto del serializer para evitar repetir queries.
+        Subcategorías activas anidadas, del árbol en memoria (sin consultas).
         """
-        all_categorias = self.context.get("prefetched_categorias")
-        if not all_categorias:
-            all_categorias = (
-                Categoria.objects.filter(estado_categoria=CategoryStatus.ACTIVA)
-                .select_related('id_catpadre')
-                .prefetch_related('subcategorias')
-                .annotate(cantidad_productos=Count('productos'))
-            )
-            self.context["prefetched_categorias"] = all_categorias
-
-        hijos = [c for c in all_categorias if c.id_catpadre_id == obj.id_categoria]
-        return CategoriaSerializer(hijos, many=True, context=self.context).data
+        return arbol_service.subcategorias(obj.id_categoria)
@@ -0,0 +1,181 @@
+# apps/categoria/services/arbol_service.py
+"""
+Jerarquía de categorías sobre la tabla de cierre categoria_cierre.
+
+Por cada par (ancestro, descendiente) hay una fila con su distancia, y
+cada categoría es ancestro de sí misma a profundidad 0. Así la ruta de una
+categoría, la comprobación "¿es descendiente de?" y la profundidad máxima
+son una sola consulta indexada, sin recorrer id_catpadre nivel a nivel.
+
+El cierre se mantiene en post_save de Categoria (apps.categoria.signals):
+al crear se copian las filas del padre (un INSERT ... SELECT) y al cambiar
+id_catpadre se desprende el subárbol de sus ancestros anteriores y se
+injerta bajo el nuevo padre (un DELETE y un INSERT). `reconstruir()` lo
+rehace entero desde id_catpadre.
+
+El árbol de categorías activas que sirve listar_arbol se arma en una
+consulta y se guarda en memoria. Se descarta con las señales categoria_*
+y, como mucho, cada CATEGORIAS_ARBOL_TTL segundos (lo que puede tardar en
+verse un cambio hecho en otro proceso o en la cantidad de productos).
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Max
+
+from apps.categoria.models import Categoria, CategoriaCierre
+from core.constants import CategoryStatus
+
+INSERTAR = """
+INSERT INTO categoria_cierre (id_ancestro, id_descendiente, profundidad)
+SELECT id_ancestro, %(id)s, profundidad + 1
+  FROM categoria_cierre
+ WHERE id_descendiente = %(padre)s
+UNION ALL
+SELECT %(id)s, %(id)s, 0
+"""
+
+# Filas que unen el subárbol con ancestros que no son parte de él
+DESPRENDER = """
+DELETE FROM categoria_cierre
+ WHERE id_descendiente IN (SELECT id_descendiente FROM categoria_cierre WHERE id_ancestro = %(id)s)
+   AND id_ancestro NOT IN (SELECT id_descendiente FROM categoria_cierre WHERE id_ancestro = %(id)s)
+"""
+
+# Cada ancestro del nuevo padre por cada nodo del subárbol
+INJERTAR = """
+INSERT INTO categoria_cierre (id_ancestro, id_descendiente, profundidad)
+SELECT sup.id_ancestro, sub.id_descendiente, sup.profundidad + sub.profundidad + 1
+  FROM categoria_cierre sup
+ CROSS JOIN categoria_cierre sub
+ WHERE sup.id_descendiente = %(padre)s
+   AND sub.id_ancestro = %(id)s
+"""
+
+RECONSTRUIR = """
+INSERT INTO categoria_cierre (id_ancestro, id_descendiente, profundidad)
+WITH RECURSIVE cierre (id_ancestro, id_descendiente, profundidad) AS (
+    SELECT id_categoria, id_categoria, 0
+      FROM categoria
+    UNION ALL
+    SELECT cierre.id_ancestro, c.id_categoria, cierre.profundidad + 1
+      FROM cierre
+      JOIN categoria c ON c.id_catpadre = cierre.id_descendiente
+)
+SELECT id_ancestro, id_descendiente, profundidad FROM cierre
+"""
+
+
+def sincronizar(categoria, creada=False):
+    """
+    Deja el cierre de acuerdo con id_catpadre tras guardar `categoria`.
+    Una consulta si nada cambió; dos o tres más si se creó o se movió.
+    """
+    actuales = {}
+    if not creada:
+        # {0: ella misma, 1: padre según el cierre}
+        actuales = dict(
+            CategoriaCierre.objects
+            .filter(descendiente_id=categoria.id_categoria, profundidad__lte=1)
+            .values_list('profundidad', 'ancestro_id')
+        )
+    params = {'id': categoria.id_categoria, 'padre': categoria.id_catpadre_id}
+
+    with connection.cursor() as cursor:
+        if 0 not in actuales:
+            # Nueva (o creada fuera del ORM): hoja bajo su padre
+            cursor.execute(INSERTAR, params)
+        elif actuales.get(1) != categoria.id_catpadre_id:
+            cursor.execute(DESPRENDER, params)
+            if categoria.id_catpadre_id is not None:
+                cursor.execute(INJERTAR, params)
+
+
+@transaction.atomic
+def reconstruir():
+    """Rehace categoria_cierre desde id_catpadre. Devuelve las filas creadas."""
+    with connection.cursor() as cursor:
+        cursor.execute("DELETE FROM categoria_cierre")
+        cursor.execute(RECONSTRUIR)
+        return cursor.rowcount
+
+
+def es_descendiente(id_categoria, id_ancestro) -> bool:
+    """True si `id_categoria` está en el subárbol de `id_ancestro` (o es ella)."""
+    return CategoriaCierre.objects.filter(ancestro_id=id_ancestro, descendiente_id=id_categoria).exists()
+
+
+def ruta(id_categoria):
+    """Ancestros de la raíz a la categoría: [{id_categoria, nombre}, ...]."""
+    return list(
+        Categoria.objects
+        .filter(cierre_descendientes__descendiente_id=id_categoria)
+        .order_by('-cierre_descendientes__profundidad')
+        .values('id_categoria', 'nombre')
+    )
+
+
+def profundidad_maxima() -> int:
+    """Niveles del árbol más profundo (una raíz sola es 1; sin categorías, 0)."""
+    maxima = CategoriaCierre.objects.aggregate(maxima=Max('profundidad'))['maxima']
+    return 0 if maxima is None else maxima + 1
+
+
+def cargar():
+    """
+    Árbol de categorías activas con su cantidad de productos (1 consulta).
+    Devuelve (raices, hijos) con hijos = {id_catpadre: [nodo, ...]}.
+    """
+    filas = (
+        Categoria.objects.filter(estado_categoria=CategoryStatus.ACTIVA)
+        .annotate(cantidad_productos=Count('productos'))
+        .order_by('nombre')
+        .values('id_categoria', 'nombre', 'id_catpadre', 'cantidad_productos')
+    )
+    hijos = {}
+    for fila in filas:
+        nodo = {
+            'id_categoria': fila['id_categoria'],
+            'nombre': fila['nombre'],
+            'id_catpadre': fila['id_catpadre'],
+            'subcategorias': [],
+            'cantidad_productos': fila['cantidad_productos'],
+        }
+        hijos.setdefault(fila['id_catpadre'], []).append(nodo)
+    for lista in hijos.values():
+        for nodo in lista:
+            nodo['subcategorias'] = hijos.get(nodo['id_categoria'], [])
+    return hijos.get(None, []), hijos
+
+
+_arbol = None
+_expira = 0.0
+_arbol_lock = threading.Lock()
+
+
+def _get_arbol():
+    global _arbol, _expira
+    with _arbol_lock:
+        if _arbol is None or _expira <= time.monotonic():
+            _arbol = cargar()
+            _expira = time.monotonic() + settings.CATEGORIAS_ARBOL_TTL
+        return _arbol
+
+
+def arbol():
+    """Categorías activas raíz, cada una con sus subcategorías anidadas."""
+    return _get_arbol()[0]
+
+
+def subcategorias(id_categoria):
+    """Subcategorías activas (anidadas) de una categoría, desde el árbol en memoria."""
+    return _get_arbol()[1].get(id_categoria, [])
+
+
+def invalidar() -> None:
+    """Descarta el árbol; se reconstruye en el próximo uso."""
+    global _arbol
+    with _arbol_lock:
+        _arbol = None
@@ -0,0 +1,37 @@
+"""
+Mantenimiento de la tabla de cierre e invalidación del árbol en memoria.
+
+El cierre se actualiza en la misma transacción que el guardado de la
+categoría. El árbol se descarta al commit: reconstruido antes, podría
+cachear datos que luego se revierten.
+"""
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from apps.bitacora.signals import (
+    categoria_actualizada,
+    categoria_creada,
+    categoria_eliminada,
+    categoria_movida,
+    categoria_restaurada,
+)
+
+from .models import Categoria
+from .services import arbol_service
+
+
+@receiver(post_save, sender=Categoria)
+def sincronizar_cierre(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    arbol_service.sincronizar(instance, creada=created)
+
+
+@receiver(categoria_creada)
+@receiver(categoria_actualizada)
+@receiver(categoria_movida)
+@receiver(categoria_eliminada)
+@receiver(categoria_restaurada)
+def invalidar_arbol(sender, **kwargs):
+    transaction.on_commit(arbol_service.invalidar)
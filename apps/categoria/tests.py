@@ -1,3 +1,90 @@
-from django.test import TestCase
+from django.db import connection
+from django.test import TransactionTestCase
 
-# Create your tests here.
+from apps.productos.models import Producto
+from core.constants import CategoryStatus
+
+from .models import Categoria, CategoriaCierre
+from .serializers import CategoriaSerializer
+from .services import arbol_service
+
+
+class ArbolCategoriasTests(TransactionTestCase):
+    available_apps = ['apps.categoria', 'apps.productos']
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        existentes = set(connection.introspection.table_names())
+        cls._modelos = [
+            m for m in (Categoria, Producto)
+            if m._meta.db_table not in existentes
+        ]
+        with connection.schema_editor() as editor:
+            for modelo in cls._modelos:
+                editor.create_model(modelo)
+
+    @classmethod
+    def tearDownClass(cls):
+        with connection.schema_editor() as editor:
+            for modelo in reversed(cls._modelos):
+                editor.delete_model(modelo)
+        super().tearDownClass()
+
+    def setUp(self):
+        # Lentes > Contacto > Diarios ; Accesorios (raíz)
+        self.lentes = Categoria.objects.create(nombre='Lentes')
+        self.contacto = Categoria.objects.create(nombre='Contacto', id_catpadre=self.lentes)
+        self.diarios = Categoria.objects.create(nombre='Diarios', id_catpadre=self.contacto)
+        self.accesorios = Categoria.objects.create(nombre='Accesorios')
+        ids = [c.pk for c in (self.lentes, self.contacto, self.diarios, self.accesorios)]
+        self.addCleanup(Categoria.objects.filter(pk__in=ids).delete)
+        self.addCleanup(arbol_service.invalidar)
+        arbol_service.invalidar()
+
+    def _cierre(self):
+        return set(CategoriaCierre.objects.values_list('ancestro_id', 'descendiente_id', 'profundidad'))
+
+    def test_cierre_se_mantiene_al_crear_y_mover(self):
+        with self.assertNumQueries(1):
+            ruta = arbol_service.ruta(self.diarios.pk)
+        self.assertEqual([c['nombre'] for c in ruta], ['Lentes', 'Contacto', 'Diarios'])
+        self.assertTrue(arbol_service.es_descendiente(self.diarios.pk, self.lentes.pk))
+        self.assertEqual(arbol_service.profundidad_maxima(), 3)
+
+        # Mover un subárbol: Contacto (con Diarios) pasa a Accesorios
+        self.contacto.id_catpadre = self.accesorios
+        self.contacto.save()
+        self.assertEqual(
+            [c['nombre'] for c in arbol_service.ruta(self.diarios.pk)],
+            ['Accesorios', 'Contacto', 'Diarios'],
+        )
+        self.assertFalse(arbol_service.es_descendiente(self.diarios.pk, self.lentes.pk))
+
+        # Y a la raíz
+        self.contacto.id_catpadre = None
+        self.contacto.save()
+        self.assertEqual(arbol_service.profundidad_maxima(), 2)
+
+        # Lo mantenido incrementalmente coincide con reconstruirlo desde id_catpadre
+        mantenido = self._cierre()
+        arbol_service.reconstruir()
+        self.assertEqual(self._cierre(), mantenido)
+
+    def test_arbol_en_memoria_y_ciclos(self):
+        Categoria.objects.filter(pk=self.accesorios.pk).update(estado_categoria=CategoryStatus.INACTIVA)
+
+        with self.assertNumQueries(1):
+            arbol = arbol_service.arbol()
+        with self.assertNumQueries(0):
+            arbol_service.arbol()
+            subcategorias = CategoriaSerializer(self.lentes).data['subcategorias']
+
+        self.assertEqual([c['nombre'] for c in arbol], ['Lentes'])
+        self.assertEqual(subcategorias[0]['nombre'], 'Contacto')
+        self.assertEqual(subcategorias[0]['subcategorias'][0]['nombre'], 'Diarios')
+
+        # Mover Lentes dentro de su propio subárbol se rechaza
+        serializer = CategoriaSerializer(self.lentes, data={'id_catpadre': self.diarios.pk}, partial=True)
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('id_catpadre', serializer.errors)
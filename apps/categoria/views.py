@@ -3,12 +3,11 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.db import transaction
-from django.db import connection
-from django.db.models import Count
 from django.db.models import Exists, OuterRef
 from .models import Categoria
 from apps.productos.models import Producto
 from .serializers import CategoriaSerializer
+from .services import arbol_service
 from rest_framework.permissions import IsAdminUser
 from apps.bitacora.signals import (
     categoria_eliminada,
@@ -167,7 +166,7 @@ class CategoriaViewSet(viewsets.ModelViewSet):
         nuevo_padre = Categoria.objects.filter(id_categoria=nuevo_id).first() if nuevo_id else None
 
         # No permitir mover dentro de sus propias subcategorías
-        if self._es_descendiente(nuevo_padre, categoria):
+        if nuevo_padre and arbol_service.es_descendiente(nuevo_padre.id_categoria, categoria.id_categoria):
             return APIResponse.bad_request(message=Messages.CATEGORY_CANNOT_MOVE_TO_CHILD)
 
         origen = categoria.id_catpadre.nombre if categoria.id_catpadre else "Raíz"
@@ -189,14 +188,14 @@ class CategoriaViewSet(viewsets.ModelViewSet):
 
         return APIResponse.success(
             message=Messages.CATEGORY_MOVED,
-            data={"ruta_nueva": self._build_ruta(categoria)}
+            data={"ruta_nueva": arbol_service.ruta(categoria.id_categoria)}
         )
 
     # === GET /api/categorias/{id}/ruta/ ===
     @action(detail=True, methods=['get'])
     def ruta(self, request, pk=None):
         categoria = self.get_object()
-        return Response({"ruta": self._build_ruta(categoria)})
+        return Response({"ruta": arbol_service.ruta(categoria.id_categoria)})
 
     # === GET /api/categorias/estadisticas/ ===
     @action(detail=False, methods=['get'], url_path='estadisticas')
@@ -206,7 +205,7 @@ class CategoriaViewSet(viewsets.ModelViewSet):
         sin_productos = Categoria.objects.annotate(
             tiene_productos=Exists(Producto.objects.filter(id_categoria=OuterRef('id_categoria')))
         ).filter(tiene_productos=False).count()
-        nivel_maximo = self._profundidad_maxima()
+        nivel_maximo = arbol_service.profundidad_maxima()
 
         return Response({
             "total": total,
@@ -220,57 +219,10 @@ class CategoriaViewSet(viewsets.ModelViewSet):
     def listar_arbol(self, request):
         """
         Devuelve todas las categorías activas en estructura jerárquica,
-        optimizada con prefetch y conteo de productos.
+        con su conteo de productos. El árbol se arma en una consulta y se
+        sirve desde memoria hasta el próximo cambio de categorías.
         """
-        categorias = (
-            Categoria.objects.filter(estado_categoria=CategoryStatus.ACTIVA)
-            .select_related('id_catpadre')
-            .prefetch_related('subcategorias', 'productos')
-            .annotate(cantidad_productos=Count('productos'))
-            .order_by('nombre')
-        )
-
-        # Solo las categorías raíz
-        categorias_raiz = [c for c in categorias if c.id_catpadre is None]
+        return Response(arbol_service.arbol(), status=status.HTTP_200_OK)
 
-        serializer = CategoriaSerializer(
-            categorias_raiz, many=True, context={"prefetched_categorias": categorias}
-        )
-        return Response(serializer.data, status=status.HTTP_200_OK)
-
-    # === MÉTODOS AUXILIARES ===
-    def _es_descendiente(self, posible_hijo, posible_padre):
-        actual = posible_hijo
-        while actual:
-            if actual.id_categoria == posible_padre.id_categoria:
-                return True
-            actual = actual.id_catpadre
-        return False
-
-    def _build_ruta(self, categoria):
-        ruta = []
-        actual = categoria
-        while actual:
-            ruta.insert(0, {"id_categoria": actual.id_categoria, "nombre": actual.nombre})
-            actual = actual.id_catpadre
-        return ruta
-
-    def _profundidad_maxima(self):
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                WITH RECURSIVE jerarquia AS (
-                    SELECT id_categoria, id_catpadre, 1 AS nivel
-                    FROM categoria
-                    WHERE id_catpadre IS NULL
-                    UNION ALL
-                    SELECT c.id_categoria, c.id_catpadre, j.nivel + 1
-                    FROM categoria c
-                    INNER JOIN jerarquia j ON c.id_catpadre = j.id_categoria
-                )
-                SELECT MAX(nivel) FROM jerarquia;
-            """)
-            result = cursor.fetchone()
-        return result[0] or 0
-    
     # NOTA: El método get_queryset() está definido al inicio de la clase (línea ~28)
     # Esta segunda definición fue eliminada para evitar duplicación
@@ -0,0 +1,194 @@
+import math
+import time
+from datetime import timedelta
+
+import numpy as np
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.categoria.models import Categoria
+from apps.compras.services import reposicion_service
+from apps.inventario.services import velocidad_service
+from apps.pagos.models import MetodoPago
+from apps.reportes.models import HechoVentaDiaria
+from apps.usuarios.models import Vendedor
+from core.constants import PurchaseStatus, ReplenishmentConfig, StockMovementReason
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el motor de reposición (carga + cálculo vectorizado) sobre un "
+        "catálogo sintético y lo compara con el mismo cálculo producto por "
+        "producto en Python. Los datos se insertan en una transacción que se "
+        "revierte. Requiere PostgreSQL y al menos un vendedor y un método de pago."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--productos", type=int, default=50_000)
+        parser.add_argument("--proveedores", type=int, default=200)
+        parser.add_argument("--dias-venta", type=int, default=20, help="Días con ventas por producto (de 90).")
+
+    def _poblar(self, n_productos, n_proveedores, dias_venta, vendedor, metodo):
+        hoy = timezone.now().date()
+        categoria = Categoria.objects.create(nombre=f"Benchmark {time.time_ns()}")
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO producto (id_producto, nombre, precio, stock, descripcion, estado_producto, id_categoria)
+                SELECT lpad(to_hex(g), 5, '0'), 'Producto ' || g, 10 + (g %% 90), (g * 7) %% 120,
+                       '-', 'ACTIVO', %s
+                FROM generate_series(1, %s) AS g
+                """,
+                [categoria.pk, n_productos],
+            )
+            # Ventas diarias directamente en la tabla de hechos
+            cursor.execute(
+                f"""
+                INSERT INTO {HechoVentaDiaria._meta.db_table}
+                    (fecha, id_producto, id_categoria, id_metodo_pago, id_vendedor, anulada,
+                     lineas, cantidad, monto, ventas, monto_ventas, fecha_actualizacion)
+                SELECT %s::date - (g / %s) * (90 / %s), lpad(to_hex(1 + g %% %s), 5, '0'), %s, %s, %s, FALSE,
+                       1, c, 10 * c, 1, 10 * c, now()
+                FROM (
+                    SELECT g, 1 + floor(random() * 6 * power(random(), 2))::int AS c
+                    FROM generate_series(0, %s - 1) AS g
+                ) AS s
+                """,
+                [hoy, n_productos, dias_venta, n_productos, categoria.pk, metodo.pk, vendedor.pk,
+                 n_productos * dias_venta],
+            )
+            cursor.execute(
+                """
+                INSERT INTO proveedor (cod_proveedor, nombre, contacto, estado_proveedor)
+                SELECT 'B' || lpad(g::text, 5, '0'), 'Proveedor ' || g, '-', 'ACTIVO'
+                FROM generate_series(1, %s) AS g
+                """,
+                [n_proveedores],
+            )
+            # Diez compras finalizadas por proveedor, una cada 30 días
+            cursor.execute(
+                """
+                INSERT INTO compra (fecha, monto_total, estado_compra, cod_proveedor)
+                SELECT %s::date - 30 * k, 0, %s, 'B' || lpad(p::text, 5, '0')
+                FROM generate_series(1, %s) AS p, generate_series(1, 10) AS k
+                RETURNING id_compra, cod_proveedor, fecha
+                """,
+                [hoy, PurchaseStatus.FINALIZADA, n_proveedores],
+            )
+            compras = cursor.fetchall()
+            # Recepción entre 2 y 12 días después (lead time variable por proveedor)
+            cursor.execute(
+                """
+                INSERT INTO movimiento_stock (id_producto, cantidad, motivo, referencia, fecha)
+                SELECT '00001', 0, %s, 'COMPRA #' || c, f + (2 + (c * 7) %% 11) * interval '1 day'
+                FROM unnest(%s::int[], %s::date[]) AS t(c, f)
+                """,
+                [StockMovementReason.RECEPCION_COMPRA, [c[0] for c in compras], [c[2] for c in compras]],
+            )
+            # Cada producto aparece en la compra más reciente de su proveedor
+            cursor.execute(
+                """
+                INSERT INTO detalle_compra (id_compra, id_producto, cantidad, precio, sub_total)
+                SELECT c.id_compra, lpad(to_hex(g), 5, '0'), 50, 5 + (g %% 20), 50 * (5 + (g %% 20))
+                FROM generate_series(1, %s) AS g
+                JOIN compra c ON c.cod_proveedor = 'B' || lpad((1 + g %% %s)::text, 5, '0')
+                             AND c.fecha = %s::date - 30
+                """,
+                [n_productos, n_proveedores, hoy],
+            )
+            # Una orden pendiente por proveedor con algunos productos en camino
+            cursor.execute(
+                """
+                WITH pendientes AS (
+                    INSERT INTO compra (fecha, monto_total, estado_compra, cod_proveedor)
+                    SELECT %s::date - 3, 0, %s, 'B' || lpad(p::text, 5, '0')
+                    FROM generate_series(1, %s) AS p
+                    RETURNING id_compra, cod_proveedor
+                )
+                INSERT INTO detalle_compra (id_compra, id_producto, cantidad, precio, sub_total)
+                SELECT c.id_compra, lpad(to_hex(g), 5, '0'), 20, 10, 200
+                FROM generate_series(1, %s, 17) AS g
+                JOIN pendientes c ON c.cod_proveedor = 'B' || lpad((1 + g %% %s)::text, 5, '0')
+                """,
+                [hoy, PurchaseStatus.PENDIENTE, n_proveedores, n_productos, n_proveedores],
+            )
+            # Lotes para la mitad de los productos, con vencimientos de 5 a 120 días
+            cursor.execute(
+                """
+                INSERT INTO lote (id_lote, cantidad, fecha_vencimiento, id_producto)
+                SELECT lpad(to_hex(524288 + g), 5, '0'), (g * 13) %% 60 + 1,
+                       %s::date + 5 + (g * 11) %% 115, lpad(to_hex(1 + (g * 2) %% %s), 5, '0')
+                FROM generate_series(0, %s - 1) AS g
+                """,
+                [hoy, n_productos, n_productos // 2],
+            )
+        velocidad_service.recalcular(hoy=hoy)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def _python(self, datos):
+        """Mismo cálculo que reposicion_service.calcular, producto por producto."""
+        hoy = timezone.now().date()
+        config = ReplenishmentConfig
+        lotes = {}
+        for i, dias, cantidad in zip(datos["lote_producto"].tolist(), datos["lote_dias"].tolist(),
+                                     datos["lote_cantidad"].tolist()):
+            lotes.setdefault(i, []).append((hoy + timedelta(days=dias), len(lotes.get(i, ())), cantidad))
+
+        sugerido = []
+        for i in range(len(datos["ids"])):
+            demanda = float(datos["demanda"][i])
+            lead_time = float(datos["lead_time"][i])
+            por_vencer = velocidad_service.proyectar_lotes(lotes.get(i, []), demanda, hoy=hoy)
+            seguridad = config.NIVEL_SERVICIO_Z * math.sqrt(
+                lead_time * float(datos["desvio_demanda"][i]) ** 2
+                + demanda ** 2 * float(datos["desvio_lead_time"][i]) ** 2
+            )
+            posicion = int(datos["stock"][i]) + int(datos["en_camino"][i]) - por_vencer
+            if demanda > 0 and posicion <= demanda * lead_time + seguridad:
+                sugerido.append(max(math.ceil(demanda * (lead_time + config.DIAS_REVISION) + seguridad - posicion), 0))
+            else:
+                sugerido.append(0)
+        return np.array(sugerido, dtype=np.int64)
+
+    def _medir(self, nombre, funcion):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        self.stdout.write(f"  {nombre:30} {(time.perf_counter() - inicio) * 1000:9.1f} ms")
+        return resultado
+
+    def handle(self, *args, **opts):
+        if connection.vendor != "postgresql":
+            raise CommandError("El benchmark usa generate_series y unnest: requiere PostgreSQL.")
+
+        vendedor = Vendedor.objects.first()
+        metodo = MetodoPago.objects.first()
+        if not (vendedor and metodo):
+            raise CommandError("Se necesita al menos un vendedor y un método de pago.")
+
+        with transaction.atomic():
+            inicio = time.perf_counter()
+            self._poblar(opts["productos"], opts["proveedores"], opts["dias_venta"], vendedor, metodo)
+            self.stdout.write(
+                f"{opts['productos']:,} productos, {opts['proveedores']:,} proveedores "
+                f"poblados en {time.perf_counter() - inicio:.1f}s"
+            )
+
+            self.stdout.write("Reposición:")
+            datos = self._medir("carga (6 consultas)", reposicion_service.cargar_datos)
+            copia = {clave: valor.copy() for clave, valor in datos.items()}
+            plan = self._medir("cálculo vectorizado (NumPy)", lambda: reposicion_service.calcular(datos))
+            referencia = self._medir("cálculo por producto (Python)", lambda: self._python(copia))
+            ordenes = self._medir("órdenes en borrador", lambda: reposicion_service.generar_borradores(plan))
+
+            distintos = int((plan["sugerido"] != referencia).sum())
+            if distintos:
+                self.stdout.write(self.style.WARNING(f"  {distintos} producto(s) con sugerencia distinta"))
+            self.stdout.write(
+                f"{int((plan['sugerido'] > 0).sum()):,} productos a reponer en {len(ordenes)} orden(es) "
+                f"por {sum(o['monto_total'] for o in ordenes):,.2f}"
+            )
+
+            transaction.set_rollback(True)
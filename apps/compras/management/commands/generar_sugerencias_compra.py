@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.compras.services import reposicion_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Calcula punto de reorden y cantidad sugerida para todos los productos "
+        "activos. Con --borradores reemplaza las órdenes de compra BORRADOR; con "
+        "--actualizar-minimos guarda el punto de reorden en inventario.stock_minimo. "
+        "Ejecutar después de actualizar_velocidad_ventas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--borradores", action="store_true", help="Generar órdenes BORRADOR por proveedor.")
+        parser.add_argument(
+            "--actualizar-minimos",
+            action="store_true",
+            help="Escribir el punto de reorden en inventario.stock_minimo.",
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        plan = reposicion_service.planificar()
+        sugeridos = int((plan["sugerido"] > 0).sum())
+        sin_proveedor = int(((plan["sugerido"] > 0) & (plan["proveedor"] == None)).sum())  # noqa: E711
+        self.stdout.write(
+            f"{len(plan['ids'])} producto(s) evaluados en {time.perf_counter() - inicio:.2f}s: "
+            f"{sugeridos} a reponer ({sin_proveedor} sin proveedor conocido)."
+        )
+
+        if options["actualizar_minimos"]:
+            filas = reposicion_service.actualizar_stock_minimo(plan)
+            self.stdout.write(f"stock_minimo actualizado en {filas} fila(s) de inventario.")
+
+        if options["borradores"]:
+            ordenes = reposicion_service.generar_borradores(plan)
+            for orden in ordenes:
+                self.stdout.write(
+                    f"OC #{orden['id_compra']} {orden['cod_proveedor']}: "
+                    f"{orden['items']} item(s), total {orden['monto_total']}"
+                )
+            self.stdout.write(self.style.SUCCESS(f"{len(ordenes)} orden(es) en borrador generadas."))
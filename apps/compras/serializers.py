@@ -7,7 +7,7 @@ from rest_framework import serializers
 
 from .models import DevolucionCompra, DetalleDevolucionCompra, Compra, DetalleCompra
 from apps.productos.models import Producto
-from core.constants import APIResponse, Messages
+from core.constants import APIResponse, Messages, PurchaseStatus
 
 
 class DetalleDevolucionCompraSerializer(serializers.ModelSerializer):
@@ -199,7 +199,7 @@ class CrearOrdenCompraSerializer(serializers.Serializer):
             compra = Compra.objects.create(
                 fecha=fecha,
                 monto_total=Decimal('0.00'),
-                estado_compra='PENDIENTE',
+                estado_compra=PurchaseStatus.PENDIENTE,
                 cod_proveedor=proveedor
             )
 
@@ -0,0 +1,348 @@
+# apps/compras/services/reposicion_service.py
+"""
+Motor de reposición: punto de reorden y cantidad sugerida por producto.
+
+cargar_datos() lee en seis consultas agregadas todo lo necesario para
+todos los productos activos y lo deja en arreglos NumPy alineados por
+producto; calcular() hace el resto sobre los arreglos completos:
+
+  - demanda diaria: velocidad_venta (30 días, o 90 si no hubo ventas);
+    su desvío, de los totales diarios de hecho_venta_diaria.
+  - proveedor y precio: los de la última compra del producto.
+  - lead time por proveedor: días entre Compra.fecha y la primera entrada
+    RECEPCION_COMPRA del kardex con referencia "COMPRA #<id>".
+  - unidades por vencer: lo que los lotes no alcanzarían a vender antes de
+    vencer al ritmo actual (FEFO); no cuenta como stock disponible.
+
+  stock_seguridad = z · √(L·σd² + d²·σL²)
+  punto_reorden   = d·L + stock_seguridad
+  objetivo        = d·(L + DIAS_REVISION) + stock_seguridad
+  posición        = stock + en camino (compras PENDIENTE) − por vencer
+
+Si la posición no supera el punto de reorden se sugiere pedir
+objetivo − posición. generar_borradores() convierte las sugerencias en
+órdenes de compra BORRADOR, una por proveedor.
+"""
+import math
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.inventario.models import VelocidadVenta
+from apps.reportes.models import HechoVentaDiaria
+from core.constants import ProductStatus, PurchaseStatus, ReplenishmentConfig, StockMovementReason
+
+# Memoria por operación para los agregados de cargar_datos(): con el valor
+# por defecto (4MB) el agrupado diario de los hechos se ordena en disco.
+WORK_MEM = "64MB"
+
+
+def _hoy():
+    return timezone.now().date()
+
+
+def _consultar(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _indices(ids: np.ndarray, claves) -> tuple:
+    """Posición de cada clave en `ids` (ordenado) y máscara de las que están."""
+    claves = np.array(claves, dtype=str)
+    if not len(ids) or not len(claves):
+        return np.zeros(len(claves), dtype=np.int64), np.zeros(len(claves), dtype=bool)
+    posiciones = np.searchsorted(ids, claves).clip(max=len(ids) - 1)
+    return posiciones, ids[posiciones] == claves
+
+
+def _columna(ids: np.ndarray, filas, indice: int, dtype, defecto=0) -> np.ndarray:
+    """Columna `indice` de filas (id, ...) reordenada según ids."""
+    resultado = np.full(len(ids), defecto, dtype=dtype)
+    if filas:
+        posiciones, encontradas = _indices(ids, [fila[0] for fila in filas])
+        valores = np.array([fila[indice] for fila in filas], dtype=dtype)
+        resultado[posiciones[encontradas]] = valores[encontradas]
+    return resultado
+
+
+@transaction.atomic
+def cargar_datos(hoy=None) -> Dict[str, np.ndarray]:
+    """Entradas de calcular() para todos los productos activos."""
+    hoy = hoy or _hoy()
+    config = ReplenishmentConfig
+    _consultar("SELECT set_config('work_mem', %s, true)", [WORK_MEM])
+
+    productos = sorted(_consultar(
+        f"""
+        SELECT p.id_producto, p.stock, COALESCE(vv.unidades_30d, 0), COALESCE(vv.unidades_90d, 0)
+        FROM producto p
+        LEFT JOIN {VelocidadVenta._meta.db_table} vv ON vv.id_producto = p.id_producto
+        WHERE p.estado_producto = %s
+        """,
+        [ProductStatus.ACTIVO],
+    ))
+    n = len(productos)
+    ids = np.array([fila[0] for fila in productos], dtype=str)
+    stock = np.fromiter((fila[1] for fila in productos), dtype=np.int64, count=n)
+    unidades_30d = np.fromiter((fila[2] for fila in productos), dtype=np.float64, count=n)
+    unidades_90d = np.fromiter((fila[3] for fila in productos), dtype=np.float64, count=n)
+
+    dias = config.DIAS_HISTORIA_DEMANDA
+    diarias = _consultar(
+        f"""
+        SELECT id_producto, SUM(cantidad)::float, SUM(cantidad * cantidad)::float
+        FROM (
+            SELECT id_producto, fecha, SUM(cantidad) AS cantidad
+            FROM {HechoVentaDiaria._meta.db_table}
+            WHERE NOT anulada AND fecha > %s::date - %s AND fecha <= %s
+            GROUP BY id_producto, fecha
+        ) AS d
+        GROUP BY id_producto
+        """,
+        [hoy, dias, hoy],
+    )
+    media = _columna(ids, diarias, 1, np.float64) / dias
+    varianza = _columna(ids, diarias, 2, np.float64) / dias - media ** 2
+
+    ultima_compra = _consultar(
+        """
+        SELECT DISTINCT ON (dc.id_producto) dc.id_producto, c.cod_proveedor, dc.precio
+        FROM detalle_compra dc
+        JOIN compra c ON c.id_compra = dc.id_compra
+        WHERE c.estado_compra <> %s
+        ORDER BY dc.id_producto, c.fecha DESC, c.id_compra DESC
+        """,
+        [PurchaseStatus.BORRADOR],
+    )
+    proveedor = _columna(ids, ultima_compra, 1, object, defecto=None)
+    precio = _columna(ids, ultima_compra, 2, object, defecto=None)
+
+    en_camino = _consultar(
+        """
+        SELECT dc.id_producto, SUM(dc.cantidad)
+        FROM detalle_compra dc
+        JOIN compra c ON c.id_compra = dc.id_compra
+        WHERE c.estado_compra = %s
+        GROUP BY dc.id_producto
+        """,
+        [PurchaseStatus.PENDIENTE],
+    )
+
+    # Recepciones: la primera entrada del kardex de cada compra
+    lead_times = sorted(_consultar(
+        """
+        SELECT c.cod_proveedor,
+               AVG(GREATEST(r.fecha::date - c.fecha, 0))::float,
+               COALESCE(stddev_pop(GREATEST(r.fecha::date - c.fecha, 0)), 0)::float
+        FROM compra c
+        JOIN (
+            SELECT referencia, MIN(fecha) AS fecha
+            FROM movimiento_stock
+            WHERE motivo = %s
+            GROUP BY referencia
+        ) AS r ON r.referencia = 'COMPRA #' || c.id_compra
+        WHERE c.fecha > %s::date - %s
+        GROUP BY c.cod_proveedor
+        """,
+        [StockMovementReason.RECEPCION_COMPRA, hoy, config.DIAS_HISTORIA_LEAD_TIME],
+    ))
+    proveedores = np.array([fila[0] for fila in lead_times], dtype=str)
+    posiciones, conocidos = _indices(proveedores, np.where(proveedor == None, "", proveedor))  # noqa: E711
+    lead_time = np.full(n, float(config.LEAD_TIME_DEFECTO))
+    desvio_lead_time = np.zeros(n)
+    if len(lead_times):
+        lead_time[conocidos] = np.array([fila[1] for fila in lead_times])[posiciones[conocidos]]
+        desvio_lead_time[conocidos] = np.array([fila[2] for fila in lead_times])[posiciones[conocidos]]
+
+    lotes = _consultar(
+        "SELECT id_producto, fecha_vencimiento - %s::date, cantidad FROM lote "
+        "WHERE cantidad > 0 AND fecha_vencimiento > %s",
+        [hoy, hoy],
+    )
+    lote_posiciones, lote_activo = _indices(ids, [fila[0] for fila in lotes])
+
+    return {
+        "ids": ids,
+        "stock": stock,
+        "demanda": np.where(unidades_30d > 0, unidades_30d / 30, unidades_90d / 90),
+        "desvio_demanda": np.sqrt(varianza.clip(min=0)),
+        "proveedor": proveedor,
+        "precio": precio,
+        "en_camino": _columna(ids, en_camino, 1, np.int64),
+        "lead_time": lead_time,
+        "desvio_lead_time": desvio_lead_time,
+        "lote_producto": lote_posiciones[lote_activo],
+        "lote_dias": np.array([fila[1] for fila in lotes], dtype=np.int64)[lote_activo],
+        "lote_cantidad": np.array([fila[2] for fila in lotes], dtype=np.int64)[lote_activo],
+    }
+
+
+def unidades_por_vencer(demanda: np.ndarray, lote_producto: np.ndarray,
+                        lote_dias: np.ndarray, lote_cantidad: np.ndarray) -> np.ndarray:
+    """
+    Versión vectorizada de velocidad_service.proyectar_lotes para todos los
+    productos a la vez.
+
+    Con FEFO a ritmo d, lo vendido al vencer el lote j nunca supera d·t_j,
+    así que lo que se pierde es max(0, max_j(C_j − ⌊d·t_j⌋)), con C_j el
+    acumulado de los lotes del producto hasta j en orden de vencimiento.
+    """
+    resultado = np.zeros(len(demanda), dtype=np.int64)
+    if not len(lote_producto):
+        return resultado
+
+    orden = np.lexsort((lote_dias, lote_producto))
+    producto, dias, cantidad = lote_producto[orden], lote_dias[orden], lote_cantidad[orden]
+    inicios = np.flatnonzero(np.r_[True, producto[1:] != producto[:-1]])
+
+    acumulado = np.cumsum(cantidad)
+    previo = acumulado[inicios] - cantidad[inicios]
+    acumulado -= np.repeat(previo, np.diff(np.r_[inicios, len(producto)]))
+
+    exceso = acumulado - np.floor(demanda[producto] * dias).astype(np.int64)
+    resultado[producto[inicios]] = np.maximum(np.maximum.reduceat(exceso, inicios), 0)
+    return resultado
+
+
+def calcular(datos: Dict[str, np.ndarray], z: float = None, dias_revision: int = None) -> Dict[str, np.ndarray]:
+    """Agrega a `datos` stock de seguridad, punto de reorden y cantidad sugerida."""
+    z = ReplenishmentConfig.NIVEL_SERVICIO_Z if z is None else z
+    dias_revision = ReplenishmentConfig.DIAS_REVISION if dias_revision is None else dias_revision
+
+    demanda = datos["demanda"]
+    lead_time = datos["lead_time"]
+    por_vencer = unidades_por_vencer(
+        demanda, datos["lote_producto"], datos["lote_dias"], datos["lote_cantidad"]
+    )
+    stock_seguridad = z * np.sqrt(
+        lead_time * datos["desvio_demanda"] ** 2 + demanda ** 2 * datos["desvio_lead_time"] ** 2
+    )
+    punto_reorden = demanda * lead_time + stock_seguridad
+    objetivo = demanda * (lead_time + dias_revision) + stock_seguridad
+    posicion = datos["stock"] + datos["en_camino"] - por_vencer
+
+    reponer = (demanda > 0) & (posicion <= punto_reorden)
+    sugerido = np.where(reponer, np.ceil(objetivo - posicion), 0).clip(min=0).astype(np.int64)
+
+    datos.update(
+        por_vencer=por_vencer,
+        posicion=posicion,
+        stock_seguridad=stock_seguridad,
+        punto_reorden=punto_reorden,
+        objetivo=objetivo,
+        sugerido=sugerido,
+    )
+    return datos
+
+
+def planificar(hoy=None) -> Dict[str, np.ndarray]:
+    return calcular(cargar_datos(hoy))
+
+
+def sugerencias(plan: Dict[str, np.ndarray], cod_proveedor: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Productos a reponer (cantidad sugerida > 0), por proveedor e id."""
+    indices = np.flatnonzero(plan["sugerido"] > 0)
+    if cod_proveedor:
+        indices = indices[plan["proveedor"][indices] == cod_proveedor]
+    indices = sorted(indices.tolist(), key=lambda i: (plan["proveedor"][i] or "", plan["ids"][i]))
+
+    resultado = []
+    for i in indices:
+        demanda = float(plan["demanda"][i])
+        resultado.append({
+            "id_producto": str(plan["ids"][i]),
+            "cod_proveedor": plan["proveedor"][i],
+            "stock": int(plan["stock"][i]),
+            "en_camino": int(plan["en_camino"][i]),
+            "por_vencer": int(plan["por_vencer"][i]),
+            "demanda_diaria": round(demanda, 3),
+            "lead_time_dias": round(float(plan["lead_time"][i]), 1),
+            "stock_seguridad": math.ceil(plan["stock_seguridad"][i]),
+            "punto_reorden": math.ceil(plan["punto_reorden"][i]),
+            "cantidad_sugerida": int(plan["sugerido"][i]),
+            "precio": plan["precio"][i],
+            "dias_cobertura": round(int(plan["posicion"][i]) / demanda, 1) if demanda else None,
+        })
+    return resultado
+
+
+@transaction.atomic
+def generar_borradores(plan: Dict[str, np.ndarray], hoy=None) -> List[Dict[str, Any]]:
+    """
+    Reemplaza las órdenes BORRADOR por una nueva por proveedor con las
+    cantidades sugeridas. Los productos sin compras previas (sin proveedor
+    ni precio) quedan fuera.
+    """
+    hoy = hoy or _hoy()
+    indices = np.flatnonzero((plan["sugerido"] > 0) & (plan["proveedor"] != None))  # noqa: E711
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "DELETE FROM detalle_compra WHERE id_compra IN "
+            "(SELECT id_compra FROM compra WHERE estado_compra = %s)",
+            [PurchaseStatus.BORRADOR],
+        )
+        cursor.execute("DELETE FROM compra WHERE estado_compra = %s", [PurchaseStatus.BORRADOR])
+        if not len(indices):
+            return []
+
+        proveedores = sorted(set(plan["proveedor"][indices].tolist()))
+        cursor.execute(
+            """
+            INSERT INTO compra (fecha, monto_total, estado_compra, cod_proveedor)
+            SELECT %s, 0, %s, cod FROM unnest(%s::varchar[]) AS cod
+            RETURNING cod_proveedor, id_compra
+            """,
+            [hoy, PurchaseStatus.BORRADOR, proveedores],
+        )
+        compras = dict(cursor.fetchall())
+
+        cursor.execute(
+            """
+            INSERT INTO detalle_compra (id_compra, id_producto, cantidad, precio, sub_total)
+            SELECT id_compra, id_producto, cantidad, precio, cantidad * precio
+            FROM unnest(%s::int[], %s::varchar[], %s::int[], %s::numeric[])
+                 AS t(id_compra, id_producto, cantidad, precio)
+            """,
+            [
+                [compras[p] for p in plan["proveedor"][indices].tolist()],
+                plan["ids"][indices].tolist(),
+                plan["sugerido"][indices].tolist(),
+                plan["precio"][indices].tolist(),
+            ],
+        )
+        cursor.execute(
+            """
+            UPDATE compra c SET monto_total = t.total
+            FROM (
+                SELECT id_compra, SUM(sub_total) AS total, COUNT(*) AS items
+                FROM detalle_compra WHERE id_compra = ANY(%s) GROUP BY id_compra
+            ) AS t
+            WHERE c.id_compra = t.id_compra
+            RETURNING c.id_compra, c.cod_proveedor, c.monto_total, t.items
+            """,
+            [list(compras.values())],
+        )
+        filas = sorted(cursor.fetchall())
+
+    return [
+        {"id_compra": id_compra, "cod_proveedor": cod, "monto_total": monto, "items": items}
+        for id_compra, cod, monto, items in filas
+    ]
+
+
+def actualizar_stock_minimo(plan: Dict[str, np.ndarray]) -> int:
+    """Guarda el punto de reorden como Inventario.stock_minimo. Devuelve filas cambiadas."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            UPDATE inventario_inventario i SET stock_minimo = t.punto_reorden
+            FROM unnest(%s::varchar[], %s::int[]) AS t(id_producto, punto_reorden)
+            WHERE i.producto_id = t.id_producto AND i.stock_minimo <> t.punto_reorden
+            """,
+            [plan["ids"].tolist(), np.ceil(plan["punto_reorden"]).astype(np.int64).tolist()],
+        )
+        return cursor.rowcount
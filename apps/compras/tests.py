@@ -1,3 +1,60 @@
-from django.test import TestCase
+from datetime import date, timedelta
 
-# Create your tests here.
+import numpy as np
+from django.test import SimpleTestCase
+
+from apps.compras.services import reposicion_service
+from apps.inventario.services.velocidad_service import proyectar_lotes
+
+
+class ReposicionCalculoTests(SimpleTestCase):
+    def _datos(self, **columnas):
+        n = len(columnas['demanda'])
+        datos = {
+            'ids': np.array([f'P{i:04d}' for i in range(n)]),
+            'stock': np.zeros(n, dtype=np.int64),
+            'desvio_demanda': np.zeros(n),
+            'en_camino': np.zeros(n, dtype=np.int64),
+            'lead_time': np.full(n, 7.0),
+            'desvio_lead_time': np.zeros(n),
+            'lote_producto': np.zeros(0, dtype=np.int64),
+            'lote_dias': np.zeros(0, dtype=np.int64),
+            'lote_cantidad': np.zeros(0, dtype=np.int64),
+        }
+        datos.update({clave: np.asarray(valor) for clave, valor in columnas.items()})
+        return datos
+
+    def test_por_vencer_coincide_con_proyeccion_fefo(self):
+        hoy = date(2025, 1, 1)
+        lotes = [(0, 10, 30), (0, 30, 50), (1, 3, 5), (2, 40, 8), (0, 12, 4)]
+        demanda = np.array([2.0, 0.5, 0.0])
+        vectorizado = reposicion_service.unidades_por_vencer(
+            demanda,
+            np.array([l[0] for l in lotes]),
+            np.array([l[1] for l in lotes]),
+            np.array([l[2] for l in lotes]),
+        )
+        for producto in range(3):
+            propios = [(hoy + timedelta(days=d), i, c) for i, (p, d, c) in enumerate(lotes) if p == producto]
+            self.assertEqual(vectorizado[producto], proyectar_lotes(propios, demanda[producto], hoy=hoy))
+
+    def test_sugiere_solo_bajo_el_punto_de_reorden(self):
+        # 2/día, lead time 7: punto de reorden 14; objetivo 2 · (7 + 14) = 42
+        datos = reposicion_service.calcular(
+            self._datos(demanda=[2.0, 2.0, 0.0], stock=[10, 20, 0], en_camino=[0, 0, 0]),
+            z=1.65, dias_revision=14,
+        )
+        self.assertEqual(datos['punto_reorden'].tolist(), [14.0, 14.0, 0.0])
+        self.assertEqual(datos['sugerido'].tolist(), [32, 0, 0])
+
+    def test_stock_por_vencer_no_cuenta_como_disponible(self):
+        datos = reposicion_service.calcular(
+            self._datos(
+                demanda=[1.0], stock=[40],
+                lote_producto=[0], lote_dias=[5], lote_cantidad=[40],
+            ),
+            z=1.65, dias_revision=14,
+        )
+        # Al ritmo de 1/día solo se venden 5 de las 40 antes de vencer
+        self.assertEqual(datos['por_vencer'].tolist(), [35])
+        self.assertEqual(datos['sugerido'].tolist(), [21 - 5])
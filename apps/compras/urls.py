@@ -5,6 +5,7 @@ from . import views
 router = DefaultRouter()
 router.register(r'devoluciones', views.DevolucionCompraViewSet, basename='devolucion-compra')
 router.register(r'ordenes', views.OrdenCompraViewSet, basename='orden-compra')
+router.register(r'reposicion', views.ReposicionViewSet, basename='reposicion')
 
 urlpatterns = [
     path('', views.index, name='compras-index'),
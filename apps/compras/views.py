@@ -13,11 +13,13 @@ from .serializers import (
     CrearOrdenCompraSerializer,
     RegistrarRecepcionSerializer,
 )
-from core.constants import APIResponse, Messages, ProductConfig
+from core.constants import APIResponse, Messages, ProductConfig, PurchaseStatus, StockMovementReason
 from apps.bitacora.services.logger import AuditoriaLogger
 from apps.bitacora.signals import producto_stock_ajustado
 from apps.autenticacion.utils.helpers import obtener_ip_cliente
 from apps.productos.models import Producto
+from apps.inventario.services.kardex_service import registrar_movimientos
+from .services import reposicion_service
 
 
 def index(request):
@@ -158,11 +160,33 @@ class OrdenCompraViewSet(viewsets.ModelViewSet):
         }
         return APIResponse.created(message='Orden de compra creada.', data={'orden': data})
 
+    @action(detail=True, methods=['post'], url_path='confirmar')
+    def confirmar(self, request, pk=None):
+        """Pasa una orden BORRADOR (sugerida por reposición) a PENDIENTE."""
+        compra = self.get_object()
+        if compra.estado_compra != PurchaseStatus.BORRADOR:
+            return APIResponse.error('Solo se pueden confirmar órdenes en borrador.', status_code=409)
+
+        compra.estado_compra = PurchaseStatus.PENDIENTE
+        compra.save(update_fields=['estado_compra'])
+        AuditoriaLogger.registrar_evento(
+            accion='PURCHASE_ORDER_STATE_CHANGE',
+            descripcion=f"Orden de compra #{compra.id_compra} confirmada para proveedor {compra.cod_proveedor_id}",
+            ip=obtener_ip_cliente(request),
+            usuario=request.user
+        )
+        return APIResponse.success(
+            message='Orden confirmada.',
+            data={'id_compra': compra.id_compra, 'estado_compra': compra.estado_compra}
+        )
+
     @action(detail=True, methods=['post'], url_path='registrar-recepcion')
     def registrar_recepcion(self, request, pk=None):
         compra = self.get_object()
-        if compra.estado_compra == 'FINALIZADA':
+        if compra.estado_compra == PurchaseStatus.FINALIZADA:
             return APIResponse.error('La compra ya está finalizada.', status_code=409)
+        if compra.estado_compra == PurchaseStatus.BORRADOR:
+            return APIResponse.error('La orden es un borrador: confírmela antes de recibirla.', status_code=409)
 
         # Guardar compra en el contexto del serializer para validación
         self.compra_obj = compra
@@ -183,15 +207,23 @@ class OrdenCompraViewSet(viewsets.ModelViewSet):
 
         # Transacción: ajustar stock y cerrar orden
         ip = obtener_ip_cliente(request)
+        productos = Producto.objects.in_bulk(list(recibir))
+        faltantes = [id_prod for id_prod in recibir if id_prod not in productos]
+        if faltantes:
+            return APIResponse.not_found(message=f'Producto {faltantes[0]} no existe.')
+
         with transaction.atomic():
+            # Un movimiento RECEPCION_COMPRA por producto, aplicado en bloque
+            stock_nuevo = registrar_movimientos(
+                [{'producto': id_prod, 'cantidad': cant} for id_prod, cant in recibir.items()],
+                motivo=StockMovementReason.RECEPCION_COMPRA,
+                usuario=request.user,
+                referencia=f'COMPRA #{compra.id_compra}',
+            )
+
             for id_prod, cant in recibir.items():
-                try:
-                    prod = Producto.objects.select_for_update().get(id_producto=id_prod)
-                except Producto.DoesNotExist:
-                    return APIResponse.not_found(message=f'Producto {id_prod} no existe.')
-                stock_anterior = prod.stock
-                prod.stock = stock_anterior + cant
-                prod.save(update_fields=['stock'])
+                prod = productos[id_prod]
+                prod.stock = stock_nuevo.get(id_prod, prod.stock)
 
                 # Señal de bitácora existente para consistencia
                 producto_stock_ajustado.send(
@@ -201,12 +233,12 @@ class OrdenCompraViewSet(viewsets.ModelViewSet):
                     ip=ip,
                     tipo_ajuste=ProductConfig.STOCK_INCREMENT,
                     cantidad=cant,
-                    stock_anterior=stock_anterior,
+                    stock_anterior=prod.stock - cant,
                     stock_nuevo=prod.stock,
                     motivo=f'Recepción de compra #{compra.id_compra}'
                 )
 
-            compra.estado_compra = 'FINALIZADA'
+            compra.estado_compra = PurchaseStatus.FINALIZADA
             compra.save(update_fields=['estado_compra'])
 
             AuditoriaLogger.registrar_evento(
@@ -220,3 +252,33 @@ class OrdenCompraViewSet(viewsets.ModelViewSet):
             message='Recepción registrada y compra finalizada.',
             data={'id_compra': compra.id_compra, 'estado_compra': compra.estado_compra, 'items_recibidos': recibir}
         )
+
+
+class ReposicionViewSet(viewsets.ViewSet):
+    """
+    Sugerencias de compra calculadas por el motor de reposición.
+    GET  /api/compras/reposicion/?cod_proveedor=PRV001  → productos a reponer
+    POST /api/compras/reposicion/borradores/            → regenera las órdenes BORRADOR
+    """
+
+    def get_permissions(self):
+        return [IsAuthenticated(), IsAdminUser()]
+
+    def list(self, request):
+        plan = reposicion_service.planificar()
+        resultados = reposicion_service.sugerencias(plan, request.query_params.get('cod_proveedor'))
+        return APIResponse.success(
+            message='Sugerencias de compra',
+            data={'total': len(resultados), 'resultados': resultados}
+        )
+
+    @action(detail=False, methods=['post'], url_path='borradores')
+    def borradores(self, request):
+        ordenes = reposicion_service.generar_borradores(reposicion_service.planificar())
+        AuditoriaLogger.registrar_evento(
+            accion='PURCHASE_ORDER_CREATE',
+            descripcion=f"{len(ordenes)} orden(es) de compra en borrador generadas por reposición",
+            ip=obtener_ip_cliente(request),
+            usuario=request.user
+        )
+        return APIResponse.created(message='Órdenes en borrador generadas.', data={'ordenes': ordenes})
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from apps.imagenes.models import ImagenProducto
+from apps.imagenes.services import preprocesado, variantes
+from apps.imagenes.services.almacenamiento import get_almacenamiento
+from core.constants import ImageStatus
+
+
+class Command(BaseCommand):
+    help = (
+        "Completa el manifiesto de variantes (tamaños, srcset, LQIP) de las "
+        "imágenes ACTIVA subidas antes de que existiera. Consulta una vez los "
+        "metadatos de cada imagen en el almacenamiento; después los "
+        "serializers no vuelven a llamar a su API."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limite", type=int, default=None, help="Máximo de imágenes a procesar.")
+        parser.add_argument("--todas", action="store_true", help="Recalcular también las que ya tienen manifiesto.")
+
+    def handle(self, *args, **options):
+        almacenamiento = get_almacenamiento()
+        qs = ImagenProducto.objects.filter(estado_imagen=ImageStatus.ACTIVA).order_by("id_imagen")
+        if not options["todas"]:
+            qs = qs.exclude(variantes__has_key="srcset")
+        if options["limite"]:
+            qs = qs[:options["limite"]]
+
+        actualizadas, sin_metadatos = 0, 0
+        for imagen in qs:
+            meta = almacenamiento.metadata(imagen.public_id)
+            if not meta:
+                sin_metadatos += 1
+                self.stdout.write(self.style.WARNING(f"Imagen {imagen.id_imagen}: sin metadatos"))
+                continue
+
+            lqip = None
+            if meta.get("ruta"):
+                lqip = preprocesado.lqip_de_archivo(meta["ruta"])
+            imagen.variantes = variantes.construir(
+                imagen.public_id, imagen.url, meta.get("width"), meta.get("height"),
+                meta.get("bytes"), meta.get("format") or imagen.formato,
+                lqip or (imagen.variantes or {}).get("lqip"), almacenamiento,
+            )
+            imagen.save(update_fields=["variantes"])
+            actualizadas += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{actualizadas} manifiesto(s) generados, {sin_metadatos} imagen(es) sin metadatos."
+        ))
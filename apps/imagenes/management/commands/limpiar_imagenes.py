@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from apps.imagenes.services import limpieza_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Elimina del almacenamiento las imágenes huérfanas (sin fila en la "
+        "base) y purga las imágenes inactivas con más de --retencion días, "
+        "en lotes y con pausa entre llamadas al API. Con --dry-run solo lista."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true")
+        parser.add_argument("--retencion", type=int, default=None, help="Días (por defecto IMAGENES_GC_RETENCION_DIAS).")
+        parser.add_argument("--lote", type=int, default=None, help="Imágenes por llamada de borrado.")
+        parser.add_argument("--pausa", type=float, default=None, help="Segundos entre llamadas.")
+        parser.add_argument("--sin-huerfanas", action="store_true")
+        parser.add_argument("--sin-purga", action="store_true")
+
+    def handle(self, *args, **options):
+        resumen = limpieza_service.recolectar(
+            dry_run=options["dry_run"],
+            huerfanas=not options["sin_huerfanas"],
+            purgar=not options["sin_purga"],
+            retencion_dias=options["retencion"],
+            lote=options["lote"],
+            pausa=options["pausa"],
+        )
+
+        verbo = "Se eliminarían" if resumen["dry_run"] else "Eliminadas"
+        for public_id in resumen["huerfanas"]:
+            self.stdout.write(f"{verbo} (huérfana): {public_id}")
+        for public_id in resumen["purgadas"]:
+            self.stdout.write(f"{verbo} (inactiva vencida): {public_id}")
+        for error in resumen["errores"]:
+            self.stdout.write(self.style.ERROR(error))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{verbo}: {len(resumen['huerfanas'])} huérfana(s), {len(resumen['purgadas'])} "
+            f"vencida(s) en {resumen['llamadas']} llamada(s), {resumen['duracion_ms']} ms."
+        ))
@@ -0,0 +1,49 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.imagenes.models import ImagenProducto
+from apps.imagenes.services import subida_service
+from core.constants import ImageStatus
+
+
+class Command(BaseCommand):
+    help = (
+        "Sube las imágenes que quedaron PENDIENTE (p. ej. tras reiniciar el "
+        "servidor con subidas en cola). Solo toma las que llevan más de "
+        "--antiguedad minutos sin cambios, para no competir con el pool del "
+        "servidor. Con --errores también reintenta las que terminaron con ERROR."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--antiguedad", type=int, default=10, help="Minutos sin actualizar.")
+        parser.add_argument("--errores", action="store_true")
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(minutes=options["antiguedad"])
+        estados = [ImageStatus.PENDIENTE]
+        if options["errores"]:
+            estados.append(ImageStatus.ERROR)
+
+        imagenes = list(
+            ImagenProducto.objects.filter(estado_imagen__in=estados, fecha_actualizacion__lt=limite)
+            .exclude(archivo_temporal="")
+            .order_by("id_imagen")
+        )
+        resumen = {ImageStatus.ACTIVA: 0, ImageStatus.ERROR: 0}
+        for imagen in imagenes:
+            if imagen.estado_imagen == ImageStatus.ERROR:
+                subida_service.reintentar(imagen, encolar=False)
+            resultado = subida_service.procesar(imagen.id_imagen)
+            if resultado is not None:
+                resumen[resultado.estado_imagen] = resumen.get(resultado.estado_imagen, 0) + 1
+                self.stdout.write(
+                    f"Imagen {imagen.id_imagen} ({imagen.id_producto_id}): {resultado.estado_imagen}"
+                    + (f" - {resultado.error_subida}" if resultado.error_subida else "")
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(imagenes)} imagen(es) procesadas: {resumen[ImageStatus.ACTIVA]} subidas, "
+            f"{resumen[ImageStatus.ERROR]} con error."
+        ))
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-18 21:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imagenes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagenproducto',
+            name='archivo_temporal',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='imagenproducto',
+            name='error_subida',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='imagenproducto',
+            name='intentos',
+            field=models.SmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='imagenproducto',
+            name='principal_solicitado',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='imagenproducto',
+            name='estado_imagen',
+            field=models.CharField(choices=[('ACTIVA', 'Activa'), ('INACTIVA', 'Inactiva'), ('PENDIENTE', 'Pendiente de subida'), ('ERROR', 'Error de subida')], default='ACTIVA', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='imagenproducto',
+            name='url',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+    ]
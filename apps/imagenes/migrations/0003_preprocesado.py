@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 21:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imagenes', '0002_subida_en_segundo_plano'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagenproducto',
+            name='bytes_optimizado',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='imagenproducto',
+            name='bytes_original',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='imagenproducto',
+            name='preprocesado_ms',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 21:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imagenes', '0003_preprocesado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagenproducto',
+            name='variantes',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
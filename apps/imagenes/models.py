@@ -1,10 +1,8 @@
 from django.db import models
 from django.core.validators import MinValueValidator
-import cloudinary
-import cloudinary.uploader
-import cloudinary.api
 
 from core.constants import ImageStatus
+from .services.almacenamiento import get_almacenamiento
 
 
 class ImagenProducto(models.Model):
@@ -15,7 +13,8 @@ class ImagenProducto(models.Model):
         db_column='id_producto',
         related_name='imagenes'
     )
-    url = models.CharField(max_length=255)
+    # Vacía mientras la subida está PENDIENTE
+    url = models.CharField(max_length=255, blank=True, default='')
     public_id = models.CharField(max_length=150, unique=True)
     formato = models.CharField(max_length=10)
     es_principal = models.BooleanField(default=False)
@@ -35,6 +34,17 @@ class ImagenProducto(models.Model):
         related_name='imagenes_subidas',
         db_column='subido_por'
     )
+    # Subida en segundo plano (apps.imagenes.services.subida_service)
+    archivo_temporal = models.CharField(max_length=255, blank=True, default='')
+    principal_solicitado = models.BooleanField(default=False)
+    intentos = models.SmallIntegerField(default=0)
+    error_subida = models.TextField(null=True, blank=True)
+    # Preprocesado local (apps.imagenes.services.preprocesado); null = sin preprocesar
+    bytes_original = models.PositiveIntegerField(null=True, blank=True)
+    bytes_optimizado = models.PositiveIntegerField(null=True, blank=True)
+    preprocesado_ms = models.PositiveIntegerField(null=True, blank=True)
+    # Manifiesto responsive (apps.imagenes.services.variantes), calculado al subir
+    variantes = models.JSONField(default=dict, blank=True)
     fecha_subida = models.DateTimeField(auto_now_add=True)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
 
@@ -51,37 +61,21 @@ class ImagenProducto(models.Model):
         return f"Imagen {self.id_imagen} - {self.id_producto.nombre}"
 
     # ===============================
-    # Métodos utilitarios Cloudinary
+    # Almacenamiento (Cloudinary o el configurado)
     # ===============================
+    # Carpeta del almacenamiento bajo la que viven todas las imágenes de productos
+    CARPETA = "afrodita/products"
+
+    @staticmethod
+    def carpeta_producto(producto_id):
+        return f"{ImagenProducto.CARPETA}/{producto_id}"
+
     @staticmethod
-    def subir_a_cloudinary(archivo, producto_id, orden=1):
-        try:
-            upload = cloudinary.uploader.upload(
-                archivo,
-                folder=f"afrodita/products/{producto_id}",
-                public_id=f"{producto_id}_{orden}",
-                overwrite=True,
-                resource_type="image",
-                transformation=[{'quality': 'auto'}, {'fetch_format': 'auto'}]
-            )
-            return {
-                'url': upload['secure_url'],
-                'public_id': upload['public_id'],
-                'formato': upload['format'],
-                'width': upload.get('width'),
-                'height': upload.get('height'),
-                'bytes': upload.get('bytes')
-            }
-        except Exception as e:
-            raise ValueError(f"Error al subir imagen a Cloudinary: {str(e)}")
+    def public_id_para(producto_id, orden):
+        return f"{ImagenProducto.carpeta_producto(producto_id)}/{producto_id}_{orden}"
 
-    def eliminar_de_cloudinary(self):
-        try:
-            result = cloudinary.uploader.destroy(self.public_id)
-            return result.get('result') == 'ok'
-        except Exception as e:
-            print(f"Error al eliminar de Cloudinary: {e}")
-            return False
+    def eliminar_del_almacenamiento(self):
+        return get_almacenamiento().eliminar(self.public_id)
 
     def marcar_como_principal(self):
         ImagenProducto.objects.filter(
@@ -92,7 +86,4 @@ class ImagenProducto(models.Model):
         self.save()
 
     def get_metadata(self):
-        try:
-            return cloudinary.api.resource(self.public_id)
-        except Exception:
-            return None
+        return get_almacenamiento().metadata(self.public_id)
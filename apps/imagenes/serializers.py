@@ -1,5 +1,24 @@
+from django.conf import settings
 from rest_framework import serializers
+
+from apps.productos.models import Producto
+from core.constants import Messages
 from .models import ImagenProducto
+from .services import preprocesado, subida_masiva_service, subida_service, variantes
+
+
+def validar_imagen(archivo):
+    """Rechaza en el request las dimensiones que el preprocesado no aceptaría."""
+    if settings.IMAGENES_PREPROCESAR:
+        try:
+            preprocesado.validar_dimensiones(
+                *preprocesado.leer_dimensiones(archivo),
+                settings.IMAGENES_MIN_LADO,
+                settings.IMAGENES_MAX_PIXELES,
+            )
+        except preprocesado.ErrorPreprocesado as e:
+            raise serializers.ValidationError(f"{archivo.name}: {e}")
+    return archivo
 
 
 class ImagenProductoSerializer(serializers.ModelSerializer):
@@ -10,10 +29,14 @@ class ImagenProductoSerializer(serializers.ModelSerializer):
         model = ImagenProducto
         fields = [
             'id_imagen', 'url', 'public_id', 'formato',
-            'es_principal', 'orden', 'estado_imagen',
+            'es_principal', 'orden', 'estado_imagen', 'intentos', 'error_subida',
+            'bytes_original', 'bytes_optimizado', 'preprocesado_ms',
             'subido_por', 'fecha_subida', 'fecha_actualizacion', 'metadata'
         ]
-        read_only_fields = ['id_imagen', 'url', 'public_id', 'formato']
+        read_only_fields = [
+            'id_imagen', 'url', 'public_id', 'formato', 'intentos', 'error_subida',
+            'bytes_original', 'bytes_optimizado', 'preprocesado_ms'
+        ]
 
 
     def get_subido_por(self, obj):
@@ -25,10 +48,8 @@ class ImagenProductoSerializer(serializers.ModelSerializer):
             return None
 
     def get_metadata(self, obj):
-        return {
-                'thumbnail': f"https://res.cloudinary.com/afrodita/image/upload/c_thumb,w_150,h_150/{obj.public_id}.jpg",
-                'medium': f"https://res.cloudinary.com/afrodita/image/upload/c_fill,w_400,h_400/{obj.public_id}.jpg"
-        }
+        """Manifiesto de variantes guardado al subir (thumbnail, medium, srcset, lqip...)."""
+        return variantes.manifiesto(obj)
 
 
 class SubirImagenSerializer(serializers.Serializer):
@@ -36,27 +57,68 @@ class SubirImagenSerializer(serializers.Serializer):
     es_principal = serializers.BooleanField(default=False)
     orden = serializers.IntegerField(default=1, min_value=1)
 
-    def create(self, validated_data):
+    def validate_imagen(self, value):
+        return validar_imagen(value)
+
+    def validate_orden(self, value):
         producto = self.context['producto']
-        usuario = self.context['request'].user
-        archivo = validated_data['imagen']
-        orden = validated_data.get('orden', 1)
+        if ImagenProducto.objects.filter(id_producto=producto, orden=value).exists():
+            raise serializers.ValidationError(Messages.IMAGE_ORDER_TAKEN.format(orden=value))
+        return value
 
-        resultado = ImagenProducto.subir_a_cloudinary(
-            archivo, producto.id_producto, orden
+    def create(self, validated_data):
+        """
+        Deja la imagen PENDIENTE y encola la subida; el cliente sigue el
+        estado en /api/imagenes/{id}/estado/.
+        """
+        return subida_service.encolar(
+            producto=self.context['producto'],
+            archivo=validated_data['imagen'],
+            orden=validated_data.get('orden', 1),
+            es_principal=validated_data['es_principal'],
+            usuario=self.context['request'].user,
+            ip=self.context.get('ip'),
         )
 
-        imagen = ImagenProducto.objects.create(
-            id_producto=producto,
-            url=resultado['url'],
-            public_id=resultado['public_id'],
-            formato=resultado['formato'],
-            es_principal=validated_data['es_principal'],
-            orden=orden,
-            subido_por=usuario
+
+class SubidaMasivaSerializer(serializers.Serializer):
+    """
+    Varias imágenes en un solo request (multipart, campo `imagenes` repetido).
+    Se indica `producto` para todas o `productos` con un id por imagen.
+    """
+    imagenes = serializers.ListField(child=serializers.ImageField(), allow_empty=False)
+    producto = serializers.CharField(required=False)
+    productos = serializers.ListField(child=serializers.CharField(), required=False)
+    es_principal = serializers.BooleanField(default=False)
+
+    def validate_imagenes(self, value):
+        if len(value) > settings.IMAGENES_SUBIDA_MASIVA_MAX:
+            raise serializers.ValidationError(
+                f"Máximo {settings.IMAGENES_SUBIDA_MASIVA_MAX} imágenes por subida."
+            )
+        return [validar_imagen(archivo) for archivo in value]
+
+    def validate(self, attrs):
+        imagenes = attrs['imagenes']
+        ids = attrs.get('productos') or (
+            [attrs['producto']] * len(imagenes) if attrs.get('producto') else []
         )
+        if len(ids) != len(imagenes):
+            raise serializers.ValidationError(Messages.BULK_PRODUCTS_MISMATCH)
 
-        if imagen.es_principal:
-            imagen.marcar_como_principal()
+        encontrados = Producto.objects.in_bulk(set(ids))
+        faltantes = sorted(set(ids) - set(encontrados))
+        if faltantes:
+            raise serializers.ValidationError(Messages.PRODUCTS_NOT_FOUND.format(ids=faltantes))
+        attrs['productos'] = [encontrados[i] for i in ids]
+        return attrs
 
-        return imagen
\ No newline at end of file
+    def create(self, validated_data):
+        """Sube el lote (en paralelo) y devuelve el resumen de subida_masiva_service."""
+        return subida_masiva_service.subir(
+            archivos=validated_data['imagenes'],
+            productos=validated_data['productos'],
+            es_principal=validated_data['es_principal'],
+            usuario=self.context['request'].user,
+            ip=self.context.get('ip'),
+        )
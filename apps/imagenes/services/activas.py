@@ -0,0 +1,38 @@
+# apps/imagenes/services/activas.py
+"""
+Imágenes visibles de un producto.
+
+Solo se muestran las imágenes ACTIVA: las PENDIENTE todavía no tienen URL
+y las ERROR nunca la tendrán. Los querysets de listado prefetchean solo
+esas con `prefetch()`; los serializers las leen con `de_producto()`, que
+consulta la base únicamente si el producto no vino prefetcheado.
+"""
+from django.db.models import Prefetch
+
+from core.constants import ImageStatus
+
+from ..models import ImagenProducto
+
+ATRIBUTO = "imagenes_activas"
+
+
+def prefetch():
+    """Prefetch de producto.imagenes filtrado a ACTIVA, en `producto.imagenes_activas`."""
+    return Prefetch(
+        "imagenes",
+        queryset=ImagenProducto.objects.filter(estado_imagen=ImageStatus.ACTIVA),
+        to_attr=ATRIBUTO,
+    )
+
+
+def de_producto(producto):
+    """Imágenes ACTIVA del producto, en orden (orden, id_imagen)."""
+    imagenes = getattr(producto, ATRIBUTO, None)
+    if imagenes is None:
+        imagenes = list(producto.imagenes.filter(estado_imagen=ImageStatus.ACTIVA))
+    return imagenes
+
+
+def principal(producto):
+    """La imagen principal ACTIVA del producto, o None."""
+    return next((imagen for imagen in de_producto(producto) if imagen.es_principal), None)
@@ -0,0 +1,290 @@
+# apps/imagenes/services/almacenamiento.py
+"""
+Almacenamiento de imágenes de productos.
+
+El resto del módulo habla con `get_almacenamiento()`, que instancia la
+clase indicada en settings.IMAGENES_ALMACENAMIENTO:
+
+  - CloudinaryAlmacenamiento: producción.
+  - LocalAlmacenamiento: copia los archivos a IMAGENES_LOCAL_DIR; sirve
+    para tests, benchmarks y desarrollo sin credenciales de Cloudinary.
+
+`subir()` devuelve siempre el mismo dict (url, public_id, formato, width,
+height, bytes) y ante un fallo lanza ErrorAlmacenamiento indicando si
+tiene sentido reintentar.
+"""
+import os
+import shutil
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class ErrorAlmacenamiento(Exception):
+    """Fallo al subir o eliminar. `reintentable` distingue errores transitorios."""
+
+    def __init__(self, mensaje, reintentable=True):
+        super().__init__(mensaje)
+        self.reintentable = reintentable
+
+
+class Almacenamiento:
+    """Interfaz común de los backends de imágenes."""
+
+    def subir(self, archivo, carpeta, nombre):
+        """
+        Sube `archivo` (ruta o archivo abierto) como carpeta/nombre,
+        sobrescribiendo si ya existe.
+
+        Returns:
+            dict: url, public_id, formato, width, height, bytes
+        """
+        raise NotImplementedError
+
+    def eliminar(self, public_id):
+        """Elimina la imagen. Devuelve True si existía y se borró."""
+        raise NotImplementedError
+
+    def metadata(self, public_id):
+        """Metadatos del backend, o None si no están disponibles."""
+        return None
+
+    # Máximo de public_ids por llamada a eliminar_lote
+    max_lote = 100
+
+    def listar(self, prefijo):
+        """Itera los public_id guardados bajo `prefijo`."""
+        raise NotImplementedError
+
+    def eliminar_lote(self, public_ids):
+        """
+        Elimina hasta `max_lote` imágenes en una sola llamada.
+
+        Returns:
+            set: public_ids que ya no existen (borrados o no encontrados).
+        """
+        for public_id in public_ids:
+            self.eliminar(public_id)
+        return set(public_ids)
+
+    # True si el backend genera tamaños al vuelo desde la URL
+    transforma = False
+
+    def url_variante(self, public_id, url, ancho=None, alto=None, recorte='limit'):
+        """
+        URL de la imagen con otro tamaño, armada localmente (sin llamadas
+        al API). Sin transformaciones devuelve la URL original.
+        """
+        return url
+
+
+class CloudinaryAlmacenamiento(Almacenamiento):
+
+    transforma = True
+
+    def url_variante(self, public_id, url, ancho=None, alto=None, recorte='limit'):
+        transformacion = [f"c_{recorte}"]
+        if ancho:
+            transformacion.append(f"w_{ancho}")
+        if alto:
+            transformacion.append(f"h_{alto}")
+        transformacion += ['f_auto', 'q_auto']
+        return (
+            f"https://res.cloudinary.com/{settings.CLOUDINARY_STORAGE['CLOUD_NAME']}"
+            f"/image/upload/{','.join(transformacion)}/{public_id}"
+        )
+
+    def subir(self, archivo, carpeta, nombre):
+        import cloudinary.exceptions
+        import cloudinary.uploader
+
+        try:
+            upload = cloudinary.uploader.upload(
+                archivo,
+                folder=carpeta,
+                public_id=nombre,
+                overwrite=True,
+                resource_type="image",
+                transformation=[{'quality': 'auto'}, {'fetch_format': 'auto'}]
+            )
+        except (cloudinary.exceptions.BadRequest, cloudinary.exceptions.NotAllowed) as e:
+            # Archivo inválido o sin permiso: reintentar no cambia nada
+            raise ErrorAlmacenamiento(f"Error al subir imagen a Cloudinary: {e}", reintentable=False)
+        except Exception as e:
+            raise ErrorAlmacenamiento(f"Error al subir imagen a Cloudinary: {e}")
+        return {
+            'url': upload['secure_url'],
+            'public_id': upload['public_id'],
+            'formato': upload['format'],
+            'width': upload.get('width'),
+            'height': upload.get('height'),
+            'bytes': upload.get('bytes')
+        }
+
+    def eliminar(self, public_id):
+        import cloudinary.uploader
+
+        try:
+            result = cloudinary.uploader.destroy(public_id)
+            return result.get('result') == 'ok'
+        except Exception as e:
+            print(f"Error al eliminar de Cloudinary: {e}")
+            return False
+
+    def metadata(self, public_id):
+        import cloudinary.api
+
+        try:
+            return cloudinary.api.resource(public_id)
+        except Exception:
+            return None
+
+    def listar(self, prefijo):
+        import cloudinary.api
+
+        cursor = None
+        while True:
+            try:
+                pagina = cloudinary.api.resources(
+                    type="upload", prefix=prefijo, max_results=500, next_cursor=cursor
+                )
+            except Exception as e:
+                raise ErrorAlmacenamiento(f"Error al listar imágenes de Cloudinary: {e}")
+            for recurso in pagina.get('resources', []):
+                yield recurso['public_id']
+            cursor = pagina.get('next_cursor')
+            if not cursor:
+                return
+
+    def eliminar_lote(self, public_ids):
+        import cloudinary.api
+
+        try:
+            result = cloudinary.api.delete_resources(list(public_ids))
+        except Exception as e:
+            raise ErrorAlmacenamiento(f"Error al eliminar imágenes de Cloudinary: {e}")
+        return {
+            public_id for public_id, estado in result.get('deleted', {}).items()
+            if estado in ('deleted', 'not_found')
+        }
+
+
+class LocalAlmacenamiento(Almacenamiento):
+    """
+    Guarda las imágenes en settings.IMAGENES_LOCAL_DIR y las publica bajo
+    settings.IMAGENES_LOCAL_URL. Mismo contrato que Cloudinary (public_id
+    con carpeta, sobrescritura), sin transformaciones.
+    """
+
+    def __init__(self, directorio=None, url_base=None):
+        self.directorio = directorio or settings.IMAGENES_LOCAL_DIR
+        self.url_base = (url_base or settings.IMAGENES_LOCAL_URL).rstrip('/')
+
+    def _ruta(self, public_id, formato):
+        return os.path.join(self.directorio, *public_id.split('/')) + f".{formato}"
+
+    def subir(self, archivo, carpeta, nombre):
+        from PIL import Image, UnidentifiedImageError
+
+        try:
+            with Image.open(archivo) as img:
+                formato = (img.format or 'jpeg').lower().replace('jpeg', 'jpg')
+                width, height = img.size
+        except (UnidentifiedImageError, OSError) as e:
+            raise ErrorAlmacenamiento(f"Archivo de imagen inválido: {e}", reintentable=False)
+
+        public_id = f"{carpeta}/{nombre}" if carpeta else nombre
+        destino = self._ruta(public_id, formato)
+        try:
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            if hasattr(archivo, 'read'):
+                archivo.seek(0)
+                with open(destino, 'wb') as fh:
+                    shutil.copyfileobj(archivo, fh)
+            else:
+                shutil.copyfile(archivo, destino)
+        except OSError as e:
+            raise ErrorAlmacenamiento(f"Error al guardar la imagen: {e}")
+
+        return {
+            'url': f"{self.url_base}/{public_id}.{formato}",
+            'public_id': public_id,
+            'formato': formato,
+            'width': width,
+            'height': height,
+            'bytes': os.path.getsize(destino)
+        }
+
+    def _buscar(self, public_id):
+        base = os.path.join(self.directorio, *public_id.split('/'))
+        carpeta, nombre = os.path.dirname(base), os.path.basename(base)
+        if not os.path.isdir(carpeta):
+            return None
+        for archivo in os.listdir(carpeta):
+            if archivo.rsplit('.', 1)[0] == nombre:
+                return os.path.join(carpeta, archivo)
+        return None
+
+    def eliminar(self, public_id):
+        ruta = self._buscar(public_id)
+        if ruta is None:
+            return False
+        os.remove(ruta)
+        return True
+
+    def listar(self, prefijo):
+        raiz = os.path.join(self.directorio, *prefijo.split('/'))
+        vistos = set()
+        for carpeta, _, archivos in os.walk(raiz):
+            relativa = os.path.relpath(carpeta, self.directorio).replace(os.sep, '/')
+            for archivo in sorted(archivos):
+                public_id = f"{relativa}/{archivo.rsplit('.', 1)[0]}"
+                if public_id not in vistos:
+                    vistos.add(public_id)
+                    yield public_id
+
+    def eliminar_lote(self, public_ids):
+        eliminados = set()
+        for public_id in public_ids:
+            # Puede haber más de un archivo (p. ej. .png y .webp del mismo public_id)
+            while self.eliminar(public_id):
+                pass
+            eliminados.add(public_id)
+        return eliminados
+
+    def metadata(self, public_id):
+        from PIL import Image
+
+        ruta = self._buscar(public_id)
+        if ruta is None:
+            return None
+        with Image.open(ruta) as img:
+            width, height = img.size
+        return {
+            'public_id': public_id,
+            'url': f"{self.url_base}/{public_id}.{ruta.rsplit('.', 1)[1]}",
+            'width': width,
+            'height': height,
+            'bytes': os.path.getsize(ruta),
+            'ruta': ruta,
+        }
+
+
+_almacenamiento = None
+_almacenamiento_lock = threading.Lock()
+
+
+def get_almacenamiento():
+    global _almacenamiento
+    with _almacenamiento_lock:
+        if _almacenamiento is None:
+            _almacenamiento = import_string(settings.IMAGENES_ALMACENAMIENTO)()
+        return _almacenamiento
+
+
+def reiniciar_almacenamiento():
+    """Descarta la instancia (p. ej. tras cambiar IMAGENES_ALMACENAMIENTO en tests)."""
+    global _almacenamiento
+    with _almacenamiento_lock:
+        _almacenamiento = None
@@ -0,0 +1,137 @@
+# apps/imagenes/services/limpieza_service.py
+"""
+Recolección de imágenes remotas sin fila en la base.
+
+Dos fuentes de basura en el almacenamiento:
+
+  - Huérfanas: public_id listados bajo ImagenProducto.CARPETA que ya no
+    tienen fila (producto eliminado, imagen borrada con error remoto,
+    subida cancelada a mitad de camino...). Se lista primero el
+    almacenamiento y después la base, y cada lote se vuelve a comprobar
+    justo antes de borrar: una subida nueva siempre crea su fila antes de
+    subir el archivo, así que nunca se borra una imagen en uso.
+  - Vencidas: imágenes INACTIVA (eliminación lógica) sin cambios desde
+    hace más de IMAGENES_GC_RETENCION_DIAS. Se borran del almacenamiento
+    y de la base, lote a lote, con las filas bloqueadas para no competir
+    con un /restaurar/.
+
+El borrado usa `eliminar_lote` del almacenamiento (una llamada por cada
+IMAGENES_GC_LOTE imágenes) con una pausa de IMAGENES_GC_PAUSA segundos
+entre llamadas para respetar el rate limit del API. Con `dry_run` solo
+se informa qué se borraría.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.bitacora.services.logger import AuditoriaLogger
+from apps.imagenes.models import ImagenProducto
+from core.constants import ImageStatus
+
+from .almacenamiento import ErrorAlmacenamiento, get_almacenamiento
+
+logger = logging.getLogger(__name__)
+
+
+def _lotes(elementos, tamano):
+    for i in range(0, len(elementos), tamano):
+        yield elementos[i:i + tamano]
+
+
+def listar_huerfanas(almacenamiento=None):
+    """public_id remotos sin fila en imagen_producto, ordenados."""
+    almacenamiento = almacenamiento or get_almacenamiento()
+    remotos = set(almacenamiento.listar(ImagenProducto.CARPETA))
+    en_bd = set(
+        ImagenProducto.objects.filter(public_id__in=remotos).values_list('public_id', flat=True)
+    )
+    return sorted(remotos - en_bd)
+
+
+def vencidas(retencion_dias=None):
+    retencion_dias = settings.IMAGENES_GC_RETENCION_DIAS if retencion_dias is None else retencion_dias
+    limite = timezone.now() - timedelta(days=retencion_dias)
+    return ImagenProducto.objects.filter(
+        estado_imagen=ImageStatus.INACTIVA,
+        es_principal=False,
+        fecha_actualizacion__lt=limite,
+    ).order_by('id_imagen')
+
+
+def recolectar(dry_run=False, huerfanas=True, purgar=True, retencion_dias=None,
+               lote=None, pausa=None, almacenamiento=None, esperar=time.sleep):
+    """
+    Borra huérfanas y/o purga vencidas.
+
+    Returns:
+        dict: huerfanas y purgadas (public_ids afectados, o que se
+        afectarían con dry_run), llamadas, errores y duracion_ms.
+    """
+    inicio = time.perf_counter()
+    almacenamiento = almacenamiento or get_almacenamiento()
+    lote = min(lote or settings.IMAGENES_GC_LOTE, almacenamiento.max_lote)
+    pausa = settings.IMAGENES_GC_PAUSA if pausa is None else pausa
+    resumen = {'dry_run': dry_run, 'huerfanas': [], 'purgadas': [], 'llamadas': 0, 'errores': []}
+
+    def eliminar(public_ids):
+        if resumen['llamadas']:
+            esperar(pausa)
+        resumen['llamadas'] += 1
+        try:
+            return almacenamiento.eliminar_lote(public_ids)
+        except ErrorAlmacenamiento as e:
+            logger.warning(f"GC de imágenes: lote de {len(public_ids)} no eliminado: {e}")
+            resumen['errores'].append(str(e))
+            return set()
+
+    if huerfanas:
+        candidatas = listar_huerfanas(almacenamiento)
+        if dry_run:
+            resumen['huerfanas'] = candidatas
+        else:
+            for grupo in _lotes(candidatas, lote):
+                # Re-chequeo: una subida pudo reservar el mismo public_id
+                ocupados = set(
+                    ImagenProducto.objects.filter(public_id__in=grupo).values_list('public_id', flat=True)
+                )
+                grupo = [public_id for public_id in grupo if public_id not in ocupados]
+                if grupo:
+                    resumen['huerfanas'] += sorted(eliminar(grupo))
+
+    if purgar:
+        ids = list(vencidas(retencion_dias).values_list('id_imagen', flat=True))
+        if dry_run:
+            resumen['purgadas'] = list(
+                ImagenProducto.objects.filter(id_imagen__in=ids)
+                .order_by('id_imagen').values_list('public_id', flat=True)
+            )
+        else:
+            for grupo in _lotes(ids, lote):
+                with transaction.atomic():
+                    filas = dict(
+                        vencidas(retencion_dias).select_for_update()
+                        .filter(id_imagen__in=grupo).values_list('id_imagen', 'public_id')
+                    )
+                    if not filas:
+                        continue
+                    eliminados = eliminar(list(filas.values()))
+                    ImagenProducto.objects.filter(
+                        id_imagen__in=[i for i, public_id in filas.items() if public_id in eliminados]
+                    ).delete()
+                resumen['purgadas'] += sorted(eliminados)
+
+    if not dry_run and (resumen['huerfanas'] or resumen['purgadas']):
+        AuditoriaLogger.registrar_evento(
+            accion="IMAGE_DELETE",
+            descripcion=(
+                f"Limpieza de imágenes: {len(resumen['huerfanas'])} huérfana(s) y "
+                f"{len(resumen['purgadas'])} inactiva(s) vencida(s) eliminadas del almacenamiento"
+            ),
+        )
+
+    resumen['duracion_ms'] = int((time.perf_counter() - inicio) * 1000)
+    return resumen
@@ -0,0 +1,163 @@
+# apps/imagenes/services/preprocesado.py
+"""
+Preprocesado local de imágenes antes de subirlas al almacenamiento.
+
+Sobre el archivo del spool:
+
+  1. Valida dimensiones (lado mínimo y total de píxeles, que también
+     frena las "decompression bombs").
+  2. Aplica la orientación EXIF y descarta los metadatos (EXIF con GPS,
+     modelo de cámara, etc.): la imagen guardada no conserva ninguno.
+  3. Reduce al lado máximo configurado (sin agrandar nunca).
+  4. Re-codifica a WebP o JPEG con la calidad objetivo.
+
+El trabajo es CPU puro, así que corre en un ProcessPoolExecutor propio
+(IMAGENES_PREPROCESADO_WORKERS; 0 = en el mismo hilo, útil en tests).
+`preprocesar()` solo depende de Pillow y recibe todo por parámetro para
+poder ejecutarse en un proceso hijo sin inicializar Django.
+"""
+import base64
+import io
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+
+
+class ErrorPreprocesado(Exception):
+    """La imagen no es válida para el catálogo (no tiene sentido reintentar)."""
+
+
+FORMATOS = {
+    'WEBP': ('webp', {'method': 4}),
+    'JPEG': ('jpg', {'optimize': True, 'progressive': True}),
+}
+
+
+def leer_dimensiones(archivo):
+    """(ancho, alto) leyendo solo la cabecera de la imagen."""
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        with Image.open(archivo) as img:
+            return img.size
+    except (UnidentifiedImageError, OSError) as e:
+        raise ErrorPreprocesado(f"Archivo de imagen inválido: {e}")
+    finally:
+        if hasattr(archivo, 'seek'):
+            archivo.seek(0)
+
+
+def validar_dimensiones(ancho, alto, min_lado, max_pixeles):
+    if min(ancho, alto) < min_lado:
+        raise ErrorPreprocesado(
+            f"La imagen mide {ancho}x{alto}; el lado mínimo es {min_lado}px."
+        )
+    if ancho * alto > max_pixeles:
+        raise ErrorPreprocesado(
+            f"La imagen mide {ancho}x{alto}; supera el máximo de {max_pixeles} píxeles."
+        )
+
+
+def generar_lqip(img, lado=16):
+    """Miniatura borrosa (LQIP) como data URI WebP de unos cientos de bytes."""
+    from PIL import Image
+
+    miniatura = img.convert('RGB')
+    miniatura.thumbnail((lado, lado), Image.BILINEAR)
+    buffer = io.BytesIO()
+    miniatura.save(buffer, 'WEBP', quality=30)
+    return "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def lqip_de_archivo(ruta):
+    from PIL import Image, ImageOps
+
+    with Image.open(ruta) as img:
+        img.draft('RGB', (64, 64))  # JPEG: decodifica a escala reducida
+        return generar_lqip(ImageOps.exif_transpose(img))
+
+
+def preprocesar(origen, directorio, max_lado, min_lado, max_pixeles, formato, calidad):
+    """
+    Genera la versión optimizada de `origen` en `directorio`.
+
+    Returns:
+        dict: ruta, formato, width, height, bytes_original, bytes, lqip, duracion_ms
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    inicio = time.perf_counter()
+    extension, opciones = FORMATOS[formato]
+    try:
+        with Image.open(origen) as img:
+            validar_dimensiones(*img.size, min_lado, max_pixeles)
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((max_lado, max_lado), Image.LANCZOS)
+
+            if formato == 'JPEG' and img.mode in ('RGBA', 'LA', 'P'):
+                img = img.convert('RGBA')
+                fondo = Image.new('RGB', img.size, 'white')
+                fondo.paste(img, mask=img.getchannel('A'))
+                img = fondo
+            elif img.mode not in ('RGB', 'RGBA'):
+                img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+
+            destino = os.path.join(directorio, f"{uuid.uuid4().hex}.{extension}")
+            # Sin exif=/icc_profile=: Pillow no copia los metadatos del original
+            img.save(destino, formato, quality=calidad, **opciones)
+            ancho, alto = img.size
+            lqip = generar_lqip(img)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        # OSError: JPEG/PNG truncado ("image file is truncated") al decodificar
+        raise ErrorPreprocesado(f"Archivo de imagen inválido: {e}")
+
+    return {
+        'ruta': destino,
+        'formato': extension,
+        'width': ancho,
+        'height': alto,
+        'bytes_original': os.path.getsize(origen),
+        'bytes': os.path.getsize(destino),
+        'lqip': lqip,
+        'duracion_ms': int((time.perf_counter() - inicio) * 1000),
+    }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: el proceso web tiene hilos (pools de subida) y fork no es seguro
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.IMAGENES_PREPROCESADO_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _pool
+
+
+def ejecutar(origen):
+    """
+    Preprocesa `origen` con la configuración de settings, en el pool de
+    procesos. Bloquea a quien llama (un hilo de subida, nunca el request).
+    """
+    argumentos = (
+        origen,
+        settings.IMAGENES_SPOOL_DIR,
+        settings.IMAGENES_MAX_LADO,
+        settings.IMAGENES_MIN_LADO,
+        settings.IMAGENES_MAX_PIXELES,
+        settings.IMAGENES_FORMATO_SALIDA,
+        settings.IMAGENES_CALIDAD,
+    )
+    if not settings.IMAGENES_PREPROCESADO_WORKERS:
+        return preprocesar(*argumentos)
+    return _get_pool().submit(preprocesar, *argumentos).result()
@@ -0,0 +1,212 @@
+# apps/imagenes/services/subida_masiva_service.py
+"""
+Subida masiva de imágenes (varios archivos, uno o varios productos).
+
+  1. Los archivos se copian al spool.
+  2. Con los productos bloqueados (FOR UPDATE) se asignan los órdenes
+     siguientes al máximo actual de cada producto, en el orden del request,
+     y se crean todas las filas PENDIENTE con un bulk_create. El public_id
+     sale del orden: dos requests simultáneos nunca comparten destino.
+  3. Las subidas corren en paralelo en un pool acotado
+     (IMAGENES_SUBIDA_MASIVA_WORKERS): cada hilo preprocesa su archivo
+     (pool de procesos) y lo sube con los mismos reintentos que la
+     subida individual. Los hilos no tocan la base.
+  4. Un bulk_update deja cada fila ACTIVA o ERROR (con su temporal, para
+     /reintentar/) y la principal de cada producto se cambia una sola vez.
+     Solo se tocan las filas que siguen PENDIENTE; lo subido para una fila
+     borrada mientras tanto se elimina del almacenamiento.
+
+La bitácora recibe un único evento imagen_subida con todo el lote.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from apps.bitacora.signals import imagen_subida
+from apps.imagenes.models import ImagenProducto
+from apps.productos.models import Producto
+from core.constants import ImageStatus
+
+from . import subida_service, variantes
+from .almacenamiento import ErrorAlmacenamiento, get_almacenamiento
+
+logger = logging.getLogger(__name__)
+
+
+def _reservar(archivos, productos, es_principal, usuario, rutas):
+    """Asigna orden y principal por producto y crea las filas PENDIENTE."""
+    ids = sorted(set(p.id_producto for p in productos))
+    with transaction.atomic():
+        list(Producto.objects.select_for_update().filter(id_producto__in=ids).order_by('id_producto'))
+        maximos = dict(
+            ImagenProducto.objects.filter(id_producto__in=ids)
+            .values('id_producto').annotate(maximo=Max('orden'))
+            .values_list('id_producto', 'maximo')
+        )
+        con_principal = set(
+            ImagenProducto.objects.filter(
+                id_producto__in=ids, es_principal=True, estado_imagen=ImageStatus.ACTIVA
+            ).values_list('id_producto', flat=True)
+        )
+
+        imagenes = []
+        siguiente = {}
+        for archivo, producto, ruta in zip(archivos, productos, rutas):
+            pid = producto.id_producto
+            orden = siguiente.get(pid, (maximos.get(pid) or 0) + 1)
+            # Principal: la primera imagen del lote de cada producto, si se
+            # pidió o si el producto todavía no tiene una
+            principal = pid not in siguiente and (es_principal or pid not in con_principal)
+            siguiente[pid] = orden + 1
+            imagenes.append(ImagenProducto(
+                id_producto=producto,
+                public_id=ImagenProducto.public_id_para(pid, orden),
+                formato=subida_service.extension_archivo(archivo.name),
+                orden=orden,
+                es_principal=False,
+                principal_solicitado=principal,
+                estado_imagen=ImageStatus.PENDIENTE,
+                archivo_temporal=ruta,
+                subido_por=usuario,
+            ))
+        return ImagenProducto.objects.bulk_create(imagenes)
+
+
+def _subir(imagen, almacenamiento, esperar):
+    """
+    Preprocesa y sube una imagen. Devuelve (resultado o None, ruta original).
+
+    Nunca lanza: un fallo inesperado deja la imagen en ERROR como cualquier
+    otro, para que `_finalizar` cierre siempre el lote (sin filas PENDIENTE
+    ni temporales olvidados).
+    """
+    original = None
+    try:
+        original = subida_service.preparar(imagen)
+        resultado = subida_service.subir_con_reintentos(imagen, almacenamiento, esperar=esperar)
+        if resultado is not None:
+            imagen.variantes = variantes.para_subida(imagen, resultado, almacenamiento)
+    except ErrorAlmacenamiento as e:
+        imagen.error_subida = str(e)
+        return None, original
+    except Exception as e:
+        logger.exception(f"Error subiendo la imagen {imagen.id_imagen}")
+        imagen.error_subida = f"Error inesperado en la subida: {e}"
+        return None, original
+    return resultado, original
+
+
+def _finalizar(imagenes, resultados, originales, almacenamiento):
+    ahora = timezone.now()
+    subidas, fallidas, temporales = [], [], [ruta for ruta in originales if ruta]
+    for imagen, resultado in zip(imagenes, resultados):
+        imagen.fecha_actualizacion = ahora
+        if resultado is None:
+            imagen.estado_imagen = ImageStatus.ERROR
+            fallidas.append(imagen)
+            continue
+        imagen.url = resultado['url']
+        imagen.public_id = resultado['public_id']
+        imagen.formato = resultado['formato']
+        imagen.estado_imagen = ImageStatus.ACTIVA
+        imagen.es_principal = imagen.principal_solicitado
+        imagen.error_subida = None
+        temporales.append(imagen.archivo_temporal)
+        imagen.archivo_temporal = ''
+        subidas.append(imagen)
+
+    calculados = ['formato', 'bytes_original', 'bytes_optimizado', 'preprocesado_ms', 'variantes']
+    with transaction.atomic():
+        # Igual que subida_service.procesar: solo se actualizan las filas que
+        # siguen PENDIENTE (una imagen borrada mientras subía no se resucita)
+        pendientes = set(
+            ImagenProducto.objects.select_for_update()
+            .filter(id_imagen__in=[i.id_imagen for i in imagenes], estado_imagen=ImageStatus.PENDIENTE)
+            .values_list('id_imagen', flat=True)
+        )
+        huerfanas = [i for i in subidas if i.id_imagen not in pendientes]
+        descartadas = [i for i in fallidas if i.id_imagen not in pendientes]
+        subidas = [i for i in subidas if i.id_imagen in pendientes]
+        fallidas = [i for i in fallidas if i.id_imagen in pendientes]
+
+        nuevas_principales = {i.id_producto_id for i in subidas if i.es_principal}
+        if nuevas_principales:
+            ImagenProducto.objects.filter(
+                id_producto__in=nuevas_principales, es_principal=True
+            ).update(es_principal=False)
+        ImagenProducto.objects.bulk_update(
+            subidas,
+            ['url', 'public_id', 'estado_imagen', 'es_principal', 'intentos',
+             'error_subida', 'archivo_temporal', 'fecha_actualizacion', *calculados],
+        )
+        ImagenProducto.objects.bulk_update(
+            fallidas,
+            ['estado_imagen', 'intentos', 'error_subida', 'archivo_temporal',
+             'fecha_actualizacion', *calculados],
+        )
+
+    # Las filas que ya no están no deben dejar archivos huérfanos
+    for imagen in huerfanas:
+        almacenamiento.eliminar(imagen.public_id)
+    temporales += [imagen.archivo_temporal for imagen in descartadas]
+    for imagen in huerfanas + descartadas:
+        imagen.estado_imagen = ImageStatus.INACTIVA
+        imagen.url = ''
+        imagen.es_principal = False
+
+    for ruta in temporales:
+        subida_service.borrar_temporal(ruta)
+    return subidas, fallidas
+
+
+def subir(archivos, productos, es_principal=False, usuario=None, ip=None, esperar=time.sleep):
+    """
+    Sube `archivos` (UploadedFile) a `productos` (Producto, uno por archivo).
+
+    Returns:
+        dict: resultados (uno por archivo, en el orden recibido), subidas,
+        fallidas y duracion_ms.
+    """
+    inicio = time.perf_counter()
+    rutas = []
+    try:
+        for archivo in archivos:
+            rutas.append(subida_service.guardar_temporal(archivo))
+        imagenes = _reservar(archivos, productos, es_principal, usuario, rutas)
+    except Exception:
+        for ruta in rutas:
+            subida_service.borrar_temporal(ruta)
+        raise
+
+    almacenamiento = get_almacenamiento()
+    workers = max(1, min(len(imagenes), settings.IMAGENES_SUBIDA_MASIVA_WORKERS))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="imagenes-masiva") as pool:
+        resultados, originales = zip(*pool.map(
+            lambda imagen: _subir(imagen, almacenamiento, esperar), imagenes
+        ))
+
+    subidas, fallidas = _finalizar(imagenes, resultados, originales, almacenamiento)
+
+    if subidas:
+        imagen_subida.send(
+            sender=ImagenProducto,
+            imagen=None,
+            imagenes=subidas,
+            usuario=usuario,
+            ip=ip,
+        )
+
+    return {
+        'resultados': [
+            {'archivo': archivo.name, **subida_service.estado(imagen)}
+            for archivo, imagen in zip(archivos, imagenes)
+        ],
+        'subidas': len(subidas),
+        'fallidas': len(fallidas),
+        'duracion_ms': int((time.perf_counter() - inicio) * 1000),
+    }
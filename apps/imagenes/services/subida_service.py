@@ -0,0 +1,316 @@
+# apps/imagenes/services/subida_service.py
+"""
+Subida de imágenes en segundo plano.
+
+El request solo copia el archivo a settings.IMAGENES_SPOOL_DIR y crea la
+fila ImagenProducto en estado PENDIENTE (con su public_id definitivo).
+Al confirmar la transacción la subida se encola en un ThreadPoolExecutor
+del proceso, que la envía al almacenamiento configurado con reintentos y
+espera exponencial ante errores transitorios:
+
+    PENDIENTE → ACTIVA   (url y formato reales, se borra el temporal)
+    PENDIENTE → ERROR    (se conserva el temporal para `reintentar`)
+
+Antes de subir, el hilo del pool preprocesa el archivo (orientación,
+sin EXIF, tamaño máximo, WebP/JPEG) en el pool de procesos de
+`preprocesado`; el ahorro y la latencia quedan en la fila.
+
+Si se pidió como principal, el cambio de principal se aplica recién al
+quedar ACTIVA: el producto no se queda sin imagen visible mientras tanto.
+Las subidas que quedaron PENDIENTE tras un reinicio se retoman con
+`manage.py procesar_subidas_imagenes`.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from apps.bitacora.signals import imagen_subida
+from apps.imagenes.models import ImagenProducto
+from core.constants import ImageStatus, Messages
+
+from . import preprocesado, variantes
+from .almacenamiento import ErrorAlmacenamiento, get_almacenamiento
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGENES_SUBIDA_WORKERS,
+                thread_name_prefix="imagenes",
+            )
+        return _executor
+
+
+def extension_archivo(nombre):
+    extension = os.path.splitext(nombre or '')[1].lower().lstrip('.')
+    return 'jpg' if extension in ('', 'jpeg') else extension
+
+
+def guardar_temporal(archivo):
+    """Copia el archivo subido al spool por chunks. Devuelve la ruta."""
+    os.makedirs(settings.IMAGENES_SPOOL_DIR, exist_ok=True)
+    ruta = os.path.join(
+        settings.IMAGENES_SPOOL_DIR, f"{uuid.uuid4().hex}.{extension_archivo(archivo.name)}"
+    )
+    with open(ruta, 'wb') as fh:
+        for chunk in archivo.chunks():
+            fh.write(chunk)
+    return ruta
+
+
+def borrar_temporal(ruta):
+    if ruta:
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+
+
+def encolar(producto, archivo, orden, es_principal, usuario, ip=None):
+    """
+    Crea la imagen PENDIENTE y encola su subida al confirmar la transacción.
+    """
+    ruta = guardar_temporal(archivo)
+    try:
+        imagen = ImagenProducto.objects.create(
+            id_producto=producto,
+            public_id=ImagenProducto.public_id_para(producto.id_producto, orden),
+            formato=extension_archivo(archivo.name),
+            orden=orden,
+            es_principal=False,
+            principal_solicitado=es_principal,
+            estado_imagen=ImageStatus.PENDIENTE,
+            archivo_temporal=ruta,
+            subido_por=usuario,
+        )
+    except Exception:
+        borrar_temporal(ruta)
+        raise
+
+    transaction.on_commit(lambda: enviar(imagen.id_imagen, ip=ip))
+    return imagen
+
+
+def enviar(id_imagen, ip=None):
+    """Encola la subida de una imagen PENDIENTE en el pool del proceso."""
+    return _get_executor().submit(_procesar_en_hilo, id_imagen, ip)
+
+
+def _procesar_en_hilo(id_imagen, ip):
+    try:
+        procesar(id_imagen, ip=ip)
+    except Exception:
+        logger.exception(f"Error procesando la subida de la imagen {id_imagen}")
+    finally:
+        # El hilo del pool no pasa por el ciclo request/response de Django
+        connections.close_all()
+
+
+def preparar(imagen):
+    """
+    Preprocesa imagen.archivo_temporal (una sola vez por imagen) y apunta
+    la imagen al resultado, solo en memoria. Devuelve la ruta original,
+    que quien llama borra después de persistir los cambios.
+
+    Raises:
+        ErrorAlmacenamiento: no reintentable, si la imagen no es válida.
+    """
+    if not settings.IMAGENES_PREPROCESAR or imagen.preprocesado_ms is not None:
+        return None
+    original = imagen.archivo_temporal
+    try:
+        resultado = preprocesado.ejecutar(original)
+    except preprocesado.ErrorPreprocesado as e:
+        raise ErrorAlmacenamiento(str(e), reintentable=False)
+    except Exception as e:
+        # Cualquier otro fallo (p. ej. el pool de procesos caído) también deja
+        # la imagen en ERROR con su temporal, en vez de PENDIENTE para siempre
+        logger.exception(f"Error preprocesando la imagen {imagen.id_imagen}")
+        raise ErrorAlmacenamiento(f"Error al preprocesar la imagen: {e}", reintentable=False)
+
+    imagen.archivo_temporal = resultado['ruta']
+    imagen.formato = resultado['formato']
+    imagen.bytes_original = resultado['bytes_original']
+    imagen.bytes_optimizado = resultado['bytes']
+    imagen.preprocesado_ms = resultado['duracion_ms']
+    imagen.variantes = {'lqip': resultado['lqip']}
+    logger.info(
+        f"Imagen {imagen.id_imagen} preprocesada en {imagen.preprocesado_ms} ms: "
+        f"{imagen.bytes_original} → {imagen.bytes_optimizado} bytes "
+        f"({resultado['width']}x{resultado['height']} {imagen.formato})"
+    )
+    return original
+
+
+def subir_con_reintentos(imagen, almacenamiento=None, al_fallar=None, esperar=time.sleep):
+    """
+    Sube imagen.archivo_temporal a su lugar definitivo (producto_orden),
+    reintentando los errores transitorios hasta IMAGENES_SUBIDA_REINTENTOS
+    intentos con espera exponencial. Actualiza imagen.intentos y
+    imagen.error_subida (solo en memoria; `al_fallar(imagen)` puede
+    persistirlos tras cada intento fallido).
+
+    Returns:
+        dict del almacenamiento, o None si se agotaron los intentos.
+    """
+    almacenamiento = almacenamiento or get_almacenamiento()
+    producto_id = imagen.id_producto_id
+    while True:
+        imagen.intentos += 1
+        try:
+            if not os.path.exists(imagen.archivo_temporal):
+                raise ErrorAlmacenamiento(Messages.IMAGE_SPOOL_MISSING, reintentable=False)
+            return almacenamiento.subir(
+                imagen.archivo_temporal,
+                ImagenProducto.carpeta_producto(producto_id),
+                f"{producto_id}_{imagen.orden}",
+            )
+        except ErrorAlmacenamiento as e:
+            imagen.error_subida = str(e)
+            if not e.reintentable or imagen.intentos >= settings.IMAGENES_SUBIDA_REINTENTOS:
+                return None
+            if al_fallar:
+                al_fallar(imagen)
+            esperar(settings.IMAGENES_SUBIDA_ESPERA * 2 ** (imagen.intentos - 1))
+
+
+def procesar(id_imagen, ip=None, esperar=time.sleep):
+    """
+    Sube una imagen PENDIENTE, reintentando los errores transitorios hasta
+    IMAGENES_SUBIDA_REINTENTOS intentos. Devuelve la imagen (o None si ya
+    no estaba pendiente).
+    """
+    imagen = (
+        ImagenProducto.objects.select_related('id_producto', 'subido_por')
+        .filter(id_imagen=id_imagen, estado_imagen=ImageStatus.PENDIENTE)
+        .first()
+    )
+    if imagen is None:
+        return None
+
+    producto_id = imagen.id_producto_id
+    almacenamiento = get_almacenamiento()
+
+    try:
+        original = preparar(imagen)
+    except ErrorAlmacenamiento as e:
+        imagen.error_subida = str(e)
+        resultado = None
+    else:
+        if original:
+            ImagenProducto.objects.filter(id_imagen=id_imagen).update(
+                archivo_temporal=imagen.archivo_temporal,
+                formato=imagen.formato,
+                bytes_original=imagen.bytes_original,
+                bytes_optimizado=imagen.bytes_optimizado,
+                preprocesado_ms=imagen.preprocesado_ms,
+                variantes=imagen.variantes,
+            )
+            borrar_temporal(original)
+
+        def registrar_fallo(imagen):
+            ImagenProducto.objects.filter(id_imagen=id_imagen).update(
+                intentos=imagen.intentos, error_subida=imagen.error_subida
+            )
+
+        resultado = subir_con_reintentos(imagen, almacenamiento, registrar_fallo, esperar)
+
+    if resultado is None:
+        ImagenProducto.objects.filter(
+            id_imagen=id_imagen, estado_imagen=ImageStatus.PENDIENTE
+        ).update(
+            estado_imagen=ImageStatus.ERROR,
+            intentos=imagen.intentos,
+            error_subida=imagen.error_subida,
+            fecha_actualizacion=timezone.now(),
+        )
+        imagen.estado_imagen = ImageStatus.ERROR
+        return imagen
+
+    manifiesto = variantes.para_subida(imagen, resultado, almacenamiento)
+    with transaction.atomic():
+        if imagen.principal_solicitado:
+            ImagenProducto.objects.filter(
+                id_producto_id=producto_id, es_principal=True
+            ).update(es_principal=False)
+        actualizadas = ImagenProducto.objects.filter(
+            id_imagen=id_imagen, estado_imagen=ImageStatus.PENDIENTE
+        ).update(
+            url=resultado['url'],
+            public_id=resultado['public_id'],
+            formato=resultado['formato'],
+            variantes=manifiesto,
+            estado_imagen=ImageStatus.ACTIVA,
+            es_principal=imagen.principal_solicitado,
+            intentos=imagen.intentos,
+            error_subida=None,
+            archivo_temporal='',
+            fecha_actualizacion=timezone.now(),
+        )
+        if not actualizadas:
+            # Se eliminó mientras subía: no dejar el archivo huérfano
+            transaction.set_rollback(True)
+
+    if not actualizadas:
+        almacenamiento.eliminar(resultado['public_id'])
+        borrar_temporal(imagen.archivo_temporal)
+        return None
+
+    borrar_temporal(imagen.archivo_temporal)
+    imagen.refresh_from_db()
+    imagen_subida.send(
+        sender=ImagenProducto,
+        imagen=imagen,
+        usuario=imagen.subido_por,
+        ip=ip,
+    )
+    return imagen
+
+
+def reintentar(imagen, ip=None, encolar=True):
+    """
+    Vuelve a PENDIENTE una imagen con ERROR cuyo temporal sigue en disco y,
+    si `encolar`, la envía al pool (si no, la procesa quien llama).
+    """
+    ImagenProducto.objects.filter(
+        id_imagen=imagen.id_imagen, estado_imagen=ImageStatus.ERROR
+    ).update(estado_imagen=ImageStatus.PENDIENTE, intentos=0, fecha_actualizacion=timezone.now())
+    imagen.refresh_from_db()
+    if encolar:
+        transaction.on_commit(lambda: enviar(imagen.id_imagen, ip=ip))
+    return imagen
+
+
+def estado(imagen):
+    """Datos de seguimiento de la subida para el cliente."""
+    return {
+        'id_imagen': imagen.id_imagen,
+        'producto': imagen.id_producto_id,
+        'estado': imagen.estado_imagen,
+        'intentos': imagen.intentos,
+        'error': imagen.error_subida,
+        'url': imagen.url or None,
+        'es_principal': imagen.es_principal,
+        'orden': imagen.orden,
+        'terminada': imagen.estado_imagen != ImageStatus.PENDIENTE,
+        'preprocesado': None if imagen.preprocesado_ms is None else {
+            'bytes_original': imagen.bytes_original,
+            'bytes': imagen.bytes_optimizado,
+            'bytes_ahorrados': imagen.bytes_original - imagen.bytes_optimizado,
+            'duracion_ms': imagen.preprocesado_ms,
+        },
+    }
@@ -0,0 +1,102 @@
+# apps/imagenes/services/variantes.py
+"""
+Manifiesto de variantes responsive de cada imagen.
+
+Se calcula una vez, al terminar la subida, y se guarda en
+ImagenProducto.variantes:
+
+    {
+      "width": 2048, "height": 1536, "bytes": 183402, "formato": "webp",
+      "lqip": "data:image/webp;base64,...",
+      "tamanos": [{"ancho": 320, "alto": 240, "url": "..."}, ...],
+      "srcset": "<url> 320w, <url> 640w, ...",
+      "thumbnail": "...", "medium": "..."
+    }
+
+Las URLs las arma el backend de almacenamiento (`url_variante`) sin
+llamadas a su API, así que los serializers solo leen el JSON.
+"""
+import logging
+
+from django.conf import settings
+
+from . import preprocesado
+from .almacenamiento import get_almacenamiento
+
+logger = logging.getLogger(__name__)
+
+# Tamaños fijos que ya consumía el frontend (metadata.thumbnail / medium)
+THUMBNAIL = (150, 150, 'thumb')
+MEDIUM = (400, 400, 'fill')
+
+
+def lqip(imagen):
+    """LQIP ya calculado en el preprocesado o, si no, leído del temporal."""
+    if (imagen.variantes or {}).get('lqip'):
+        return imagen.variantes['lqip']
+    try:
+        return preprocesado.lqip_de_archivo(imagen.archivo_temporal)
+    except Exception:
+        logger.warning(f"No se pudo generar el LQIP de la imagen {imagen.id_imagen}")
+        return None
+
+
+def construir(public_id, url, width, height, bytes_, formato, lqip=None, almacenamiento=None):
+    """Manifiesto completo a partir de los datos que devuelve el almacenamiento."""
+    almacenamiento = almacenamiento or get_almacenamiento()
+    tamanos = []
+    if almacenamiento.transforma and width:
+        for ancho in settings.IMAGENES_ANCHOS_SRCSET:
+            if ancho < width:
+                tamanos.append({
+                    'ancho': ancho,
+                    'alto': round(height * ancho / width),
+                    'url': almacenamiento.url_variante(public_id, url, ancho=ancho),
+                })
+    if width:
+        tamanos.append({'ancho': width, 'alto': height, 'url': url})
+
+    return {
+        'width': width,
+        'height': height,
+        'bytes': bytes_,
+        'formato': formato,
+        'lqip': lqip,
+        'tamanos': tamanos,
+        'srcset': ", ".join(f"{t['url']} {t['ancho']}w" for t in tamanos) if tamanos else url,
+        'thumbnail': almacenamiento.url_variante(
+            public_id, url, ancho=THUMBNAIL[0], alto=THUMBNAIL[1], recorte=THUMBNAIL[2]
+        ),
+        'medium': almacenamiento.url_variante(
+            public_id, url, ancho=MEDIUM[0], alto=MEDIUM[1], recorte=MEDIUM[2]
+        ),
+    }
+
+
+def para_subida(imagen, resultado, almacenamiento=None):
+    """Manifiesto de una imagen recién subida (resultado de Almacenamiento.subir)."""
+    return construir(
+        resultado['public_id'], resultado['url'], resultado.get('width'), resultado.get('height'),
+        resultado.get('bytes'), resultado['formato'], lqip(imagen), almacenamiento,
+    )
+
+
+def manifiesto(imagen):
+    """
+    Manifiesto guardado o, para imágenes anteriores a él, uno mínimo sin
+    dimensiones (solo URLs; `manage.py generar_variantes_imagenes` lo completa).
+    """
+    if imagen.variantes and 'srcset' in imagen.variantes:
+        return imagen.variantes
+    return construir(imagen.public_id, imagen.url, None, None, None, imagen.formato)
+
+
+def resumen(imagen):
+    """Lo justo para un <img srcset> en listados (sin la lista de tamaños)."""
+    datos = manifiesto(imagen)
+    return {
+        'srcset': datos['srcset'],
+        'lqip': datos['lqip'],
+        'width': datos['width'],
+        'height': datos['height'],
+    }
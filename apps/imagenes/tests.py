@@ -1,3 +1,452 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.apps import apps
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from apps.bitacora.models import Bitacora
+from apps.catalogo.serializers import ProductoCatalogoListSerializer
+from apps.categoria.models import Categoria
+from apps.imagenes.models import ImagenProducto
+from apps.imagenes.services import (
+    activas, limpieza_service, preprocesado, subida_masiva_service, subida_service, variantes,
+)
+from apps.imagenes.services.almacenamiento import (
+    CloudinaryAlmacenamiento,
+    ErrorAlmacenamiento,
+    LocalAlmacenamiento,
+    get_almacenamiento,
+    reiniciar_almacenamiento,
+)
+from apps.productos.models import Producto
+from apps.productos.serializers import ProductoDetalleSerializer, ProductoListSerializer
+from apps.usuarios.models import Usuario
+from core.constants import ImageStatus
+
+
+def _png(ancho=8, alto=6):
+    buffer = io.BytesIO()
+    Image.new('RGB', (ancho, alto), 'red').save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class AlmacenamientoInestable(LocalAlmacenamiento):
+    """Falla (de forma transitoria) las primeras `fallas` subidas."""
+
+    fallas = 0
+
+    def subir(self, archivo, carpeta, nombre):
+        if AlmacenamientoInestable.fallas > 0:
+            AlmacenamientoInestable.fallas -= 1
+            raise ErrorAlmacenamiento('timeout')
+        return super().subir(archivo, carpeta, nombre)
+
+
+class LocalAlmacenamientoTests(SimpleTestCase):
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+        self.almacenamiento = LocalAlmacenamiento(self.directorio, '/media/test/')
+
+    def test_subir_y_eliminar(self):
+        origen = os.path.join(self.directorio, 'origen.png')
+        with open(origen, 'wb') as fh:
+            fh.write(_png())
+
+        resultado = self.almacenamiento.subir(origen, 'afrodita/products/P1', 'P1_1')
+
+        self.assertEqual(resultado['public_id'], 'afrodita/products/P1/P1_1')
+        self.assertEqual(resultado['url'], '/media/test/afrodita/products/P1/P1_1.png')
+        self.assertEqual((resultado['formato'], resultado['width'], resultado['height']), ('png', 8, 6))
+        self.assertIsNotNone(self.almacenamiento.metadata(resultado['public_id']))
+        self.assertTrue(self.almacenamiento.eliminar(resultado['public_id']))
+        self.assertFalse(self.almacenamiento.eliminar(resultado['public_id']))
+
+    def test_archivo_invalido_no_se_reintenta(self):
+        with self.assertRaises(ErrorAlmacenamiento) as ctx:
+            self.almacenamiento.subir(io.BytesIO(b'no es una imagen'), 'x', 'y')
+        self.assertFalse(ctx.exception.reintentable)
+
+
+class PreprocesadoTests(SimpleTestCase):
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+
+    def _foto(self, ancho, alto, orientacion=None):
+        """JPEG como los de un teléfono: con EXIF (orientación y cámara)."""
+        exif = Image.Exif()
+        exif[0x010F] = 'Telefono'  # Make
+        if orientacion:
+            exif[0x0112] = orientacion
+        ruta = os.path.join(self.directorio, 'foto.jpg')
+        Image.effect_noise((ancho, alto), 64).convert('RGB').save(ruta, 'JPEG', quality=95, exif=exif)
+        return ruta
+
+    def test_orienta_reduce_y_quita_exif(self):
+        origen = self._foto(1200, 800, orientacion=6)  # rotada 90°
+
+        resultado = preprocesado.preprocesar(origen, self.directorio, 600, 100, 10**8, 'WEBP', 80)
+
+        self.assertEqual((resultado['width'], resultado['height']), (400, 600))
+        self.assertEqual(resultado['formato'], 'webp')
+        self.assertLess(resultado['bytes'], resultado['bytes_original'])
+        with Image.open(resultado['ruta']) as img:
+            self.assertEqual(img.format, 'WEBP')
+            self.assertEqual(len(img.getexif()), 0)
+
+    def test_rechaza_dimensiones_fuera_de_rango(self):
+        origen = self._foto(120, 80)
+        with self.assertRaises(preprocesado.ErrorPreprocesado):
+            preprocesado.preprocesar(origen, self.directorio, 600, 100, 10**8, 'JPEG', 80)
+        with self.assertRaises(preprocesado.ErrorPreprocesado):
+            preprocesado.preprocesar(origen, self.directorio, 600, 10, 5000, 'JPEG', 80)
+
+    def test_jpeg_truncado_es_error_de_preprocesado(self):
+        origen = self._foto(400, 300)
+        with open(origen, 'rb') as fh:
+            datos = fh.read()
+        with open(origen, 'wb') as fh:
+            fh.write(datos[:len(datos) // 2])
+
+        with self.assertRaises(preprocesado.ErrorPreprocesado):
+            preprocesado.preprocesar(origen, self.directorio, 600, 100, 10**8, 'WEBP', 80)
+
+
+class VariantesTests(SimpleTestCase):
+    @override_settings(
+        CLOUDINARY_STORAGE={'CLOUD_NAME': 'tienda'}, IMAGENES_ANCHOS_SRCSET=[320, 640, 1280]
+    )
+    def test_manifiesto_cloudinary_usa_cloud_name_y_omite_anchos_mayores(self):
+        url = 'https://res.cloudinary.com/tienda/image/upload/v1/afrodita/products/P1/P1_1.webp'
+        manifiesto = variantes.construir(
+            'afrodita/products/P1/P1_1', url, 1000, 500, 1234, 'webp',
+            almacenamiento=CloudinaryAlmacenamiento(),
+        )
+
+        self.assertEqual([t['ancho'] for t in manifiesto['tamanos']], [320, 640, 1000])
+        self.assertEqual(manifiesto['tamanos'][0]['alto'], 160)
+        self.assertEqual(
+            manifiesto['tamanos'][0]['url'],
+            'https://res.cloudinary.com/tienda/image/upload/c_limit,w_320,f_auto,q_auto/afrodita/products/P1/P1_1',
+        )
+        self.assertTrue(manifiesto['srcset'].endswith(f'{url} 1000w'))
+        self.assertIn('/tienda/image/upload/c_thumb,w_150,h_150,', manifiesto['thumbnail'])
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Requiere PostgreSQL')
+class SubidaEnSegundoPlanoTests(TransactionTestCase):
+    # Producto, categoría y usuario son managed=False: se crean a mano
+    available_apps = ['apps.imagenes', 'apps.categoria']
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        existentes = set(connection.introspection.table_names())
+        cls._modelos = [
+            m for m in apps.get_models()
+            if not m._meta.managed and m._meta.db_table not in existentes
+        ]
+        with connection.schema_editor() as editor:
+            for modelo in cls._modelos:
+                editor.create_model(modelo)
+
+    @classmethod
+    def tearDownClass(cls):
+        with connection.schema_editor() as editor:
+            for modelo in reversed(cls._modelos):
+                editor.delete_model(modelo)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+        ajustes = override_settings(
+            IMAGENES_ALMACENAMIENTO='apps.imagenes.tests.AlmacenamientoInestable',
+            IMAGENES_LOCAL_DIR=os.path.join(self.directorio, 'media'),
+            IMAGENES_SPOOL_DIR=os.path.join(self.directorio, 'spool'),
+            IMAGENES_SUBIDA_REINTENTOS=3,
+            IMAGENES_PREPROCESAR=False,
+        )
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        reiniciar_almacenamiento()
+        self.addCleanup(reiniciar_almacenamiento)
+        AlmacenamientoInestable.fallas = 0
+
+        self.usuario = Usuario.objects.create(
+            nombre_completo='Admin Test', nombre_usuario='admin_img',
+            correo='admin@test.com', sexo='F', password='x',
+        )
+        categoria = Categoria.objects.create(nombre='Lentes')
+        self.producto = Producto.objects.create(
+            id_producto='P0001', nombre='Lente', precio=Decimal('10.00'), stock=1,
+            descripcion='-', estado_producto='ACTIVO', id_categoria=categoria,
+        )
+        self.addCleanup(Usuario.objects.filter(pk=self.usuario.pk).delete)
+        self.addCleanup(Categoria.objects.filter(pk=categoria.pk).delete)
+        self.addCleanup(Producto.objects.all().delete)
+        self.addCleanup(ImagenProducto.objects.all().delete)
+        # La subida completada se registra en bitácora
+        self.addCleanup(Bitacora.objects.filter(id_usuario=self.usuario).delete)
+
+    def _encolar(self, orden=1, es_principal=False):
+        archivo = SimpleUploadedFile('foto.png', _png(), content_type='image/png')
+        # Sin pool: el test llama a procesar() directamente
+        with mock.patch.object(subida_service, 'enviar') as enviar:
+            imagen = subida_service.encolar(self.producto, archivo, orden, es_principal, self.usuario)
+        enviar.assert_called_once_with(imagen.id_imagen, ip=None)
+        return imagen
+
+    def test_subida_reintenta_errores_transitorios(self):
+        anterior = self._encolar(orden=1, es_principal=True)
+        subida_service.procesar(anterior.id_imagen, esperar=lambda _: None)
+
+        imagen = self._encolar(orden=2, es_principal=True)
+        self.assertEqual(imagen.estado_imagen, ImageStatus.PENDIENTE)
+        self.assertFalse(imagen.es_principal)
+        self.assertTrue(os.path.exists(imagen.archivo_temporal))
+
+        AlmacenamientoInestable.fallas = 2
+        esperas = []
+        subida_service.procesar(imagen.id_imagen, esperar=esperas.append)
+
+        imagen.refresh_from_db()
+        self.assertEqual(imagen.estado_imagen, ImageStatus.ACTIVA)
+        self.assertEqual(imagen.intentos, 3)
+        self.assertEqual(len(esperas), 2)
+        self.assertEqual(esperas[1], 2 * esperas[0])
+        self.assertTrue(imagen.es_principal)
+        self.assertTrue(imagen.url.endswith('afrodita/products/P0001/P0001_2.png'))
+        self.assertEqual(imagen.archivo_temporal, '')
+        self.assertEqual(
+            list(ImagenProducto.objects.filter(es_principal=True).values_list('id_imagen', flat=True)),
+            [imagen.id_imagen],
+        )
+
+    def test_agotar_reintentos_deja_error_y_conserva_temporal(self):
+        imagen = self._encolar()
+        temporal = imagen.archivo_temporal
+
+        AlmacenamientoInestable.fallas = 5
+        subida_service.procesar(imagen.id_imagen, esperar=lambda _: None)
+
+        imagen.refresh_from_db()
+        self.assertEqual(imagen.estado_imagen, ImageStatus.ERROR)
+        self.assertEqual(imagen.intentos, 3)
+        self.assertEqual(imagen.error_subida, 'timeout')
+        self.assertTrue(os.path.exists(temporal))
+
+        AlmacenamientoInestable.fallas = 0
+        subida_service.reintentar(imagen, encolar=False)
+        subida_service.procesar(imagen.id_imagen, esperar=lambda _: None)
+        imagen.refresh_from_db()
+        self.assertEqual(imagen.estado_imagen, ImageStatus.ACTIVA)
+        self.assertFalse(os.path.exists(temporal))
+
+    def test_serializers_de_producto_muestran_solo_imagenes_activas(self):
+        def imagen(orden, estado, es_principal=False):
+            return ImagenProducto.objects.create(
+                id_producto=self.producto, orden=orden, estado_imagen=estado, es_principal=es_principal,
+                public_id=ImagenProducto.public_id_para(self.producto.pk, orden), formato='png',
+                url='' if estado == ImageStatus.PENDIENTE else f'https://cdn/{orden}.png',
+            )
+        # Una subida pendiente o fallida nunca se muestra, aunque sea la principal pedida
+        imagen(1, ImageStatus.PENDIENTE, es_principal=True)
+        visible = imagen(2, ImageStatus.ACTIVA)
+        imagen(3, ImageStatus.ERROR)
+        principal = imagen(4, ImageStatus.ACTIVA, es_principal=True)
+
+        producto = Producto.objects.prefetch_related(activas.prefetch()).get(pk=self.producto.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(activas.principal(producto), principal)
+            catalogo = ProductoCatalogoListSerializer().get_imagen_principal(producto)
+        self.assertEqual(catalogo['url'], 'https://cdn/4.png')
+
+        listado = ProductoListSerializer(producto).data
+        self.assertEqual([i['id_imagen'] for i in listado['imagenes']], [visible.pk, principal.pk])
+        self.assertEqual(listado['imagen_principal']['id'], principal.pk)
+        # Sin prefetch (respuestas de crear/actualizar) se filtra igual
+        detalle = ProductoDetalleSerializer(Producto.objects.get(pk=self.producto.pk)).data
+        self.assertEqual([i['id_imagen'] for i in detalle['imagenes']], [visible.pk, principal.pk])
+
+    def test_subida_masiva_asigna_orden_y_una_principal_por_producto(self):
+        otro = Producto.objects.create(
+            id_producto='P0002', nombre='Lente 2', precio=Decimal('10.00'), stock=1,
+            descripcion='-', estado_producto='ACTIVO', id_categoria=self.producto.id_categoria,
+        )
+        existente = self._encolar(orden=1, es_principal=True)
+        subida_service.procesar(existente.id_imagen, esperar=lambda _: None)
+        eventos = Bitacora.objects.count()
+
+        archivos = [SimpleUploadedFile(f'f{i}.png', _png(), content_type='image/png') for i in range(5)]
+        productos = [self.producto, otro, self.producto, otro, self.producto]
+        resultado = subida_masiva_service.subir(
+            archivos, productos, usuario=self.usuario, esperar=lambda _: None
+        )
+
+        self.assertEqual((resultado['subidas'], resultado['fallidas']), (5, 0))
+        self.assertEqual(
+            [(r['producto'], r['orden']) for r in resultado['resultados']],
+            [('P0001', 2), ('P0002', 1), ('P0001', 3), ('P0002', 2), ('P0001', 4)],
+        )
+        # P0001 conserva su principal; P0002 no tenía y toma la primera del lote
+        self.assertEqual(
+            sorted(ImagenProducto.objects.filter(es_principal=True).values_list('id_producto', 'orden')),
+            [('P0001', 1), ('P0002', 1)],
+        )
+        self.assertFalse(ImagenProducto.objects.exclude(estado_imagen=ImageStatus.ACTIVA).exists())
+        self.assertEqual(Bitacora.objects.count(), eventos + 1)
+
+    def test_subida_masiva_no_resucita_filas_borradas_ni_deja_archivos(self):
+        reservar = subida_masiva_service._reservar
+
+        def reservar_y_borrar(*args):
+            imagenes = reservar(*args)
+            # El usuario borra la primera mientras el lote sube
+            ImagenProducto.objects.filter(pk=imagenes[0].pk).delete()
+            return imagenes
+
+        archivos = [SimpleUploadedFile(f'f{i}.png', _png(), content_type='image/png') for i in range(2)]
+        with mock.patch.object(subida_masiva_service, '_reservar', reservar_y_borrar):
+            resultado = subida_masiva_service.subir(
+                archivos, [self.producto] * 2, usuario=self.usuario, esperar=lambda _: None
+            )
+
+        self.assertEqual((resultado['subidas'], resultado['fallidas']), (1, 0))
+        self.assertEqual(
+            [(r['estado'], r['url'] is None) for r in resultado['resultados']],
+            [(ImageStatus.INACTIVA, True), (ImageStatus.ACTIVA, False)],
+        )
+        self.assertEqual(list(ImagenProducto.objects.values_list('orden', flat=True)), [2])
+        self.assertEqual(
+            list(get_almacenamiento().listar(ImagenProducto.CARPETA)),
+            [ImagenProducto.public_id_para('P0001', 2)],
+        )
+        self.assertEqual(os.listdir(os.path.join(self.directorio, 'spool')), [])
+
+    @override_settings(
+        IMAGENES_PREPROCESAR=True, IMAGENES_PREPROCESADO_WORKERS=0, IMAGENES_MIN_LADO=1,
+        IMAGENES_MAX_LADO=4, IMAGENES_FORMATO_SALIDA='WEBP',
+    )
+    def test_subida_preprocesa_y_registra_ahorro(self):
+        imagen = self._encolar()
+        original = imagen.archivo_temporal
+
+        subida_service.procesar(imagen.id_imagen, esperar=lambda _: None)
+
+        imagen.refresh_from_db()
+        self.assertEqual(imagen.estado_imagen, ImageStatus.ACTIVA)
+        self.assertEqual(imagen.formato, 'webp')
+        self.assertTrue(imagen.url.endswith('P0001_1.webp'))
+        self.assertEqual(imagen.bytes_original, len(_png()))
+        self.assertIsNotNone(imagen.preprocesado_ms)
+        self.assertFalse(os.path.exists(original))
+        self.assertEqual(
+            subida_service.estado(imagen)['preprocesado']['bytes_ahorrados'],
+            imagen.bytes_original - imagen.bytes_optimizado,
+        )
+        # Manifiesto guardado: 4x3 tras reducir, con LQIP del preprocesado
+        self.assertEqual((imagen.variantes['width'], imagen.variantes['height']), (4, 3))
+        self.assertTrue(imagen.variantes['lqip'].startswith('data:image/webp;base64,'))
+        self.assertEqual(imagen.variantes['srcset'], f'{imagen.url} 4w')
+
+    @override_settings(IMAGENES_PREPROCESAR=True, IMAGENES_PREPROCESADO_WORKERS=0, IMAGENES_MIN_LADO=1)
+    def test_jpeg_truncado_deja_error_en_subida_individual_y_masiva(self):
+        buffer = io.BytesIO()
+        Image.effect_noise((64, 48), 64).convert('RGB').save(buffer, 'JPEG')
+        truncado = buffer.getvalue()[:len(buffer.getvalue()) // 2]
+
+        imagen = self._encolar()
+        with open(imagen.archivo_temporal, 'wb') as fh:
+            fh.write(truncado)
+        subida_service.procesar(imagen.id_imagen, esperar=lambda _: None)
+        imagen.refresh_from_db()
+        self.assertEqual(imagen.estado_imagen, ImageStatus.ERROR)
+        self.assertTrue(os.path.exists(imagen.archivo_temporal))  # para /reintentar/
+
+        archivos = [
+            SimpleUploadedFile('roto.jpg', truncado, content_type='image/jpeg'),
+            SimpleUploadedFile('bien.png', _png(), content_type='image/png'),
+        ]
+        resultado = subida_masiva_service.subir(
+            archivos, [self.producto] * 2, usuario=self.usuario, esperar=lambda _: None
+        )
+        self.assertEqual((resultado['subidas'], resultado['fallidas']), (1, 1))
+        self.assertEqual(
+            [r['estado'] for r in resultado['resultados']], [ImageStatus.ERROR, ImageStatus.ACTIVA]
+        )
+
+    def test_subida_masiva_cierra_el_lote_ante_errores_inesperados(self):
+        subir = subida_service.subir_con_reintentos
+
+        def fallar_la_primera(imagen, *args, **kwargs):
+            if imagen.orden == 1:
+                raise RuntimeError('conexión reiniciada')
+            return subir(imagen, *args, **kwargs)
+
+        archivos = [SimpleUploadedFile(f'f{i}.png', _png(), content_type='image/png') for i in range(2)]
+        with mock.patch.object(subida_service, 'subir_con_reintentos', fallar_la_primera):
+            resultado = subida_masiva_service.subir(
+                archivos, [self.producto] * 2, usuario=self.usuario, esperar=lambda _: None
+            )
+
+        self.assertEqual((resultado['subidas'], resultado['fallidas']), (1, 1))
+        fallida = ImagenProducto.objects.get(orden=1)
+        self.assertEqual(fallida.estado_imagen, ImageStatus.ERROR)
+        self.assertIn('conexión reiniciada', fallida.error_subida)
+        self.assertFalse(ImagenProducto.objects.filter(estado_imagen=ImageStatus.PENDIENTE).exists())
+        # El temporal de la fallida queda para /reintentar/; nada más en el spool
+        self.assertEqual(
+            os.listdir(os.path.join(self.directorio, 'spool')),
+            [os.path.basename(fallida.archivo_temporal)],
+        )
+
+    def test_limpieza_borra_huerfanas_y_purga_inactivas_vencidas(self):
+        imagenes = []
+        for orden in (1, 2, 3):
+            imagen = self._encolar(orden=orden, es_principal=orden == 1)
+            subida_service.procesar(imagen.id_imagen, esperar=lambda _: None)
+            imagenes.append(imagen)
+        origen = os.path.join(self.directorio, 'suelta.png')
+        with open(origen, 'wb') as fh:
+            fh.write(_png())
+        almacenamiento = get_almacenamiento()
+        almacenamiento.subir(origen, ImagenProducto.carpeta_producto('P0001'), 'P0001_9')
+        almacenamiento.subir(origen, ImagenProducto.carpeta_producto('P0099'), 'P0099_1')
+        ImagenProducto.objects.filter(pk=imagenes[1].pk).update(estado_imagen=ImageStatus.INACTIVA)
+        ImagenProducto.objects.filter(pk=imagenes[2].pk).update(
+            estado_imagen=ImageStatus.INACTIVA, fecha_actualizacion=timezone.now() - timedelta(days=40)
+        )
+        self.addCleanup(Bitacora.objects.filter(id_usuario__isnull=True).delete)
+
+        simulacion = limpieza_service.recolectar(dry_run=True, retencion_dias=30)
+        self.assertEqual(
+            simulacion['huerfanas'], ['afrodita/products/P0001/P0001_9', 'afrodita/products/P0099/P0099_1']
+        )
+        self.assertEqual(simulacion['purgadas'], ['afrodita/products/P0001/P0001_3'])
+        self.assertEqual(simulacion['llamadas'], 0)
+        self.assertEqual(len(list(almacenamiento.listar(ImagenProducto.CARPETA))), 5)
+
+        esperas = []
+        resumen = limpieza_service.recolectar(retencion_dias=30, lote=1, pausa=0.5, esperar=esperas.append)
+
+        self.assertEqual((len(resumen['huerfanas']), len(resumen['purgadas'])), (2, 1))
+        self.assertEqual(esperas, [0.5, 0.5])
+        self.assertEqual(
+            sorted(almacenamiento.listar(ImagenProducto.CARPETA)),
+            ['afrodita/products/P0001/P0001_1', 'afrodita/products/P0001/P0001_2'],
+        )
+        self.assertEqual(
+            list(ImagenProducto.objects.order_by('orden').values_list('orden', flat=True)), [1, 2]
+        )
@@ -1,17 +1,20 @@
+import os
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from django.db import transaction
 from django.db.models import Case, When, Value, IntegerField, F
 from django.core.exceptions import ValidationError
+from django.urls import reverse
 
 from apps.productos.models import Producto
 from apps.autenticacion.utils.helpers import obtener_ip_cliente
 from core.constants import APIResponse, Messages, ImageStatus
 from .models import ImagenProducto
-from .serializers import ImagenProductoSerializer, SubirImagenSerializer
+from .serializers import ImagenProductoSerializer, SubirImagenSerializer, SubidaMasivaSerializer
+from .services import subida_service
 
 from apps.bitacora.signals import (
-    imagen_subida,
     imagen_eliminada,
     imagen_principal_cambiada,
     imagen_actualizada,
@@ -24,7 +27,8 @@ class ImagenProductoViewSet(viewsets.ModelViewSet):
     ViewSet para gestionar las imágenes del catálogo
     Permite:
     - Listar imágenes de un producto
-    - Subir nuevas imágenes (con Cloudinary)
+    - Subir nuevas imágenes (en segundo plano, al almacenamiento configurado)
+    - Subir varias imágenes en un solo request (en paralelo)
     - Marcar imagen como principal
     - Eliminar imágenes (de BD y Cloudinary)
     """
@@ -34,7 +38,10 @@ class ImagenProductoViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         producto_id = self.request.query_params.get('producto')
-        qs = super().get_queryset().filter(estado_imagen=ImageStatus.ACTIVA)
+        qs = super().get_queryset()
+        # El seguimiento de la subida también ve imágenes PENDIENTE o con ERROR
+        if self.action not in ('estado', 'reintentar'):
+            qs = qs.filter(estado_imagen=ImageStatus.ACTIVA)
         if producto_id:
             qs = qs.filter(id_producto__id_producto=producto_id)
         return qs.order_by('orden')
@@ -57,24 +64,101 @@ class ImagenProductoViewSet(viewsets.ModelViewSet):
 
         serializer = SubirImagenSerializer(
             data=request.data,
-            context={'producto': producto, 'request': request}
+            context={'producto': producto, 'request': request, 'ip': obtener_ip_cliente(request)}
         )
         serializer.is_valid(raise_exception=True)
 
-        # Guardar imagen
+        # Guardar el archivo y encolar la subida (la bitácora se registra al terminar)
         imagen = serializer.save()
 
-        # Emitir señal para bitácora
-        imagen_subida.send(
-            sender=self.__class__,
-            imagen=imagen,
-            usuario=request.user,
-            ip=obtener_ip_cliente(request)
+        return APIResponse.success(
+            data={
+                **subida_service.estado(imagen),
+                'url_estado': request.build_absolute_uri(
+                    reverse('imagenes-estado', args=[imagen.id_imagen])
+                ),
+            },
+            message=Messages.IMAGE_UPLOAD_QUEUED,
+            status_code=status.HTTP_202_ACCEPTED
+        )
+
+    @action(detail=False, methods=['post'], url_path='subida-masiva')
+    def subida_masiva(self, request):
+        """
+        Subir varias imágenes (a uno o varios productos) en paralelo
+        POST /api/imagenes/subida-masiva/
+        multipart: imagenes=<archivo> (repetido), producto=<id> o productos=<id> (uno por imagen),
+                   es_principal=true|false
+        Responde 201 si subieron todas, 207 si alguna quedó en ERROR
+        (se puede reintentar con /api/imagenes/{id}/reintentar/) y 502 si fallaron todas.
+        """
+        data = {
+            'imagenes': request.FILES.getlist('imagenes'),
+            'productos': request.data.getlist('productos') if hasattr(request.data, 'getlist')
+            else request.data.get('productos'),
+            'es_principal': request.data.get('es_principal', False),
+        }
+        if request.data.get('producto'):
+            data['producto'] = request.data.get('producto')
+        if not data['productos']:
+            data.pop('productos')
+
+        serializer = SubidaMasivaSerializer(
+            data=data,
+            context={'request': request, 'ip': obtener_ip_cliente(request)}
         )
+        serializer.is_valid(raise_exception=True)
+        resultado = serializer.save()
 
-        return APIResponse.created(
-            data=ImagenProductoSerializer(imagen).data,
-            message=Messages.IMAGE_UPLOADED
+        message = Messages.IMAGES_BULK_UPLOADED.format(
+            subidas=resultado['subidas'], fallidas=resultado['fallidas']
+        )
+        if not resultado['subidas']:
+            return APIResponse.error(
+                message=message, status_code=status.HTTP_502_BAD_GATEWAY, data=resultado
+            )
+        return APIResponse.success(
+            data=resultado,
+            message=message,
+            status_code=status.HTTP_207_MULTI_STATUS if resultado['fallidas'] else status.HTTP_201_CREATED
+        )
+
+    @action(detail=True, methods=['get'])
+    def estado(self, request, pk=None):
+        """
+        Estado de la subida de una imagen (PENDIENTE, ACTIVA o ERROR)
+        GET /api/imagenes/{id}/estado/
+        """
+        imagen = self.get_object()
+        return APIResponse.success(
+            data=subida_service.estado(imagen),
+            message=Messages.IMAGE_UPLOAD_STATUS
+        )
+
+    @action(detail=True, methods=['post'])
+    def reintentar(self, request, pk=None):
+        """
+        Reencolar una subida que terminó con error
+        POST /api/imagenes/{id}/reintentar/
+        """
+        imagen = self.get_object()
+
+        if imagen.estado_imagen != ImageStatus.ERROR:
+            return APIResponse.error(
+                message=Messages.IMAGE_NOT_RETRYABLE,
+                status_code=status.HTTP_409_CONFLICT
+            )
+        if not imagen.archivo_temporal or not os.path.exists(imagen.archivo_temporal):
+            return APIResponse.error(
+                message=Messages.IMAGE_SPOOL_MISSING,
+                status_code=status.HTTP_410_GONE
+            )
+
+        imagen = subida_service.reintentar(imagen, ip=obtener_ip_cliente(request))
+        return APIResponse.success(
+            data=subida_service.estado(imagen),
+            message=Messages.IMAGE_UPLOAD_RETRIED,
+            status_code=status.HTTP_202_ACCEPTED
         )
 
     @action(detail=True, methods=['post'])
@@ -119,7 +203,7 @@ class ImagenProductoViewSet(viewsets.ModelViewSet):
         force_delete = request.query_params.get('force', 'false').lower() == 'true'
 
         if force_delete:
-            imagen.eliminar_de_cloudinary()
+            imagen.eliminar_del_almacenamiento()
             # Emitir señal para bitácora
             imagen_eliminada.send(
                 sender=self.__class__,
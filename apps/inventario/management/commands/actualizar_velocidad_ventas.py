@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from apps.inventario.services.velocidad_service import recalcular
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula la velocidad de venta (ventanas de 7, 30 y 90 días) desde "
+        "hecho_venta_diaria con fecha de corte hoy. Ejecutar una vez al día, "
+        "después de actualizar_hechos_venta."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--producto",
+            action="append",
+            dest="productos",
+            help="Limitar a uno o más productos (se puede repetir).",
+        )
+
+    def handle(self, *args, **options):
+        filas = recalcular(productos=options["productos"])
+        self.stdout.write(self.style.SUCCESS(f"Velocidad de venta actualizada: {filas} producto(s)."))
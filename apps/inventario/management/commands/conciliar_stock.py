@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from apps.inventario.services.kardex_service import conciliar
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara producto.stock y lote.cantidad con el kardex (movimiento_stock) "
+        "y el saldo materializado (saldo_stock). Con --aplicar registra los "
+        "movimientos de apertura/conciliación que faltan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--producto",
+            action="append",
+            dest="productos",
+            help="Limitar a uno o más productos (se puede repetir).",
+        )
+        parser.add_argument(
+            "--aplicar",
+            action="store_true",
+            help="Registrar los movimientos de ajuste (por defecto solo reporta).",
+        )
+
+    def handle(self, *args, **options):
+        resultado = conciliar(productos=options["productos"], aplicar=options["aplicar"])
+
+        for dif in resultado["productos"]:
+            self.stdout.write(
+                f"Producto {dif['id_producto']}: stock={dif['stock']} "
+                f"saldo={dif['saldo']} kardex={dif['kardex']} diferencia={dif['diferencia']:+d}"
+            )
+        for dif in resultado["lotes"]:
+            self.stdout.write(
+                f"Lote {dif['id_lote']}: cantidad={dif['stock']} "
+                f"saldo={dif['saldo']} kardex={dif['kardex']} diferencia={dif['diferencia']:+d}"
+            )
+
+        total = len(resultado["productos"]) + len(resultado["lotes"])
+        if not total:
+            self.stdout.write(self.style.SUCCESS("Kardex conciliado: sin diferencias."))
+        elif options["aplicar"]:
+            self.stdout.write(self.style.SUCCESS(f"{total} diferencia(s) conciliada(s)."))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f"{total} diferencia(s) encontrada(s). Ejecute con --aplicar para conciliar."
+            ))
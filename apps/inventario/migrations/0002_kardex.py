@@ -0,0 +1,51 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:51
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0001_initial'),
+        ('lotes', '0002_alter_lote_options'),
+        ('productos', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovimientoStock',
+            fields=[
+                ('id_movimiento', models.BigAutoField(primary_key=True, serialize=False)),
+                ('cantidad', models.IntegerField(help_text='Delta: positivo entra, negativo sale')),
+                ('motivo', models.CharField(choices=[('APERTURA', 'Saldo inicial'), ('VENTA', 'Venta'), ('ANULACION_VENTA', 'Anulación de venta'), ('RECEPCION_COMPRA', 'Recepción de compra'), ('AJUSTE', 'Ajuste manual'), ('CORRECCION', 'Corrección de stock'), ('AJUSTE_LOTE', 'Ajuste de lote'), ('CONCILIACION', 'Conciliación')], max_length=20)),
+                ('referencia', models.CharField(blank=True, max_length=50, null=True)),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('lote', models.ForeignKey(blank=True, db_column='id_lote', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movimientos_stock', to='lotes.lote')),
+                ('producto', models.ForeignKey(db_column='id_producto', on_delete=django.db.models.deletion.PROTECT, related_name='movimientos_stock', to='productos.producto')),
+                ('usuario', models.ForeignKey(blank=True, db_column='id_usuario', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movimientos_stock', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'movimiento_stock',
+                'ordering': ['-fecha', '-id_movimiento'],
+                'indexes': [models.Index(fields=['producto', 'fecha'], name='mov_stock_producto_fecha_idx'), models.Index(fields=['lote', 'fecha'], name='mov_stock_lote_fecha_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SaldoStock',
+            fields=[
+                ('id_saldo', models.BigAutoField(primary_key=True, serialize=False)),
+                ('cantidad', models.IntegerField(default=0)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('lote', models.ForeignKey(blank=True, db_column='id_lote', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='saldos_stock', to='lotes.lote')),
+                ('producto', models.ForeignKey(db_column='id_producto', on_delete=django.db.models.deletion.CASCADE, related_name='saldos_stock', to='productos.producto')),
+            ],
+            options={
+                'db_table': 'saldo_stock',
+                'constraints': [models.UniqueConstraint(condition=models.Q(('lote__isnull', True)), fields=('producto',), name='saldo_stock_producto_uniq'), models.UniqueConstraint(condition=models.Q(('lote__isnull', False)), fields=('producto', 'lote'), name='saldo_stock_producto_lote_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 21:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0002_kardex'),
+        ('productos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VelocidadVenta',
+            fields=[
+                ('producto', models.OneToOneField(db_column='id_producto', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='velocidad_venta', serialize=False, to='productos.producto')),
+                ('unidades_7d', models.IntegerField(default=0)),
+                ('unidades_30d', models.IntegerField(default=0)),
+                ('unidades_90d', models.IntegerField(default=0)),
+                ('fecha_corte', models.DateField(help_text='Último día incluido en las ventanas')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'velocidad_venta',
+            },
+        ),
+    ]
@@ -1,6 +1,9 @@
 from django.db import models
+from django.utils import timezone
+
 from apps.productos.models import Producto
 from apps.usuarios.models import Usuario
+from core.constants import StockMovementReason
 
 
 class Inventario(models.Model):
@@ -31,3 +34,148 @@ class Inventario(models.Model):
 
     def __str__(self):
         return f"{self.producto.nombre} ({self.cantidad_actual})"
+
+
+class MovimientoStock(models.Model):
+    """
+    Kardex: libro de movimientos de stock (solo inserción).
+    Cada cambio de stock de un producto o lote queda registrado aquí
+    con su motivo y referencia (venta, compra, ajuste...).
+    """
+
+    id_movimiento = models.BigAutoField(primary_key=True)
+    producto = models.ForeignKey(
+        Producto,
+        on_delete=models.PROTECT,
+        db_column="id_producto",
+        related_name="movimientos_stock",
+    )
+    lote = models.ForeignKey(
+        "lotes.Lote",
+        on_delete=models.SET_NULL,
+        db_column="id_lote",
+        null=True,
+        blank=True,
+        related_name="movimientos_stock",
+    )
+    cantidad = models.IntegerField(help_text="Delta: positivo entra, negativo sale")
+    motivo = models.CharField(max_length=20, choices=StockMovementReason.choices())
+    referencia = models.CharField(max_length=50, null=True, blank=True)
+    usuario = models.ForeignKey(
+        Usuario,
+        on_delete=models.SET_NULL,
+        db_column="id_usuario",
+        null=True,
+        blank=True,
+        related_name="movimientos_stock",
+    )
+    fecha = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "movimiento_stock"
+        ordering = ["-fecha", "-id_movimiento"]
+        indexes = [
+            models.Index(fields=["producto", "fecha"], name="mov_stock_producto_fecha_idx"),
+            models.Index(fields=["lote", "fecha"], name="mov_stock_lote_fecha_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.producto_id} {self.cantidad:+d} ({self.motivo})"
+
+
+class SaldoStock(models.Model):
+    """
+    Saldo materializado del kardex.
+    Una fila por producto (lote nulo) y una por cada lote del producto.
+    """
+
+    id_saldo = models.BigAutoField(primary_key=True)
+    producto = models.ForeignKey(
+        Producto,
+        on_delete=models.CASCADE,
+        db_column="id_producto",
+        related_name="saldos_stock",
+    )
+    lote = models.ForeignKey(
+        "lotes.Lote",
+        on_delete=models.CASCADE,
+        db_column="id_lote",
+        null=True,
+        blank=True,
+        related_name="saldos_stock",
+    )
+    cantidad = models.IntegerField(default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "saldo_stock"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["producto"],
+                condition=models.Q(lote__isnull=True),
+                name="saldo_stock_producto_uniq",
+            ),
+            models.UniqueConstraint(
+                fields=["producto", "lote"],
+                condition=models.Q(lote__isnull=False),
+                name="saldo_stock_producto_lote_uniq",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.producto_id}/{self.lote_id or '-'}: {self.cantidad}"
+
+
+class VelocidadVenta(models.Model):
+    """
+    Unidades vendidas por producto en ventanas móviles de 7, 30 y 90 días
+    (ventas no anuladas), ancladas en fecha_corte.
+
+    Se actualiza en cada venta/anulación (services.velocidad_service) y se
+    recalcula cada día con `manage.py actualizar_velocidad_ventas`.
+    """
+
+    VENTANAS = (7, 30, 90)
+
+    producto = models.OneToOneField(
+        Producto,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        db_column="id_producto",
+        related_name="velocidad_venta",
+    )
+    unidades_7d = models.IntegerField(default=0)
+    unidades_30d = models.IntegerField(default=0)
+    unidades_90d = models.IntegerField(default=0)
+    fecha_corte = models.DateField(help_text="Último día incluido en las ventanas")
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "velocidad_venta"
+
+    def __str__(self):
+        return f"{self.producto_id}: {self.unidades_7d}/{self.unidades_30d}/{self.unidades_90d}"
+
+    @property
+    def velocidad_7d(self):
+        return self.unidades_7d / 7
+
+    @property
+    def velocidad_30d(self):
+        return self.unidades_30d / 30
+
+    @property
+    def velocidad_90d(self):
+        return self.unidades_90d / 90
+
+    @property
+    def velocidad_diaria(self):
+        """Unidades por día para proyectar: 30 días, o 90 si no hubo ventas en 30."""
+        return self.velocidad_30d or self.velocidad_90d
+
+    def dias_cobertura(self, stock):
+        """Días que alcanza `stock` al ritmo actual (None si no se vende)."""
+        velocidad = self.velocidad_diaria
+        if not velocidad:
+            return None
+        return max(stock, 0) / velocidad
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Inventario
+from .models import Inventario, MovimientoStock
 
 
 class InventarioSerializer(serializers.ModelSerializer):
@@ -23,4 +23,30 @@ class InventarioSerializer(serializers.ModelSerializer):
             "usuario_actualiza",
             "usuario_actualiza_nombre",
         ]
-        read_only_fields = ["fecha_actualizacion"]
+        # cantidad_actual la mantiene el kardex (refleja producto.stock)
+        read_only_fields = ["cantidad_actual", "fecha_actualizacion"]
+
+    def create(self, validated_data):
+        validated_data["cantidad_actual"] = max(validated_data["producto"].stock, 0)
+        return super().create(validated_data)
+
+
+class MovimientoStockSerializer(serializers.ModelSerializer):
+    producto_nombre = serializers.CharField(source="producto.nombre", read_only=True)
+    usuario_nombre = serializers.CharField(source="usuario.nombre_usuario", read_only=True, default=None)
+
+    class Meta:
+        model = MovimientoStock
+        fields = [
+            "id_movimiento",
+            "producto",
+            "producto_nombre",
+            "lote",
+            "cantidad",
+            "motivo",
+            "referencia",
+            "usuario",
+            "usuario_nombre",
+            "fecha",
+        ]
+        read_only_fields = fields
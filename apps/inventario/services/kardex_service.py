@@ -0,0 +1,399 @@
+# apps/inventario/services/kardex_service.py
+"""
+Kardex: toda modificación de stock pasa por aquí.
+
+Cada llamada a registrar_movimientos:
+  1. inserta las filas de movimiento_stock (solo inserción),
+  2. aplica los deltas a producto.stock y lote.cantidad con un UPDATE por tabla,
+  3. deja saldo_stock e inventario_inventario con el valor resultante.
+
+Todo ocurre en la misma transacción, así que las columnas de stock que lee
+el resto del sistema nunca quedan desalineadas del libro de movimientos.
+"""
+import logging
+
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery, Sum
+from django.utils import timezone
+
+from apps.inventario.models import Inventario, MovimientoStock, SaldoStock
+from apps.lotes.models import Lote
+from apps.productos.models import Producto
+from core.constants import StockMovementReason
+
+logger = logging.getLogger(__name__)
+
+
+class StockInsuficiente(Exception):
+    """Un movimiento dejaría el stock de un producto o lote en negativo."""
+
+    def __init__(self, productos=(), lotes=()):
+        self.productos = list(productos)
+        self.lotes = list(lotes)
+        nombres = list(
+            Producto.objects.filter(id_producto__in=self.productos).values_list("nombre", flat=True)
+        )
+        nombres += [f"lote {id_lote}" for id_lote in self.lotes]
+        super().__init__(f"Stock insuficiente para {', '.join(nombres)}")
+
+
+def _aplicar_deltas(tabla, columna_pk, columna_cantidad, deltas, permitir_negativo):
+    """
+    UPDATE tabla SET cantidad = cantidad + v.delta FROM (VALUES ...) v
+    en una sola sentencia. Devuelve {clave: cantidad_resultante}.
+
+    Si no se permite negativo, las filas que quedarían bajo cero no se
+    actualizan y se devuelven como faltantes.
+    """
+    claves = sorted(k for k, v in deltas.items() if v)
+    if not claves:
+        return {}, []
+
+    valores = ", ".join(["(%s, %s)"] * len(claves))
+    params = []
+    for clave in claves:
+        params.extend([clave, int(deltas[clave])])
+
+    condicion = ""
+    if not permitir_negativo:
+        condicion = f" AND {tabla}.{columna_cantidad} + v.delta >= 0"
+
+    # Las claves van ordenadas: transacciones concurrentes bloquean en el mismo orden
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {tabla}
+            SET {columna_cantidad} = {tabla}.{columna_cantidad} + v.delta
+            FROM (VALUES {valores}) AS v(clave, delta)
+            WHERE {tabla}.{columna_pk} = v.clave{condicion}
+            RETURNING {tabla}.{columna_pk}, {tabla}.{columna_cantidad}
+            """,
+            params,
+        )
+        resultado = dict(cursor.fetchall())
+
+    faltantes = [c for c in claves if c not in resultado]
+    return resultado, faltantes
+
+
+def _guardar_saldos(saldos_producto, saldos_lote, producto_de_lote):
+    """Upsert de saldo_stock con el valor ya aplicado en producto/lote."""
+    ahora = timezone.now()
+    with connection.cursor() as cursor:
+        if saldos_producto:
+            valores = ", ".join(["(%s, NULL, %s, %s)"] * len(saldos_producto))
+            params = []
+            for id_producto, cantidad in sorted(saldos_producto.items()):
+                params.extend([id_producto, cantidad, ahora])
+            cursor.execute(
+                f"""
+                INSERT INTO saldo_stock (id_producto, id_lote, cantidad, fecha_actualizacion)
+                VALUES {valores}
+                ON CONFLICT (id_producto) WHERE id_lote IS NULL
+                DO UPDATE SET cantidad = EXCLUDED.cantidad,
+                              fecha_actualizacion = EXCLUDED.fecha_actualizacion
+                """,
+                params,
+            )
+
+        if saldos_lote:
+            valores = ", ".join(["(%s, %s, %s, %s)"] * len(saldos_lote))
+            params = []
+            for id_lote, cantidad in sorted(saldos_lote.items()):
+                params.extend([producto_de_lote[id_lote], id_lote, cantidad, ahora])
+            cursor.execute(
+                f"""
+                INSERT INTO saldo_stock (id_producto, id_lote, cantidad, fecha_actualizacion)
+                VALUES {valores}
+                ON CONFLICT (id_producto, id_lote) WHERE id_lote IS NOT NULL
+                DO UPDATE SET cantidad = EXCLUDED.cantidad,
+                              fecha_actualizacion = EXCLUDED.fecha_actualizacion
+                """,
+                params,
+            )
+
+
+def _sincronizar_inventario(ids_producto):
+    """inventario_inventario.cantidad_actual refleja producto.stock."""
+    if not ids_producto:
+        return
+    Inventario.objects.filter(producto_id__in=ids_producto).update(
+        cantidad_actual=Subquery(
+            Producto.objects.filter(id_producto=OuterRef("producto_id")).values("stock")[:1]
+        )
+    )
+
+
+@transaction.atomic
+def registrar_movimientos(movimientos, motivo, usuario=None, referencia=None, permitir_negativo=False):
+    """
+    Registra varios movimientos de stock en bloque.
+
+    Args:
+        movimientos (list[dict]): {"producto": id, "cantidad": delta, "lote": id|None,
+                                   "referencia": str|None}
+        motivo (str): StockMovementReason
+        usuario (Usuario, optional): quién origina el movimiento
+        referencia (str, optional): referencia por defecto (p.ej. "VENTA #12")
+        permitir_negativo (bool): si False, lanza StockInsuficiente antes de dejar stock < 0
+
+    Returns:
+        dict: {id_producto: stock_resultante} de los productos afectados
+    """
+    movimientos = [m for m in movimientos if m.get("cantidad")]
+    if not movimientos:
+        return {}
+
+    afecta_producto = StockMovementReason.afecta_producto(motivo)
+
+    deltas_producto = {}
+    deltas_lote = {}
+    producto_de_lote = {}
+    for mov in movimientos:
+        cantidad = int(mov["cantidad"])
+        if afecta_producto:
+            deltas_producto[mov["producto"]] = deltas_producto.get(mov["producto"], 0) + cantidad
+        if mov.get("lote"):
+            deltas_lote[mov["lote"]] = deltas_lote.get(mov["lote"], 0) + cantidad
+            producto_de_lote[mov["lote"]] = mov["producto"]
+
+    # Orden de bloqueo fijo en todo el sistema: lotes (por id) y luego productos (por id)
+    saldos_lote, lotes_sin_stock = _aplicar_deltas(
+        "lote", "id_lote", "cantidad", deltas_lote, permitir_negativo
+    )
+    saldos_producto, sin_stock = _aplicar_deltas(
+        "producto", "id_producto", "stock", deltas_producto, permitir_negativo
+    )
+    if sin_stock or lotes_sin_stock:
+        # El atomic de la función revierte lo que sí se alcanzó a aplicar
+        raise StockInsuficiente(sin_stock, lotes_sin_stock)
+
+    ahora = timezone.now()
+    MovimientoStock.objects.bulk_create([
+        MovimientoStock(
+            producto_id=mov["producto"],
+            lote_id=mov.get("lote"),
+            cantidad=int(mov["cantidad"]),
+            motivo=motivo,
+            referencia=mov.get("referencia") or referencia,
+            usuario=usuario,
+            fecha=ahora,
+        )
+        for mov in movimientos
+    ])
+
+    _guardar_saldos(saldos_producto, saldos_lote, producto_de_lote)
+    _sincronizar_inventario(list(saldos_producto))
+
+    return saldos_producto
+
+
+def registrar_movimiento(producto_id, cantidad, motivo, lote_id=None, usuario=None,
+                         referencia=None, permitir_negativo=False):
+    """Atajo para un único movimiento. Devuelve el stock resultante del producto."""
+    saldos = registrar_movimientos(
+        [{"producto": producto_id, "cantidad": cantidad, "lote": lote_id}],
+        motivo=motivo,
+        usuario=usuario,
+        referencia=referencia,
+        permitir_negativo=permitir_negativo,
+    )
+    return saldos.get(producto_id)
+
+
+@transaction.atomic
+def fijar_stock(producto_id, cantidad_nueva, motivo=StockMovementReason.CORRECCION,
+                usuario=None, referencia=None):
+    """
+    Lleva el stock de un producto a un valor absoluto registrando
+    el delta correspondiente. Devuelve (stock_anterior, stock_nuevo).
+    """
+    stock_anterior = (
+        Producto.objects.select_for_update()
+        .values_list("stock", flat=True)
+        .get(id_producto=producto_id)
+    )
+    delta = int(cantidad_nueva) - stock_anterior
+    if delta:
+        registrar_movimiento(
+            producto_id, delta, motivo, usuario=usuario,
+            referencia=referencia, permitir_negativo=True,
+        )
+    return stock_anterior, stock_anterior + delta
+
+
+@transaction.atomic
+def fijar_cantidad_lote(lote, cantidad_nueva, usuario=None, referencia=None):
+    """Igual que fijar_stock pero para la cantidad de un lote (AJUSTE_LOTE)."""
+    cantidad_anterior = (
+        Lote.objects.select_for_update()
+        .values_list("cantidad", flat=True)
+        .get(id_lote=lote.id_lote)
+    )
+    delta = int(cantidad_nueva) - cantidad_anterior
+    if delta:
+        registrar_movimientos(
+            [{"producto": lote.producto_id, "lote": lote.id_lote, "cantidad": delta}],
+            motivo=StockMovementReason.AJUSTE_LOTE,
+            usuario=usuario,
+            referencia=referencia,
+            permitir_negativo=True,
+        )
+    return cantidad_anterior, cantidad_anterior + delta
+
+
+# ==========================================================
+# CONSULTAS
+# ==========================================================
+
+def _movimientos_de_producto():
+    """Movimientos que afectan el stock del producto (excluye los solo-lote)."""
+    return MovimientoStock.objects.exclude(motivo__in=StockMovementReason.SOLO_LOTE)
+
+
+def stocks_a_fecha(fecha, productos=None):
+    """
+    Stock de cada producto al momento `fecha`:
+    saldo actual (materializado) menos los movimientos posteriores.
+    Dos consultas agregadas, sin recorrer el historial completo.
+
+    Returns:
+        dict: {id_producto: stock}
+    """
+    saldos = Producto.objects.all()
+    if productos is not None:
+        saldos = saldos.filter(id_producto__in=productos)
+    resultado = dict(saldos.values_list("id_producto", "stock"))
+
+    posteriores = _movimientos_de_producto().filter(fecha__gt=fecha)
+    if productos is not None:
+        posteriores = posteriores.filter(producto_id__in=productos)
+
+    for row in posteriores.values("producto_id").annotate(total=Sum("cantidad")):
+        if row["producto_id"] in resultado:
+            resultado[row["producto_id"]] -= row["total"]
+    return resultado
+
+
+def stock_a_fecha(producto_id, fecha, lote_id=None):
+    """Stock de un producto (o de uno de sus lotes) en una fecha dada."""
+    if lote_id:
+        actual = Lote.objects.values_list("cantidad", flat=True).get(id_lote=lote_id)
+        posteriores = MovimientoStock.objects.filter(lote_id=lote_id, fecha__gt=fecha)
+    else:
+        actual = Producto.objects.values_list("stock", flat=True).get(id_producto=producto_id)
+        posteriores = _movimientos_de_producto().filter(producto_id=producto_id, fecha__gt=fecha)
+
+    return actual - (posteriores.aggregate(total=Sum("cantidad"))["total"] or 0)
+
+
+# ==========================================================
+# CONCILIACIÓN
+# ==========================================================
+
+def _diferencias(actuales, saldos, sumas, clave):
+    diferencias = []
+    for pk, actual in actuales.items():
+        saldo = saldos.get(pk)
+        suma = sumas.get(pk, 0)
+        if saldo != actual or suma != actual:
+            diferencias.append({
+                clave: pk,
+                "stock": actual,
+                "saldo": saldo,
+                "kardex": suma,
+                "diferencia": actual - suma,
+                "sin_movimientos": pk not in sumas,
+            })
+    return diferencias
+
+
+@transaction.atomic
+def conciliar(productos=None, aplicar=False, usuario=None):
+    """
+    Compara producto.stock / lote.cantidad con saldo_stock y con la suma del kardex.
+
+    Con aplicar=True registra un movimiento APERTURA (productos que aún no
+    tenían movimientos) o CONCILIACION por la diferencia, de modo que el
+    kardex vuelva a explicar el stock físico; también reescribe saldo_stock
+    e inventario_inventario.
+
+    Returns:
+        dict: {"productos": [...], "lotes": [...]} con las diferencias encontradas
+    """
+    prod_qs = Producto.objects.all()
+    lote_qs = Lote.objects.all()
+    mov_prod = _movimientos_de_producto()
+    mov_lote = MovimientoStock.objects.filter(lote__isnull=False)
+    saldo_prod = SaldoStock.objects.filter(lote__isnull=True)
+    saldo_lote = SaldoStock.objects.filter(lote__isnull=False)
+
+    if productos is not None:
+        prod_qs = prod_qs.filter(id_producto__in=productos)
+        lote_qs = lote_qs.filter(producto_id__in=productos)
+        mov_prod = mov_prod.filter(producto_id__in=productos)
+        mov_lote = mov_lote.filter(producto_id__in=productos)
+        saldo_prod = saldo_prod.filter(producto_id__in=productos)
+        saldo_lote = saldo_lote.filter(producto_id__in=productos)
+
+    if aplicar:
+        prod_qs = prod_qs.select_for_update()
+        lote_qs = lote_qs.select_for_update()
+
+    stock_actual = dict(prod_qs.values_list("id_producto", "stock"))
+    lotes = {lid: (pid, cant) for lid, pid, cant in lote_qs.values_list("id_lote", "producto_id", "cantidad")}
+
+    diferencias_producto = _diferencias(
+        stock_actual,
+        dict(saldo_prod.values_list("producto_id", "cantidad")),
+        {r["producto_id"]: r["total"] for r in mov_prod.values("producto_id").annotate(total=Sum("cantidad"))},
+        "id_producto",
+    )
+    diferencias_lote = _diferencias(
+        {lid: cant for lid, (_, cant) in lotes.items()},
+        dict(saldo_lote.values_list("lote_id", "cantidad")),
+        {r["lote_id"]: r["total"] for r in mov_lote.values("lote_id").annotate(total=Sum("cantidad"))},
+        "id_lote",
+    )
+
+    if aplicar and (diferencias_producto or diferencias_lote):
+        ahora = timezone.now()
+        nuevos = []
+        for dif in diferencias_producto:
+            if dif["diferencia"]:
+                nuevos.append(MovimientoStock(
+                    producto_id=dif["id_producto"],
+                    cantidad=dif["diferencia"],
+                    motivo=(StockMovementReason.APERTURA if dif["sin_movimientos"]
+                            else StockMovementReason.CONCILIACION),
+                    referencia="Conciliación de stock",
+                    usuario=usuario,
+                    fecha=ahora,
+                ))
+        for dif in diferencias_lote:
+            if dif["diferencia"]:
+                # Solo-lote: no debe volver a mover el stock del producto
+                nuevos.append(MovimientoStock(
+                    producto_id=lotes[dif["id_lote"]][0],
+                    lote_id=dif["id_lote"],
+                    cantidad=dif["diferencia"],
+                    motivo=StockMovementReason.AJUSTE_LOTE,
+                    referencia="Conciliación de stock",
+                    usuario=usuario,
+                    fecha=ahora,
+                ))
+        MovimientoStock.objects.bulk_create(nuevos)
+
+        _guardar_saldos(
+            {d["id_producto"]: d["stock"] for d in diferencias_producto},
+            {d["id_lote"]: d["stock"] for d in diferencias_lote},
+            {lid: pid for lid, (pid, _) in lotes.items()},
+        )
+        _sincronizar_inventario([d["id_producto"] for d in diferencias_producto])
+
+        logger.info(
+            f"Conciliación aplicada: {len(diferencias_producto)} productos, "
+            f"{len(diferencias_lote)} lotes"
+        )
+
+    return {"productos": diferencias_producto, "lotes": diferencias_lote}
@@ -0,0 +1,231 @@
+# apps/inventario/services/velocidad_service.py
+"""
+Velocidad de venta por producto (ventanas móviles de 7, 30 y 90 días).
+
+velocidad_venta guarda, por producto, las unidades vendidas (no anuladas)
+en cada ventana hasta fecha_corte:
+
+  - En cada venta/anulación se suman o restan las unidades de esa venta
+    con un solo UPDATE ... FROM (solo filas con fecha_corte = hoy).
+  - Si la fila no existe o quedó de un día anterior (las ventanas ya se
+    corrieron) se recalcula ese producto desde hecho_venta_diaria.
+  - `manage.py actualizar_velocidad_ventas` corre las ventanas de todos los
+    productos una vez al día.
+
+Leer la velocidad o los días de cobertura de un producto es leer una fila.
+"""
+from django.db import connection
+from django.utils import timezone
+
+from apps.inventario.models import VelocidadVenta
+from apps.lotes.services.fefo_service import cargar_heaps
+from apps.productos.models import Producto
+from apps.reportes.models import HechoVentaDiaria
+
+TABLA = VelocidadVenta._meta.db_table
+
+# Productos por consulta al recorrer todo el catálogo (bajo_cobertura)
+LOTE_COBERTURA = 500
+
+
+def _hoy():
+    return timezone.now().date()
+
+
+def recalcular(productos=None, hoy=None):
+    """
+    Recalcula las ventanas desde hecho_venta_diaria para `productos`
+    (o todos) con fecha_corte = hoy. Devuelve la cantidad de filas escritas.
+    """
+    hoy = hoy or _hoy()
+    params = {"hoy": hoy}
+    condicion = ""
+    if productos is not None:
+        productos = sorted(set(productos))
+        if not productos:
+            return 0
+        condicion = "WHERE p.id_producto = ANY(%(productos)s)"
+        params["productos"] = productos
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {TABLA} AS vv
+                (id_producto, unidades_7d, unidades_30d, unidades_90d, fecha_corte, fecha_actualizacion)
+            SELECT p.id_producto,
+                   COALESCE(SUM(h.cantidad) FILTER (WHERE h.fecha > %(hoy)s::date - 7), 0),
+                   COALESCE(SUM(h.cantidad) FILTER (WHERE h.fecha > %(hoy)s::date - 30), 0),
+                   COALESCE(SUM(h.cantidad), 0),
+                   %(hoy)s, now()
+            FROM producto p
+            LEFT JOIN {HechoVentaDiaria._meta.db_table} h
+                   ON h.id_producto = p.id_producto
+                  AND NOT h.anulada
+                  AND h.fecha > %(hoy)s::date - 90
+                  AND h.fecha <= %(hoy)s
+            {condicion}
+            GROUP BY p.id_producto
+            ORDER BY p.id_producto
+            ON CONFLICT (id_producto) DO UPDATE SET
+                unidades_7d = EXCLUDED.unidades_7d,
+                unidades_30d = EXCLUDED.unidades_30d,
+                unidades_90d = EXCLUDED.unidades_90d,
+                fecha_corte = EXCLUDED.fecha_corte,
+                fecha_actualizacion = EXCLUDED.fecha_actualizacion
+            """,
+            params,
+        )
+        return cursor.rowcount
+
+
+def _aplicar(ids_venta, signo):
+    ids = sorted({int(i) for i in ids_venta})
+    if not ids:
+        return
+    hoy = _hoy()
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {TABLA} AS vv SET
+                unidades_7d = vv.unidades_7d + %(signo)s * d.u7,
+                unidades_30d = vv.unidades_30d + %(signo)s * d.u30,
+                unidades_90d = vv.unidades_90d + %(signo)s * d.u90,
+                fecha_actualizacion = now()
+            FROM (
+                SELECT dv.id_producto,
+                       COALESCE(SUM(dv.cantidad) FILTER (WHERE v.fecha > %(hoy)s::date - 7), 0) AS u7,
+                       COALESCE(SUM(dv.cantidad) FILTER (WHERE v.fecha > %(hoy)s::date - 30), 0) AS u30,
+                       SUM(dv.cantidad) AS u90
+                FROM detalle_venta dv
+                JOIN venta v ON v.id_venta = dv.id_venta
+                WHERE dv.id_venta = ANY(%(ids)s)
+                  AND v.fecha > %(hoy)s::date - 90
+                  AND v.fecha <= %(hoy)s
+                GROUP BY dv.id_producto
+            ) AS d
+            WHERE vv.id_producto = d.id_producto AND vv.fecha_corte = %(hoy)s
+            RETURNING vv.id_producto
+            """,
+            {"signo": int(signo), "hoy": hoy, "ids": ids},
+        )
+        actualizados = {fila[0] for fila in cursor.fetchall()}
+
+        cursor.execute(
+            "SELECT DISTINCT id_producto FROM detalle_venta WHERE id_venta = ANY(%s)", [ids]
+        )
+        afectados = {fila[0] for fila in cursor.fetchall()}
+
+    # Sin fila o con ventanas de otro día: se recalcula (ya incluye esta venta)
+    recalcular(afectados - actualizados, hoy=hoy)
+
+
+def registrar_ventas(ids_venta):
+    """Suma a las ventanas las unidades de ventas nuevas (llamar tras hechos)."""
+    _aplicar(ids_venta, 1)
+
+
+def registrar_anulaciones(ids_venta):
+    """Resta de las ventanas las unidades de ventas recién anuladas."""
+    _aplicar(ids_venta, -1)
+
+
+def proyectar_lotes(lotes, velocidad, hoy=None):
+    """
+    Proyección FEFO al ritmo `velocidad` (unidades/día): cuántas unidades de
+    los lotes vencerían antes de venderse.
+
+    Args:
+        lotes: [(fecha_vencimiento, id_lote, cantidad), ...] en cualquier orden.
+
+    Returns:
+        int: unidades por vencer sin venderse.
+    """
+    hoy = hoy or _hoy()
+    if not velocidad:
+        return sum(cantidad for _, _, cantidad in lotes)
+
+    vendidas = 0.0
+    por_vencer = 0
+    for vencimiento, _, cantidad in sorted(lotes):
+        # Lo que se alcanza a vender de este lote antes de que venza
+        capacidad = max(velocidad * (vencimiento - hoy).days - vendidas, 0)
+        vendible = min(cantidad, int(capacidad))
+        vendidas += vendible
+        por_vencer += cantidad - vendible
+    return por_vencer
+
+
+def cobertura(productos):
+    """
+    Velocidad y días de cobertura de `productos` (ids).
+
+    dias_cobertura usa el stock del producto; dias_cobertura_efectiva
+    descuenta las unidades de lotes que vencerían antes de venderse.
+    Productos sin fila de velocidad se informan con velocidad 0.
+
+    Returns:
+        list[dict]: una entrada por producto, en orden de id.
+    """
+    ids = sorted(set(productos))
+    velocidades = VelocidadVenta.objects.in_bulk(ids)
+    stocks = dict(Producto.objects.filter(id_producto__in=ids).values_list("id_producto", "stock"))
+    heaps = cargar_heaps(ids, bloquear=False)
+    hoy = _hoy()
+
+    resultado = []
+    for id_producto in ids:
+        if id_producto not in stocks:
+            continue
+        stock = stocks[id_producto]
+        fila = velocidades.get(id_producto) or VelocidadVenta(producto_id=id_producto, fecha_corte=hoy)
+        velocidad = fila.velocidad_diaria
+        por_vencer = proyectar_lotes(heaps.get(id_producto, []), velocidad, hoy=hoy)
+        efectiva = fila.dias_cobertura(stock - por_vencer)
+        resultado.append({
+            "id_producto": id_producto,
+            "stock": stock,
+            "unidades_7d": fila.unidades_7d,
+            "unidades_30d": fila.unidades_30d,
+            "unidades_90d": fila.unidades_90d,
+            "velocidad_diaria": round(velocidad, 3),
+            "dias_cobertura": _redondear(fila.dias_cobertura(stock)),
+            "unidades_por_vencer": por_vencer,
+            "dias_cobertura_efectiva": _redondear(efectiva),
+            "fecha_corte": fila.fecha_corte,
+        })
+    return resultado
+
+
+def bajo_cobertura(limite, lote=LOTE_COBERTURA):
+    """
+    Productos con dias_cobertura_efectiva menor a `limite`, de menor a mayor.
+
+    Recorre el catálogo en lotes de `lote` ids para no cargar velocidades,
+    stocks y lotes de todos los productos a la vez.
+    """
+    productos = Producto.objects.order_by("id_producto").values_list("id_producto", flat=True)
+    resultado = []
+    ids = []
+    for id_producto in productos.iterator(chunk_size=lote):
+        ids.append(id_producto)
+        if len(ids) == lote:
+            resultado.extend(filtrar_por_cobertura(cobertura(ids), limite))
+            ids = []
+    if ids:
+        resultado.extend(filtrar_por_cobertura(cobertura(ids), limite))
+    resultado.sort(key=lambda r: r["dias_cobertura_efectiva"])
+    return resultado
+
+
+def filtrar_por_cobertura(resultados, limite):
+    """Entradas de `cobertura` con menos de `limite` días efectivos, de menor a mayor."""
+    return sorted(
+        (r for r in resultados
+         if r["dias_cobertura_efectiva"] is not None and r["dias_cobertura_efectiva"] < limite),
+        key=lambda r: r["dias_cobertura_efectiva"],
+    )
+
+
+def _redondear(valor):
+    return None if valor is None else round(valor, 1)
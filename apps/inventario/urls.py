@@ -1,7 +1,9 @@
 from rest_framework.routers import DefaultRouter
-from .views import InventarioViewSet
+from .views import InventarioViewSet, MovimientoStockViewSet, VelocidadVentaViewSet
 
 router = DefaultRouter()
 router.register(r"inventario", InventarioViewSet, basename="inventario")
+router.register(r"movimientos-stock", MovimientoStockViewSet, basename="movimientos-stock")
+router.register(r"velocidad-ventas", VelocidadVentaViewSet, basename="velocidad-ventas")
 
 urlpatterns = router.urls
@@ -1,6 +1,16 @@
-from rest_framework import viewsets, permissions
-from .models import Inventario
-from .serializers import InventarioSerializer
+from datetime import datetime, time
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import viewsets, permissions, decorators, response, status
+from rest_framework.pagination import PageNumberPagination
+
+from apps.lotes.models import Lote
+from apps.productos.models import Producto
+from .models import Inventario, MovimientoStock
+from .serializers import InventarioSerializer, MovimientoStockSerializer
+from .services import kardex_service, velocidad_service
 
 
 class InventarioViewSet(viewsets.ModelViewSet):
@@ -28,3 +38,138 @@ class InventarioViewSet(viewsets.ModelViewSet):
     def perform_update(self, serializer):
         user = self.request.user if self.request.user.is_authenticated else None
         serializer.save(usuario_actualiza=user)
+
+
+def _parsear_fecha(valor):
+    """Acepta fecha (fin del día) o fecha-hora ISO."""
+    if not valor:
+        return None
+    fecha = parse_date(valor) if len(valor) == 10 else None
+    if fecha:
+        fecha_hora = datetime.combine(fecha, time.max)
+    else:
+        fecha_hora = parse_datetime(valor)
+    if not fecha_hora:
+        raise ValueError(valor)
+    if settings.USE_TZ and timezone.is_naive(fecha_hora):
+        fecha_hora = timezone.make_aware(fecha_hora)
+    return fecha_hora
+
+
+class MovimientoStockViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Kardex (solo lectura).
+    GET /api/inventario/movimientos-stock/?producto=P0001&lote=L01&motivo=VENTA&desde=2025-01-01&hasta=2025-01-31
+    GET /api/inventario/movimientos-stock/stock-a-fecha/?fecha=2025-01-31[&producto=P0001[&lote=L01]]
+    """
+    queryset = MovimientoStock.objects.select_related("producto", "usuario").all()
+    serializer_class = MovimientoStockSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        params = self.request.query_params
+        if params.get("producto"):
+            qs = qs.filter(producto_id=params["producto"])
+        if params.get("lote"):
+            qs = qs.filter(lote_id=params["lote"])
+        if params.get("motivo"):
+            qs = qs.filter(motivo=params["motivo"])
+        try:
+            desde = _parsear_fecha(params.get("desde"))
+            hasta = _parsear_fecha(params.get("hasta"))
+        except ValueError:
+            return qs.none()
+        if desde:
+            qs = qs.filter(fecha__gte=desde)
+        if hasta:
+            qs = qs.filter(fecha__lte=hasta)
+        return qs
+
+    @decorators.action(detail=False, methods=["get"], url_path="stock-a-fecha")
+    def stock_a_fecha(self, request):
+        try:
+            fecha = _parsear_fecha(request.query_params.get("fecha"))
+        except ValueError:
+            fecha = None
+        if not fecha:
+            return response.Response(
+                {"error": "Debe enviar una fecha válida (YYYY-MM-DD o ISO 8601)."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        id_producto = request.query_params.get("producto")
+        id_lote = request.query_params.get("lote")
+
+        if id_producto or id_lote:
+            try:
+                stock = kardex_service.stock_a_fecha(id_producto, fecha, lote_id=id_lote)
+            except (Producto.DoesNotExist, Lote.DoesNotExist):
+                return response.Response(
+                    {"error": "Producto o lote no encontrado."},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+            return response.Response({
+                "fecha": fecha, "producto": id_producto, "lote": id_lote, "stock": stock,
+            })
+
+        stocks = kardex_service.stocks_a_fecha(fecha)
+        return response.Response({
+            "fecha": fecha,
+            "resultados": [
+                {"producto": id_prod, "stock": stock} for id_prod, stock in sorted(stocks.items())
+            ],
+        })
+
+
+class VelocidadVentaViewSet(viewsets.ViewSet):
+    """
+    Velocidad de venta y días de cobertura (solo lectura).
+    GET /api/inventario/velocidad-ventas/?producto=P0001&producto=P0002
+    GET /api/inventario/velocidad-ventas/?cobertura_max=7   → productos con menos de 7 días de stock
+    GET /api/inventario/velocidad-ventas/{id_producto}/
+
+    Sin `producto` se recorre todo el catálogo y la respuesta va paginada
+    (count/next/previous/results, ?page=N).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def list(self, request):
+        limite = None
+        cobertura_max = request.query_params.get("cobertura_max")
+        if cobertura_max:
+            try:
+                limite = float(cobertura_max)
+            except ValueError:
+                return response.Response(
+                    {"error": "cobertura_max debe ser numérico."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        ids = request.query_params.getlist("producto")
+        if ids:
+            resultados = velocidad_service.cobertura(ids)
+            if limite is not None:
+                resultados = velocidad_service.filtrar_por_cobertura(resultados, limite)
+            return response.Response({"total": len(resultados), "resultados": resultados})
+
+        paginador = PageNumberPagination()
+        if limite is None:
+            # Solo la página pedida de ids; la cobertura se calcula para esos
+            productos = Producto.objects.order_by("id_producto").values_list("id_producto", flat=True)
+            pagina = paginador.paginate_queryset(productos, request, view=self)
+            resultados = velocidad_service.cobertura(pagina)
+        else:
+            resultados = paginador.paginate_queryset(
+                velocidad_service.bajo_cobertura(limite), request, view=self
+            )
+        return paginador.get_paginated_response(resultados)
+
+    def retrieve(self, request, pk=None):
+        resultados = velocidad_service.cobertura([pk])
+        if not resultados:
+            return response.Response(
+                {"error": "Producto no encontrado."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        return response.Response(resultados[0])
@@ -0,0 +1,62 @@
+import heapq
+import random
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from apps.lotes.services.fefo_service import repartir
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la asignación FEFO en memoria para pedidos sobre productos con "
+        "cientos de lotes (no toca la base de datos)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--productos", type=int, default=20, help="Productos por pedido.")
+        parser.add_argument("--lotes", type=int, default=500, help="Lotes por producto.")
+        parser.add_argument("--pedidos", type=int, default=200, help="Pedidos a simular.")
+        parser.add_argument("--cantidad", type=int, default=50, help="Unidades máximas por línea.")
+        parser.add_argument("--semilla", type=int, default=42)
+
+    def _lotes(self, rnd, n, hoy):
+        return [
+            (hoy + timedelta(days=rnd.randint(1, 720)), f"L{i:04d}", rnd.randint(1, 20))
+            for i in range(n)
+        ]
+
+    def handle(self, *args, **opts):
+        rnd = random.Random(opts["semilla"])
+        hoy = date.today()
+        base = {
+            f"P{p:04d}": self._lotes(rnd, opts["lotes"], hoy)
+            for p in range(opts["productos"])
+        }
+
+        t_heap = t_repartir = 0.0
+        lineas = partidas = 0
+        for _ in range(opts["pedidos"]):
+            inicio = time.perf_counter()
+            heaps = {}
+            for id_producto, lotes in base.items():
+                heap = list(lotes)
+                heapq.heapify(heap)
+                heaps[id_producto] = heap
+            t_heap += time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            for id_producto in base:
+                partes, _ = repartir(heaps[id_producto], rnd.randint(1, opts["cantidad"]))
+                lineas += 1
+                partidas += len(partes)
+            t_repartir += time.perf_counter() - inicio
+
+        pedidos = opts["pedidos"]
+        self.stdout.write(
+            f"{pedidos} pedidos x {opts['productos']} productos x {opts['lotes']} lotes/producto"
+        )
+        self.stdout.write(f"  armado de heaps : {t_heap / pedidos * 1000:.3f} ms/pedido")
+        self.stdout.write(f"  reparto FEFO    : {t_repartir / pedidos * 1000:.3f} ms/pedido")
+        self.stdout.write(f"  líneas de venta : {partidas / lineas:.2f} por línea pedida")
@@ -0,0 +1,111 @@
+# apps/lotes/services/fefo_service.py
+"""
+Asignación de lotes FEFO (first-expired, first-out) para ventas.
+
+Por cada checkout se cargan una sola vez los lotes vigentes de los
+productos del pedido (SELECT ... FOR UPDATE) y se arma un heap por
+producto ordenado por fecha de vencimiento. Cada línea del pedido se
+reparte entre los lotes que vencen primero; el descuento real de
+lote.cantidad lo hace el kardex con un UPDATE condicional.
+"""
+import heapq
+from decimal import Decimal
+
+from django.utils import timezone
+
+from apps.lotes.models import Lote
+
+
+def cargar_heaps(ids_producto, bloquear=True):
+    """
+    Lotes vigentes con cantidad > 0 agrupados en un heap por producto.
+
+    Los lotes se bloquean en orden de id_lote (el mismo orden que usa el
+    kardex al actualizarlos), así dos checkouts concurrentes no se cruzan.
+
+    Returns:
+        dict: {id_producto: [(fecha_vencimiento, id_lote, disponible), ...]}
+    """
+    qs = Lote.objects.filter(
+        producto_id__in=set(ids_producto),
+        cantidad__gt=0,
+        fecha_vencimiento__gt=timezone.now().date(),
+    ).order_by("id_lote")
+    if bloquear:
+        qs = qs.select_for_update()
+
+    heaps = {}
+    for id_lote, id_producto, fecha, cantidad in qs.values_list(
+        "id_lote", "producto_id", "fecha_vencimiento", "cantidad"
+    ):
+        heaps.setdefault(id_producto, []).append((fecha, id_lote, cantidad))
+
+    for heap in heaps.values():
+        heapq.heapify(heap)
+    return heaps
+
+
+def repartir(heap, cantidad):
+    """
+    Toma `cantidad` unidades del heap, lote que vence primero antes.
+    Modifica el heap (lo consumido ya no queda disponible para las
+    siguientes líneas del mismo pedido).
+
+    Returns:
+        tuple: ([(id_lote, cantidad), ...], cantidad_sin_lote)
+    """
+    partes = []
+    while cantidad > 0 and heap:
+        fecha, id_lote, disponible = heap[0]
+        tomado = min(disponible, cantidad)
+        partes.append((id_lote, tomado))
+        cantidad -= tomado
+        if tomado == disponible:
+            heapq.heappop(heap)
+        else:
+            heapq.heapreplace(heap, (fecha, id_lote, disponible - tomado))
+    return partes, cantidad
+
+
+def asignar_lotes(items, bloquear=True):
+    """
+    Reparte las líneas de un pedido entre lotes (FEFO).
+
+    Debe llamarse dentro de la transacción del checkout para que el
+    bloqueo de los lotes dure hasta el commit.
+
+    Args:
+        items (list[dict]): {"producto": Producto, "cantidad": int, "precio": Decimal}
+            y opcionalmente "total": importe de la línea con descuentos; los
+            sub_total de sus partes se prorratean para sumar exactamente eso.
+
+    Returns:
+        list[dict]: líneas {"producto", "lote" (id o None), "cantidad", "precio", "sub_total"}.
+            Una línea se parte en varias si cruza lotes; lo que no cubren
+            los lotes queda en una línea sin lote (stock sin lote asignado).
+    """
+    heaps = cargar_heaps([item["producto"].id_producto for item in items], bloquear=bloquear)
+
+    lineas = []
+    for item in items:
+        producto = item["producto"]
+        partes, resto = repartir(heaps.get(producto.id_producto, []), item["cantidad"])
+        if resto:
+            partes.append((None, resto))
+        total, asignado = item.get("total"), 0
+        for i, (id_lote, cantidad) in enumerate(partes):
+            if total is None:
+                sub_total = item["precio"] * cantidad
+            elif i == len(partes) - 1:
+                sub_total = total - asignado
+            else:
+                sub_total = (total * cantidad / item["cantidad"]).quantize(Decimal("0.01"))
+                asignado += sub_total
+            lineas.append({
+                "producto": producto,
+                "lote": id_lote,
+                "cantidad": cantidad,
+                "precio": item["precio"],
+                "sub_total": sub_total,
+            })
+    return lineas
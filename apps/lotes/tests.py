@@ -1,3 +1,38 @@
-from django.test import TestCase
+import heapq
+from datetime import date
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from apps.lotes.services.fefo_service import repartir
+
+
+class RepartirFefoTests(SimpleTestCase):
+
+    def _heap(self, *lotes):
+        heap = list(lotes)
+        heapq.heapify(heap)
+        return heap
+
+    def test_consume_primero_el_lote_que_vence_antes(self):
+        heap = self._heap(
+            (date(2031, 1, 1), 'L3', 10),
+            (date(2030, 1, 1), 'L1', 4),
+            (date(2030, 6, 1), 'L2', 5),
+        )
+        partes, resto = repartir(heap, 7)
+        self.assertEqual(partes, [('L1', 4), ('L2', 3)])
+        self.assertEqual(resto, 0)
+
+    def test_lineas_siguientes_ven_lo_ya_consumido(self):
+        heap = self._heap((date(2030, 1, 1), 'L1', 4), (date(2030, 6, 1), 'L2', 5))
+        repartir(heap, 3)
+        partes, resto = repartir(heap, 3)
+        self.assertEqual(partes, [('L1', 1), ('L2', 2)])
+        self.assertEqual(heap, [(date(2030, 6, 1), 'L2', 3)])
+
+    def test_devuelve_lo_que_los_lotes_no_cubren(self):
+        heap = self._heap((date(2030, 1, 1), 'L1', 2))
+        partes, resto = repartir(heap, 5)
+        self.assertEqual(partes, [('L1', 2)])
+        self.assertEqual(resto, 3)
+        self.assertEqual(heap, [])
@@ -1,6 +1,9 @@
 from rest_framework import viewsets, permissions, decorators, response, status
 from django.utils import timezone
 from django.db.models import Q
+from django.db import transaction
+
+from apps.inventario.services.kardex_service import fijar_cantidad_lote
 from .models import Lote
 from .serializers import LoteSerializer
 
@@ -10,6 +13,27 @@ class LoteViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     lookup_field = 'id_lote'
 
+    def _usuario(self):
+        return self.request.user if self.request.user.is_authenticated else None
+
+    @transaction.atomic
+    def perform_create(self, serializer):
+        """La cantidad inicial del lote entra al kardex (AJUSTE_LOTE)."""
+        cantidad = serializer.validated_data.pop('cantidad', 0)
+        lote = serializer.save(cantidad=0)
+        _, lote.cantidad = fijar_cantidad_lote(
+            lote, cantidad, usuario=self._usuario(), referencia=f'LOTE {lote.id_lote}'
+        )
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        cantidad = serializer.validated_data.pop('cantidad', None)
+        lote = serializer.save()
+        if cantidad is not None:
+            _, lote.cantidad = fijar_cantidad_lote(
+                lote, cantidad, usuario=self._usuario(), referencia=f'LOTE {lote.id_lote}'
+            )
+
     def list(self, request, *args, **kwargs):
         search = request.query_params.get('search')
         qs = self.get_queryset()
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 21:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetodoPago',
+            fields=[
+                ('id_metodo_pago', models.AutoField(primary_key=True, serialize=False)),
+                ('tipo', models.CharField(max_length=30)),
+                ('categoria', models.CharField(max_length=20)),
+                ('requiere_pasarela', models.BooleanField(db_column='requiere_pasarela', default=False)),
+                ('codigo_pasarela', models.CharField(blank=True, max_length=30, null=True)),
+                ('descripcion', models.TextField(blank=True, null=True)),
+                ('activo', models.BooleanField(default=True)),
+            ],
+            options={
+                'db_table': 'metodo_pago',
+                'ordering': ['tipo'],
+                'managed': False,
+            },
+        ),
+    ]
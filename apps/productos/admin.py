@@ -33,6 +33,7 @@ class ProductoAdmin(admin.ModelAdmin):
     list_filter = ['estado_producto', 'id_categoria', 'fecha_creacion']
     search_fields = ['id_producto', 'nombre', 'descripcion']
     ordering = ['-fecha_creacion', 'nombre']
+    list_select_related = ['id_categoria', 'velocidad_venta']
     readonly_fields = ['fecha_creacion', 'ultima_actualizacion']
     
     fieldsets = (
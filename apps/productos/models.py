@@ -85,8 +85,20 @@ class Producto(models.Model):
     
     @property
     def stock_bajo(self):
-        """Considera stock bajo si es menor al umbral configurado"""
-        return 0 < self.stock < ProductConfig.STOCK_LOW_THRESHOLD
+        """
+        Stock bajo si es menor al umbral configurado o si, al ritmo de venta
+        actual (inventario.VelocidadVenta), alcanza para menos de
+        STOCK_LOW_COVER_DAYS días.
+        """
+        if self.stock <= 0:
+            return False
+        if self.stock < ProductConfig.STOCK_LOW_THRESHOLD:
+            return True
+        velocidad = getattr(self, 'velocidad_venta', None)
+        if velocidad is None:
+            return False
+        dias = velocidad.dias_cobertura(self.stock)
+        return dias is not None and dias < ProductConfig.STOCK_LOW_COVER_DAYS
     
     @property
     def esta_activo(self):
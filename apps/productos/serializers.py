@@ -3,9 +3,20 @@ from .models import Producto, ConfiguracionLente, Medida
 from apps.categoria.models import Categoria
 from apps.imagenes.models import ImagenProducto
 from apps.imagenes.serializers import ImagenProductoSerializer
+from apps.imagenes.services import activas, variantes
 from rest_framework.pagination import PageNumberPagination
 
-from core.constants import Messages, ProductConfig, ProductStatus, ImageStatus
+from django.db import transaction
+
+from apps.inventario.services.kardex_service import fijar_stock, registrar_movimiento
+from core.constants import Messages, ProductConfig, ProductStatus, ImageStatus, StockMovementReason
+
+
+def _usuario_contexto(context):
+    request = context.get('request')
+    usuario = getattr(request, 'user', None)
+    return usuario if getattr(usuario, 'is_authenticated', False) else None
+
 
 class ProductoPagination(PageNumberPagination):
     page_size = ProductConfig.PRODUCTS_PAGE_SIZE
@@ -88,7 +99,7 @@ class ProductoListSerializer(serializers.ModelSerializer):
     categoria = CategoriaSimpleSerializer(source='id_categoria', read_only=True)
     configuracion = ConfiguracionLenteSerializer(source='id_configuracion', read_only=True)
     imagen_principal = serializers.SerializerMethodField()
-    imagenes = ImagenProductoSerializer(many=True, read_only=True)
+    imagenes = serializers.SerializerMethodField()
     tiene_stock = serializers.BooleanField(read_only=True)
     stock_bajo = serializers.BooleanField(read_only=True)
     
@@ -101,32 +112,26 @@ class ProductoListSerializer(serializers.ModelSerializer):
         ]
     
     def get_imagen_principal(self, obj):
-        imagen = obj.imagenes.filter(es_principal=True).first()
+        """Obtiene la imagen principal (ACTIVA) del producto"""
+        imagen = activas.principal(obj)
         if imagen:
             return {
                 'id': imagen.id_imagen,
                 'url': imagen.url,
-                'public_id': imagen.public_id
+                'public_id': imagen.public_id,
+                **variantes.resumen(imagen)
             }
         return None
 
-    def get_imagen_principal(self, obj):
-        """Obtiene la imagen principal del producto"""
-        imagen = obj.imagenes.filter(es_principal=True).first()
-        if imagen:
-            return {
-                'id': imagen.id_imagen,
-                'url': imagen.url,
-                'public_id': imagen.public_id
-            }
-        return None
+    def get_imagenes(self, obj):
+        return ImagenProductoSerializer(activas.de_producto(obj), many=True).data
 
 
 class ProductoDetalleSerializer(serializers.ModelSerializer):
     """Serializer completo con todas las relaciones"""
     categoria = CategoriaSimpleSerializer(source='id_categoria', read_only=True)
     configuracion = ConfiguracionLenteSerializer(source='id_configuracion', read_only=True)
-    imagenes = ImagenProductoSerializer(many=True, read_only=True)
+    imagenes = serializers.SerializerMethodField()
     tiene_stock = serializers.BooleanField(read_only=True)
     stock_bajo = serializers.BooleanField(read_only=True)
     esta_activo = serializers.BooleanField(read_only=True)
@@ -140,6 +145,10 @@ class ProductoDetalleSerializer(serializers.ModelSerializer):
             'tiene_stock', 'stock_bajo', 'esta_activo'
         ]
 
+    def get_imagenes(self, obj):
+        """Solo las imágenes ACTIVA: las PENDIENTE o ERROR no tienen URL"""
+        return ImagenProductoSerializer(activas.de_producto(obj), many=True).data
+
 
 class CrearProductoSerializer(serializers.ModelSerializer):
     """Serializer para crear productos"""
@@ -189,9 +198,17 @@ class CrearProductoSerializer(serializers.ModelSerializer):
         
         return attrs
     
+    @transaction.atomic
     def create(self, validated_data):
-        """Crea el producto"""
-        producto = Producto.objects.create(**validated_data)
+        """Crea el producto; el stock inicial entra al kardex como APERTURA"""
+        stock_inicial = validated_data.pop('stock', 0) or 0
+        producto = Producto.objects.create(stock=0, **validated_data)
+        if stock_inicial:
+            producto.stock = registrar_movimiento(
+                producto.id_producto, stock_inicial, StockMovementReason.APERTURA,
+                usuario=_usuario_contexto(self.context),
+                referencia='Alta de producto',
+            )
         return producto
 
 
@@ -234,10 +251,22 @@ class ActualizarProductoSerializer(serializers.ModelSerializer):
                     'nuevo': new_value
                 }
         
+        # El stock no se escribe directo: se corrige vía kardex
+        stock_nuevo = validated_data.pop('stock', None)
+
         # Actualizar
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
+        with transaction.atomic():
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            if validated_data:
+                instance.save(update_fields=list(validated_data))
+
+            if stock_nuevo is not None and stock_nuevo != instance.stock:
+                _, instance.stock = fijar_stock(
+                    instance.id_producto, stock_nuevo,
+                    usuario=_usuario_contexto(self.context),
+                    referencia='Edición de producto',
+                )
         
         # Guardar cambios en el contexto para el response
         self.context['cambios'] = cambios
@@ -8,7 +8,13 @@ from django.utils import timezone
 from types import SimpleNamespace
 
 from apps.autenticacion.utils.helpers import obtener_ip_cliente
-from core.constants import APIResponse, Messages, ProductStatus, ProductConfig
+from apps.imagenes.services import activas
+from core.constants import APIResponse, Messages, ProductStatus, ProductConfig, StockMovementReason
+from apps.inventario.services.kardex_service import (
+    StockInsuficiente,
+    fijar_stock,
+    registrar_movimiento,
+)
 
 from .models import Producto, ConfiguracionLente
 from .serializers import (
@@ -53,8 +59,9 @@ class ProductoViewSet(viewsets.ModelViewSet):
     queryset = Producto.objects.select_related(
         'id_categoria',
         'id_configuracion',
-        'id_configuracion__id_medida'
-    ).prefetch_related('imagenes')
+        'id_configuracion__id_medida',
+        'velocidad_venta'
+    ).prefetch_related(activas.prefetch())
     lookup_field = 'id_producto'
     
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -286,7 +293,7 @@ class ProductoViewSet(viewsets.ModelViewSet):
         )
     
     @action(detail=True, methods=['post'], url_path='ajustar-stock')
-    def ajustar_stock(self, request, pk=None):
+    def ajustar_stock(self, request, id_producto=None):
         """
         Ajustar stock del producto
         
@@ -307,26 +314,32 @@ class ProductoViewSet(viewsets.ModelViewSet):
         
         # Guardar stock anterior
         stock_anterior = producto.stock
-        
-        # Realizar ajuste
-        if tipo_ajuste == ProductConfig.STOCK_INCREMENT:
-            producto.stock += cantidad
-        elif tipo_ajuste == ProductConfig.STOCK_DECREMENT:
-            if producto.stock < cantidad:
+        referencia = f'AJUSTE {tipo_ajuste}'
+
+        # Realizar ajuste vía kardex
+        if tipo_ajuste == ProductConfig.STOCK_CORRECTION:
+            stock_anterior, producto.stock = fijar_stock(
+                producto.id_producto, cantidad, usuario=request.user, referencia=referencia
+            )
+        else:
+            delta = cantidad if tipo_ajuste == ProductConfig.STOCK_INCREMENT else -cantidad
+            try:
+                producto.stock = registrar_movimiento(
+                    producto.id_producto, delta, StockMovementReason.AJUSTE,
+                    usuario=request.user, referencia=referencia,
+                )
+            except StockInsuficiente:
+                producto.refresh_from_db(fields=['stock'])
                 return APIResponse.bad_request(
-                    data={
+                    errors={
                         'stock_actual': producto.stock,
                         'cantidad_solicitada': cantidad,
                         'deficit': cantidad - producto.stock
                     },
                     message=Messages.PRODUCT_STOCK_INSUFFICIENT
                 )
-            producto.stock -= cantidad
-        elif tipo_ajuste == ProductConfig.STOCK_CORRECTION:
-            producto.stock = cantidad
-        
-        producto.save()
-        
+            stock_anterior = producto.stock - delta
+
         # Emitir señal para bitácora
         producto_stock_ajustado.send(
             sender=self.__class__,
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PromocionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.promocion'
+
+    def ready(self):
+        # Receivers que invalidan el índice del motor de precios
+        import apps.promocion.signals
@@ -0,0 +1,25 @@
+import django.contrib.postgres.fields.ranges
+import django.contrib.postgres.indexes
+from django.db import migrations
+from django.db.models import F, Func, Q, Value
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promocion', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='promocion',
+            index=django.contrib.postgres.indexes.GistIndex(
+                Func(
+                    F('fecha_inicio'), F('fecha_fin'), Value('[]'),
+                    function='daterange', output_field=django.contrib.postgres.fields.ranges.DateRangeField(),
+                ),
+                condition=Q(estado='ACTIVA'),
+                name='promocion_vigencia_gist',
+            ),
+        ),
+    ]
@@ -1,4 +1,7 @@
+from django.contrib.postgres.fields import DateRangeField
+from django.contrib.postgres.indexes import GistIndex
 from django.db import models
+from django.db.models import F, Func, Q, Value
 
 from core.constants.promocion import PromotionStatus, PromotionType
 
@@ -45,6 +48,17 @@ class Promocion(models.Model):
         db_table = 'promocion'
         managed = True
         ordering = ['-fecha_inicio', 'nombre']
+        indexes = [
+            # Solapamiento de vigencias (solapamiento_service); fechas nulas = sin límite
+            GistIndex(
+                Func(
+                    F('fecha_inicio'), F('fecha_fin'), Value('[]'),
+                    function='daterange', output_field=DateRangeField(),
+                ),
+                condition=Q(estado=PromotionStatus.ACTIVA),
+                name='promocion_vigencia_gist',
+            ),
+        ]
 
     def __str__(self):
         return self.nombre
@@ -1,10 +1,11 @@
-from django.db import transaction
+from django.conf import settings
 from rest_framework import serializers
 
-from core.constants.promocion import PromotionStatus, PromotionType
+from core.constants.promocion import PromotionType
 from core.constants import Messages
 
-from .models import Promocion, PromocionProducto
+from .models import Promocion
+from .services import solapamiento_service
 from apps.productos.models import Producto
 
 
@@ -33,7 +34,8 @@ class PromocionSerializer(serializers.ModelSerializer):
         ]
 
 
-class PromocionCreateSerializer(serializers.Serializer):
+class PromocionDatosSerializer(serializers.Serializer):
+    """Campos de una promoción nueva y sus validaciones sin base de datos."""
     nombre = serializers.CharField(max_length=50)
     descripcion = serializers.CharField(required=False, allow_blank=True, allow_null=True)
     codigo_descuento = serializers.CharField(max_length=20)
@@ -57,8 +59,6 @@ class PromocionCreateSerializer(serializers.Serializer):
         tipo = attrs.get('tipo')
         valor = attrs.get('valor_descuento')
         productos_ids = attrs.get('productos') or []
-        codigo = attrs.get('codigo_descuento')
-        nombre = attrs.get('nombre')
 
         if fin < inicio:
             raise serializers.ValidationError({'fecha_fin': Messages.PROMO_DATE_INVALID})
@@ -72,49 +72,85 @@ class PromocionCreateSerializer(serializers.Serializer):
             raise serializers.ValidationError({'productos': Messages.PROMO_PRODUCTS_REQUIRED})
 
         # Normalizar lista (sin duplicados)
-        productos_ids = list({str(pid) for pid in productos_ids})
-        attrs['productos'] = productos_ids
-
-        # Unicidad
-        if Promocion.objects.filter(codigo_descuento=codigo).exists():
-            raise serializers.ValidationError({'codigo_descuento': 'El código de descuento ya existe.'})
-        if Promocion.objects.filter(nombre=nombre).exists():
-            raise serializers.ValidationError({'nombre': 'El nombre de la promoción ya existe.'})
-
-        # Validar productos existentes
-        productos_encontrados = Producto.objects.filter(id_producto__in=productos_ids)
-        faltantes = set(productos_ids) - set(prod.id_producto for prod in productos_encontrados)
-        if faltantes:
-            raise serializers.ValidationError({'productos': f"Productos no encontrados: {', '.join(faltantes)}"})
+        attrs['productos'] = sorted({str(pid) for pid in productos_ids})
+        return attrs
 
-        # Validar solapamiento con promociones activas
-        promociones_conflictivas = Promocion.objects.filter(
-            estado=PromotionStatus.ACTIVA,
-            fecha_inicio__lte=fin,
-            fecha_fin__gte=inicio,
-        ).filter(
-            promociones_productos__producto_id__in=productos_ids
-        ).distinct()
 
-        if promociones_conflictivas.exists():
-            raise serializers.ValidationError({'productos': Messages.PROMO_CONFLICT})
+def _validar_contra_base(promociones):
+    """
+    Unicidad de código y nombre, productos existentes y solapamientos, con
+    una consulta por chequeo para todo el lote. Devuelve errores por índice.
+    """
+    errores = {}
+
+    def agregar(orden, campo, mensaje):
+        errores.setdefault(orden, {}).setdefault(campo, []).append(mensaje)
+
+    for campo, mensaje in (
+        ('codigo_descuento', 'El código de descuento ya existe.'),
+        ('nombre', 'El nombre de la promoción ya existe.'),
+    ):
+        valores = [promocion[campo] for promocion in promociones]
+        existentes = set(
+            Promocion.objects.filter(**{f'{campo}__in': valores}).values_list(campo, flat=True)
+        )
+        for orden, valor in enumerate(valores):
+            if valor in existentes or valores.index(valor) != orden:
+                agregar(orden, campo, mensaje)
+
+    pedidos = {pid for promocion in promociones for pid in promocion['productos']}
+    encontrados = set(
+        Producto.objects.filter(id_producto__in=pedidos).values_list('id_producto', flat=True)
+    )
+    for orden, promocion in enumerate(promociones):
+        faltantes = [pid for pid in promocion['productos'] if pid not in encontrados]
+        if faltantes:
+            agregar(orden, 'productos', f"Productos no encontrados: {', '.join(faltantes)}")
+
+    # Solapamiento con promociones activas y entre las del lote
+    conflictos = solapamiento_service.buscar_conflictos(promociones)
+    for conflicto in conflictos['existentes']:
+        agregar(
+            conflicto['orden'], 'conflictos',
+            f"{conflicto['id_producto']}: '{conflicto['nombre']}' "
+            f"({conflicto['fecha_inicio']} a {conflicto['fecha_fin']})",
+        )
+    for conflicto in conflictos['internos']:
+        agregar(
+            conflicto['orden'], 'conflictos',
+            f"{conflicto['id_producto']}: promoción #{conflicto['orden_conflicto'] + 1} del lote",
+        )
+    for orden in {c['orden'] for c in conflictos['existentes'] + conflictos['internos']}:
+        agregar(orden, 'productos', Messages.PROMO_CONFLICT)
+    return errores
+
+
+class PromocionCreateSerializer(PromocionDatosSerializer):
 
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        errores = _validar_contra_base([attrs])
+        if errores:
+            raise serializers.ValidationError(errores[0])
         return attrs
 
     def create(self, validated_data):
-        productos_ids = validated_data.pop('productos', [])
+        return solapamiento_service.crear_en_bloque([validated_data])[0]
 
-        with transaction.atomic():
-            promocion = Promocion.objects.create(
-                estado=PromotionStatus.ACTIVA,
-                **validated_data
+
+class PromocionBulkCreateSerializer(serializers.Serializer):
+    """Varias promociones en una operación: se crean todas o ninguna."""
+    promociones = PromocionDatosSerializer(many=True, allow_empty=False)
+
+    def validate_promociones(self, promociones):
+        if len(promociones) > settings.PROMOCIONES_BLOQUE_MAX:
+            raise serializers.ValidationError(
+                f"Máximo {settings.PROMOCIONES_BLOQUE_MAX} promociones por operación."
             )
-            promocion_productos = [
-                PromocionProducto(
-                    promocion=promocion,
-                    producto_id=pid
-                )
-                for pid in productos_ids
-            ]
-            PromocionProducto.objects.bulk_create(promocion_productos)
-        return promocion
+        errores = _validar_contra_base(promociones)
+        if errores:
+            raise serializers.ValidationError([errores.get(orden, {}) for orden in range(len(promociones))])
+        return promociones
+
+    def create(self, validated_data):
+        return solapamiento_service.crear_en_bloque(validated_data['promociones'])
@@ -0,0 +1,239 @@
+# apps/promocion/services/precios_service.py
+"""
+Motor de precios con promociones.
+
+Las promociones ACTIVA vigentes (o futuras) se cargan en memoria en un
+`IndicePromociones`: por producto, una lista ordenada de fronteras de
+fecha y, para cada tramo entre fronteras, las promociones que lo cubren.
+Saber qué promociones aplican a un producto en una fecha es un bisect, sin
+consultas. El índice se reconstruye (una consulta) cuando cambia una
+promoción o su lista de productos (apps.promocion.signals) y, como mucho,
+cada PROMOCIONES_INDICE_TTL segundos, que es lo que puede tardar en verse
+un cambio hecho en otro proceso.
+
+Descuento de cada tipo sobre una línea de `cantidad` unidades:
+
+    DESCUENTO_PORCENTAJE  valor % del importe de la línea
+    DESCUENTO_MONTO       valor por unidad (nunca más que el precio)
+    DOS_X_UNO             una unidad gratis por cada dos
+    COMBO                 valor % sobre los juegos completos: solo si el
+                          pedido trae todos los productos del combo
+
+Por línea se aplica la promoción que da el mayor descuento (no se
+acumulan). `cotizar()` precia un carrito o pedido completo y
+`precios_catalogo()` una página del catálogo, ambos en una llamada.
+"""
+import threading
+import time
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from django.conf import settings
+
+from apps.productos.models import Producto
+from apps.promocion.models import PromocionProducto
+from core.constants import PromotionStatus, PromotionType
+
+CENTAVO = Decimal('0.01')
+
+
+@dataclass(frozen=True)
+class PromocionVigente:
+    id_promocion: int
+    nombre: str
+    tipo: str
+    valor: Optional[Decimal]
+    fecha_inicio: Optional[date]
+    fecha_fin: Optional[date]
+    productos: FrozenSet[str]
+
+    def como_dict(self):
+        return {'id': self.id_promocion, 'nombre': self.nombre, 'tipo': self.tipo, 'valor': self.valor}
+
+
+class IndicePromociones:
+    """Promociones por producto y tramo de fechas (consulta por bisect)."""
+
+    def __init__(self, promociones):
+        por_producto = {}
+        for promocion in promociones:
+            for id_producto in promocion.productos:
+                por_producto.setdefault(id_producto, []).append(promocion)
+
+        self._tramos = {}
+        for id_producto, lista in por_producto.items():
+            lista.sort(key=lambda p: p.id_promocion)
+            fronteras = sorted(
+                {p.fecha_inicio or date.min for p in lista}
+                | {p.fecha_fin + timedelta(days=1) for p in lista if p.fecha_fin and p.fecha_fin < date.max}
+            )
+            activas = [
+                tuple(
+                    p for p in lista
+                    if (p.fecha_inicio or date.min) <= frontera
+                    and (p.fecha_fin is None or frontera <= p.fecha_fin)
+                )
+                for frontera in fronteras
+            ]
+            self._tramos[id_producto] = (fronteras, activas)
+        self.promociones = len({p.id_promocion for lista in por_producto.values() for p in lista})
+        self.productos = len(self._tramos)
+
+    def vigentes(self, id_producto, fecha) -> Tuple[PromocionVigente, ...]:
+        tramos = self._tramos.get(id_producto)
+        if tramos is None:
+            return ()
+        fronteras, activas = tramos
+        i = bisect_right(fronteras, fecha) - 1
+        return activas[i] if i >= 0 else ()
+
+
+def cargar(hoy=None) -> IndicePromociones:
+    """Construye el índice con las promociones ACTIVA no vencidas (1 consulta)."""
+    hoy = hoy or date.today()
+    filas = (
+        PromocionProducto.objects
+        .filter(promocion__estado=PromotionStatus.ACTIVA)
+        .exclude(promocion__fecha_fin__lt=hoy)
+        .values_list(
+            'promocion_id', 'producto_id', 'promocion__nombre', 'promocion__tipo',
+            'promocion__valor_descuento', 'promocion__fecha_inicio', 'promocion__fecha_fin',
+        )
+    )
+    datos, productos = {}, {}
+    for id_promocion, id_producto, *resto in filas:
+        datos[id_promocion] = resto
+        productos.setdefault(id_promocion, set()).add(id_producto)
+    return IndicePromociones(
+        PromocionVigente(id_promocion, *datos[id_promocion], frozenset(productos[id_promocion]))
+        for id_promocion in datos
+    )
+
+
+_indice: Optional[IndicePromociones] = None
+_expira = 0.0
+_indice_lock = threading.Lock()
+
+
+def get_indice() -> IndicePromociones:
+    global _indice, _expira
+    with _indice_lock:
+        if _indice is None or _expira <= time.monotonic():
+            _indice = cargar()
+            _expira = time.monotonic() + settings.PROMOCIONES_INDICE_TTL
+        return _indice
+
+
+def invalidar() -> None:
+    """Descarta el índice; se reconstruye en el próximo uso."""
+    global _indice
+    with _indice_lock:
+        _indice = None
+
+
+def descuento(promocion, precio, cantidad, cantidades) -> Decimal:
+    """Descuento de `promocion` sobre una línea; `cantidades` es todo el pedido."""
+    importe = precio * cantidad
+    valor = promocion.valor or Decimal('0')
+    if promocion.tipo == PromotionType.PORCENTAJE:
+        monto = importe * valor / 100
+    elif promocion.tipo == PromotionType.MONTO:
+        monto = min(valor, precio) * cantidad
+    elif promocion.tipo == PromotionType.DOS_POR_UNO:
+        monto = precio * (cantidad // 2)
+    elif promocion.tipo == PromotionType.COMBO:
+        if not promocion.productos <= cantidades.keys():
+            return Decimal('0')
+        juegos = min(cantidades[id_producto] for id_producto in promocion.productos)
+        monto = precio * min(juegos, cantidad) * valor / 100
+    else:
+        return Decimal('0')
+    return min(Decimal(monto).quantize(CENTAVO, rounding=ROUND_HALF_UP), importe)
+
+
+def cotizar(lineas, productos=None, fecha=None, indice=None) -> Dict:
+    """
+    Precia un pedido completo con la mejor promoción de cada línea.
+
+    Args:
+        lineas: dicts con id_producto y cantidad.
+        productos: {id_producto: Producto} ya cargados; si no, una consulta.
+            Las líneas de productos inexistentes se omiten.
+
+    Returns:
+        dict: lineas (precio_unitario, subtotal, descuento, total, promocion),
+        subtotal, descuento, total y principal (id de la promoción que más
+        descuenta, o None).
+    """
+    fecha = fecha or date.today()
+    indice = indice or get_indice()
+    if productos is None:
+        productos = Producto.objects.only('id_producto', 'precio').in_bulk(
+            {linea['id_producto'] for linea in lineas}
+        )
+
+    cantidades = {}
+    for linea in lineas:
+        if linea['id_producto'] in productos:
+            cantidades[linea['id_producto']] = cantidades.get(linea['id_producto'], 0) + linea['cantidad']
+
+    resultado, por_promocion = [], {}
+    subtotal = total_descuento = Decimal('0')
+    for linea in lineas:
+        producto = productos.get(linea['id_producto'])
+        if producto is None:
+            continue
+        cantidad = linea['cantidad']
+        mejor, monto = None, Decimal('0')
+        for promocion in indice.vigentes(producto.id_producto, fecha):
+            candidato = descuento(promocion, producto.precio, cantidad, cantidades)
+            if candidato > monto:
+                mejor, monto = promocion, candidato
+        importe = producto.precio * cantidad
+        resultado.append({
+            'id_producto': producto.id_producto,
+            'cantidad': cantidad,
+            'precio_unitario': producto.precio,
+            'subtotal': importe,
+            'descuento': monto,
+            'total': importe - monto,
+            'promocion': mejor.como_dict() if mejor else None,
+        })
+        subtotal += importe
+        total_descuento += monto
+        if mejor:
+            por_promocion[mejor.id_promocion] = por_promocion.get(mejor.id_promocion, 0) + monto
+
+    return {
+        'lineas': resultado,
+        'subtotal': subtotal,
+        'descuento': total_descuento,
+        'total': subtotal - total_descuento,
+        'principal': max(por_promocion, key=por_promocion.get) if por_promocion else None,
+    }
+
+
+def precios_catalogo(productos, fecha=None, indice=None) -> Dict[str, Dict]:
+    """
+    Precio unitario de cada producto (página del catálogo), sin consultas.
+    Cada producto se precia solo: un COMBO nunca aplica aquí, pero figura
+    en `promociones` junto con las demás vigentes.
+    """
+    fecha = fecha or date.today()
+    indice = indice or get_indice()
+    precios = {}
+    for producto in productos:
+        vigentes = indice.vigentes(producto.id_producto, fecha)
+        monto = max(
+            (descuento(p, producto.precio, 1, {producto.id_producto: 1}) for p in vigentes),
+            default=Decimal('0'),
+        )
+        precios[producto.id_producto] = {
+            'precio_final': producto.precio - monto,
+            'descuento': monto,
+            'promociones': [p.como_dict() for p in vigentes],
+        }
+    return precios
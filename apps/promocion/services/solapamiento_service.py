@@ -0,0 +1,269 @@
+# apps/promocion/services/solapamiento_service.py
+"""
+Detección de solapamientos entre promociones.
+
+Un producto no puede estar en dos promociones ACTIVA con vigencias que se
+crucen (fechas inclusive; una fecha nula es un extremo abierto).
+`buscar_conflictos()` recibe una o muchas promociones propuestas y
+devuelve TODOS los pares (producto, promoción) en conflicto:
+
+  - Contra la base, en una sola consulta. En PostgreSQL las propuestas
+    entran como arrays (unnest) y se cruzan con `&&` sobre
+    daterange(fecha_inicio, fecha_fin, '[]'), la misma expresión del
+    índice GiST parcial promocion_vigencia_gist. En otros motores se
+    cargan (una consulta) las promociones activas de los productos
+    involucrados y se consultan con un árbol de intervalos en memoria.
+  - Entre las propias propuestas, siempre con árboles en memoria.
+
+`crear_en_bloque()` y `activar()` son las únicas escrituras que pueden
+crear un solapamiento. Ambas bloquean (FOR UPDATE, en orden de id) los
+productos afectados y vuelven a consultar los conflictos dentro de la
+misma transacción: dos requests simultáneos sobre un mismo producto se
+serializan y el segundo ve lo que insertó el primero. La validación del
+serializer se hace antes y sin bloqueo, solo para informar los errores.
+"""
+from datetime import date
+
+from django.db import connection, transaction
+
+from apps.productos.models import Producto
+from apps.promocion.models import Promocion, PromocionProducto
+from core.constants import PromotionStatus
+
+from . import precios_service
+
+CONFLICTOS_SQL = """
+WITH propuestas (orden, id_producto, inicio, fin) AS (
+    SELECT * FROM unnest(%s::int[], %s::varchar[], %s::date[], %s::date[])
+)
+SELECT n.orden, n.id_producto, p.id_promocion, p.nombre, p.fecha_inicio, p.fecha_fin
+  FROM propuestas n
+  JOIN promocion_producto pp ON pp.id_producto = n.id_producto
+  JOIN promocion p ON p.id_promocion = pp.id_promocion
+ WHERE p.estado = %s
+   AND daterange(p.fecha_inicio, p.fecha_fin, '[]') && daterange(n.inicio, n.fin, '[]')
+   AND NOT (p.id_promocion = ANY(%s::int[]))
+ ORDER BY n.orden, n.id_producto, p.id_promocion
+"""
+
+
+class ConflictoVigencia(Exception):
+    """Algún producto ya está en una promoción ACTIVA con vigencia cruzada."""
+
+    def __init__(self, conflictos):
+        super().__init__(f"{len(conflictos)} conflictos de vigencia")
+        self.conflictos = conflictos
+
+
+class ArbolIntervalos:
+    """
+    Árbol de intervalos centrado, estático. Intervalos cerrados
+    (inicio, fin, dato) con None como extremo abierto.
+    """
+
+    def __init__(self, intervalos):
+        intervalos = [
+            (inicio or date.min, fin or date.max, dato) for inicio, fin, dato in intervalos
+        ]
+        self.izquierda = self.derecha = None
+        self.por_inicio = self.por_fin = []
+        if not intervalos:
+            self.centro = None
+            return
+
+        extremos = sorted(extremo for inicio, fin, _ in intervalos for extremo in (inicio, fin))
+        self.centro = extremos[len(extremos) // 2]
+        izquierda, derecha, aqui = [], [], []
+        for intervalo in intervalos:
+            if intervalo[1] < self.centro:
+                izquierda.append(intervalo)
+            elif intervalo[0] > self.centro:
+                derecha.append(intervalo)
+            else:
+                aqui.append(intervalo)
+        # Los que cruzan el centro, ordenados para cortar la búsqueda antes
+        self.por_inicio = sorted(aqui, key=lambda i: i[0])
+        self.por_fin = sorted(aqui, key=lambda i: i[1], reverse=True)
+        if izquierda:
+            self.izquierda = ArbolIntervalos(izquierda)
+        if derecha:
+            self.derecha = ArbolIntervalos(derecha)
+
+    def solapados(self, inicio, fin):
+        """Datos de los intervalos que se cruzan con [inicio, fin]."""
+        inicio, fin = inicio or date.min, fin or date.max
+        encontrados, pendientes = [], [self]
+        while pendientes:
+            nodo = pendientes.pop()
+            if nodo is None or nodo.centro is None:
+                continue
+            if fin < nodo.centro:
+                for intervalo in nodo.por_inicio:
+                    if intervalo[0] > fin:
+                        break
+                    encontrados.append(intervalo[2])
+                pendientes.append(nodo.izquierda)
+            elif inicio > nodo.centro:
+                for intervalo in nodo.por_fin:
+                    if intervalo[1] < inicio:
+                        break
+                    encontrados.append(intervalo[2])
+                pendientes.append(nodo.derecha)
+            else:
+                encontrados.extend(intervalo[2] for intervalo in nodo.por_inicio)
+                pendientes.extend((nodo.izquierda, nodo.derecha))
+        return encontrados
+
+
+def _filas(propuestas):
+    """(orden, id_producto, inicio, fin) por cada producto de cada propuesta."""
+    return [
+        (orden, str(id_producto), propuesta.get('fecha_inicio'), propuesta.get('fecha_fin'))
+        for orden, propuesta in enumerate(propuestas)
+        for id_producto in propuesta['productos']
+    ]
+
+
+def _conflictos_postgres(filas, excluir):
+    ordenes, productos, inicios, fines = (list(columna) for columna in zip(*filas))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            CONFLICTOS_SQL,
+            [ordenes, productos, inicios, fines, PromotionStatus.ACTIVA, list(excluir)],
+        )
+        return [
+            {
+                'orden': orden, 'id_producto': id_producto, 'id_promocion': id_promocion,
+                'nombre': nombre, 'fecha_inicio': inicio, 'fecha_fin': fin,
+            }
+            for orden, id_producto, id_promocion, nombre, inicio, fin in cursor.fetchall()
+        ]
+
+
+def _conflictos_memoria(filas, excluir):
+    existentes = (
+        PromocionProducto.objects
+        .filter(promocion__estado=PromotionStatus.ACTIVA, producto_id__in={f[1] for f in filas})
+        .exclude(promocion_id__in=excluir)
+        .values_list(
+            'producto_id', 'promocion_id', 'promocion__nombre',
+            'promocion__fecha_inicio', 'promocion__fecha_fin',
+        )
+    )
+    por_producto = {}
+    for id_producto, id_promocion, nombre, inicio, fin in existentes:
+        por_producto.setdefault(id_producto, []).append(
+            (inicio, fin, {'id_promocion': id_promocion, 'nombre': nombre, 'fecha_inicio': inicio, 'fecha_fin': fin})
+        )
+    arboles = {id_producto: ArbolIntervalos(lista) for id_producto, lista in por_producto.items()}
+
+    conflictos = []
+    for orden, id_producto, inicio, fin in filas:
+        arbol = arboles.get(id_producto)
+        if arbol is None:
+            continue
+        for dato in sorted(arbol.solapados(inicio, fin), key=lambda d: d['id_promocion']):
+            conflictos.append({'orden': orden, 'id_producto': id_producto, **dato})
+    return conflictos
+
+
+def _conflictos_internos(filas):
+    """Pares de propuestas del mismo lote que comparten producto y fechas."""
+    por_producto = {}
+    for orden, id_producto, inicio, fin in filas:
+        por_producto.setdefault(id_producto, []).append((inicio, fin, orden))
+
+    conflictos = []
+    for id_producto, lista in por_producto.items():
+        if len(lista) < 2:
+            continue
+        arbol = ArbolIntervalos(lista)
+        for inicio, fin, orden in lista:
+            for otra in sorted(arbol.solapados(inicio, fin)):
+                if otra != orden:
+                    conflictos.append({'orden': orden, 'id_producto': id_producto, 'orden_conflicto': otra})
+    return sorted(conflictos, key=lambda c: (c['orden'], c['id_producto'], c['orden_conflicto']))
+
+
+def buscar_conflictos(propuestas, excluir=()):
+    """
+    Args:
+        propuestas: dicts con fecha_inicio, fecha_fin y productos (ids).
+        excluir: ids de promociones existentes que no cuentan (p. ej. la
+            que se está extendiendo).
+
+    Returns:
+        dict: existentes (orden de la propuesta, id_producto, id_promocion,
+        nombre y fechas de la promoción activa) e internos (orden,
+        id_producto, orden_conflicto entre propuestas del mismo lote).
+    """
+    filas = _filas(propuestas)
+    if not filas:
+        return {'existentes': [], 'internos': []}
+    if connection.vendor == 'postgresql':
+        existentes = _conflictos_postgres(filas, excluir)
+    else:
+        existentes = _conflictos_memoria(filas, excluir)
+    return {'existentes': existentes, 'internos': _conflictos_internos(filas)}
+
+
+def _bloquear_productos(propuestas):
+    """FOR UPDATE sobre los productos de las propuestas (requiere transacción)."""
+    ids = sorted({str(id_producto) for propuesta in propuestas for id_producto in propuesta['productos']})
+    list(Producto.objects.select_for_update().filter(id_producto__in=ids).order_by('id_producto'))
+
+
+def _verificar(propuestas, excluir=()):
+    _bloquear_productos(propuestas)
+    conflictos = buscar_conflictos(propuestas, excluir)['existentes']
+    if conflictos:
+        raise ConflictoVigencia(conflictos)
+
+
+@transaction.atomic
+def crear_en_bloque(propuestas):
+    """
+    Crea promociones ACTIVA ya validadas (productos como ids) con un
+    bulk_create de promociones y otro de sus productos.
+
+    Raises:
+        ConflictoVigencia: si otra promoción activa se cruzó desde la validación.
+    """
+    _verificar(propuestas)
+    promociones = Promocion.objects.bulk_create([
+        Promocion(
+            estado=PromotionStatus.ACTIVA,
+            **{campo: valor for campo, valor in propuesta.items() if campo != 'productos'},
+        )
+        for propuesta in propuestas
+    ])
+    PromocionProducto.objects.bulk_create([
+        PromocionProducto(promocion=promocion, producto_id=id_producto)
+        for promocion, propuesta in zip(promociones, propuestas)
+        for id_producto in propuesta['productos']
+    ])
+    # bulk_create no emite post_save: el índice de precios se invalida aquí
+    transaction.on_commit(precios_service.invalidar)
+    return promociones
+
+
+@transaction.atomic
+def activar(promocion):
+    """
+    Vuelve a ACTIVA una promoción inactiva.
+
+    Raises:
+        ConflictoVigencia: si alguno de sus productos está en otra promoción
+            activa con vigencia cruzada.
+    """
+    _verificar(
+        [{
+            'fecha_inicio': promocion.fecha_inicio,
+            'fecha_fin': promocion.fecha_fin,
+            'productos': list(promocion.productos.values_list('id_producto', flat=True)),
+        }],
+        excluir=[promocion.id_promocion],
+    )
+    promocion.estado = PromotionStatus.ACTIVA
+    promocion.save(update_fields=['estado'])
+    return promocion
@@ -0,0 +1,21 @@
+"""
+Invalidación del índice de promociones del motor de precios.
+
+Se difiere al commit: reconstruido dentro de la transacción, el índice
+podría leer la promoción sin sus productos (se insertan después con
+bulk_create, que no emite señales) o cachear datos que luego se revierten.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Promocion, PromocionProducto
+from .services import precios_service
+
+
+@receiver(post_save, sender=Promocion)
+@receiver(post_delete, sender=Promocion)
+@receiver(post_save, sender=PromocionProducto)
+@receiver(post_delete, sender=PromocionProducto)
+def invalidar_indice_promociones(sender, **kwargs):
+    transaction.on_commit(precios_service.invalidar)
@@ -1,3 +1,240 @@
-from django.test import TestCase
+import random
+import threading
+import time
+import unittest
+from datetime import date, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TransactionTestCase
+
+from apps.categoria.models import Categoria
+from apps.productos.models import Producto
+from apps.promocion.models import Promocion, PromocionProducto
+from apps.promocion.serializers import PromocionBulkCreateSerializer
+from apps.promocion.services import precios_service, solapamiento_service
+from apps.promocion.services.precios_service import IndicePromociones, PromocionVigente
+from apps.promocion.services.solapamiento_service import ArbolIntervalos
+from core.constants import PromotionStatus, PromotionType
+
+
+def _promocion(id_promocion, tipo, valor, productos, inicio=None, fin=None):
+    return PromocionVigente(
+        id_promocion, f'Promo {id_promocion}', tipo, valor and Decimal(valor),
+        inicio, fin, frozenset(productos),
+    )
+
+
+class MotorPreciosTests(SimpleTestCase):
+
+    def setUp(self):
+        self.indice = IndicePromociones([
+            _promocion(1, PromotionType.PORCENTAJE, '10', ['A', 'B'], date(2025, 1, 1), date(2025, 1, 31)),
+            _promocion(2, PromotionType.MONTO, '15', ['A'], date(2025, 1, 20), date(2025, 2, 10)),
+            _promocion(3, PromotionType.DOS_POR_UNO, None, ['B'], date(2025, 3, 1)),
+            _promocion(4, PromotionType.COMBO, '50', ['A', 'C'], None, date(2025, 12, 31)),
+        ])
+        self.productos = {
+            id_producto: Producto(id_producto=id_producto, precio=Decimal(precio))
+            for id_producto, precio in (('A', '100.00'), ('B', '30.00'), ('C', '40.00'))
+        }
+
+    def test_indice_por_tramos_de_fecha(self):
+        vigentes = lambda id_producto, fecha: [p.id_promocion for p in self.indice.vigentes(id_producto, fecha)]
+        self.assertEqual(vigentes('A', date(2024, 6, 1)), [4])
+        self.assertEqual(vigentes('A', date(2025, 1, 25)), [1, 2, 4])
+        self.assertEqual(vigentes('A', date(2025, 2, 1)), [2, 4])
+        self.assertEqual(vigentes('A', date(2026, 1, 1)), [])
+        self.assertEqual(vigentes('B', date(2025, 2, 15)), [])
+        self.assertEqual(vigentes('B', date(2030, 1, 1)), [3])
+        self.assertEqual(vigentes('Z', date(2025, 1, 25)), [])
+
+    def test_cotizar_aplica_la_mejor_promocion_por_linea(self):
+        cotizar = lambda lineas, fecha: precios_service.cotizar(
+            lineas, productos=self.productos, fecha=fecha, indice=self.indice
+        )
+
+        # 25/01: A tiene 10% (20.00) y 15 por unidad (30.00); B solo 10%
+        cotizacion = cotizar([{'id_producto': 'A', 'cantidad': 2}, {'id_producto': 'B', 'cantidad': 1}],
+                             date(2025, 1, 25))
+        self.assertEqual(
+            [(l['id_producto'], l['descuento'], l['promocion']['id']) for l in cotizacion['lineas']],
+            [('A', Decimal('30.00'), 2), ('B', Decimal('3.00'), 1)],
+        )
+        self.assertEqual((cotizacion['total'], cotizacion['principal']), (Decimal('197.00'), 2))
+
+        # 2x1: 3 unidades pagan 2
+        cotizacion = cotizar([{'id_producto': 'B', 'cantidad': 3}], date(2025, 3, 5))
+        self.assertEqual(cotizacion['total'], Decimal('60.00'))
+
+        # Combo 50% solo con A y C en el pedido, sobre los juegos completos
+        sin_c = cotizar([{'id_producto': 'A', 'cantidad': 1}], date(2025, 6, 1))
+        self.assertEqual(sin_c['descuento'], Decimal('0'))
+        con_c = cotizar([{'id_producto': 'A', 'cantidad': 2}, {'id_producto': 'C', 'cantidad': 1}],
+                        date(2025, 6, 1))
+        self.assertEqual([l['descuento'] for l in con_c['lineas']], [Decimal('50.00'), Decimal('20.00')])
+
+    def test_precios_catalogo_por_unidad(self):
+        precios = precios_service.precios_catalogo(
+            self.productos.values(), fecha=date(2025, 1, 25), indice=self.indice
+        )
+        self.assertEqual(precios['A']['precio_final'], Decimal('85.00'))
+        self.assertEqual(precios['B']['precio_final'], Decimal('27.00'))
+        # El combo figura pero no rebaja el precio unitario
+        self.assertEqual(precios['C']['precio_final'], Decimal('40.00'))
+        self.assertEqual([p['id'] for p in precios['C']['promociones']], [4])
+
+
+class ArbolIntervalosTests(SimpleTestCase):
+
+    def test_solapados_igual_que_fuerza_bruta(self):
+        rnd = random.Random(7)
+        base = date(2025, 1, 1)
+        intervalos = []
+        for i in range(300):
+            inicio = base + timedelta(days=rnd.randint(0, 365))
+            fin = inicio + timedelta(days=rnd.randint(0, 40))
+            intervalos.append((None if i % 50 == 0 else inicio, None if i % 70 == 0 else fin, i))
+        arbol = ArbolIntervalos(intervalos)
+
+        for _ in range(200):
+            inicio = base + timedelta(days=rnd.randint(-20, 400))
+            fin = inicio + timedelta(days=rnd.randint(0, 30))
+            esperados = sorted(
+                dato for a, b, dato in intervalos
+                if (a or date.min) <= fin and inicio <= (b or date.max)
+            )
+            self.assertEqual(sorted(arbol.solapados(inicio, fin)), esperados)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Requiere PostgreSQL')
+class SolapamientoTests(TransactionTestCase):
+    available_apps = ['apps.promocion', 'apps.productos', 'apps.categoria']
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        existentes = set(connection.introspection.table_names())
+        cls._modelos = [
+            m for m in (Categoria, Producto)
+            if m._meta.db_table not in existentes
+        ]
+        with connection.schema_editor() as editor:
+            for modelo in cls._modelos:
+                editor.create_model(modelo)
+
+    @classmethod
+    def tearDownClass(cls):
+        with connection.schema_editor() as editor:
+            for modelo in reversed(cls._modelos):
+                editor.delete_model(modelo)
+        super().tearDownClass()
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre='Lentes')
+        for i in range(1, 4):
+            Producto.objects.create(
+                id_producto=f'P000{i}', nombre=f'Lente {i}', precio=Decimal('10.00'),
+                stock=5, descripcion='-', estado_producto='ACTIVO', id_categoria=categoria,
+            )
+        self.addCleanup(Categoria.objects.filter(pk=categoria.pk).delete)
+        self.addCleanup(Producto.objects.all().delete)
+        self.addCleanup(Promocion.objects.all().delete)
+
+        solapamiento_service.crear_en_bloque([{
+            'nombre': 'Enero', 'codigo_descuento': 'ENE', 'tipo': PromotionType.PORCENTAJE,
+            'valor_descuento': Decimal('10'), 'fecha_inicio': date(2025, 1, 1),
+            'fecha_fin': date(2025, 1, 31), 'productos': ['P0001', 'P0002'],
+        }])
+
+    def test_conflictos_en_una_consulta_y_en_memoria(self):
+        propuestas = [
+            {'fecha_inicio': date(2025, 1, 31), 'fecha_fin': date(2025, 2, 5), 'productos': ['P0002', 'P0003']},
+            {'fecha_inicio': date(2025, 2, 1), 'fecha_fin': date(2025, 2, 28), 'productos': ['P0001', 'P0003']},
+        ]
+        with self.assertNumQueries(1):
+            conflictos = solapamiento_service.buscar_conflictos(propuestas)
+        self.assertEqual(
+            [(c['orden'], c['id_producto'], c['nombre']) for c in conflictos['existentes']],
+            [(0, 'P0002', 'Enero')],
+        )
+        self.assertEqual(
+            [(c['orden'], c['id_producto'], c['orden_conflicto']) for c in conflictos['internos']],
+            [(0, 'P0003', 1), (1, 'P0003', 0)],
+        )
+
+        filas = solapamiento_service._filas(propuestas)
+        self.assertEqual(
+            solapamiento_service._conflictos_memoria(filas, ()),
+            conflictos['existentes'],
+        )
+
+    def test_creacion_en_bloque_informa_cada_conflicto(self):
+        datos = lambda codigo, inicio, fin, productos: {
+            'nombre': codigo, 'codigo_descuento': codigo, 'tipo': PromotionType.DOS_POR_UNO,
+            'fecha_inicio': inicio, 'fecha_fin': fin, 'productos': productos,
+        }
+        serializer = PromocionBulkCreateSerializer(data={'promociones': [
+            datos('FEB', '2025-02-01', '2025-02-28', ['P0001', 'P0002']),
+            datos('CRUCE', '2025-01-15', '2025-02-15', ['P0003', 'P0002']),
+        ]})
+        self.assertFalse(serializer.is_valid())
+        errores = serializer.errors['promociones']
+        self.assertEqual(errores[0]['conflictos'], ['P0002: promoción #2 del lote'])
+        self.assertEqual(
+            errores[1]['conflictos'],
+            ["P0002: 'Enero' (2025-01-01 a 2025-01-31)", 'P0002: promoción #1 del lote'],
+        )
+
+        serializer = PromocionBulkCreateSerializer(data={'promociones': [
+            datos('FEB', '2025-02-01', '2025-02-28', ['P0001', 'P0002']),
+            datos('MAR', '2025-03-01', '2025-03-31', ['P0003']),
+        ]})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        creadas = serializer.save()
+        self.assertEqual(
+            sorted(Promocion.objects.filter(pk__in=[p.pk for p in creadas]).values_list('codigo_descuento', flat=True)),
+            ['FEB', 'MAR'],
+        )
+
+    def test_creaciones_simultaneas_no_dejan_solapamientos(self):
+        datos = lambda codigo: {
+            'nombre': codigo, 'codigo_descuento': codigo, 'tipo': PromotionType.DOS_POR_UNO,
+            'fecha_inicio': date(2025, 3, 1), 'fecha_fin': date(2025, 3, 31), 'productos': ['P0003'],
+        }
+        bloqueado = threading.Event()
+
+        def otra_transaccion():
+            # Otro request: ya validó, bloqueó P0003 e insertó, pero aún no confirma
+            try:
+                with transaction.atomic():
+                    solapamiento_service._bloquear_productos([datos('OTRA')])
+                    promocion = Promocion.objects.create(
+                        **{k: v for k, v in datos('OTRA').items() if k != 'productos'}
+                    )
+                    PromocionProducto.objects.create(promocion=promocion, producto_id='P0003')
+                    bloqueado.set()
+                    time.sleep(0.3)
+            finally:
+                connection.close()
+
+        hilo = threading.Thread(target=otra_transaccion)
+        hilo.start()
+        bloqueado.wait(5)
+        with self.assertRaises(solapamiento_service.ConflictoVigencia) as ctx:
+            solapamiento_service.crear_en_bloque([datos('MAR')])
+        hilo.join()
+
+        self.assertEqual([c['nombre'] for c in ctx.exception.conflictos], ['OTRA'])
+        self.assertFalse(Promocion.objects.filter(codigo_descuento='MAR').exists())
+
+        # activar() toma el mismo bloqueo y rechaza reactivar la que se cruza
+        Promocion.objects.filter(codigo_descuento='OTRA').update(estado=PromotionStatus.INACTIVA)
+        marzo = solapamiento_service.crear_en_bloque([datos('MAR')])[0]
+        otra = Promocion.objects.get(codigo_descuento='OTRA')
+        with self.assertRaises(solapamiento_service.ConflictoVigencia):
+            solapamiento_service.activar(otra)
+        marzo.estado = PromotionStatus.INACTIVA
+        marzo.save(update_fields=['estado'])
+        solapamiento_service.activar(otra)
+        self.assertEqual(Promocion.objects.get(pk=otra.pk).estado, PromotionStatus.ACTIVA)
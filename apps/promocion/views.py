@@ -6,7 +6,8 @@ from rest_framework.permissions import IsAdminUser
 from core.constants import APIResponse, Messages
 from core.constants.promocion import PromotionStatus
 from .models import Promocion
-from .serializers import PromocionSerializer, PromocionCreateSerializer
+from .services import solapamiento_service
+from .serializers import PromocionBulkCreateSerializer, PromocionCreateSerializer, PromocionSerializer
 
 
 class PromocionViewSet(viewsets.ModelViewSet):
@@ -20,6 +21,8 @@ class PromocionViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         if self.action in ['create']:
             return PromocionCreateSerializer
+        if self.action == 'bloque':
+            return PromocionBulkCreateSerializer
         return PromocionSerializer
 
     def list(self, request, *args, **kwargs):
@@ -35,10 +38,32 @@ class PromocionViewSet(viewsets.ModelViewSet):
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        promocion = serializer.save()
+        try:
+            promocion = serializer.save()
+        except solapamiento_service.ConflictoVigencia as e:
+            return APIResponse.bad_request(message=Messages.PROMO_CONFLICT, errors=e.conflictos)
         response_data = PromocionSerializer(promocion).data
         return APIResponse.created(message=Messages.PROMO_CREATED, data=response_data)
 
+    @action(detail=False, methods=['post'])
+    def bloque(self, request):
+        """
+        Crea varias promociones en una operación (todas o ninguna).
+        POST /api/promociones/bloque/  {"promociones": [{...}, {...}]}
+        Los conflictos de vigencia se informan por promoción y producto.
+        """
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return APIResponse.bad_request(errors=serializer.errors)
+        try:
+            promociones = serializer.save()
+        except solapamiento_service.ConflictoVigencia as e:
+            return APIResponse.bad_request(message=Messages.PROMO_CONFLICT, errors=e.conflictos)
+        return APIResponse.created(
+            message=Messages.PROMOS_BULK_CREATED.format(total=len(promociones)),
+            data={'ids': [promocion.id_promocion for promocion in promociones]},
+        )
+
     @action(detail=True, methods=['post'])
     @transaction.atomic
     def desactivar(self, request, pk=None):
@@ -55,6 +80,8 @@ class PromocionViewSet(viewsets.ModelViewSet):
         promocion = self.get_object()
         if promocion.estado == PromotionStatus.ACTIVA:
             return APIResponse.success(message=Messages.PROMO_ALREADY_ACTIVE)
-        promocion.estado = PromotionStatus.ACTIVA
-        promocion.save(update_fields=['estado'])
+        try:
+            solapamiento_service.activar(promocion)
+        except solapamiento_service.ConflictoVigencia as e:
+            return APIResponse.bad_request(message=Messages.PROMO_CONFLICT, errors=e.conflictos)
         return APIResponse.success(message=Messages.PROMO_ACTIVATED)
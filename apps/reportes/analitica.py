@@ -0,0 +1,215 @@
+"""
+Analítica vectorizada para los reportes de productos más vendidos e inventario.
+
+Las columnas necesarias se leen de hecho_venta_diaria (e inventario) y se
+pasan a arreglos NumPy; ranking, participación acumulada, clasificación
+ABC, rotación y días de cobertura se calculan sobre el arreglo completo,
+sin recorrer filas en Python. Solo las filas que se devuelven se arman
+como dicts.
+"""
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import HechoVentaDiaria
+
+# Clasificación ABC (Pareto) por participación acumulada en el monto vendido
+UMBRAL_A = 0.80
+UMBRAL_B = 0.95
+
+# Requerimiento: stock bajo si cantidad_actual <= 10
+STOCK_BAJO = 10
+
+# Ventana de ventas para rotación y cobertura si el filtro no trae rango
+DIAS_VENTANA_INVENTARIO = 30
+
+
+def _columnas(filas: Sequence[tuple], tipos: Sequence[Any]) -> List[np.ndarray]:
+    """Transpone filas de values_list en un arreglo por columna."""
+    n = len(filas)
+    if not n:
+        return [np.empty(0, dtype=tipo) for tipo in tipos]
+    return [
+        np.fromiter(columna, dtype=tipo, count=n) if tipo is not object else np.array(columna, dtype=object)
+        for columna, tipo in zip(zip(*filas), tipos)
+    ]
+
+
+def _fecha(valor) -> Optional[date]:
+    if not valor:
+        return None
+    if isinstance(valor, date):
+        return valor
+    return parse_date(str(valor))
+
+
+def _dividir(numerador: np.ndarray, denominador: np.ndarray) -> np.ndarray:
+    """numerador / denominador con NaN donde el denominador es 0."""
+    resultado = np.full(numerador.shape, np.nan)
+    np.divide(numerador, denominador, out=resultado, where=denominador != 0)
+    return resultado
+
+
+def _redondear(arreglo: np.ndarray, decimales: int) -> List[Any]:
+    """Lista JSON-serializable: NaN pasa a None."""
+    redondeado = np.round(arreglo, decimales)
+    return np.where(np.isnan(redondeado), None, redondeado).tolist()
+
+
+def alinear(claves: np.ndarray, claves_valores: np.ndarray, valores: np.ndarray) -> np.ndarray:
+    """valores[k] para cada k de claves (0 si no está), sin recorrer en Python."""
+    resultado = np.zeros(claves.shape, dtype=valores.dtype)
+    if not len(claves_valores):
+        return resultado
+    orden = np.argsort(claves_valores)
+    ordenadas = claves_valores[orden]
+    posiciones = np.searchsorted(ordenadas, claves).clip(max=len(ordenadas) - 1)
+    encontradas = ordenadas[posiciones] == claves
+    resultado[encontradas] = valores[orden][posiciones[encontradas]]
+    return resultado
+
+
+def clasificar_abc(montos: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Participación y clase ABC por elemento (en el orden original).
+
+    Un elemento es A si lo acumulado antes de él no llega a UMBRAL_A, B si no
+    llega a UMBRAL_B, y C en otro caso; así el elemento que cruza el umbral
+    queda en la clase superior.
+    """
+    total = montos.sum()
+    participacion = montos / total if total else np.zeros(montos.shape)
+
+    orden = np.argsort(-montos, kind="stable")
+    acumulada_ordenada = np.cumsum(participacion[orden])
+    previa = acumulada_ordenada - participacion[orden]
+    clase_ordenada = np.where(previa < UMBRAL_A, "A", np.where(previa < UMBRAL_B, "B", "C"))
+
+    acumulada = np.empty_like(acumulada_ordenada)
+    acumulada[orden] = acumulada_ordenada
+    clase = np.empty(montos.shape, dtype="<U1")
+    clase[orden] = clase_ordenada
+    return {"participacion": participacion, "acumulada": acumulada, "clase": clase}
+
+
+def metricas_productos(ids: np.ndarray, cantidades: np.ndarray, montos: np.ndarray, top: int) -> Dict[str, Any]:
+    """
+    Ranking por cantidad (desc, id asc; solo los `top` primeros índices),
+    participación, participación acumulada y clase ABC por monto.
+    """
+    abc = clasificar_abc(montos)
+    clases, conteos = np.unique(abc["clase"], return_counts=True)
+    return {
+        **abc,
+        "ranking": np.lexsort((ids.astype(str), -cantidades))[:top],
+        "abc": {**{"A": 0, "B": 0, "C": 0}, **dict(zip(clases.tolist(), conteos.tolist()))},
+    }
+
+
+def metricas_inventario(stock: np.ndarray, unidades: np.ndarray, dias: int) -> Dict[str, np.ndarray]:
+    """Rotación (vendidas / stock), días de cobertura (stock / venta diaria) y estado."""
+    return {
+        "rotacion": _dividir(unidades.astype(np.float64), stock.astype(np.float64)),
+        "cobertura": _dividir(stock * float(dias), unidades.astype(np.float64)),
+        "estado": np.where(stock <= 0, "SIN_STOCK", np.where(stock <= STOCK_BAJO, "BAJO", "OK")),
+    }
+
+
+def productos_mas_vendidos(filtros: Dict[str, Any], top: int) -> Dict[str, Any]:
+    """
+    Todos los productos vendidos en el rango (sin ventas anuladas), desde
+    hecho_venta_diaria.
+
+    El ranking (cantidad desc, id asc) y la clase ABC (por monto) se
+    calculan sobre todos los productos; se devuelven los `top` primeros.
+    """
+    qs = HechoVentaDiaria.objects.filter(anulada=False)
+    if filtros.get("fecha_desde"):
+        qs = qs.filter(fecha__gte=filtros["fecha_desde"])
+    if filtros.get("fecha_hasta"):
+        qs = qs.filter(fecha__lte=filtros["fecha_hasta"])
+
+    filas = list(
+        qs.values("producto_id")
+        .annotate(cantidad=Sum("cantidad"), monto=Sum("monto"))
+        .values_list("producto_id", "producto__nombre", "cantidad", "monto")
+    )
+    ids, nombres, cantidades, montos_exactos = _columnas(filas, (object, object, np.int64, object))
+    metricas = metricas_productos(ids, cantidades, montos_exactos.astype(np.float64), top)
+
+    ranking = metricas["ranking"]
+    participacion = _redondear(metricas["participacion"][ranking] * 100, 2)
+    acumulada = _redondear(metricas["acumulada"][ranking] * 100, 2)
+    resultados = [
+        {
+            "id_producto": ids[i],
+            "nombre_producto": nombres[i],
+            "cantidad_vendida": int(cantidades[i]),
+            "monto_total": montos_exactos[i],
+            "ranking": posicion,
+            "participacion_pct": participacion[posicion - 1],
+            "participacion_acumulada_pct": acumulada[posicion - 1],
+            "clase_abc": str(metricas["clase"][i]),
+        }
+        for posicion, i in enumerate(ranking.tolist(), start=1)
+    ]
+
+    return {
+        "productos_vendidos": len(filas),
+        "resultados": resultados,
+        "abc": metricas["abc"],
+    }
+
+
+def inventario(qs, filtros: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Inventario con unidades vendidas en la ventana, rotación
+    (vendidas / stock actual), días de cobertura (stock / venta diaria)
+    y estado de stock (SIN_STOCK, BAJO, OK).
+    """
+    hasta = _fecha(filtros.get("fecha_hasta")) or timezone.now().date()
+    desde = _fecha(filtros.get("fecha_desde")) or hasta - timedelta(days=DIAS_VENTANA_INVENTARIO - 1)
+    dias = max((hasta - desde).days + 1, 1)
+
+    resultados = list(
+        qs.order_by("producto__nombre", "producto__id_producto")
+        .values("producto__id_producto", "producto__nombre", "cantidad_actual", "ubicacion")
+    )
+    n = len(resultados)
+    ids = np.array([fila["producto__id_producto"] for fila in resultados], dtype=str)
+    stock = np.fromiter((fila["cantidad_actual"] for fila in resultados), dtype=np.int64, count=n)
+
+    # Ventas de la ventana agregadas aparte y alineadas por id en NumPy:
+    # sale más barato que agrupar el JOIN inventario × hechos en SQL.
+    vendidas = list(
+        HechoVentaDiaria.objects.filter(fecha__gte=desde, fecha__lte=hasta, anulada=False)
+        .values("producto_id")
+        .annotate(total=Sum("cantidad"))
+        .values_list("producto_id", "total")
+    )
+    ids_vendidos, totales = _columnas(vendidas, (object, np.int64))
+    unidades = alinear(ids, ids_vendidos.astype(str), totales)
+
+    metricas = metricas_inventario(stock, unidades, dias)
+    columnas = zip(
+        unidades.tolist(),
+        _redondear(metricas["rotacion"], 2),
+        _redondear(metricas["cobertura"], 1),
+        metricas["estado"].tolist(),
+    )
+    for fila, (vendidas_fila, rotacion, cobertura, estado) in zip(resultados, columnas):
+        fila["unidades_vendidas"] = vendidas_fila
+        fila["rotacion"] = rotacion
+        fila["dias_cobertura"] = cobertura
+        fila["estado_stock"] = estado
+
+    return {
+        "resultados": resultados,
+        "ventana": {"fecha_desde": desde, "fecha_hasta": hasta, "dias": dias},
+        "items_con_stock_bajo": int(np.count_nonzero(stock <= STOCK_BAJO)),
+        "items_sin_stock": int(np.count_nonzero(stock <= 0)),
+    }
@@ -6,3 +6,6 @@ class ReportesConfig(AppConfig):
     name = "apps.reportes"
     verbose_name = "Módulo de Reportes"
 
+    def ready(self):
+        # Receivers que invalidan la caché de reportes
+        import apps.reportes.signals
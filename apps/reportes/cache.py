@@ -0,0 +1,241 @@
+"""
+Caché de reportes generados.
+
+Clave: el mismo hash que los jobs (tipo_reporte + filtros normalizados).
+Valor: el reporte serializado con pickle, así cada acierto devuelve una
+copia independiente y el tamaño en bytes es exacto.
+
+- Rangos cerrados (fecha_hasta < hoy) viven REPORTES_CACHE_TTL_HISTORICO.
+- Rangos abiertos o reportes sin rango viven REPORTES_CACHE_TTL_RECIENTE y
+  además se invalidan por dependencia (ventas, inventario, clientes) desde
+  los receivers de apps.reportes.signals.
+- Al superar REPORTES_CACHE_MAX_BYTES se expulsa lo usado hace más tiempo.
+
+La caché es por proceso y los receivers solo invalidan la del worker que
+hizo el cambio. En los demás:
+
+- Un rango abierto puede quedar desactualizado como máximo
+  REPORTES_CACHE_TTL_RECIENTE segundos.
+- Un rango cerrado no: cada invalidación con fecha anterior a hoy (o sin
+  fecha) incrementa además la generación compartida de la dependencia
+  (GeneracionCacheReportes, en la base). Las entradas de rango cerrado
+  guardan las generaciones vigentes al empezar a calcularse y, al leerlas,
+  se descartan si alguna cambió (una consulta por PK por lectura).
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .jobs import calcular_job_id
+from .models import GeneracionCacheReportes
+from .services import ReportesService, ReportType
+
+
+class Dependencia:
+    VENTAS = "ventas"
+    INVENTARIO = "inventario"
+    CLIENTES = "clientes"
+
+
+# Qué cambios invalidan cada tipo de reporte
+DEPENDENCIAS = {
+    ReportType.VENTAS: (Dependencia.VENTAS,),
+    ReportType.PRODUCTOS_MAS_VENDIDOS: (Dependencia.VENTAS,),
+    ReportType.ENVIOS: (Dependencia.VENTAS,),
+    ReportType.INVENTARIO: (Dependencia.INVENTARIO, Dependencia.VENTAS),
+    ReportType.CLIENTES: (Dependencia.CLIENTES,),
+    ReportType.PROMOCIONES: (),
+    ReportType.BITACORA: (),
+}
+
+
+@dataclass
+class _Entrada:
+    datos: bytes
+    expira: float
+    dependencias: Tuple[str, ...]
+    desde: Optional[date]
+    hasta: Optional[date]
+    generacion: Tuple[int, ...] = ()
+
+    def cubre(self, fecha: Optional[date]) -> bool:
+        if fecha is None:
+            return True
+        return (self.desde is None or self.desde <= fecha) and (self.hasta is None or fecha <= self.hasta)
+
+
+def _fecha(valor) -> Optional[date]:
+    if not valor:
+        return None
+    if isinstance(valor, date):
+        return valor
+    return parse_date(str(valor))
+
+
+class CacheReportes:
+    """LRU con TTL y límite en bytes, segura entre hilos."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entradas: "OrderedDict[str, _Entrada]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._contadores = dict.fromkeys(
+            ("aciertos", "fallos", "guardados", "expulsiones", "expiradas", "invalidadas", "rechazadas"), 0
+        )
+
+    def _quitar(self, clave: str) -> None:
+        entrada = self._entradas.pop(clave)
+        self._bytes -= len(entrada.datos)
+
+    def obtener(self, clave: str, generacion: Tuple[int, ...] = ()) -> Optional[Any]:
+        """El valor guardado en `clave`, o None si no está, expiró o es de otra `generacion`."""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada.expira <= time.monotonic():
+                self._quitar(clave)
+                self._contadores["expiradas"] += 1
+                entrada = None
+            elif entrada is not None and entrada.generacion != generacion:
+                self._quitar(clave)
+                self._contadores["invalidadas"] += 1
+                entrada = None
+            if entrada is None:
+                self._contadores["fallos"] += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self._contadores["aciertos"] += 1
+            datos = entrada.datos
+        return pickle.loads(datos)
+
+    def guardar(self, clave: str, valor: Any, ttl: int, dependencias=(), desde=None, hasta=None,
+                generacion: Tuple[int, ...] = ()) -> bool:
+        datos = pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            # Un reporte que ocupa más de un cuarto de la caché la vaciaría sola
+            if len(datos) > self.max_bytes // 4:
+                self._contadores["rechazadas"] += 1
+                return False
+            if clave in self._entradas:
+                self._quitar(clave)
+            self._entradas[clave] = _Entrada(
+                datos, time.monotonic() + ttl, tuple(dependencias), desde, hasta, tuple(generacion)
+            )
+            self._bytes += len(datos)
+            self._contadores["guardados"] += 1
+            while self._bytes > self.max_bytes:
+                self._quitar(next(iter(self._entradas)))
+                self._contadores["expulsiones"] += 1
+        return True
+
+    def invalidar(self, dependencia: str, fecha: Optional[date] = None) -> int:
+        """
+        Descarta las entradas que dependen de `dependencia`. Con `fecha`, solo
+        las cuyo rango la incluye (una venta de hoy no toca rangos cerrados).
+        """
+        with self._lock:
+            claves = [
+                clave for clave, entrada in self._entradas.items()
+                if dependencia in entrada.dependencias and entrada.cubre(fecha)
+            ]
+            for clave in claves:
+                self._quitar(clave)
+            self._contadores["invalidadas"] += len(claves)
+        return len(claves)
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            consultas = self._contadores["aciertos"] + self._contadores["fallos"]
+            return {
+                **self._contadores,
+                "ratio_aciertos": round(self._contadores["aciertos"] / consultas, 4) if consultas else None,
+                "entradas": len(self._entradas),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_cache: Optional[CacheReportes] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> CacheReportes:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CacheReportes(settings.REPORTES_CACHE_MAX_BYTES)
+        return _cache
+
+
+def generaciones(dependencias) -> Tuple[int, ...]:
+    """Generación compartida actual de cada dependencia (0 si nunca se invalidó)."""
+    if not dependencias:
+        return ()
+    actuales = dict(
+        GeneracionCacheReportes.objects.filter(dependencia__in=dependencias)
+        .values_list("dependencia", "generacion")
+    )
+    return tuple(actuales.get(dependencia, 0) for dependencia in dependencias)
+
+
+def generar_reporte(tipo_reporte: str, filtros: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+    """
+    ReportesService.generar_reporte con caché.
+
+    Returns:
+        tuple: (reporte, desde_cache)
+    """
+    cache = get_cache()
+    clave = calcular_job_id(tipo_reporte, filtros)
+    dependencias = DEPENDENCIAS.get(tipo_reporte, ())
+
+    desde = _fecha(filtros.get("fecha_desde"))
+    hasta = _fecha(filtros.get("fecha_hasta"))
+    cerrado = hasta is not None and hasta < timezone.now().date()
+    # Se lee antes de calcular: un cambio que llegue mientras tanto deja la
+    # entrada guardada con una generación vieja
+    generacion = generaciones(dependencias) if cerrado else ()
+
+    reporte = cache.obtener(clave, generacion)
+    if reporte is not None:
+        return reporte, True
+
+    reporte = ReportesService.generar_reporte(tipo_reporte, filtros)
+
+    cache.guardar(
+        clave,
+        reporte,
+        ttl=settings.REPORTES_CACHE_TTL_HISTORICO if cerrado else settings.REPORTES_CACHE_TTL_RECIENTE,
+        dependencias=dependencias,
+        desde=desde,
+        hasta=hasta,
+        generacion=generacion,
+    )
+    return reporte, False
+
+
+def invalidar(dependencia: str, fecha: Optional[date] = None) -> int:
+    """
+    Invalida la caché local y, si el cambio puede tocar un rango cerrado
+    (fecha anterior a hoy o sin fecha), la de los demás workers.
+    """
+    if fecha is None or fecha < timezone.now().date():
+        GeneracionCacheReportes.objects.get_or_create(dependencia=dependencia)
+        GeneracionCacheReportes.objects.filter(dependencia=dependencia).update(
+            generacion=F("generacion") + 1
+        )
+    return get_cache().invalidar(dependencia, fecha)
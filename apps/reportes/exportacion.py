@@ -0,0 +1,321 @@
+"""
+Exportación de reportes en streaming (CSV, NDJSON, XLSX).
+
+Las filas salen de la base con .iterator(chunk_size=...) (cursor del lado
+del servidor en PostgreSQL) y se escriben a medida que llegan, así la
+memoria no crece con el tamaño del reporte.
+"""
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from django.db.models import Count, Sum
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import hechos
+from .services import ReportesService, ReportType, estado_venta_sql
+
+
+CHUNK_SIZE = 2000
+FILAS_POR_ESCRITURA = 500
+
+
+class ExportFormat:
+    CSV = "CSV"
+    NDJSON = "NDJSON"
+    XLSX = "XLSX"
+
+    CONTENT_TYPES = {
+        CSV: "text/csv; charset=utf-8",
+        NDJSON: "application/x-ndjson",
+        XLSX: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    }
+    EXTENSIONES = {CSV: "csv", NDJSON: "ndjson", XLSX: "xlsx"}
+
+    @classmethod
+    def choices(cls) -> List[tuple[str, str]]:
+        return [(cls.CSV, "CSV"), (cls.NDJSON, "NDJSON"), (cls.XLSX, "Excel (XLSX)")]
+
+
+# ==========================================================
+# FILAS POR TIPO DE REPORTE
+# ==========================================================
+
+Filas = Tuple[List[str], Iterable[tuple]]
+
+
+def _filas_ventas(filtros: Dict[str, Any]) -> Filas:
+    encabezados = [
+        "id_venta", "fecha", "monto_total", "estado_venta",
+        "metodo_pago", "id_cliente", "nombreCompleto_cliente",
+    ]
+    qs = (
+        ReportesService.queryset_ventas(filtros)
+        .annotate(estado_venta=estado_venta_sql())
+        .order_by("-fecha", "-id_venta")
+        .values_list(
+            "id_venta", "fecha", "monto_total", "estado_venta",
+            "id_metodo_pago__tipo", "id_cliente_id", "id_cliente__id_cliente__nombre_completo",
+        )
+    )
+    return encabezados, qs.iterator(chunk_size=CHUNK_SIZE)
+
+
+def _filas_clientes(filtros: Dict[str, Any]) -> Filas:
+    campos = [
+        "id_cliente_id",
+        "id_cliente__nombre_completo",
+        "id_cliente__nombre_usuario",
+        "id_cliente__correo",
+        "id_cliente__fecha_registro",
+    ]
+    qs = (
+        ReportesService.queryset_clientes(filtros)
+        .order_by("id_cliente__nombre_completo", "id_cliente_id")
+        .values_list(*campos)
+    )
+    return campos, qs.iterator(chunk_size=CHUNK_SIZE)
+
+
+def _filas_envios(filtros: Dict[str, Any]) -> Filas:
+    qs = (
+        ReportesService.queryset_envios(filtros)
+        .values("estado_envio", "cod_tipo_envio__tipo")
+        .annotate(cantidad=Count("cod_envio"), costo_total=Sum("costo"))
+        .order_by("estado_envio", "cod_tipo_envio__tipo")
+        .values_list("estado_envio", "cod_tipo_envio__tipo", "cantidad", "costo_total")
+    )
+    return ["estado_envio", "tipo_envio", "cantidad", "costo_total"], qs.iterator(chunk_size=CHUNK_SIZE)
+
+
+def _filas_productos_mas_vendidos(filtros: Dict[str, Any]) -> Filas:
+    top = filtros.get("top") or 10
+    # Mismo criterio que el reporte: las ventas anuladas no cuentan
+    filas = hechos.consultar(
+        {**filtros, "anulada": False}, dimensiones=["producto"], orden=["-cantidad", "producto_id"], limite=top
+    )
+    return ["id_producto", "nombre_producto", "cantidad_vendida", "monto_total"], (
+        (f["producto_id"], f["producto__nombre"], f["cantidad"], f["monto"]) for f in filas
+    )
+
+
+def _filas_inventario(filtros: Dict[str, Any]) -> Filas:
+    campos = ["producto__id_producto", "producto__nombre", "cantidad_actual", "ubicacion"]
+    qs = (
+        ReportesService.queryset_inventario(filtros)
+        .order_by("producto__nombre")
+        .values_list(*campos)
+    )
+    return campos, qs.iterator(chunk_size=CHUNK_SIZE)
+
+
+def _filas_promociones(filtros: Dict[str, Any]) -> Filas:
+    campos = ["id_promocion", "nombre", "codigo_descuento", "fecha_inicio", "fecha_fin", "estado"]
+    qs = (
+        ReportesService.queryset_promociones(filtros)
+        .order_by("fecha_inicio")
+        .values_list(*campos)
+    )
+    return campos, qs.iterator(chunk_size=CHUNK_SIZE)
+
+
+def _filas_bitacora(filtros: Dict[str, Any]) -> Filas:
+    qs = (
+        ReportesService.queryset_bitacora(filtros)
+        .order_by("-fecha_hora")
+        .values_list(
+            "id_bitacora", "fecha_hora", "accion", "descripcion", "ip",
+            "id_usuario_id", "id_usuario__nombre_usuario",
+        )
+    )
+    encabezados = [
+        "id_bitacora", "fecha_hora", "accion", "descripcion", "ip",
+        "id_usuario", "nombre_usuario",
+    ]
+    return encabezados, qs.iterator(chunk_size=CHUNK_SIZE)
+
+
+FILAS_POR_TIPO: Dict[str, Callable[[Dict[str, Any]], Filas]] = {
+    ReportType.VENTAS: _filas_ventas,
+    ReportType.CLIENTES: _filas_clientes,
+    ReportType.ENVIOS: _filas_envios,
+    ReportType.PRODUCTOS_MAS_VENDIDOS: _filas_productos_mas_vendidos,
+    ReportType.INVENTARIO: _filas_inventario,
+    ReportType.PROMOCIONES: _filas_promociones,
+    ReportType.BITACORA: _filas_bitacora,
+}
+
+
+def filas_reporte(tipo_reporte: str, filtros: Dict[str, Any]) -> Filas:
+    """Encabezados e iterador de filas (tuplas) de un reporte."""
+    try:
+        return FILAS_POR_TIPO[tipo_reporte](filtros)
+    except KeyError:
+        raise ValueError("Tipo de reporte no soportado.")
+
+
+# ==========================================================
+# ESCRITORES
+# ==========================================================
+
+def _en_lotes(filas: Iterable[tuple], tamano: int = FILAS_POR_ESCRITURA) -> Iterator[List[tuple]]:
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def escribir_csv(encabezados: List[str], filas: Iterable[tuple]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM: Excel abre el CSV como UTF-8 (acentos, ñ)
+    buffer.write("\ufeff")
+    writer.writerow(encabezados)
+    for lote in _en_lotes(filas):
+        writer.writerows(lote)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    resto = buffer.getvalue()
+    if resto:
+        yield resto.encode("utf-8")
+
+
+def escribir_ndjson(encabezados: List[str], filas: Iterable[tuple]) -> Iterator[bytes]:
+    encoder = JSONEncoder(ensure_ascii=False)
+    for lote in _en_lotes(filas):
+        yield "".join(
+            encoder.encode(dict(zip(encabezados, fila))) + "\n" for fila in lote
+        ).encode("utf-8")
+
+
+# ---------- XLSX ----------
+
+_XML_INVALIDO = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+_XLSX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{nombre}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+
+class _Sumidero:
+    """Destino de escritura sin seek: acumula bytes hasta que se vacían."""
+
+    def __init__(self):
+        self._partes: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._partes.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def vaciar(self) -> bytes:
+        data = b"".join(self._partes)
+        self._partes.clear()
+        return data
+
+
+def _celda_xlsx(valor: Any) -> str:
+    if valor is None:
+        return "<c/>"
+    if isinstance(valor, bool):
+        return f'<c t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float, Decimal)):
+        return f"<c><v>{valor}</v></c>"
+    if isinstance(valor, (date, datetime)):
+        valor = valor.isoformat(sep=" ") if isinstance(valor, datetime) else valor.isoformat()
+    texto = escape(_XML_INVALIDO.sub("", str(valor)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _fila_xlsx(valores: Iterable[Any]) -> str:
+    return "<row>" + "".join(_celda_xlsx(v) for v in valores) + "</row>"
+
+
+def escribir_xlsx(encabezados: List[str], filas: Iterable[tuple], nombre_hoja: str = "Reporte") -> Iterator[bytes]:
+    """
+    XLSX mínimo (una hoja, strings en línea) escrito directamente sobre un
+    zip en streaming: no necesita archivo temporal ni librerías externas.
+    """
+    salida = _Sumidero()
+    with zipfile.ZipFile(salida, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", _XLSX_CONTENT_TYPES)
+        zf.writestr("_rels/.rels", _XLSX_RELS)
+        zf.writestr("xl/workbook.xml", _XLSX_WORKBOOK.format(nombre=escape(nombre_hoja[:31])))
+        zf.writestr("xl/_rels/workbook.xml.rels", _XLSX_WORKBOOK_RELS)
+        yield salida.vaciar()
+
+        with zf.open("xl/worksheets/sheet1.xml", mode="w", force_zip64=True) as hoja:
+            hoja.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                b"<sheetData>"
+            )
+            hoja.write(_fila_xlsx(encabezados).encode("utf-8"))
+            for lote in _en_lotes(filas):
+                hoja.write("".join(_fila_xlsx(fila) for fila in lote).encode("utf-8"))
+                datos = salida.vaciar()
+                if datos:
+                    yield datos
+            hoja.write(b"</sheetData></worksheet>")
+    yield salida.vaciar()
+
+
+ESCRITORES = {
+    ExportFormat.CSV: escribir_csv,
+    ExportFormat.NDJSON: escribir_ndjson,
+    ExportFormat.XLSX: escribir_xlsx,
+}
+
+
+def exportar(formato: str, encabezados: List[str], filas: Iterable[tuple]) -> Iterator[bytes]:
+    return ESCRITORES[formato](encabezados, filas)
+
+
+def nombre_archivo(tipo_reporte: str, formato: str, sufijo: Optional[str] = None) -> str:
+    base = f"reporte_{tipo_reporte.lower()}"
+    if sufijo:
+        base = f"{base}_{sufijo}"
+    return f"{base}.{ExportFormat.EXTENSIONES[formato]}"
@@ -0,0 +1,264 @@
+"""
+Tabla de hechos hecho_venta_diaria: mantenimiento y consultas.
+
+Las ventas entran en línea, dentro de la misma transacción que las crea
+o anula (registrar_ventas / registrar_anulaciones), con un único
+INSERT ... SELECT ... ON CONFLICT DO UPDATE que suma deltas por celda.
+reconstruir() recalcula un rango de fechas desde venta/detalle_venta y es
+lo que ejecuta el comando actualizar_hechos_venta.
+
+consultar() agrupa por cualquier combinación de dimensiones y período.
+El resumen y la serie del reporte de ventas, el reporte de productos más
+vendidos y el cubo de ventas la usan en lugar de recorrer las tablas
+transaccionales; el detalle venta por venta sigue saliendo de venta.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncYear
+
+from .models import HechoVentaDiaria
+
+TABLA = HechoVentaDiaria._meta.db_table
+
+# Dimensión -> (campo de agrupación, campo de etiqueta)
+DIMENSIONES = {
+    "producto": ("producto_id", "producto__nombre"),
+    "categoria": ("categoria_id", "categoria__nombre"),
+    "metodo_pago": ("metodo_pago_id", "metodo_pago__tipo"),
+    "vendedor": ("vendedor_id", "vendedor__id_vendedor__nombre_completo"),
+    "anulada": ("anulada", None),
+}
+
+METRICAS = ("lineas", "cantidad", "monto", "ventas", "monto_ventas")
+
+# Filtros aceptados por consultar() -> campo de la tabla de hechos
+FILTROS = {
+    "id_producto": "producto_id",
+    "id_categoria": "categoria_id",
+    "id_metodo_pago": "metodo_pago_id",
+    "id_vendedor": "vendedor_id",
+    "anulada": "anulada",
+}
+
+_ANULADA_SQL = "v.estado ILIKE '%%ANUL%%'"
+
+# Agrega las líneas de un conjunto de ventas en celdas del grano de la tabla.
+# La primera línea de cada venta (menor id_detalle_venta) carga las medidas
+# por venta, así cada venta cuenta una sola vez aunque tenga varias líneas.
+_SELECT_CELDAS = """
+    SELECT d.fecha, d.id_producto, {categoria}, d.id_metodo_pago, d.id_vendedor,
+           {anulada} AS anulada,
+           {signo} * COUNT(*),
+           {signo} * SUM(d.cantidad),
+           {signo} * SUM(d.sub_total),
+           {signo} * COUNT(*) FILTER (WHERE d.primera),
+           {signo} * COALESCE(SUM(d.monto_total) FILTER (WHERE d.primera), 0),
+           now()
+    FROM (
+        SELECT v.fecha, v.id_metodo_pago, v.id_vendedor, v.monto_total, v.estado,
+               dv.id_producto, dv.cantidad, dv.sub_total,
+               dv.id_detalle_venta = MIN(dv.id_detalle_venta) OVER (PARTITION BY dv.id_venta) AS primera
+        FROM venta v
+        JOIN detalle_venta dv ON dv.id_venta = v.id_venta
+        WHERE {condicion}
+    ) AS d
+    JOIN producto p ON p.id_producto = d.id_producto
+    GROUP BY 1, 2, 3, 4, 5, 6
+    ORDER BY 1, 2, 3, 4, 5, 6
+"""
+
+# La categoría de una venta es la del producto al registrarla. Una anulación
+# tiene que mover la venta desde la celda que la contiene, aunque el
+# producto haya cambiado de categoría después: se busca la celda no anulada
+# existente (fecha, producto, método de pago, vendedor) y solo si no hay
+# ninguna se usa la categoría actual. Si existen celdas en las dos
+# categorías, se prefiere la actual; `actualizar_hechos_venta` con el rango
+# de esa fecha lo deja exacto.
+_CATEGORIA_ACTUAL = "p.id_categoria"
+_CATEGORIA_REGISTRADA = """
+    COALESCE((
+        SELECT h.id_categoria FROM {tabla} h
+        WHERE h.fecha = d.fecha AND h.id_producto = d.id_producto
+          AND h.id_metodo_pago IS NOT DISTINCT FROM d.id_metodo_pago
+          AND h.id_vendedor IS NOT DISTINCT FROM d.id_vendedor
+          AND NOT h.anulada
+        ORDER BY h.id_categoria = p.id_categoria DESC, h.lineas DESC
+        LIMIT 1
+    ), p.id_categoria)
+""".format(tabla=TABLA)
+
+_COLUMNAS = (
+    "fecha, id_producto, id_categoria, id_metodo_pago, id_vendedor, anulada, "
+    "lineas, cantidad, monto, ventas, monto_ventas, fecha_actualizacion"
+)
+
+
+def _acumular(
+    ids_venta: Sequence[int], signo: int, anulada: Optional[bool] = None, categoria: str = _CATEGORIA_ACTUAL
+) -> None:
+    """
+    Suma (signo=1) o resta (signo=-1) las ventas indicadas en sus celdas.
+    Si anulada es None se toma del estado actual de cada venta.
+    """
+    select = _SELECT_CELDAS.format(
+        categoria=categoria,
+        anulada=_ANULADA_SQL.replace("v.", "d.") if anulada is None else ("TRUE" if anulada else "FALSE"),
+        signo=int(signo),
+        condicion="v.id_venta = ANY(%s)",
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {TABLA} AS h ({_COLUMNAS})
+            {select}
+            ON CONFLICT (fecha, id_producto, id_categoria, id_metodo_pago, id_vendedor, anulada)
+            DO UPDATE SET
+                lineas = h.lineas + EXCLUDED.lineas,
+                cantidad = h.cantidad + EXCLUDED.cantidad,
+                monto = h.monto + EXCLUDED.monto,
+                ventas = h.ventas + EXCLUDED.ventas,
+                monto_ventas = h.monto_ventas + EXCLUDED.monto_ventas,
+                fecha_actualizacion = EXCLUDED.fecha_actualizacion
+            """,
+            [list(ids_venta)],
+        )
+        if signo < 0:
+            # Celdas que quedaron vacías al mover ventas a anulada
+            cursor.execute(
+                f"""
+                DELETE FROM {TABLA}
+                WHERE lineas = 0
+                  AND fecha IN (SELECT fecha FROM venta WHERE id_venta = ANY(%s))
+                """,
+                [list(ids_venta)],
+            )
+
+
+def registrar_ventas(ids_venta: Iterable[int]) -> None:
+    """Incorpora ventas nuevas (con sus detalles ya creados)."""
+    ids = sorted({int(i) for i in ids_venta})
+    if ids:
+        _acumular(ids, 1)
+
+
+def registrar_anulaciones(ids_venta: Iterable[int]) -> None:
+    """
+    Mueve ventas recién anuladas de anulada=False a anulada=True, dentro de
+    la categoría en la que se registraron (ver _CATEGORIA_REGISTRADA).
+    """
+    ids = sorted({int(i) for i in ids_venta})
+    if ids:
+        # Primero la suma: la celda de origen todavía existe para ubicar la categoría
+        _acumular(ids, 1, anulada=True, categoria=_CATEGORIA_REGISTRADA)
+        _acumular(ids, -1, anulada=False, categoria=_CATEGORIA_REGISTRADA)
+
+
+@transaction.atomic
+def reconstruir(fecha_desde=None, fecha_hasta=None) -> int:
+    """
+    Recalcula las celdas del rango [fecha_desde, fecha_hasta] (o toda la
+    tabla) desde venta y detalle_venta. Devuelve cuántas celdas quedaron.
+
+    La tabla se bloquea en SHARE ROW EXCLUSIVE mientras dura: las ventas
+    que se registren en paralelo esperan y se suman después del commit,
+    sin contarse dos veces ni perderse.
+    """
+    condiciones = ["TRUE"]
+    params: List[Any] = []
+    if fecha_desde:
+        condiciones.append("fecha >= %s")
+        params.append(fecha_desde)
+    if fecha_hasta:
+        condiciones.append("fecha <= %s")
+        params.append(fecha_hasta)
+    rango = " AND ".join(condiciones)
+
+    select = _SELECT_CELDAS.format(
+        categoria=_CATEGORIA_ACTUAL,
+        anulada=_ANULADA_SQL.replace("v.", "d."),
+        signo=1,
+        condicion=rango.replace("fecha", "v.fecha"),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {TABLA} IN SHARE ROW EXCLUSIVE MODE")
+        cursor.execute(f"DELETE FROM {TABLA} WHERE {rango}", params)
+        cursor.execute(f"INSERT INTO {TABLA} ({_COLUMNAS}) {select}", params)
+        return cursor.rowcount
+
+
+def truncar_periodo(frecuencia: Optional[str]):
+    """(Trunc sobre `fecha`, formato de la etiqueta) para DIARIO/MENSUAL/ANUAL."""
+    from .services import Frequency
+
+    if frecuencia == Frequency.DIARIO:
+        return TruncDate("fecha"), "%Y-%m-%d"
+    if frecuencia == Frequency.ANUAL:
+        return TruncYear("fecha"), "%Y"
+    return TruncMonth("fecha"), "%Y-%m"
+
+
+def consultar(
+    filtros: Dict[str, Any],
+    dimensiones: Sequence[str] = (),
+    frecuencia: Optional[str] = None,
+    orden: Optional[Sequence[str]] = None,
+    limite: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Agregado de la tabla de hechos.
+
+    Args:
+        filtros: fecha_desde, fecha_hasta y cualquiera de FILTROS.
+        dimensiones: claves de DIMENSIONES por las que agrupar.
+        frecuencia: si se indica, agrupa además por período (DIARIO/MENSUAL/ANUAL)
+            y cada fila trae "periodo" ya formateado.
+        orden: campos de ordenamiento (p. ej. ["-cantidad"]); por defecto
+            período y dimensiones.
+        limite: máximo de filas.
+
+    Returns:
+        list[dict]: una fila por grupo con las dimensiones, sus etiquetas y METRICAS.
+    """
+    desconocidas = [d for d in dimensiones if d not in DIMENSIONES]
+    if desconocidas:
+        raise ValueError(f"Dimensiones no soportadas: {', '.join(desconocidas)}")
+
+    qs = HechoVentaDiaria.objects.all()
+    if filtros.get("fecha_desde"):
+        qs = qs.filter(fecha__gte=filtros["fecha_desde"])
+    if filtros.get("fecha_hasta"):
+        qs = qs.filter(fecha__lte=filtros["fecha_hasta"])
+    for clave, campo in FILTROS.items():
+        valor = filtros.get(clave)
+        if valor not in (None, ""):
+            qs = qs.filter(**{campo: valor})
+
+    campos: List[str] = []
+    formato = None
+    if frecuencia:
+        trunc, formato = truncar_periodo(frecuencia)
+        qs = qs.annotate(periodo=trunc)
+        campos.append("periodo")
+    for dimension in dimensiones:
+        campo, etiqueta = DIMENSIONES[dimension]
+        campos.append(campo)
+        if etiqueta:
+            campos.append(etiqueta)
+
+    if not campos:
+        totales = qs.aggregate(**{m: Sum(m) for m in METRICAS})
+        return [totales] if totales["lineas"] is not None else []
+
+    filas = qs.values(*campos).annotate(**{m: Sum(m) for m in METRICAS})
+    filas = filas.order_by(*(orden or campos))
+    if limite:
+        filas = filas[:limite]
+
+    resultados = []
+    for fila in filas:
+        if formato:
+            fila["periodo"] = fila["periodo"].strftime(formato) if fila["periodo"] else None
+        resultados.append(fila)
+    return resultados
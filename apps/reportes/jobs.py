@@ -0,0 +1,311 @@
+"""
+Jobs de reportes en segundo plano.
+
+Un job se identifica por el hash de (tipo_reporte, filtros): pedir dos
+veces el mismo reporte devuelve el mismo job. Cada job vive en su propio
+directorio bajo settings.REPORTES_DIR:
+
+    <job_id>/estado.json             estado, tiempos, totales
+    <job_id>/resumen.json.gz         todo el reporte menos "resultados"
+    <job_id>/resultados-0000.ndjson.gz, -0001, ...   filas en chunks
+
+Las filas salen de exportacion.filas_reporte (mismas columnas que la
+exportación) y se escriben chunk a chunk a medida que llegan de la base:
+la memoria del job no crece con el tamaño del reporte.
+
+Un job terminado se reutiliza mientras sus datos no puedan haber cambiado:
+siempre si su rango de fechas ya estaba cerrado al generarse (fecha_hasta
+anterior a ese día) y, si no, durante REPORTES_JOB_TTL_RECIENTE segundos.
+
+Los jobs los ejecuta un ThreadPoolExecutor local del proceso.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from django.conf import settings
+from django.db import connections
+from django.utils.dateparse import parse_date
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import exportacion
+from .services import NoDataForReport, ReportesService
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus:
+    PENDIENTE = "PENDIENTE"
+    EN_PROCESO = "EN_PROCESO"
+    COMPLETADO = "COMPLETADO"
+    SIN_DATOS = "SIN_DATOS"
+    ERROR = "ERROR"
+
+    FINALES = (COMPLETADO, SIN_DATOS, ERROR)
+
+
+class JobNoEncontrado(Exception):
+    """El job no existe (o el id no es válido)."""
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.REPORTES_JOB_WORKERS,
+                thread_name_prefix="reportes",
+            )
+        return _executor
+
+
+def _dumps(data: Any) -> str:
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False)
+
+
+# Filtros que no cambian los datos del reporte (solo cómo se presentan)
+FILTROS_SIN_EFECTO = ("tipo_reporte", "formato")
+
+
+def normalizar_filtros(filtros: Dict[str, Any]) -> Dict[str, Any]:
+    """Filtros en forma JSON, sin vacíos ni claves que no afectan el resultado."""
+    return {
+        clave: valor
+        for clave, valor in json.loads(_dumps(filtros)).items()
+        if clave not in FILTROS_SIN_EFECTO and valor not in (None, "")
+    }
+
+
+def calcular_job_id(tipo_reporte: str, filtros: Dict[str, Any]) -> str:
+    """Hash estable de (tipo_reporte, filtros normalizados)."""
+    clave = json.dumps(
+        {"tipo_reporte": tipo_reporte, "filtros": normalizar_filtros(filtros)},
+        cls=JSONEncoder,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(clave.encode("utf-8")).hexdigest()[:32]
+
+
+def _dir_job(job_id: str) -> str:
+    if not job_id.isalnum():
+        raise JobNoEncontrado(job_id)
+    return os.path.join(settings.REPORTES_DIR, job_id)
+
+
+def _escribir_atomico(ruta: str, contenido: bytes) -> None:
+    tmp = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(contenido)
+    os.replace(tmp, ruta)
+
+
+def _guardar_estado(job_id: str, **cambios: Any) -> Dict[str, Any]:
+    ruta = os.path.join(_dir_job(job_id), "estado.json")
+    with open(ruta, "r", encoding="utf-8") as fh:
+        estado = json.load(fh)
+    estado.update(cambios)
+    estado["actualizado"] = time.time()
+    _escribir_atomico(ruta, _dumps(estado).encode("utf-8"))
+    return estado
+
+
+def obtener_estado(job_id: str) -> Dict[str, Any]:
+    ruta = os.path.join(_dir_job(job_id), "estado.json")
+    try:
+        with open(ruta, "r", encoding="utf-8") as fh:
+            return json.load(fh)
+    except (FileNotFoundError, json.JSONDecodeError):
+        raise JobNoEncontrado(job_id)
+
+
+def _rango_cerrado(estado: Dict[str, Any]) -> bool:
+    """True si fecha_hasta ya había pasado cuando terminó el job."""
+    hasta = parse_date(str((estado.get("filtros") or {}).get("fecha_hasta") or ""))
+    return hasta is not None and hasta < datetime.fromtimestamp(estado["fin"]).date()
+
+
+def _job_reutilizable(estado: Dict[str, Any]) -> bool:
+    if estado["estado"] in (JobStatus.COMPLETADO, JobStatus.SIN_DATOS):
+        if _rango_cerrado(estado):
+            return True
+        return time.time() - estado["fin"] < settings.REPORTES_JOB_TTL_RECIENTE
+    if estado["estado"] in (JobStatus.PENDIENTE, JobStatus.EN_PROCESO):
+        return time.time() - estado["actualizado"] < settings.REPORTES_JOB_TIMEOUT
+    return False
+
+
+def _reclamar(job_id: str, tipo_reporte: str, filtros: Dict[str, Any], forzar: bool) -> Optional[Dict[str, Any]]:
+    """
+    Crea estado.json con O_EXCL: si otro proceso/hilo ya lo creó, gana él.
+    Devuelve el estado nuevo, o None si el job ya existe y sirve.
+    """
+    directorio = _dir_job(job_id)
+    os.makedirs(directorio, exist_ok=True)
+    ruta = os.path.join(directorio, "estado.json")
+
+    if os.path.exists(ruta):
+        try:
+            existente = obtener_estado(job_id)
+        except JobNoEncontrado:
+            existente = None
+        if existente and _job_reutilizable(existente):
+            # Un job en curso nunca se duplica, ni siquiera forzado
+            if not forzar or existente["estado"] not in JobStatus.FINALES:
+                return None
+        # Fallido, caído o forzado: se descarta para volver a reclamarlo
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+
+    ahora = time.time()
+    estado = {
+        "job_id": job_id,
+        "tipo_reporte": tipo_reporte,
+        "filtros": filtros,
+        "estado": JobStatus.PENDIENTE,
+        "creado": ahora,
+        "actualizado": ahora,
+        "inicio": None,
+        "fin": None,
+        "duracion_ms": None,
+        "total_filas": None,
+        "chunks": 0,
+        "bytes": 0,
+        "mensaje": None,
+    }
+    try:
+        fd = os.open(ruta, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+    except FileExistsError:
+        return None
+    with os.fdopen(fd, "wb") as fh:
+        fh.write(_dumps(estado).encode("utf-8"))
+    return json.loads(_dumps(estado))
+
+
+def _escribir_chunks(job_id: str, filas: Iterable[Dict[str, Any]], tamano: int) -> Dict[str, int]:
+    directorio = _dir_job(job_id)
+    chunk: List[str] = []
+    n_chunk = total = bytes_escritos = 0
+
+    def volcar():
+        nonlocal n_chunk, bytes_escritos
+        contenido = gzip.compress(("\n".join(chunk) + "\n").encode("utf-8"))
+        _escribir_atomico(os.path.join(directorio, f"resultados-{n_chunk:04d}.ndjson.gz"), contenido)
+        bytes_escritos += len(contenido)
+        n_chunk += 1
+        chunk.clear()
+
+    for fila in filas:
+        chunk.append(_dumps(fila))
+        total += 1
+        if len(chunk) >= tamano:
+            volcar()
+    if chunk:
+        volcar()
+
+    return {"total_filas": total, "chunks": n_chunk, "bytes": bytes_escritos}
+
+
+def _ejecutar(job_id: str, tipo_reporte: str, filtros: Dict[str, Any]) -> None:
+    inicio = time.time()
+    _guardar_estado(job_id, estado=JobStatus.EN_PROCESO, inicio=inicio)
+    try:
+        # Primero el resumen (sin filas): si no hay datos termina en SIN_DATOS
+        reporte = ReportesService.generar_reporte(tipo_reporte, filtros, incluir_resultados=False)
+        reporte.pop("resultados", None)
+
+        encabezados, filas = exportacion.filas_reporte(tipo_reporte, filtros)
+        totales = _escribir_chunks(
+            job_id,
+            (dict(zip(encabezados, fila)) for fila in filas),
+            settings.REPORTES_CHUNK_FILAS,
+        )
+        resumen = gzip.compress(_dumps(reporte).encode("utf-8"))
+        _escribir_atomico(os.path.join(_dir_job(job_id), "resumen.json.gz"), resumen)
+
+        fin = time.time()
+        _guardar_estado(
+            job_id,
+            estado=JobStatus.COMPLETADO,
+            fin=fin,
+            duracion_ms=int((fin - inicio) * 1000),
+            total_filas=totales["total_filas"],
+            chunks=totales["chunks"],
+            bytes=totales["bytes"] + len(resumen),
+        )
+    except NoDataForReport as exc:
+        _guardar_estado(job_id, estado=JobStatus.SIN_DATOS, fin=time.time(), mensaje=str(exc))
+    except Exception as exc:
+        logger.exception(f"Error en job de reporte {job_id}")
+        _guardar_estado(job_id, estado=JobStatus.ERROR, fin=time.time(), mensaje=str(exc))
+    finally:
+        # El hilo del pool no pasa por el ciclo request/response de Django
+        connections.close_all()
+
+
+def enviar_job(tipo_reporte: str, filtros: Dict[str, Any], forzar: bool = False) -> Dict[str, Any]:
+    """
+    Encola un reporte. Si ya existe un job para los mismos filtros
+    (terminado o en curso) se devuelve ese en lugar de generar otro.
+    """
+    filtros_json = normalizar_filtros(filtros)
+    job_id = calcular_job_id(tipo_reporte, filtros_json)
+
+    estado = _reclamar(job_id, tipo_reporte, filtros_json, forzar)
+    if estado is None:
+        estado = obtener_estado(job_id)
+        estado["reutilizado"] = True
+        return estado
+
+    _get_executor().submit(_ejecutar, job_id, tipo_reporte, filtros)
+    estado["reutilizado"] = False
+    return estado
+
+
+def leer_resumen(job_id: str) -> Dict[str, Any]:
+    with gzip.open(os.path.join(_dir_job(job_id), "resumen.json.gz"), "rt", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def leer_chunk(job_id: str, numero: int) -> List[Dict[str, Any]]:
+    ruta = os.path.join(_dir_job(job_id), f"resultados-{numero:04d}.ndjson.gz")
+    if not os.path.exists(ruta):
+        raise JobNoEncontrado(job_id)
+    with gzip.open(ruta, "rt", encoding="utf-8") as fh:
+        return [json.loads(linea) for linea in fh if linea.strip()]
+
+
+def iterar_json(job_id: str) -> Iterator[bytes]:
+    """
+    Reconstruye el JSON completo del reporte sin cargarlo en memoria:
+    el resumen y luego las filas chunk por chunk.
+    """
+    estado = obtener_estado(job_id)
+    resumen = leer_resumen(job_id)
+    cabecera = _dumps(resumen)
+    yield (cabecera[:-1] + ', "resultados": [').encode("utf-8")
+
+    primero = True
+    for numero in range(estado["chunks"]):
+        ruta = os.path.join(_dir_job(job_id), f"resultados-{numero:04d}.ndjson.gz")
+        with gzip.open(ruta, "rt", encoding="utf-8") as fh:
+            for linea in fh:
+                linea = linea.strip()
+                if not linea:
+                    continue
+                yield (linea if primero else "," + linea).encode("utf-8")
+                primero = False
+    yield b"]}"
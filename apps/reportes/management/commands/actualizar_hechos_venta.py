@@ -0,0 +1,57 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from apps.reportes import hechos
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye hecho_venta_diaria desde venta y detalle_venta. Por defecto "
+        "recalcula los últimos --dias días; con --completo, toda la tabla (necesario "
+        "la primera vez, para cargar el histórico)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--desde", help="Fecha inicial (YYYY-MM-DD).")
+        parser.add_argument("--hasta", help="Fecha final (YYYY-MM-DD).")
+        parser.add_argument(
+            "--dias",
+            type=int,
+            default=2,
+            help="Días hacia atrás a recalcular si no se indica rango (por defecto 2).",
+        )
+        parser.add_argument(
+            "--completo",
+            action="store_true",
+            help="Recalcular todas las fechas.",
+        )
+
+    def _fecha(self, valor):
+        if not valor:
+            return None
+        fecha = parse_date(valor)
+        if fecha is None:
+            raise CommandError(f"Fecha inválida: {valor}")
+        return fecha
+
+    def handle(self, *args, **options):
+        desde = self._fecha(options["desde"])
+        hasta = self._fecha(options["hasta"])
+
+        if options["completo"]:
+            desde = hasta = None
+        elif not desde and not hasta:
+            desde = timezone.now().date() - timedelta(days=options["dias"])
+
+        inicio = time.perf_counter()
+        celdas = hechos.reconstruir(fecha_desde=desde, fecha_hasta=hasta)
+        segundos = time.perf_counter() - inicio
+
+        rango = "todas las fechas" if not (desde or hasta) else f"{desde or '...'} a {hasta or '...'}"
+        self.stdout.write(self.style.SUCCESS(
+            f"hecho_venta_diaria: {celdas} celda(s) recalculada(s) para {rango} en {segundos:.2f}s."
+        ))
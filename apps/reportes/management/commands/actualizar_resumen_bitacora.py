@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from apps.reportes import resumen_bitacora
+
+
+class Command(BaseCommand):
+    help = (
+        "Agrega a resumen_bitacora_hora las horas cerradas de la bitácora que "
+        "faltan. Con --reconstruir vacía el resumen y lo recalcula completo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reconstruir", action="store_true")
+
+    def handle(self, *args, **options):
+        if options["reconstruir"]:
+            celdas = resumen_bitacora.reconstruir()
+        else:
+            celdas = resumen_bitacora.actualizar()
+        self.stdout.write(self.style.SUCCESS(f"Resumen de bitácora: {celdas} celda(s) escritas."))
@@ -0,0 +1,219 @@
+import time
+from datetime import timedelta
+
+import numpy as np
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from apps.categoria.models import Categoria
+from apps.inventario.models import Inventario
+from apps.pagos.models import MetodoPago
+from apps.reportes import analitica, hechos
+from apps.reportes.models import HechoVentaDiaria
+from apps.reportes.services import ReportesService
+from apps.usuarios.models import Cliente, Vendedor
+from apps.ventas.models import DetalleVenta
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara la analítica vectorizada (NumPy) de productos más vendidos e "
+        "inventario contra el cálculo fila por fila en Python y contra los "
+        "reportes anteriores sobre detalle_venta. Los datos sintéticos se "
+        "insertan en una transacción que se revierte. Requiere PostgreSQL y "
+        "al menos un cliente, vendedor y método de pago."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--productos", type=int, default=100_000)
+        parser.add_argument("--lineas", type=int, default=1_000_000)
+        parser.add_argument("--top", type=int, default=10)
+
+    # ------------------------------------------------------------------
+    # Referencias
+    # ------------------------------------------------------------------
+    def _anterior_productos(self, filtros, top):
+        """Reporte previo: agregado sobre detalle_venta, sin métricas."""
+        return list(
+            DetalleVenta.objects.filter(id_venta__fecha__gte=filtros["fecha_desde"])
+            .values("id_producto", "id_producto__nombre")
+            .annotate(cantidad_total=Sum("cantidad"), monto_total=Sum("sub_total"))
+            .order_by("-cantidad_total")[:top]
+        )
+
+    def _anterior_inventario(self):
+        return list(
+            Inventario.objects.values(
+                "producto__id_producto", "producto__nombre", "cantidad_actual", "ubicacion"
+            ).order_by("producto__nombre")
+        )
+
+    def _filas_productos(self, filtros):
+        return list(
+            HechoVentaDiaria.objects.filter(fecha__gte=filtros["fecha_desde"])
+            .values("producto_id")
+            .annotate(cantidad=Sum("cantidad"), monto=Sum("monto"))
+            .values("producto_id", "producto__nombre", "cantidad", "monto")
+        )
+
+    def _python_metricas_productos(self, filas, top):
+        """Mismas métricas que analitica.metricas_productos, fila por fila."""
+        total = sum(float(f["monto"]) for f in filas) or 1.0
+        acumulado = 0.0
+        clases = {"A": 0, "B": 0, "C": 0}
+        for fila in sorted(filas, key=lambda f: -float(f["monto"])):
+            participacion = float(fila["monto"]) / total
+            clase = "A" if acumulado < analitica.UMBRAL_A else "B" if acumulado < analitica.UMBRAL_B else "C"
+            acumulado += participacion
+            fila.update(participacion=participacion, acumulada=acumulado, clase_abc=clase)
+            clases[clase] += 1
+        ranking = sorted(filas, key=lambda f: (-f["cantidad"], f["producto_id"]))[:top]
+        return ranking, clases
+
+    def _numpy_metricas_productos(self, filas, top):
+        ids, cantidades, montos = analitica._columnas(
+            [(f["producto_id"], f["cantidad"], f["monto"]) for f in filas], (object, np.int64, object)
+        )
+        return analitica.metricas_productos(ids, cantidades, montos.astype(np.float64), top)
+
+    def _python_productos(self, filtros, top):
+        return self._python_metricas_productos(self._filas_productos(filtros), top)
+
+    def _filas_inventario(self, filtros):
+        vendidas = dict(
+            HechoVentaDiaria.objects.filter(fecha__gte=filtros["fecha_desde"], anulada=False)
+            .values("producto_id")
+            .annotate(total=Sum("cantidad"))
+            .values_list("producto_id", "total")
+        )
+        filas = self._anterior_inventario()
+        for fila in filas:
+            fila["unidades_vendidas"] = vendidas.get(fila["producto__id_producto"], 0)
+        return filas
+
+    def _python_metricas_inventario(self, filas, dias):
+        for fila in filas:
+            stock = fila["cantidad_actual"]
+            unidades = fila["unidades_vendidas"]
+            fila["rotacion"] = round(unidades / stock, 2) if stock else None
+            fila["dias_cobertura"] = round(stock * dias / unidades, 1) if unidades else None
+            fila["estado_stock"] = (
+                "SIN_STOCK" if stock <= 0 else "BAJO" if stock <= analitica.STOCK_BAJO else "OK"
+            )
+        return filas
+
+    def _numpy_metricas_inventario(self, filas, dias):
+        stock, unidades = analitica._columnas(
+            [(f["cantidad_actual"], f["unidades_vendidas"]) for f in filas], (np.int64, np.int64)
+        )
+        metricas = analitica.metricas_inventario(stock, unidades, dias)
+        return analitica._redondear(metricas["rotacion"], 2), analitica._redondear(metricas["cobertura"], 1)
+
+    def _python_inventario(self, filtros, dias):
+        return self._python_metricas_inventario(self._filas_inventario(filtros), dias)
+
+    # ------------------------------------------------------------------
+    def _poblar(self, n_productos, n_lineas, cliente, vendedor, metodo):
+        hoy = timezone.now().date()
+        categoria = Categoria.objects.create(nombre=f"Benchmark {time.time_ns()}")
+        with connection.cursor() as cursor:
+            # id_producto es varchar(5): hexadecimal con ceros a la izquierda
+            cursor.execute(
+                """
+                INSERT INTO producto (id_producto, nombre, precio, stock, descripcion, estado_producto, id_categoria)
+                SELECT lpad(to_hex(g), 5, '0'), 'Producto ' || g, 10 + (g %% 90), (g * 7) %% 60,
+                       '-', 'ACTIVO', %s
+                FROM generate_series(1, %s) AS g
+                """,
+                [categoria.pk, n_productos],
+            )
+            cursor.execute(
+                """
+                INSERT INTO inventario_inventario (producto_id, cantidad_actual, stock_minimo, fecha_actualizacion)
+                SELECT id_producto, stock, 5, now() FROM producto WHERE id_categoria = %s
+                """,
+                [categoria.pk],
+            )
+            n_ventas = max(n_lineas // 4, 1)
+            cursor.execute(
+                """
+                INSERT INTO venta (fecha, monto_total, estado, id_metodo_pago, id_cliente, id_vendedor)
+                SELECT %s::date - (g %% 90), 40, 'COMPLETADO', %s, %s, %s
+                FROM generate_series(1, %s) AS g
+                RETURNING id_venta
+                """,
+                [hoy, metodo.pk, cliente.pk, vendedor.pk, n_ventas],
+            )
+            primera = min(fila[0] for fila in cursor.fetchall())
+            # Demanda sesgada (pocos productos concentran las ventas)
+            cursor.execute(
+                """
+                INSERT INTO detalle_venta (id_venta, id_producto, cantidad, precio, sub_total)
+                SELECT %s + (g %% %s), lpad(to_hex(1 + floor(%s * power(random(), 3))::int), 5, '0'),
+                       1 + (g %% 3), 10, 10 * (1 + (g %% 3))
+                FROM generate_series(1, %s) AS g
+                """,
+                [primera, n_ventas, n_productos - 1, n_lineas],
+            )
+        return hoy - timedelta(days=89)
+
+    def _medir(self, nombre, funcion):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        self.stdout.write(f"  {nombre:30} {(time.perf_counter() - inicio) * 1000:9.1f} ms")
+        return resultado
+
+    def handle(self, *args, **opts):
+        if connection.vendor != "postgresql":
+            raise CommandError("El benchmark usa generate_series: requiere PostgreSQL.")
+
+        cliente = Cliente.objects.first()
+        vendedor = Vendedor.objects.first()
+        metodo = MetodoPago.objects.first()
+        if not (cliente and vendedor and metodo):
+            raise CommandError("Se necesita al menos un cliente, un vendedor y un método de pago.")
+
+        top = opts["top"]
+        with transaction.atomic():
+            inicio = time.perf_counter()
+            desde = self._poblar(opts["productos"], opts["lineas"], cliente, vendedor, metodo)
+            celdas = hechos.reconstruir()
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+            self.stdout.write(
+                f"{opts['productos']:,} productos, {opts['lineas']:,} líneas, "
+                f"{celdas:,} celdas de hechos en {time.perf_counter() - inicio:.1f}s"
+            )
+            filtros = {"fecha_desde": desde}
+
+            dias = (timezone.now().date() - desde).days + 1
+
+            self.stdout.write("Productos más vendidos (consulta + cálculo):")
+            self._medir("anterior (detalle_venta)", lambda: self._anterior_productos(filtros, top))
+            _, clases_py = self._medir("filas Python + métricas", lambda: self._python_productos(filtros, top))
+            vectorizado = self._medir(
+                "vectorizado (NumPy)", lambda: analitica.productos_mas_vendidos(filtros, top)
+            )
+            if vectorizado["abc"] != clases_py:
+                self.stdout.write(self.style.WARNING(
+                    f"  ABC distinto: python={clases_py} numpy={vectorizado['abc']}"
+                ))
+            filas = self._filas_productos(filtros)
+            self.stdout.write(f"Productos más vendidos (solo cálculo, {len(filas):,} productos):")
+            self._medir("Python", lambda: self._python_metricas_productos([dict(f) for f in filas], top))
+            self._medir("NumPy", lambda: self._numpy_metricas_productos(filas, top))
+
+            qs_inventario = ReportesService.queryset_inventario({})
+            self.stdout.write("Inventario (consulta + cálculo):")
+            self._medir("anterior (sin métricas)", self._anterior_inventario)
+            self._medir("filas Python + métricas", lambda: self._python_inventario(filtros, dias))
+            self._medir("vectorizado (NumPy)", lambda: analitica.inventario(qs_inventario, filtros))
+            filas = self._filas_inventario(filtros)
+            self.stdout.write(f"Inventario (solo cálculo, {len(filas):,} productos):")
+            self._medir("Python", lambda: self._python_metricas_inventario([dict(f) for f in filas], dias))
+            self._medir("NumPy", lambda: self._numpy_metricas_inventario(filas, dias))
+
+            transaction.set_rollback(True)
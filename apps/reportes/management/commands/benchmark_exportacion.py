@@ -0,0 +1,95 @@
+import resource
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.reportes import exportacion
+from apps.reportes.services import ReportType
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide filas/seg, bytes y memoria pico de la exportación en streaming "
+        "por formato. Por defecto usa filas sintéticas con forma de venta; "
+        "con --tipo lee el reporte real desde la base."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--filas", type=int, default=1_000_000, help="Filas sintéticas.")
+        parser.add_argument(
+            "--tipo",
+            choices=[codigo for codigo, _ in ReportType.choices()],
+            help="Exportar un reporte real (todos sus datos) en lugar de filas sintéticas.",
+        )
+        parser.add_argument(
+            "--tracemalloc",
+            action="store_true",
+            help="Medir también el pico de memoria Python (más lento).",
+        )
+        parser.add_argument(
+            "--formatos",
+            default="CSV,NDJSON,XLSX",
+            help="Formatos separados por coma.",
+        )
+
+    def _sinteticas(self, n):
+        base = date(2024, 1, 1)
+        encabezados = [
+            "id_venta", "fecha", "monto_total", "estado_venta",
+            "metodo_pago", "id_cliente", "nombreCompleto_cliente",
+        ]
+
+        def filas():
+            for i in range(n):
+                yield (
+                    i, base + timedelta(days=i % 365), Decimal(i % 1000) + Decimal("0.50"),
+                    "COMPLETADO", "EFECTIVO", i % 5000, f"Cliente {i % 5000}",
+                )
+
+        return encabezados, filas()
+
+    def handle(self, *args, **opts):
+        formatos = [f.strip().upper() for f in opts["formatos"].split(",") if f.strip()]
+        for formato in formatos:
+            if formato not in exportacion.ExportFormat.CONTENT_TYPES:
+                raise CommandError(f"Formato no soportado: {formato}")
+
+        origen = opts["tipo"] or f"{opts['filas']:,} filas sintéticas"
+        self.stdout.write(f"Exportación de {origen}")
+        self.stdout.write(f"{'formato':8} {'filas':>10} {'seg':>8} {'filas/seg':>12} {'MB':>8} {'pico py MB':>11} {'RSS max MB':>11}")
+
+        for formato in formatos:
+            if opts["tipo"]:
+                encabezados, filas = exportacion.filas_reporte(opts["tipo"], {})
+            else:
+                encabezados, filas = self._sinteticas(opts["filas"])
+
+            contadas = [0]
+
+            def contar(iterable):
+                for fila in iterable:
+                    contadas[0] += 1
+                    yield fila
+
+            if opts["tracemalloc"]:
+                tracemalloc.start()
+            inicio = time.perf_counter()
+            total_bytes = 0
+            for bloque in exportacion.exportar(formato, encabezados, contar(filas)):
+                total_bytes += len(bloque)
+            segundos = time.perf_counter() - inicio
+            pico = 0
+            if opts["tracemalloc"]:
+                _, pico = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+            # ru_maxrss está en KB en Linux
+            rss_max = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            n = contadas[0]
+            self.stdout.write(
+                f"{formato:8} {n:>10,} {segundos:>8.2f} {n / segundos if segundos else 0:>12,.0f} "
+                f"{total_bytes / 1e6:>8.1f} {pico / 1e6:>11.2f} {rss_max:>11.1f}"
+            )
@@ -0,0 +1,97 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+from django.test.utils import CaptureQueriesContext
+
+from apps.pagos.models import MetodoPago
+from apps.reportes.services import Frequency, ReportesService
+from apps.usuarios.models import Cliente, Vendedor
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el reporte de ventas en una sola pasada contra el esquema "
+        "anterior (exists + serie + count + aggregate + recorrido) sobre ventas "
+        "sintéticas. Los datos se insertan en una transacción que se revierte. "
+        "Requiere PostgreSQL y al menos un cliente, vendedor y método de pago."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ventas", type=int, default=1_000_000)
+
+    def _reporte_anterior(self, filtros):
+        """Réplica de las pasadas que hacía _reporte_ventas_v2 antes del cambio."""
+        qs = ReportesService.queryset_ventas(filtros).select_related(
+            "id_cliente__id_cliente", "id_metodo_pago"
+        )
+        qs.exists()
+        list(
+            qs.annotate(periodo=TruncMonth("fecha"))
+            .values("periodo")
+            .annotate(total_ventas=Count("id_venta"), monto_total=Sum("monto_total"))
+            .order_by("periodo")
+        )
+        qs.count()
+        qs.aggregate(total=Sum("monto_total"))
+        filas = []
+        for venta in qs.order_by("-fecha", "-id_venta"):
+            estado = venta.estado.upper()
+            if "ANUL" in estado:
+                estado = "ANULADO"
+            elif "COMP" in estado:
+                estado = "COMPLETADO"
+            filas.append({
+                "id_venta": venta.id_venta,
+                "fecha": venta.fecha,
+                "monto_total": venta.monto_total,
+                "estado_venta": estado,
+                "metodo_pago": venta.id_metodo_pago.tipo,
+                "id_cliente": venta.id_cliente_id,
+                "nombreCompleto_cliente": venta.id_cliente.id_cliente.nombre_completo,
+            })
+        return filas
+
+    def _medir(self, nombre, funcion):
+        with CaptureQueriesContext(connection) as consultas:
+            inicio = time.perf_counter()
+            funcion()
+            segundos = time.perf_counter() - inicio
+        self.stdout.write(f"{nombre:22} consultas={len(consultas):<3} tiempo={segundos:8.2f}s")
+
+    def handle(self, *args, **opts):
+        if connection.vendor != "postgresql":
+            raise CommandError("El benchmark usa generate_series: requiere PostgreSQL.")
+
+        cliente = Cliente.objects.first()
+        vendedor = Vendedor.objects.first()
+        metodo = MetodoPago.objects.first()
+        if not (cliente and vendedor and metodo):
+            raise CommandError("Se necesita al menos un cliente, un vendedor y un método de pago.")
+
+        n = opts["ventas"]
+        filtros = {"fecha_desde": "2000-01-01", "frecuencia": Frequency.MENSUAL}
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                inicio = time.perf_counter()
+                cursor.execute(
+                    """
+                    INSERT INTO venta (fecha, monto_total, estado, id_metodo_pago, id_cliente, id_vendedor)
+                    SELECT DATE '2000-01-01' + (g %% 3650),
+                           (g %% 1000) + 0.50,
+                           CASE WHEN g %% 10 = 0 THEN 'ANULADA' ELSE 'COMPLETADO' END,
+                           %s, %s, %s
+                    FROM generate_series(1, %s) AS g
+                    """,
+                    [metodo.pk, cliente.pk, vendedor.pk, n],
+                )
+                cursor.execute("ANALYZE venta")
+            self.stdout.write(f"{n:,} ventas sintéticas insertadas en {time.perf_counter() - inicio:.1f}s")
+
+            self._medir("anterior (5 pasadas)", lambda: self._reporte_anterior(filtros))
+            self._medir("una pasada", lambda: ReportesService._reporte_ventas_v2(filtros))
+
+            transaction.set_rollback(True)
@@ -0,0 +1,48 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.reportes import programados
+
+
+class Command(BaseCommand):
+    help = (
+        "Programador local de reportes: cada REPORTES_PROGRAMADOS_INTERVALO "
+        "segundos genera los reportes programados vencidos y guarda sus "
+        "artefactos. Con --una-vez hace una sola pasada (para cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--una-vez", action="store_true")
+        parser.add_argument("--intervalo", type=int, default=None, help="Segundos entre pasadas.")
+
+    def handle(self, *args, **options):
+        intervalo = options["intervalo"] or settings.REPORTES_PROGRAMADOS_INTERVALO
+        self._detener = False
+        if not options["una_vez"]:
+            signal.signal(signal.SIGTERM, self._senal)
+            signal.signal(signal.SIGINT, self._senal)
+
+        while True:
+            close_old_connections()
+            for artefacto in programados.ejecutar_vencidos():
+                self.stdout.write(
+                    f"{artefacto.programado.nombre} {artefacto.formato} "
+                    f"{artefacto.periodo_desde}..{artefacto.periodo_hasta}: {artefacto.estado} "
+                    f"({artefacto.filas} filas, {artefacto.bytes:,} bytes, {artefacto.duracion_ms} ms)"
+                )
+            if options["una_vez"] or self._detener:
+                return
+            # Espera en pasos cortos para atender SIGTERM enseguida
+            fin = time.monotonic() + intervalo
+            while not self._detener and time.monotonic() < fin:
+                time.sleep(min(1.0, fin - time.monotonic()))
+            if self._detener:
+                return
+
+    def _senal(self, *_):
+        self.stdout.write("Deteniendo el programador de reportes...")
+        self._detener = True
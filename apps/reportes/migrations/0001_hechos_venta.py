@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-18 21:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('categoria', '0001_initial'),
+        ('pagos', '0001_initial'),
+        ('productos', '0001_initial'),
+        ('usuarios', '0002_direccioncliente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HechoVentaDiaria',
+            fields=[
+                ('id_hecho', models.BigAutoField(primary_key=True, serialize=False)),
+                ('fecha', models.DateField()),
+                ('anulada', models.BooleanField(default=False)),
+                ('lineas', models.IntegerField(default=0)),
+                ('cantidad', models.IntegerField(default=0)),
+                ('monto', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('ventas', models.IntegerField(default=0)),
+                ('monto_ventas', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('categoria', models.ForeignKey(db_column='id_categoria', on_delete=django.db.models.deletion.CASCADE, related_name='hechos_venta', to='categoria.categoria')),
+                ('metodo_pago', models.ForeignKey(db_column='id_metodo_pago', on_delete=django.db.models.deletion.CASCADE, related_name='hechos_venta', to='pagos.metodopago')),
+                ('producto', models.ForeignKey(db_column='id_producto', on_delete=django.db.models.deletion.CASCADE, related_name='hechos_venta', to='productos.producto')),
+                ('vendedor', models.ForeignKey(db_column='id_vendedor', on_delete=django.db.models.deletion.CASCADE, related_name='hechos_venta', to='usuarios.vendedor')),
+            ],
+            options={
+                'db_table': 'hecho_venta_diaria',
+                'indexes': [models.Index(fields=['producto', 'fecha'], name='hecho_venta_producto_idx')],
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'producto', 'categoria', 'metodo_pago', 'vendedor', 'anulada'), name='hecho_venta_diaria_grano_uniq')],
+            },
+        ),
+    ]
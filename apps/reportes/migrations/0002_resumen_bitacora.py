@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 21:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0001_hechos_venta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenBitacoraHora',
+            fields=[
+                ('id_resumen', models.BigAutoField(primary_key=True, serialize=False)),
+                ('hora', models.DateTimeField()),
+                ('accion', models.CharField(max_length=255)),
+                ('id_usuario', models.IntegerField(blank=True, null=True)),
+                ('ip', models.GenericIPAddressField(blank=True, null=True)),
+                ('total', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'resumen_bitacora_hora',
+                'constraints': [models.UniqueConstraint(fields=('hora', 'accion', 'id_usuario', 'ip'), name='resumen_bitacora_grano_uniq', nulls_distinct=False)],
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.6 on 2026-10-18 21:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0002_resumen_bitacora'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReporteProgramado',
+            fields=[
+                ('id_programado', models.BigAutoField(primary_key=True, serialize=False)),
+                ('nombre', models.CharField(max_length=120)),
+                ('tipo_reporte', models.CharField(max_length=40)),
+                ('filtros', models.JSONField(blank=True, default=dict)),
+                ('frecuencia', models.CharField(max_length=10)),
+                ('hora_ejecucion', models.TimeField()),
+                ('formatos', models.JSONField(default=list)),
+                ('activo', models.BooleanField(default=True)),
+                ('proxima_ejecucion', models.DateTimeField()),
+                ('ultima_ejecucion', models.DateTimeField(blank=True, null=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('creado_por', models.ForeignKey(blank=True, db_column='creado_por', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reportes_programados', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'reporte_programado',
+                'ordering': ['nombre', 'id_programado'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArtefactoReporte',
+            fields=[
+                ('id_artefacto', models.BigAutoField(primary_key=True, serialize=False)),
+                ('formato', models.CharField(max_length=10)),
+                ('estado', models.CharField(max_length=15)),
+                ('periodo_desde', models.DateField()),
+                ('periodo_hasta', models.DateField()),
+                ('ruta', models.CharField(blank=True, default='', max_length=255)),
+                ('filas', models.IntegerField(default=0)),
+                ('bytes', models.BigIntegerField(default=0)),
+                ('bytes_sin_comprimir', models.BigIntegerField(default=0)),
+                ('duracion_consulta_ms', models.IntegerField(blank=True, null=True)),
+                ('duracion_ms', models.IntegerField(default=0)),
+                ('mensaje', models.TextField(blank=True, null=True)),
+                ('fecha_generacion', models.DateTimeField()),
+                ('programado', models.ForeignKey(db_column='id_programado', on_delete=django.db.models.deletion.CASCADE, related_name='artefactos', to='reportes.reporteprogramado')),
+            ],
+            options={
+                'db_table': 'artefacto_reporte',
+                'ordering': ['-fecha_generacion', '-id_artefacto'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='reporteprogramado',
+            index=models.Index(fields=['activo', 'proxima_ejecucion'], name='reporte_programado_prox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='artefactoreporte',
+            index=models.Index(fields=['programado', 'formato', '-fecha_generacion'], name='artefacto_reporte_ultimo_idx'),
+        ),
+    ]
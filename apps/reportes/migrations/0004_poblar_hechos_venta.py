@@ -0,0 +1,48 @@
+from django.db import migrations
+
+# hecho_venta_diaria se creó vacía: se llena con toda la historia de las
+# tablas legadas venta/detalle_venta (managed=False), solo si existen. Es
+# lo mismo que `actualizar_hechos_venta --completo` (hechos.reconstruir):
+# borra y recalcula, así que también corrige lo registrado en línea entre
+# 0001 y esta migración.
+POBLAR = """
+DO $$
+BEGIN
+    IF to_regclass('venta') IS NOT NULL AND to_regclass('detalle_venta') IS NOT NULL THEN
+        LOCK TABLE hecho_venta_diaria IN SHARE ROW EXCLUSIVE MODE;
+        DELETE FROM hecho_venta_diaria;
+
+        INSERT INTO hecho_venta_diaria
+               (fecha, id_producto, id_categoria, id_metodo_pago, id_vendedor, anulada,
+                lineas, cantidad, monto, ventas, monto_ventas, fecha_actualizacion)
+        SELECT d.fecha, d.id_producto, p.id_categoria, d.id_metodo_pago, d.id_vendedor,
+               d.estado ILIKE '%ANUL%',
+               COUNT(*),
+               SUM(d.cantidad),
+               SUM(d.sub_total),
+               COUNT(*) FILTER (WHERE d.primera),
+               COALESCE(SUM(d.monto_total) FILTER (WHERE d.primera), 0),
+               now()
+          FROM (
+                SELECT v.fecha, v.id_metodo_pago, v.id_vendedor, v.monto_total, v.estado,
+                       dv.id_producto, dv.cantidad, dv.sub_total,
+                       dv.id_detalle_venta = MIN(dv.id_detalle_venta) OVER (PARTITION BY dv.id_venta) AS primera
+                  FROM venta v
+                  JOIN detalle_venta dv ON dv.id_venta = v.id_venta
+               ) AS d
+          JOIN producto p ON p.id_producto = d.id_producto
+         GROUP BY 1, 2, 3, 4, 5, 6;
+    END IF;
+END $$;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0003_reportes_programados'),
+    ]
+
+    operations = [
+        migrations.RunSQL(POBLAR, migrations.RunSQL.noop),
+    ]
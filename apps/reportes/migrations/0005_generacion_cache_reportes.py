@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0004_poblar_hechos_venta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeneracionCacheReportes',
+            fields=[
+                ('dependencia', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('generacion', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'reporte_cache_generacion',
+            },
+        ),
+    ]
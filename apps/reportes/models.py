@@ -0,0 +1,201 @@
+from django.db import models
+
+
+class HechoVentaDiaria(models.Model):
+    """
+    Tabla de hechos de ventas por día.
+
+    Grano: fecha × producto × categoría × método de pago × vendedor × anulada.
+    Se mantiene en línea al registrar y anular ventas (apps.reportes.hechos)
+    y se reconstruye por rango con `manage.py actualizar_hechos_venta`.
+
+    Medidas:
+      - lineas, cantidad, monto: suma de detalle_venta (aditivas en todo eje).
+      - ventas, monto_ventas: cada venta cuenta una sola vez, en la celda de
+        su primera línea. Suman bien agrupando por fecha, método de pago,
+        vendedor o anulada; por producto/categoría usar lineas y monto.
+    """
+
+    id_hecho = models.BigAutoField(primary_key=True)
+    fecha = models.DateField()
+    producto = models.ForeignKey(
+        "productos.Producto",
+        on_delete=models.CASCADE,
+        db_column="id_producto",
+        related_name="hechos_venta",
+    )
+    categoria = models.ForeignKey(
+        "categoria.Categoria",
+        on_delete=models.CASCADE,
+        db_column="id_categoria",
+        related_name="hechos_venta",
+    )
+    metodo_pago = models.ForeignKey(
+        "pagos.MetodoPago",
+        on_delete=models.CASCADE,
+        db_column="id_metodo_pago",
+        related_name="hechos_venta",
+    )
+    vendedor = models.ForeignKey(
+        "usuarios.Vendedor",
+        on_delete=models.CASCADE,
+        db_column="id_vendedor",
+        related_name="hechos_venta",
+    )
+    anulada = models.BooleanField(default=False)
+
+    lineas = models.IntegerField(default=0)
+    cantidad = models.IntegerField(default=0)
+    monto = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    ventas = models.IntegerField(default=0)
+    monto_ventas = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "hecho_venta_diaria"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["fecha", "producto", "categoria", "metodo_pago", "vendedor", "anulada"],
+                name="hecho_venta_diaria_grano_uniq",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["producto", "fecha"], name="hecho_venta_producto_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} {self.producto_id}: {self.cantidad}"
+
+
+class ResumenBitacoraHora(models.Model):
+    """
+    Eventos de bitácora agregados por hora.
+
+    Grano: hora × acción × usuario × IP. Solo contiene horas cerradas; las
+    agrega `apps.reportes.resumen_bitacora.actualizar()` a partir de la
+    última hora resumida (la bitácora solo recibe inserciones con la hora
+    actual, así que una hora cerrada no vuelve a cambiar).
+    """
+
+    id_resumen = models.BigAutoField(primary_key=True)
+    hora = models.DateTimeField()
+    accion = models.CharField(max_length=255)
+    # Sin FK: el resumen conserva el id aunque el usuario se elimine
+    id_usuario = models.IntegerField(null=True, blank=True)
+    ip = models.GenericIPAddressField(null=True, blank=True)
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = "resumen_bitacora_hora"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["hora", "accion", "id_usuario", "ip"],
+                name="resumen_bitacora_grano_uniq",
+                nulls_distinct=False,
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.hora:%Y-%m-%d %H}h {self.accion}: {self.total}"
+
+
+class ReporteProgramado(models.Model):
+    """
+    Definición guardada de un reporte que se genera solo.
+
+    `frecuencia` (DIARIO/MENSUAL/ANUAL) marca cada cuánto se genera; cada
+    ejecución cubre el período cerrado anterior (el día, mes o año previo)
+    y se corre a `hora_ejecucion`, por defecto fuera del horario comercial.
+    Lo ejecuta `manage.py programador_reportes` (apps.reportes.programados).
+    """
+
+    id_programado = models.BigAutoField(primary_key=True)
+    nombre = models.CharField(max_length=120)
+    tipo_reporte = models.CharField(max_length=40)
+    # Filtros del reporte sin fecha_desde/fecha_hasta (las pone el período)
+    filtros = models.JSONField(default=dict, blank=True)
+    frecuencia = models.CharField(max_length=10)
+    hora_ejecucion = models.TimeField()
+    formatos = models.JSONField(default=list)
+    activo = models.BooleanField(default=True)
+    proxima_ejecucion = models.DateTimeField()
+    ultima_ejecucion = models.DateTimeField(null=True, blank=True)
+    creado_por = models.ForeignKey(
+        "usuarios.Usuario",
+        db_column="creado_por",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="reportes_programados",
+    )
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "reporte_programado"
+        ordering = ["nombre", "id_programado"]
+        indexes = [
+            models.Index(fields=["activo", "proxima_ejecucion"], name="reporte_programado_prox_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.nombre} ({self.tipo_reporte}, {self.frecuencia})"
+
+
+class ArtefactoReporte(models.Model):
+    """
+    Archivo generado por una ejecución de un reporte programado.
+
+    El archivo (JSON o CSV comprimido con gzip) vive en
+    settings.REPORTES_DIR/programados/; `ruta` es relativa a ese directorio.
+    """
+
+    id_artefacto = models.BigAutoField(primary_key=True)
+    programado = models.ForeignKey(
+        ReporteProgramado,
+        db_column="id_programado",
+        on_delete=models.CASCADE,
+        related_name="artefactos",
+    )
+    formato = models.CharField(max_length=10)
+    estado = models.CharField(max_length=15)
+    periodo_desde = models.DateField()
+    periodo_hasta = models.DateField()
+    ruta = models.CharField(max_length=255, blank=True, default="")
+    filas = models.IntegerField(default=0)
+    bytes = models.BigIntegerField(default=0)
+    bytes_sin_comprimir = models.BigIntegerField(default=0)
+    # Consulta del reporte y escritura del archivo (en CSV van juntas: streaming)
+    duracion_consulta_ms = models.IntegerField(null=True, blank=True)
+    duracion_ms = models.IntegerField(default=0)
+    mensaje = models.TextField(null=True, blank=True)
+    fecha_generacion = models.DateTimeField()
+
+    class Meta:
+        db_table = "artefacto_reporte"
+        ordering = ["-fecha_generacion", "-id_artefacto"]
+        indexes = [
+            models.Index(fields=["programado", "formato", "-fecha_generacion"], name="artefacto_reporte_ultimo_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.programado_id} {self.formato} {self.periodo_desde}..{self.periodo_hasta}"
+
+
+class GeneracionCacheReportes(models.Model):
+    """
+    Generación compartida de la caché de reportes, por dependencia.
+
+    La caché vive en cada proceso. Un cambio que toca un rango ya cerrado
+    (p. ej. anular una venta de un mes anterior) incrementa la generación
+    de su dependencia; los demás workers comparan la que guardaron con
+    cada entrada de rango cerrado al leerla (apps.reportes.cache).
+    """
+
+    dependencia = models.CharField(max_length=20, primary_key=True)
+    generacion = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = "reporte_cache_generacion"
+
+    def __str__(self):
+        return f"{self.dependencia}: {self.generacion}"
@@ -0,0 +1,388 @@
+"""
+Reportes programados: definiciones guardadas que se generan solas.
+
+Cada ReporteProgramado tiene una frecuencia (DIARIO/MENSUAL/ANUAL) y una
+hora de ejecución. `manage.py programador_reportes` revisa cada minuto
+las definiciones vencidas, las reclama con SELECT ... FOR UPDATE SKIP
+LOCKED (dos programadores no generan lo mismo) y escribe un artefacto por
+formato en settings.REPORTES_DIR/programados/<id_programado>/:
+
+    JSON  el reporte completo (lo mismo que /generar/), gzip
+    CSV   las filas de la exportación (lo mismo que /exportar/), gzip
+
+Cada ejecución cubre el período cerrado anterior a la fecha programada:
+el día, el mes o el año previo. El dashboard descarga el último artefacto
+sin volver a consultar la base.
+"""
+import calendar
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+from datetime import time as hora_del_dia
+from typing import Any, Dict, List, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import exportacion
+from .models import ArtefactoReporte, ReporteProgramado
+from .services import Frequency, NoDataForReport, ReportesService
+
+logger = logging.getLogger(__name__)
+
+# Fuera del horario comercial
+HORA_DEFECTO = hora_del_dia(3, 0)
+# Definiciones que toma cada pasada del programador
+LOTE_RECLAMO = 20
+
+
+class FormatoArtefacto:
+    JSON = "JSON"
+    CSV = "CSV"
+
+    CONTENT_TYPES = {JSON: "application/json", CSV: "text/csv; charset=utf-8"}
+    EXTENSIONES = {JSON: "json", CSV: "csv"}
+
+    @classmethod
+    def choices(cls) -> List[tuple[str, str]]:
+        return [(cls.JSON, "JSON"), (cls.CSV, "CSV")]
+
+
+class EstadoArtefacto:
+    COMPLETADO = "COMPLETADO"
+    SIN_DATOS = "SIN_DATOS"
+    ERROR = "ERROR"
+
+
+# ==========================================================
+# CALENDARIO
+# ==========================================================
+
+def periodo(frecuencia: str, fecha: date) -> Tuple[date, date]:
+    """Período cerrado (desde, hasta) anterior a `fecha`."""
+    if frecuencia == Frequency.DIARIO:
+        dia = fecha - timedelta(days=1)
+        return dia, dia
+    if frecuencia == Frequency.MENSUAL:
+        hasta = fecha.replace(day=1) - timedelta(days=1)
+        return hasta.replace(day=1), hasta
+    if frecuencia == Frequency.ANUAL:
+        return date(fecha.year - 1, 1, 1), date(fecha.year - 1, 12, 31)
+    raise ValueError(f"Frecuencia no soportada: {frecuencia}")
+
+
+def _inicio_periodo(frecuencia: str, fecha: date) -> date:
+    if frecuencia == Frequency.MENSUAL:
+        return fecha.replace(day=1)
+    if frecuencia == Frequency.ANUAL:
+        return fecha.replace(month=1, day=1)
+    return fecha
+
+
+def _periodo_siguiente(frecuencia: str, inicio: date) -> date:
+    if frecuencia == Frequency.MENSUAL:
+        dias = calendar.monthrange(inicio.year, inicio.month)[1]
+        return inicio + timedelta(days=dias)
+    if frecuencia == Frequency.ANUAL:
+        return inicio.replace(year=inicio.year + 1)
+    return inicio + timedelta(days=1)
+
+
+def siguiente_ejecucion(frecuencia: str, hora, despues: datetime) -> datetime:
+    """Primera ejecución estrictamente posterior a `despues`."""
+    if frecuencia not in dict(Frequency.choices()):
+        raise ValueError(f"Frecuencia no soportada: {frecuencia}")
+    inicio = _inicio_periodo(frecuencia, despues.date())
+    candidata = datetime.combine(inicio, hora)
+    if candidata <= despues:
+        candidata = datetime.combine(_periodo_siguiente(frecuencia, inicio), hora)
+    return candidata
+
+
+# ==========================================================
+# ARCHIVOS
+# ==========================================================
+
+def directorio_base() -> str:
+    return os.path.join(settings.REPORTES_DIR, "programados")
+
+
+def ruta_absoluta(artefacto: ArtefactoReporte) -> str:
+    return os.path.join(directorio_base(), artefacto.ruta)
+
+
+def _escribir_gzip(ruta_relativa: str, partes) -> Dict[str, int]:
+    """Escribe las partes (bytes) comprimidas; el archivo aparece completo o no aparece."""
+    ruta = os.path.join(directorio_base(), ruta_relativa)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    tmp = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    sin_comprimir = 0
+    try:
+        with gzip.open(tmp, "wb", compresslevel=6) as fh:
+            for parte in partes:
+                fh.write(parte)
+                sin_comprimir += len(parte)
+        os.replace(tmp, ruta)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return {"bytes": os.path.getsize(ruta), "bytes_sin_comprimir": sin_comprimir}
+
+
+def _contar(filas, contador: List[int]):
+    for fila in filas:
+        contador[0] += 1
+        yield fila
+
+
+def _generar_json(tipo_reporte: str, filtros: Dict[str, Any], ruta: str) -> Dict[str, Any]:
+    inicio = time.perf_counter()
+    reporte = ReportesService.generar_reporte(tipo_reporte, filtros)
+    consulta_ms = int((time.perf_counter() - inicio) * 1000)
+    contenido = json.dumps(reporte, cls=JSONEncoder, ensure_ascii=False).encode("utf-8")
+    return {
+        **_escribir_gzip(ruta, [contenido]),
+        "filas": len(reporte.get("resultados") or []),
+        "duracion_consulta_ms": consulta_ms,
+    }
+
+
+def _generar_csv(tipo_reporte: str, filtros: Dict[str, Any], ruta: str) -> Dict[str, Any]:
+    encabezados, filas = exportacion.filas_reporte(tipo_reporte, filtros)
+    contador = [0]
+    escrito = _escribir_gzip(ruta, exportacion.escribir_csv(encabezados, _contar(filas, contador)))
+    # Consulta y escritura van intercaladas (streaming): solo hay duración total
+    return {**escrito, "filas": contador[0], "duracion_consulta_ms": None}
+
+
+GENERADORES = {
+    FormatoArtefacto.JSON: _generar_json,
+    FormatoArtefacto.CSV: _generar_csv,
+}
+
+
+# ==========================================================
+# EJECUCIÓN
+# ==========================================================
+
+def filtros_ejecucion(programado: ReporteProgramado, desde: date, hasta: date) -> Dict[str, Any]:
+    """Filtros validados del reporte para el período."""
+    from .serializers import ReporteFiltroSerializer
+
+    serializer = ReporteFiltroSerializer(data={
+        **programado.filtros,
+        "tipo_reporte": programado.tipo_reporte,
+        "fecha_desde": desde,
+        "fecha_hasta": hasta,
+    })
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data
+
+
+def _generar_artefacto(artefacto: ArtefactoReporte, tipo_reporte: str, filtros: Dict[str, Any], ruta: str) -> None:
+    try:
+        resultado = GENERADORES[artefacto.formato](tipo_reporte, filtros, ruta)
+    except NoDataForReport as exc:
+        artefacto.estado = EstadoArtefacto.SIN_DATOS
+        artefacto.mensaje = str(exc)
+    except Exception as exc:
+        logger.exception(
+            f"Error generando el reporte programado {artefacto.programado_id} ({artefacto.formato})"
+        )
+        artefacto.estado = EstadoArtefacto.ERROR
+        artefacto.mensaje = str(exc)
+    else:
+        artefacto.estado = EstadoArtefacto.COMPLETADO
+        artefacto.ruta = ruta
+        artefacto.filas = resultado["filas"]
+        artefacto.bytes = resultado["bytes"]
+        artefacto.bytes_sin_comprimir = resultado["bytes_sin_comprimir"]
+        artefacto.duracion_consulta_ms = resultado["duracion_consulta_ms"]
+
+
+def ejecutar(programado: ReporteProgramado, fecha: date = None) -> List[ArtefactoReporte]:
+    """
+    Genera un artefacto por formato para el período cerrado anterior a
+    `fecha` (hoy si no se indica). Un formato que falla no impide los demás.
+
+    Si los filtros guardados ya no validan para el período, cada formato
+    queda registrado como ERROR con el detalle de la validación.
+    """
+    fecha = fecha or timezone.now().date()
+    desde, hasta = periodo(programado.frecuencia, fecha)
+    try:
+        filtros, error_filtros = filtros_ejecucion(programado, desde, hasta), None
+    except ValidationError as exc:
+        logger.warning(f"Filtros inválidos en el reporte programado {programado.pk}: {exc.detail}")
+        filtros, error_filtros = None, json.dumps(exc.detail, ensure_ascii=False)
+    marca = timezone.now().strftime("%Y%m%dT%H%M%S")
+
+    artefactos = []
+    for formato in programado.formatos:
+        ruta = os.path.join(
+            str(programado.pk),
+            f"{desde:%Y%m%d}-{hasta:%Y%m%d}_{marca}.{FormatoArtefacto.EXTENSIONES[formato]}.gz",
+        )
+        artefacto = ArtefactoReporte(
+            programado=programado,
+            formato=formato,
+            periodo_desde=desde,
+            periodo_hasta=hasta,
+        )
+        inicio = time.perf_counter()
+        if error_filtros is not None:
+            artefacto.estado = EstadoArtefacto.ERROR
+            artefacto.mensaje = error_filtros
+        else:
+            _generar_artefacto(artefacto, programado.tipo_reporte, filtros, ruta)
+        artefacto.duracion_ms = int((time.perf_counter() - inicio) * 1000)
+        artefacto.fecha_generacion = timezone.now()
+        artefacto.save()
+        artefactos.append(artefacto)
+
+    depurar(programado)
+    return artefactos
+
+
+def reclamar_vencidos(ahora: datetime = None, limite: int = LOTE_RECLAMO) -> List[Tuple[ReporteProgramado, date]]:
+    """
+    Toma las definiciones vencidas y adelanta su próxima ejecución en la
+    misma transacción: si la generación falla o el proceso cae, no se
+    reintenta en cada pasada. Devuelve (definición, fecha programada).
+    """
+    ahora = ahora or timezone.now()
+    reclamados = []
+    with transaction.atomic():
+        vencidos = (
+            ReporteProgramado.objects.select_for_update(skip_locked=True)
+            .filter(activo=True, proxima_ejecucion__lte=ahora)
+            .order_by("proxima_ejecucion")[:limite]
+        )
+        for programado in vencidos:
+            reclamados.append((programado, programado.proxima_ejecucion.date()))
+            programado.ultima_ejecucion = ahora
+            programado.proxima_ejecucion = siguiente_ejecucion(
+                programado.frecuencia, programado.hora_ejecucion, ahora
+            )
+            programado.save(update_fields=["ultima_ejecucion", "proxima_ejecucion"])
+    return reclamados
+
+
+def ejecutar_vencidos(ahora: datetime = None) -> List[ArtefactoReporte]:
+    artefactos = []
+    while True:
+        reclamados = reclamar_vencidos(ahora)
+        for programado, fecha in reclamados:
+            try:
+                artefactos += ejecutar(programado, fecha)
+            except Exception:
+                # Una definición rota no corta el lote ni el programador
+                logger.exception(f"Error ejecutando el reporte programado {programado.pk}")
+        if len(reclamados) < LOTE_RECLAMO:
+            return artefactos
+
+
+def depurar(programado: ReporteProgramado) -> int:
+    """Conserva los últimos REPORTES_PROGRAMADOS_RETENCION artefactos por formato."""
+    retencion = settings.REPORTES_PROGRAMADOS_RETENCION
+    viejos = []
+    for formato in programado.formatos:
+        viejos += list(
+            ArtefactoReporte.objects.filter(programado=programado, formato=formato)
+            .order_by("-fecha_generacion", "-id_artefacto")[retencion:]
+        )
+    for artefacto in viejos:
+        if artefacto.ruta:
+            try:
+                os.remove(ruta_absoluta(artefacto))
+            except FileNotFoundError:
+                pass
+    ArtefactoReporte.objects.filter(pk__in=[a.pk for a in viejos]).delete()
+    return len(viejos)
+
+
+def ultimo_artefacto(programado: ReporteProgramado, formato: str = FormatoArtefacto.JSON):
+    return (
+        ArtefactoReporte.objects.filter(
+            programado=programado, formato=formato, estado=EstadoArtefacto.COMPLETADO
+        )
+        .order_by("-fecha_generacion", "-id_artefacto")
+        .first()
+    )
+
+
+def ultimos_artefactos(ids_programados) -> Dict[Tuple[int, str], ArtefactoReporte]:
+    """Último artefacto completado por (definición, formato), en una consulta."""
+    artefactos = (
+        ArtefactoReporte.objects.select_related("programado")
+        .filter(programado_id__in=list(ids_programados), estado=EstadoArtefacto.COMPLETADO)
+        .order_by("programado_id", "formato", "-fecha_generacion", "-id_artefacto")
+        .distinct("programado_id", "formato")
+    )
+    return {(a.programado_id, a.formato): a for a in artefactos}
+
+
+# ==========================================================
+# MÉTRICAS
+# ==========================================================
+
+def metricas(dias: int = 30) -> List[Dict[str, Any]]:
+    """
+    Tiempos de generación por tipo de reporte y formato en los últimos
+    `dias`: ejecuciones, errores, promedio, p95 y máximo (ms), filas y
+    bytes promedio y la relación de compresión.
+    """
+    desde = timezone.now() - timedelta(days=dias)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT p.tipo_reporte, a.formato,
+                   COUNT(*),
+                   COUNT(*) FILTER (WHERE a.estado = %(error)s),
+                   AVG(a.duracion_ms),
+                   percentile_cont(0.95) WITHIN GROUP (ORDER BY a.duracion_ms),
+                   MAX(a.duracion_ms),
+                   AVG(a.duracion_consulta_ms),
+                   AVG(a.filas) FILTER (WHERE a.estado = %(completado)s),
+                   AVG(a.bytes) FILTER (WHERE a.estado = %(completado)s),
+                   SUM(a.bytes_sin_comprimir)::float / NULLIF(SUM(a.bytes), 0),
+                   MAX(a.fecha_generacion)
+            FROM {ArtefactoReporte._meta.db_table} a
+            JOIN {ReporteProgramado._meta.db_table} p ON p.id_programado = a.id_programado
+            WHERE a.fecha_generacion >= %(desde)s
+            GROUP BY 1, 2
+            ORDER BY 1, 2
+            """,
+            {"desde": desde, "error": EstadoArtefacto.ERROR, "completado": EstadoArtefacto.COMPLETADO},
+        )
+        filas = cursor.fetchall()
+
+    def _num(valor, decimales=1):
+        return None if valor is None else round(float(valor), decimales)
+
+    return [
+        {
+            "tipo_reporte": tipo,
+            "formato": formato,
+            "ejecuciones": ejecuciones,
+            "errores": errores,
+            "duracion_promedio_ms": _num(promedio),
+            "duracion_p95_ms": _num(p95),
+            "duracion_max_ms": maximo,
+            "consulta_promedio_ms": _num(consulta),
+            "filas_promedio": _num(filas_promedio),
+            "bytes_promedio": _num(bytes_promedio, 0),
+            "compresion": _num(compresion, 2),
+            "ultima_generacion": ultima,
+        }
+        for (tipo, formato, ejecuciones, errores, promedio, p95, maximo, consulta,
+             filas_promedio, bytes_promedio, compresion, ultima) in filas
+    ]
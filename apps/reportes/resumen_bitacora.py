@@ -0,0 +1,257 @@
+"""
+Resumen horario de la bitácora y consultas del reporte de bitácora.
+
+resumen_bitacora_hora guarda las horas cerradas agregadas por acción,
+usuario e IP. actualizar() agrega solo las horas nuevas desde la última
+resumida (lo ejecuta el reporte antes de consultar y el comando
+actualizar_resumen_bitacora). Las consultas combinan el resumen con la
+cola todavía no resumida, leída directamente de bitacora.
+
+- serie(): eventos por minuto, hora o día. Hora y día salen del resumen;
+  minuto necesita la bitácora y se limita a MAX_DIAS_MINUTO días.
+- por_accion(): totales exactos por acción.
+- mas_frecuentes(): top-K de IPs, usuarios y acciones con Space-Saving
+  sobre un cursor del lado del servidor: la memoria queda acotada por
+  CONTADORES sin importar el tamaño de la ventana.
+"""
+import heapq
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from apps.bitacora.models import Bitacora
+
+from .models import ResumenBitacoraHora
+
+TABLA = ResumenBitacoraHora._meta.db_table
+BITACORA = Bitacora._meta.db_table
+
+# Una hora se resume recién pasado este margen: un evento cuya transacción
+# confirma unos segundos después del cambio de hora no queda afuera.
+MARGEN_CIERRE = timedelta(minutes=5)
+
+MAX_DIAS_MINUTO = 2
+CONTADORES = 1000
+CHUNK_SIZE = 5000
+
+
+class Granularidad:
+    MINUTO = "MINUTO"
+    HORA = "HORA"
+    DIA = "DIA"
+
+    TRUNC = {MINUTO: "minute", HORA: "hour", DIA: "day"}
+    FORMATO = {MINUTO: "%Y-%m-%d %H:%M", HORA: "%Y-%m-%d %H:00", DIA: "%Y-%m-%d"}
+
+    @classmethod
+    def choices(cls) -> List[tuple[str, str]]:
+        return [(cls.MINUTO, "Por minuto"), (cls.HORA, "Por hora"), (cls.DIA, "Por día")]
+
+
+class ContadorFrecuentes:
+    """
+    Space-Saving (Metwally, Agrawal y El Abbadi) con incrementos ponderados.
+
+    Guarda a lo sumo `capacidad` claves. Cada conteo sobreestima el real en
+    a lo sumo su error, y error <= total / capacidad: toda clave con más de
+    total / capacidad ocurrencias está presente.
+    """
+
+    def __init__(self, capacidad: int = CONTADORES):
+        self.capacidad = capacidad
+        self.total = 0
+        self._conteos: Dict[Any, List[int]] = {}  # clave -> [conteo, error]
+        self._heap: List[Tuple[int, Any]] = []    # (conteo, clave), con entradas viejas
+
+    def agregar(self, clave, peso: int = 1) -> None:
+        self.total += peso
+        entrada = self._conteos.get(clave)
+        if entrada is not None:
+            entrada[0] += peso
+        elif len(self._conteos) < self.capacidad:
+            entrada = self._conteos[clave] = [peso, 0]
+        else:
+            # Reemplaza la clave de menor conteo y hereda ese conteo como error
+            minimo, victima = self._menor()
+            del self._conteos[victima]
+            entrada = self._conteos[clave] = [minimo + peso, minimo]
+        heapq.heappush(self._heap, (entrada[0], clave))
+        if len(self._heap) > 4 * self.capacidad:
+            self._heap = [(conteo, c) for c, (conteo, _) in self._conteos.items()]
+            heapq.heapify(self._heap)
+
+    def _menor(self) -> Tuple[int, Any]:
+        while True:
+            conteo, clave = heapq.heappop(self._heap)
+            entrada = self._conteos.get(clave)
+            if entrada is not None and entrada[0] == conteo:
+                return conteo, clave
+
+    def top(self, k: int) -> List[Dict[str, Any]]:
+        mayores = sorted(self._conteos.items(), key=lambda item: (-item[1][0], str(item[0])))[:k]
+        return [{"clave": clave, "total": conteo, "error": error} for clave, (conteo, error) in mayores]
+
+
+def _fecha(valor) -> Optional[date]:
+    if not valor:
+        return None
+    if isinstance(valor, date):
+        return valor
+    return parse_date(str(valor))
+
+
+def _rango(filtros: Dict[str, Any]) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """[inicio, fin) en fecha-hora a partir de fecha_desde/fecha_hasta (días completos)."""
+    desde = _fecha(filtros.get("fecha_desde"))
+    hasta = _fecha(filtros.get("fecha_hasta"))
+    inicio = datetime.combine(desde, time.min) if desde else None
+    fin = datetime.combine(hasta + timedelta(days=1), time.min) if hasta else None
+    return inicio, fin
+
+
+def _condiciones(filtros: Dict[str, Any], campo: str, inicio, fin) -> Tuple[str, List[Any]]:
+    condiciones, params = ["TRUE"], []
+    if inicio:
+        condiciones.append(f"{campo} >= %s")
+        params.append(inicio)
+    if fin:
+        condiciones.append(f"{campo} < %s")
+        params.append(fin)
+    if filtros.get("accion"):
+        condiciones.append("accion = %s")
+        params.append(filtros["accion"])
+    if filtros.get("usuario_id"):
+        condiciones.append("id_usuario = %s")
+        params.append(filtros["usuario_id"])
+    return " AND ".join(condiciones), params
+
+
+def _corte() -> Optional[datetime]:
+    """Primera hora que no está en el resumen (None si está vacío)."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT MAX(hora) FROM {TABLA}")
+        ultima = cursor.fetchone()[0]
+    return ultima + timedelta(hours=1) if ultima else None
+
+
+@transaction.atomic
+def actualizar() -> int:
+    """Resume las horas cerradas que faltan. Devuelve las celdas escritas."""
+    limite = (timezone.now() - MARGEN_CIERRE).replace(minute=0, second=0, microsecond=0)
+    with connection.cursor() as cursor:
+        # Serializa las actualizaciones; las lecturas no se bloquean
+        cursor.execute(f"LOCK TABLE {TABLA} IN SHARE ROW EXCLUSIVE MODE")
+        desde = _corte()
+        if desde and desde >= limite:
+            return 0
+        rango, params = _condiciones({}, "fecha_hora", desde, limite)
+        cursor.execute(
+            f"""
+            INSERT INTO {TABLA} (hora, accion, id_usuario, ip, total)
+            SELECT date_trunc('hour', fecha_hora), accion, id_usuario, ip, COUNT(*)
+            FROM {BITACORA}
+            WHERE {rango}
+            GROUP BY 1, 2, 3, 4
+            ON CONFLICT ON CONSTRAINT resumen_bitacora_grano_uniq
+            DO UPDATE SET total = EXCLUDED.total
+            """,
+            params,
+        )
+        return cursor.rowcount
+
+
+@transaction.atomic
+def reconstruir() -> int:
+    with connection.cursor() as cursor:
+        cursor.execute(f"TRUNCATE {TABLA}")
+    return actualizar()
+
+
+def _eventos(filtros: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """
+    SELECT de (hora, accion, id_usuario, ip, total) para la ventana: horas
+    resumidas desde resumen_bitacora_hora y el resto desde bitacora.
+    """
+    inicio, fin = _rango(filtros)
+    corte = _corte()
+    partes, params = [], []
+
+    if corte and (inicio is None or inicio < corte):
+        condicion, p = _condiciones(filtros, "hora", inicio, min(fin, corte) if fin else corte)
+        partes.append(f"SELECT hora, accion, id_usuario, ip, total FROM {TABLA} WHERE {condicion}")
+        params += p
+
+    inicio_cola = max(inicio, corte) if inicio and corte else (corte or inicio)
+    if fin is None or inicio_cola is None or inicio_cola < fin:
+        condicion, p = _condiciones(filtros, "fecha_hora", inicio_cola, fin)
+        partes.append(
+            f"SELECT date_trunc('hour', fecha_hora) AS hora, accion, id_usuario, ip, COUNT(*) AS total "
+            f"FROM {BITACORA} WHERE {condicion} GROUP BY 1, 2, 3, 4"
+        )
+        params += p
+
+    return " UNION ALL ".join(partes), params
+
+
+def serie(filtros: Dict[str, Any], granularidad: str = Granularidad.HORA) -> List[Dict[str, Any]]:
+    """Eventos por período; por minuto se lee la bitácora directamente."""
+    trunc = Granularidad.TRUNC[granularidad]
+    if granularidad == Granularidad.MINUTO:
+        inicio, fin = _rango(filtros)
+        condicion, params = _condiciones(filtros, "fecha_hora", inicio, fin)
+        sql = f"SELECT date_trunc('minute', fecha_hora), COUNT(*) FROM {BITACORA} WHERE {condicion} GROUP BY 1 ORDER BY 1"
+    else:
+        eventos, params = _eventos(filtros)
+        sql = f"SELECT date_trunc(%s, hora), SUM(total) FROM ({eventos}) AS e GROUP BY 1 ORDER BY 1"
+        params = [trunc] + params
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        filas = cursor.fetchall()
+    formato = Granularidad.FORMATO[granularidad]
+    return [{"periodo": periodo.strftime(formato), "total": int(total)} for periodo, total in filas]
+
+
+def por_accion(filtros: Dict[str, Any]) -> List[Dict[str, Any]]:
+    eventos, params = _eventos(filtros)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT accion, SUM(total) FROM ({eventos}) AS e GROUP BY accion ORDER BY 2 DESC, accion",
+            params,
+        )
+        return [{"accion": accion, "total": int(total)} for accion, total in cursor.fetchall()]
+
+
+def mas_frecuentes(filtros: Dict[str, Any], k: int = 10) -> Dict[str, Any]:
+    """
+    Top-K aproximado de IPs, usuarios y acciones. Las celdas se leen en
+    bloques de CHUNK_SIZE con un cursor del lado del servidor (salvo que
+    la conexión tenga DISABLE_SERVER_SIDE_CURSORS).
+    """
+    eventos, params = _eventos(filtros)
+    contadores = {nombre: ContadorFrecuentes() for nombre in ("ips", "usuarios", "acciones")}
+
+    servidor = not connection.settings_dict.get("DISABLE_SERVER_SIDE_CURSORS")
+    with transaction.atomic():
+        cursor = connection.chunked_cursor() if servidor else connection.cursor()
+        with cursor:
+            cursor.execute(f"SELECT accion, id_usuario, host(ip), total FROM ({eventos}) AS e", params)
+            while True:
+                filas = cursor.fetchmany(CHUNK_SIZE)
+                if not filas:
+                    break
+                for accion, id_usuario, ip, total in filas:
+                    contadores["acciones"].agregar(accion, total)
+                    if id_usuario is not None:
+                        contadores["usuarios"].agregar(id_usuario, total)
+                    if ip is not None:
+                        contadores["ips"].agregar(ip, total)
+
+    return {
+        "total_eventos": contadores["acciones"].total,
+        "contadores": CONTADORES,
+        **{nombre: contador.top(k) for nombre, contador in contadores.items()},
+    }
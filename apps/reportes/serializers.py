@@ -1,5 +1,8 @@
+from django.utils import timezone
 from rest_framework import serializers
 
+from . import hechos, jobs, programados, resumen_bitacora
+from .models import ArtefactoReporte, ReporteProgramado
 from .services import Frequency, ReportType
 
 
@@ -37,14 +40,27 @@ class ReporteFiltroSerializer(serializers.Serializer):
 
     # Ventas - filtros adicionales
     cliente = serializers.CharField(required=False, allow_blank=True)
+    # Ventas - página del detalle (el cursor lo devuelve `siguiente`)
+    cursor = serializers.CharField(required=False, allow_blank=True)
+    tamano_pagina = serializers.IntegerField(required=False, min_value=1, max_value=5000)
 
     # Bitácora
     accion = serializers.CharField(required=False, allow_blank=True)
     usuario_id = serializers.IntegerField(required=False)
+    granularidad = serializers.ChoiceField(
+        choices=resumen_bitacora.Granularidad.choices(), required=False
+    )
 
-    # Formato de salida (por ahora solo JSON, pero se deja listo para exportación)
+    # Formato de salida: JSON para /generar/, CSV/NDJSON/XLSX para /exportar/
     formato = serializers.ChoiceField(
-        choices=[("JSON", "JSON"), ("EXCEL", "Excel"), ("PDF", "PDF")],
+        choices=[
+            ("JSON", "JSON"),
+            ("EXCEL", "Excel"),
+            ("PDF", "PDF"),
+            ("CSV", "CSV"),
+            ("NDJSON", "NDJSON"),
+            ("XLSX", "Excel (XLSX)"),
+        ],
         default="JSON",
     )
 
@@ -62,6 +78,14 @@ class ReporteFiltroSerializer(serializers.Serializer):
         ):
             attrs["frecuencia"] = Frequency.MENSUAL
 
+        if attrs.get("granularidad") == resumen_bitacora.Granularidad.MINUTO:
+            # Por minuto se lee la bitácora sin resumir: solo ventanas cortas
+            dias = resumen_bitacora.MAX_DIAS_MINUTO
+            if not fecha_desde or ((fecha_hasta or timezone.now().date()) - fecha_desde).days >= dias:
+                raise serializers.ValidationError(
+                    f"La granularidad MINUTO requiere fecha_desde y un rango de hasta {dias} días."
+                )
+
         cliente = attrs.get("cliente")
         if isinstance(cliente, str):
             attrs["cliente"] = cliente.strip()
@@ -74,3 +98,106 @@ class TipoReporteSerializer(serializers.Serializer):
     nombre = serializers.CharField()
     descripcion = serializers.CharField()
     soporta_exportacion = serializers.BooleanField()
+
+
+class CuboVentasSerializer(serializers.Serializer):
+    """Consulta agregada sobre hecho_venta_diaria (dimensiones separadas por coma)."""
+
+    fecha_desde = serializers.DateField(required=False)
+    fecha_hasta = serializers.DateField(required=False)
+    frecuencia = serializers.ChoiceField(choices=Frequency.choices(), required=False)
+    dimensiones = serializers.CharField(required=False, allow_blank=True)
+
+    id_producto = serializers.CharField(required=False)
+    id_categoria = serializers.IntegerField(required=False)
+    id_metodo_pago = serializers.IntegerField(required=False)
+    id_vendedor = serializers.IntegerField(required=False)
+    anulada = serializers.BooleanField(required=False, allow_null=True, default=None)
+
+    def validate_dimensiones(self, value):
+        dimensiones = [d.strip() for d in (value or "").split(",") if d.strip()]
+        desconocidas = [d for d in dimensiones if d not in hechos.DIMENSIONES]
+        if desconocidas:
+            raise serializers.ValidationError(
+                f"Dimensiones no soportadas: {', '.join(desconocidas)}. "
+                f"Disponibles: {', '.join(hechos.DIMENSIONES)}."
+            )
+        return dimensiones
+
+    def validate(self, attrs):
+        fecha_desde = attrs.get("fecha_desde")
+        fecha_hasta = attrs.get("fecha_hasta")
+
+        if fecha_desde and fecha_hasta and fecha_desde > fecha_hasta:
+            raise serializers.ValidationError(
+                "La fecha_desde no puede ser mayor que fecha_hasta."
+            )
+        return attrs
+
+
+class ReporteProgramadoSerializer(serializers.ModelSerializer):
+    """
+    Definición de reporte programado. `filtros` usa los mismos campos que
+    /generar/ salvo las fechas, que las pone cada ejecución según la
+    frecuencia.
+    """
+
+    tipo_reporte = serializers.ChoiceField(choices=ReportType.choices())
+    frecuencia = serializers.ChoiceField(choices=Frequency.choices())
+    hora_ejecucion = serializers.TimeField(default=programados.HORA_DEFECTO)
+    formatos = serializers.ListField(
+        child=serializers.ChoiceField(choices=programados.FormatoArtefacto.choices()),
+        allow_empty=False,
+        default=[programados.FormatoArtefacto.JSON, programados.FormatoArtefacto.CSV],
+    )
+    filtros = serializers.DictField(required=False, default=dict)
+
+    class Meta:
+        model = ReporteProgramado
+        fields = [
+            "id_programado", "nombre", "tipo_reporte", "filtros", "frecuencia",
+            "hora_ejecucion", "formatos", "activo", "proxima_ejecucion",
+            "ultima_ejecucion", "creado_por", "fecha_creacion",
+        ]
+        read_only_fields = ["proxima_ejecucion", "ultima_ejecucion", "creado_por", "fecha_creacion"]
+
+    def validate_formatos(self, value):
+        return list(dict.fromkeys(value))
+
+    def validate(self, attrs):
+        tipo_reporte = attrs.get("tipo_reporte", getattr(self.instance, "tipo_reporte", None))
+        filtros = attrs.get("filtros", getattr(self.instance, "filtros", {}))
+
+        fechas = [campo for campo in ("fecha_desde", "fecha_hasta") if campo in filtros]
+        if fechas:
+            raise serializers.ValidationError(
+                {"filtros": f"No incluya {', '.join(fechas)}: el período lo define la frecuencia."}
+            )
+
+        filtro_serializer = ReporteFiltroSerializer(data={**filtros, "tipo_reporte": tipo_reporte})
+        if not filtro_serializer.is_valid():
+            raise serializers.ValidationError({"filtros": filtro_serializer.errors})
+        attrs["filtros"] = jobs.normalizar_filtros(filtro_serializer.validated_data)
+
+        frecuencia = attrs.get("frecuencia", getattr(self.instance, "frecuencia", None))
+        hora = attrs.get("hora_ejecucion", getattr(self.instance, "hora_ejecucion", None))
+        if (
+            self.instance is None
+            or frecuencia != self.instance.frecuencia
+            or hora != self.instance.hora_ejecucion
+        ):
+            attrs["proxima_ejecucion"] = programados.siguiente_ejecucion(frecuencia, hora, timezone.now())
+        return attrs
+
+
+class ArtefactoReporteSerializer(serializers.ModelSerializer):
+    nombre = serializers.CharField(source="programado.nombre", read_only=True)
+    tipo_reporte = serializers.CharField(source="programado.tipo_reporte", read_only=True)
+
+    class Meta:
+        model = ArtefactoReporte
+        fields = [
+            "id_artefacto", "programado", "nombre", "tipo_reporte", "formato", "estado",
+            "periodo_desde", "periodo_hasta", "filas", "bytes", "bytes_sin_comprimir",
+            "duracion_consulta_ms", "duracion_ms", "mensaje", "fecha_generacion",
+        ]
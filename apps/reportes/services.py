@@ -1,16 +1,23 @@
 from datetime import date
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
 
-from django.db.models import Count, F, Q, Sum
-from django.db.models.functions import TruncDate, TruncMonth, TruncYear
+from django.conf import settings
+from django.db.models import Case, CharField, Count, F, Q, Sum, Value, When
+from django.db.models.functions import TruncDate, Upper
 
 from apps.ventas.models import DetalleVenta, Venta
-from apps.usuarios.models import Cliente
+from apps.ventas.services import listado_service
+from apps.usuarios.models import Cliente, Usuario
 from apps.envio.models import Envio
 from apps.inventario.models import Inventario
 from apps.promocion.models import Promocion
 from apps.bitacora.models import Bitacora
 
+from . import analitica, hechos, resumen_bitacora
+
+# Detalle incluido en el reporte JSON de bitácora (el resto, vía exportación)
+MAX_FILAS_BITACORA = 1000
+
 
 class NoDataForReport(Exception):
     """Se lanza cuando no existen datos para el reporte solicitado."""
@@ -38,6 +45,19 @@ class ReportType:
         ]
 
 
+def estado_venta_sql():
+    """
+    Estado de venta normalizado en SQL:
+    ANULADA/anulado → ANULADO, COMPLETADA/completado → COMPLETADO, resto en mayúsculas.
+    """
+    return Case(
+        When(estado__icontains="ANUL", then=Value("ANULADO")),
+        When(estado__icontains="COMP", then=Value("COMPLETADO")),
+        default=Upper("estado"),
+        output_field=CharField(),
+    )
+
+
 class Frequency:
     DIARIO = "DIARIO"
     MENSUAL = "MENSUAL"
@@ -56,11 +76,18 @@ class ReportesService:
     """Servicio centralizado para generación de reportes."""
 
     @staticmethod
-    def generar_reporte(tipo_reporte: str, filtros: Dict[str, Any]) -> Dict[str, Any]:
+    def generar_reporte(
+        tipo_reporte: str, filtros: Dict[str, Any], incluir_resultados: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Con incluir_resultados=False los reportes de detalle (ventas,
+        clientes, promociones, bitácora) devuelven solo el resumen, sin
+        cargar las filas: los jobs las escriben desde exportacion.filas_reporte.
+        """
         if tipo_reporte == ReportType.VENTAS:
-            return ReportesService._reporte_ventas_v2(filtros)
+            return ReportesService._reporte_ventas_v2(filtros, incluir_resultados)
         if tipo_reporte == ReportType.CLIENTES:
-            return ReportesService._reporte_clientes_v2(filtros)
+            return ReportesService._reporte_clientes_v2(filtros, incluir_resultados)
         if tipo_reporte == ReportType.ENVIOS:
             return ReportesService._reporte_envios(filtros)
         if tipo_reporte == ReportType.PRODUCTOS_MAS_VENDIDOS:
@@ -68,9 +95,9 @@ class ReportesService:
         if tipo_reporte == ReportType.INVENTARIO:
             return ReportesService._reporte_inventario(filtros)
         if tipo_reporte == ReportType.PROMOCIONES:
-            return ReportesService._reporte_promociones(filtros)
+            return ReportesService._reporte_promociones(filtros, incluir_resultados)
         if tipo_reporte == ReportType.BITACORA:
-            return ReportesService._reporte_bitacora(filtros)
+            return ReportesService._reporte_bitacora(filtros, incluir_resultados)
 
         raise ValueError("Tipo de reporte no soportado.")
 
@@ -86,20 +113,12 @@ class ReportesService:
         return queryset
 
     @staticmethod
-    def _reporte_ventas_v2(filtros: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Reporte de ventas detallado por venta, con serie agregada
-        para gr��fico por per��odo.
-        """
-        frecuencia = filtros.get("frecuencia") or Frequency.MENSUAL
-
-        qs = Venta.objects.select_related(
-            "id_cliente__id_cliente",
-            "id_metodo_pago",
-        )
+    def queryset_ventas(filtros: Dict[str, Any]):
+        """Ventas filtradas por rango de fechas, método de pago y cliente."""
+        qs = Venta.objects.all()
         qs = ReportesService._aplicar_rango_fechas(qs, "fecha", filtros)
 
-        # Filtro por m��todo de pago (id)
+        # Filtro por método de pago (id)
         metodo_pago_id = filtros.get("id_metodo_pago")
         if metodo_pago_id:
             qs = qs.filter(id_metodo_pago_id=metodo_pago_id)
@@ -115,76 +134,163 @@ class ReportesService:
             if cliente_query.isdigit():
                 condiciones |= Q(id_cliente_id=int(cliente_query))
             qs = qs.filter(condiciones)
+        return qs
 
-        if not qs.exists():
-            raise NoDataForReport("No existen ventas para el per��odo indicado.")
-
-        # Serie para gr��fico: agregados por per��odo
-        if frecuencia == Frequency.DIARIO:
-            trunc = TruncDate("fecha")
-            formato = "%Y-%m-%d"
-        elif frecuencia == Frequency.ANUAL:
-            trunc = TruncYear("fecha")
-            formato = "%Y"
-        else:
-            trunc = TruncMonth("fecha")
-            formato = "%Y-%m"
+    @staticmethod
+    def queryset_clientes(filtros: Dict[str, Any]):
+        qs = Cliente.objects.select_related("id_cliente")
 
-        agregados = (
-            qs.annotate(periodo=trunc)
+        fecha_desde = filtros.get("fecha_desde")
+        fecha_hasta = filtros.get("fecha_hasta")
+
+        if fecha_desde:
+            qs = qs.filter(id_cliente__fecha_registro__date__gte=fecha_desde)
+        if fecha_hasta:
+            qs = qs.filter(id_cliente__fecha_registro__date__lte=fecha_hasta)
+        return qs
+
+    @staticmethod
+    def queryset_envios(filtros: Dict[str, Any]):
+        qs = Envio.objects.select_related("cod_tipo_envio")
+        qs = ReportesService._aplicar_rango_fechas(qs, "fecha_envio", filtros)
+
+        estado_envio = filtros.get("estado_envio")
+        if estado_envio:
+            qs = qs.filter(estado_envio=estado_envio)
+        return qs
+
+    @staticmethod
+    def queryset_detalles_vendidos(filtros: Dict[str, Any]):
+        qs = DetalleVenta.objects.select_related("id_producto", "id_venta")
+        return ReportesService._aplicar_rango_fechas(qs, "id_venta__fecha", filtros)
+
+    @staticmethod
+    def queryset_inventario(filtros: Dict[str, Any]):
+        qs = Inventario.objects.select_related("producto")
+
+        solo_stock_bajo = filtros.get("solo_stock_bajo")
+        if solo_stock_bajo:
+            # Requerimiento: stock bajo si cantidad_actual <= 10
+            qs = qs.filter(cantidad_actual__lte=10)
+        return qs
+
+    @staticmethod
+    def queryset_promociones(filtros: Dict[str, Any]):
+        hoy = filtros.get("fecha_referencia") or date.today()
+        estado_promocion = filtros.get("estado_promocion", "TODAS").upper()
+
+        qs = Promocion.objects.all()
+
+        if estado_promocion == "ACTIVAS":
+            qs = qs.filter(estado="ACTIVA", fecha_inicio__lte=hoy).filter(
+                fecha_fin__isnull=True
+            ) | qs.filter(estado="ACTIVA", fecha_inicio__lte=hoy, fecha_fin__gte=hoy)
+        elif estado_promocion == "EXPIRADAS":
+            qs = qs.filter(estado="EXPIRADA")
+        return qs
+
+    @staticmethod
+    def queryset_bitacora(filtros: Dict[str, Any]):
+        qs = Bitacora.objects.select_related("id_usuario")
+
+        qs = ReportesService._aplicar_rango_fechas(qs, "fecha_hora", filtros)
+
+        accion = filtros.get("accion")
+        if accion:
+            qs = qs.filter(accion=accion)
+
+        usuario_id = filtros.get("usuario_id")
+        if usuario_id:
+            qs = qs.filter(id_usuario_id=usuario_id)
+        return qs
+
+    @staticmethod
+    def _resumen_ventas_oltp(filtros: Dict[str, Any], frecuencia: str) -> List[Dict[str, Any]]:
+        """
+        Serie (periodo, ventas, monto) agregada desde venta. Solo se usa con
+        el filtro de cliente, que hecho_venta_diaria no tiene como dimensión.
+        """
+        trunc, formato = hechos.truncar_periodo(frecuencia)
+        filas = (
+            ReportesService.queryset_ventas(filtros)
+            .annotate(periodo=trunc)
             .values("periodo")
-            .annotate(
-                total_ventas=Count("id_venta"),
-                monto_total=Sum("monto_total"),
-            )
+            .annotate(ventas=Count("id_venta"), monto_ventas=Sum("monto_total"))
             .order_by("periodo")
         )
+        return [
+            {
+                "periodo": fila["periodo"].strftime(formato) if fila["periodo"] else None,
+                "ventas": fila["ventas"],
+                "monto_ventas": fila["monto_ventas"] or 0,
+            }
+            for fila in filas
+        ]
 
-        total_ventas = qs.count()
-        monto_total = qs.aggregate(total=Sum("monto_total"))["total"] or 0
+    @staticmethod
+    def _pagina_ventas(filtros: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Any]:
+        """
+        Una página del detalle venta por venta, por clave (fecha, id_venta)
+        descendente como el listado de ventas. Devuelve (filas, siguiente cursor).
+        """
+        ventas = (
+            ReportesService.queryset_ventas(filtros)
+            .select_related("id_metodo_pago", "id_cliente__id_cliente")
+            .annotate(estado_venta=estado_venta_sql())
+            .order_by("-fecha", "-id_venta")
+        )
+        tamano = filtros.get("tamano_pagina") or settings.REPORTES_VENTAS_PAGINA
+        pagina, siguiente = listado_service.obtener_pagina(ventas, filtros.get("cursor"), tamano)
+        return [
+            {
+                "id_venta": venta.id_venta,
+                "fecha": venta.fecha,
+                "monto_total": venta.monto_total or 0,
+                "estado_venta": venta.estado_venta,
+                "metodo_pago": venta.id_metodo_pago.tipo if venta.id_metodo_pago else None,
+                "id_cliente": venta.id_cliente_id,
+                "nombreCompleto_cliente": (
+                    venta.id_cliente.id_cliente.nombre_completo if venta.id_cliente else None
+                ),
+            }
+            for venta in pagina
+        ], siguiente
+
+    @staticmethod
+    def _reporte_ventas_v2(filtros: Dict[str, Any], incluir_resultados: bool = True) -> Dict[str, Any]:
+        """
+        Reporte de ventas: resumen y serie para gráfico por período desde
+        hecho_venta_diaria, y una página del detalle venta por venta
+        (`cursor` / `tamano_pagina`; `siguiente` trae el cursor de la próxima).
+
+        Con filtro de cliente el resumen se agrega desde venta: la tabla de
+        hechos no tiene esa dimensión.
+        """
+        frecuencia = filtros.get("frecuencia") or Frequency.MENSUAL
+
+        if (filtros.get("cliente") or "").strip():
+            serie = ReportesService._resumen_ventas_oltp(filtros, frecuencia)
+        else:
+            serie = hechos.consultar(filtros, frecuencia=frecuencia)
+
+        if not serie:
+            raise NoDataForReport("No existen ventas para el período indicado.")
 
         serie_grafico = [
             {
-                "etiqueta": row["periodo"].strftime(formato)
-                if row["periodo"]
-                else None,
-                "total_ventas": row["total_ventas"],
-                "monto_total": row["monto_total"],
+                "etiqueta": fila["periodo"],
+                "total_ventas": fila["ventas"],
+                "monto_total": fila["monto_ventas"],
             }
-            for row in agregados
+            for fila in serie
         ]
 
-        # Resultados detallados por venta
-        resultados: List[Dict[str, Any]] = []
-        for venta in qs.order_by("-fecha", "-id_venta"):
-            usuario_cliente = getattr(venta.id_cliente, "id_cliente", None)
-            nombre_cliente = (
-                usuario_cliente.nombre_completo if usuario_cliente else None
-            )
-            estado_venta = venta.estado.upper()
-            if "ANUL" in estado_venta:
-                estado_venta = "ANULADO"
-            elif "COMP" in estado_venta:
-                estado_venta = "COMPLETADO"
-
-            resultados.append(
-                {
-                    "id_venta": venta.id_venta,
-                    "fecha": venta.fecha,
-                    "monto_total": venta.monto_total,
-                    "estado_venta": estado_venta,
-                    "metodo_pago": getattr(venta.id_metodo_pago, "tipo", None),
-                    "id_cliente": venta.id_cliente_id,
-                    "nombreCompleto_cliente": nombre_cliente,
-                }
-            )
-
-        return {
+        reporte = {
             "tipo_reporte": ReportType.VENTAS,
             "filtros": filtros,
             "resumen": {
-                "total_ventas": total_ventas,
-                "monto_total": monto_total,
+                "total_ventas": sum(punto["total_ventas"] for punto in serie_grafico),
+                "monto_total": sum(punto["monto_total"] for punto in serie_grafico),
                 "serie_grafico": {
                     "tipo": "linea",
                     "eje_x": "Periodo",
@@ -192,80 +298,18 @@ class ReportesService:
                     "puntos": serie_grafico,
                 },
             },
-            "resultados": resultados,
-        }
-
-    @staticmethod
-    def _reporte_ventas(filtros: Dict[str, Any]) -> Dict[str, Any]:
-        frecuencia = filtros.get("frecuencia") or Frequency.MENSUAL
-
-        qs = Venta.objects.all()
-        qs = ReportesService._aplicar_rango_fechas(qs, "fecha", filtros)
-
-        if not qs.exists():
-            raise NoDataForReport("No existen ventas para el período indicado.")
-
-        if frecuencia == Frequency.DIARIO:
-            trunc = TruncDate("fecha")
-            formato = "%Y-%m-%d"
-        elif frecuencia == Frequency.ANUAL:
-            trunc = TruncYear("fecha")
-            formato = "%Y"
-        else:
-            trunc = TruncMonth("fecha")
-            formato = "%Y-%m"
-
-        agregados = (
-            qs.annotate(periodo=trunc)
-            .values("periodo")
-            .annotate(
-                total_ventas=Count("id_venta"),
-                monto_total=Sum("monto_total"),
-            )
-            .order_by("periodo")
-        )
-
-        resultados: List[Dict[str, Any]] = []
-        total_ventas = 0
-        monto_total = 0
-
-        for row in agregados:
-            periodo = row["periodo"]
-            total_ventas += row["total_ventas"]
-            monto_total += row["monto_total"] or 0
-            resultados.append(
-                {
-                    "periodo": periodo.strftime(formato) if periodo else None,
-                    "total_ventas": row["total_ventas"],
-                    "monto_total": row["monto_total"],
-                }
-            )
-
-        return {
-            "tipo_reporte": ReportType.VENTAS,
-            "filtros": filtros,
-            "resumen": {
-                "total_ventas": total_ventas,
-                "monto_total": monto_total,
-            },
-            "resultados": resultados,
         }
+        if incluir_resultados:
+            reporte["resultados"], reporte["siguiente"] = ReportesService._pagina_ventas(filtros)
+        return reporte
 
     @staticmethod
-    def _reporte_clientes_v2(filtros: Dict[str, Any]) -> Dict[str, Any]:
+    def _reporte_clientes_v2(filtros: Dict[str, Any], incluir_resultados: bool = True) -> Dict[str, Any]:
         """
         Reporte de clientes registrados, detallado por cliente y con
         serie de nuevos clientes por fecha para el gr��fico.
         """
-        qs = Cliente.objects.select_related("id_cliente")
-
-        fecha_desde = filtros.get("fecha_desde")
-        fecha_hasta = filtros.get("fecha_hasta")
-
-        if fecha_desde:
-            qs = qs.filter(id_cliente__fecha_registro__date__gte=fecha_desde)
-        if fecha_hasta:
-            qs = qs.filter(id_cliente__fecha_registro__date__lte=fecha_hasta)
+        qs = ReportesService.queryset_clientes(filtros)
 
         if not qs.exists():
             raise NoDataForReport("No existen clientes para el per��odo indicado.")
@@ -287,17 +331,7 @@ class ReportesService:
 
         total_clientes = qs.count()
 
-        resultados = list(
-            qs.values(
-                "id_cliente_id",
-                "id_cliente__nombre_completo",
-                "id_cliente__nombre_usuario",
-                "id_cliente__correo",
-                "id_cliente__fecha_registro",
-            ).order_by("id_cliente__nombre_completo", "id_cliente_id")
-        )
-
-        return {
+        reporte = {
             "tipo_reporte": ReportType.CLIENTES,
             "filtros": filtros,
             "resumen": {
@@ -309,20 +343,22 @@ class ReportesService:
                     "puntos": serie_grafico,
                 },
             },
-            "resultados": resultados,
         }
+        if incluir_resultados:
+            reporte["resultados"] = list(
+                qs.values(
+                    "id_cliente_id",
+                    "id_cliente__nombre_completo",
+                    "id_cliente__nombre_usuario",
+                    "id_cliente__correo",
+                    "id_cliente__fecha_registro",
+                ).order_by("id_cliente__nombre_completo", "id_cliente_id")
+            )
+        return reporte
 
     @staticmethod
     def _reporte_clientes(filtros: Dict[str, Any]) -> Dict[str, Any]:
-        qs = Cliente.objects.select_related("id_cliente")
-
-        fecha_desde = filtros.get("fecha_desde")
-        fecha_hasta = filtros.get("fecha_hasta")
-
-        if fecha_desde:
-            qs = qs.filter(id_cliente__fecha_registro__date__gte=fecha_desde)
-        if fecha_hasta:
-            qs = qs.filter(id_cliente__fecha_registro__date__lte=fecha_hasta)
+        qs = ReportesService.queryset_clientes(filtros)
 
         if not qs.exists():
             raise NoDataForReport("No existen clientes para el período indicado.")
@@ -354,12 +390,7 @@ class ReportesService:
 
     @staticmethod
     def _reporte_envios(filtros: Dict[str, Any]) -> Dict[str, Any]:
-        qs = Envio.objects.select_related("cod_tipo_envio")
-        qs = ReportesService._aplicar_rango_fechas(qs, "fecha_envio", filtros)
-
-        estado_envio = filtros.get("estado_envio")
-        if estado_envio:
-            qs = qs.filter(estado_envio=estado_envio)
+        qs = ReportesService.queryset_envios(filtros)
 
         if not qs.exists():
             raise NoDataForReport("No existen envíos para el período indicado.")
@@ -412,31 +443,11 @@ class ReportesService:
     def _reporte_productos_mas_vendidos(filtros: Dict[str, Any]) -> Dict[str, Any]:
         top = filtros.get("top") or 10
 
-        qs = DetalleVenta.objects.select_related("id_producto", "id_venta")
-        qs = ReportesService._aplicar_rango_fechas(qs, "id_venta__fecha", filtros)
-
-        if not qs.exists():
+        analisis = analitica.productos_mas_vendidos(filtros, top)
+        resultados = analisis["resultados"]
+        if not resultados:
             raise NoDataForReport("No existen ventas de productos para el período indicado.")
 
-        agregados = (
-            qs.values("id_producto", "id_producto__nombre")
-            .annotate(
-                cantidad_total=Sum("cantidad"),
-                monto_total=Sum("sub_total"),
-            )
-            .order_by("-cantidad_total")[:top]
-        )
-
-        resultados = [
-            {
-                "id_producto": row["id_producto"],
-                "nombre_producto": row["id_producto__nombre"],
-                "cantidad_vendida": row["cantidad_total"],
-                "monto_total": row["monto_total"],
-            }
-            for row in agregados
-        ]
-
         total_productos = len(resultados)
 
         return {
@@ -444,6 +455,8 @@ class ReportesService:
             "filtros": filtros,
             "resumen": {
                 "total_productos": total_productos,
+                "productos_vendidos": analisis["productos_vendidos"],
+                "clasificacion_abc": analisis["abc"],
                 "serie_grafico": {
                     "tipo": "barra",
                     "eje_x": "Producto",
@@ -462,34 +475,21 @@ class ReportesService:
 
     @staticmethod
     def _reporte_inventario(filtros: Dict[str, Any]) -> Dict[str, Any]:
-        qs = Inventario.objects.select_related("producto")
-
-        solo_stock_bajo = filtros.get("solo_stock_bajo")
-        if solo_stock_bajo:
-            # Requerimiento: stock bajo si cantidad_actual <= 10
-            qs = qs.filter(cantidad_actual__lte=10)
+        qs = ReportesService.queryset_inventario(filtros)
 
-        if not qs.exists():
+        analisis = analitica.inventario(qs, filtros)
+        resultados = analisis["resultados"]
+        if not resultados:
             raise NoDataForReport("No existen registros de inventario para los filtros indicados.")
 
-        resultados = list(
-            qs.values(
-                "producto__id_producto",
-                "producto__nombre",
-                "cantidad_actual",
-                "ubicacion",
-            ).order_by("producto__nombre")
-        )
-
-        total_items = qs.count()
-        con_stock_bajo = qs.filter(cantidad_actual__lte=10).count()
-
         return {
             "tipo_reporte": ReportType.INVENTARIO,
             "filtros": filtros,
             "resumen": {
-                "total_items": total_items,
-                "items_con_stock_bajo": con_stock_bajo,
+                "total_items": len(resultados),
+                "items_con_stock_bajo": analisis["items_con_stock_bajo"],
+                "items_sin_stock": analisis["items_sin_stock"],
+                "ventana_ventas": analisis["ventana"],
                 "serie_grafico": {
                     "tipo": "barra",
                     "eje_x": "Producto",
@@ -507,18 +507,8 @@ class ReportesService:
         }
 
     @staticmethod
-    def _reporte_promociones(filtros: Dict[str, Any]) -> Dict[str, Any]:
-        hoy = filtros.get("fecha_referencia") or date.today()
-        estado_promocion = filtros.get("estado_promocion", "TODAS").upper()
-
-        qs = Promocion.objects.all()
-
-        if estado_promocion == "ACTIVAS":
-            qs = qs.filter(estado="ACTIVA", fecha_inicio__lte=hoy).filter(
-                fecha_fin__isnull=True
-            ) | qs.filter(estado="ACTIVA", fecha_inicio__lte=hoy, fecha_fin__gte=hoy)
-        elif estado_promocion == "EXPIRADAS":
-            qs = qs.filter(estado="EXPIRADA")
+    def _reporte_promociones(filtros: Dict[str, Any], incluir_resultados: bool = True) -> Dict[str, Any]:
+        qs = ReportesService.queryset_promociones(filtros)
 
         if not qs.exists():
             raise NoDataForReport("No existen promociones para los filtros indicados.")
@@ -526,18 +516,7 @@ class ReportesService:
         activas = qs.filter(estado="ACTIVA").count()
         expiradas = qs.filter(estado="EXPIRADA").count()
 
-        resultados = list(
-            qs.values(
-                "id_promocion",
-                "nombre",
-                "codigo_descuento",
-                "fecha_inicio",
-                "fecha_fin",
-                "estado",
-            ).order_by("fecha_inicio")
-        )
-
-        return {
+        reporte = {
             "tipo_reporte": ReportType.PROMOCIONES,
             "filtros": filtros,
             "resumen": {
@@ -554,45 +533,60 @@ class ReportesService:
                     ],
                 },
             },
-            "resultados": resultados,
         }
+        if incluir_resultados:
+            reporte["resultados"] = list(
+                qs.values(
+                    "id_promocion",
+                    "nombre",
+                    "codigo_descuento",
+                    "fecha_inicio",
+                    "fecha_fin",
+                    "estado",
+                ).order_by("fecha_inicio")
+            )
+        return reporte
 
     @staticmethod
-    def _reporte_bitacora(filtros: Dict[str, Any]) -> Dict[str, Any]:
-        qs = Bitacora.objects.select_related("id_usuario")
-
-        qs = ReportesService._aplicar_rango_fechas(qs, "fecha_hora", filtros)
-
-        accion = filtros.get("accion")
-        if accion:
-            qs = qs.filter(accion=accion)
-
-        usuario_id = filtros.get("usuario_id")
-        if usuario_id:
-            qs = qs.filter(id_usuario_id=usuario_id)
+    def _reporte_bitacora(filtros: Dict[str, Any], incluir_resultados: bool = True) -> Dict[str, Any]:
+        """
+        Totales, serie temporal y top-K desde el resumen horario
+        (resumen_bitacora); el detalle se limita a los MAX_FILAS_BITACORA
+        eventos más recientes. El detalle completo se descarga en streaming
+        con /api/reportes/exportar/.
+        """
+        resumen_bitacora.actualizar()
 
-        if not qs.exists():
+        por_accion = resumen_bitacora.por_accion(filtros)
+        if not por_accion:
             raise NoDataForReport(
                 "No existen eventos de bitácora para los filtros indicados."
             )
+        total_eventos = sum(row["total"] for row in por_accion)
 
-        total_eventos = qs.count()
-
-        por_accion = (
-            qs.values("accion")
-            .annotate(total=Count("id_bitacora"))
-            .order_by("-total")
-        )
+        granularidad = filtros.get("granularidad") or resumen_bitacora.Granularidad.HORA
+        frecuentes = resumen_bitacora.mas_frecuentes(filtros, filtros.get("top") or 10)
 
-        por_usuario = (
-            qs.filter(id_usuario__isnull=False)
-            .values("id_usuario_id", "id_usuario__nombre_usuario")
-            .annotate(total=Count("id_bitacora"))
-            .order_by("-total")
+        nombres = dict(
+            Usuario.objects.filter(
+                pk__in=[row["clave"] for row in frecuentes["usuarios"]]
+            ).values_list("pk", "nombre_usuario")
         )
+        por_usuario = [
+            {
+                "id_usuario_id": row["clave"],
+                "id_usuario__nombre_usuario": nombres.get(row["clave"]),
+                "total": row["total"],
+                "error": row["error"],
+            }
+            for row in frecuentes["usuarios"]
+        ]
 
-        filas = list(
-            qs.values(
+        resultados: List[Dict[str, Any]] = []
+        filas = (
+            ReportesService.queryset_bitacora(filtros)
+            .order_by("-fecha_hora")
+            .values_list(
                 "id_bitacora",
                 "fecha_hora",
                 "accion",
@@ -600,38 +594,39 @@ class ReportesService:
                 "ip",
                 "id_usuario_id",
                 "id_usuario__nombre_usuario",
-            ).order_by("-fecha_hora")
+            )[:MAX_FILAS_BITACORA]
         )
-
-        resultados = [
-            {
-                "id_bitacora": row["id_bitacora"],
-                "fecha_hora": row["fecha_hora"],
-                "accion": row["accion"],
-                "descripcion": row["descripcion"],
-                "ip": row["ip"],
-                "id_usuario": row["id_usuario_id"],
-                "nombre_usuario": row["id_usuario__nombre_usuario"],
-            }
-            for row in filas
-        ]
+        campos = ("id_bitacora", "fecha_hora", "accion", "descripcion", "ip", "id_usuario", "nombre_usuario")
+        if incluir_resultados:
+            resultados = [dict(zip(campos, row)) for row in filas.iterator(chunk_size=MAX_FILAS_BITACORA)]
 
         return {
             "tipo_reporte": ReportType.BITACORA,
             "filtros": filtros,
             "resumen": {
                 "total_eventos": total_eventos,
-                "por_accion": list(por_accion),
-                "por_usuario": list(por_usuario),
+                "por_accion": por_accion,
+                "por_usuario": por_usuario,
+                "mas_frecuentes": {
+                    "ips": frecuentes["ips"],
+                    "usuarios": frecuentes["usuarios"],
+                    "acciones": frecuentes["acciones"],
+                    "contadores": frecuentes["contadores"],
+                },
+                "serie_temporal": {
+                    "granularidad": granularidad,
+                    "puntos": resumen_bitacora.serie(filtros, granularidad),
+                },
                 "serie_grafico": {
                     "tipo": "barra",
-                    "eje_x": "Acci��n",
+                    "eje_x": "Acción",
                     "eje_y": "Eventos",
                     "puntos": [
                         {"etiqueta": row["accion"], "total": row["total"]}
                         for row in por_accion
                     ],
                 },
+                "resultados_truncados": incluir_resultados and total_eventos > len(resultados),
             },
-            "resultados": resultados,
+            **({"resultados": resultados} if incluir_resultados else {}),
         }
@@ -0,0 +1,57 @@
+"""
+Invalidación de la caché de reportes.
+
+Los receivers difieren la invalidación al commit: si se invalidara dentro
+de la transacción, otra petición podría volver a cachear los datos
+anteriores antes de que el cambio sea visible.
+"""
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.bitacora.signals import (
+    producto_actualizado,
+    producto_creado,
+    producto_eliminado,
+    producto_estado_cambiado,
+    producto_stock_ajustado,
+    usuario_creado,
+    venta_anulada,
+    venta_creada,
+)
+
+from .cache import Dependencia, invalidar
+
+
+def _invalidar_al_commit(*dependencias, fecha=None):
+    def ejecutar():
+        for dependencia in dependencias:
+            invalidar(dependencia, fecha)
+
+    transaction.on_commit(ejecutar)
+
+
+@receiver(venta_creada)
+def invalidar_por_venta_creada(sender, venta, **kwargs):
+    # La venta también mueve stock: el reporte de inventario cambia
+    _invalidar_al_commit(Dependencia.VENTAS, Dependencia.INVENTARIO, fecha=venta.fecha)
+
+
+@receiver(venta_anulada)
+def invalidar_por_venta_anulada(sender, venta, **kwargs):
+    # Puede ser una venta de un rango ya cerrado
+    _invalidar_al_commit(Dependencia.VENTAS, Dependencia.INVENTARIO, fecha=venta.fecha)
+
+
+@receiver(producto_creado)
+@receiver(producto_actualizado)
+@receiver(producto_eliminado)
+@receiver(producto_estado_cambiado)
+@receiver(producto_stock_ajustado)
+def invalidar_por_inventario(sender, **kwargs):
+    _invalidar_al_commit(Dependencia.INVENTARIO)
+
+
+@receiver(usuario_creado)
+def invalidar_por_usuario_creado(sender, **kwargs):
+    _invalidar_al_commit(Dependencia.CLIENTES, fecha=timezone.now().date())
@@ -0,0 +1,410 @@
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import zipfile
+from unittest import mock
+from datetime import date, datetime, timedelta
+from datetime import time as hora_del_dia
+from decimal import Decimal
+
+import numpy as np
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from apps.bitacora.models import Bitacora
+
+from . import analitica, exportacion, jobs, programados, resumen_bitacora
+from . import cache as cache_reportes
+from .cache import CacheReportes, Dependencia
+from .models import ReporteProgramado, ResumenBitacoraHora
+from .services import Frequency, ReportesService, ReportType
+
+
+class JobsReportesTests(SimpleTestCase):
+
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        ajustes = override_settings(REPORTES_DIR=directorio, REPORTES_JOB_TTL_RECIENTE=60)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def _terminar(self, job_id, hace):
+        """Marca el job COMPLETADO como si hubiera terminado hace `hace` segundos."""
+        jobs._guardar_estado(job_id, estado=jobs.JobStatus.COMPLETADO, fin=time.time() - hace)
+
+    def test_job_id_ignora_formato_y_filtros_vacios(self):
+        self.assertEqual(
+            jobs.calcular_job_id('VENTAS', {'fecha_desde': date(2025, 1, 1), 'cliente': '', 'formato': 'CSV'}),
+            jobs.calcular_job_id('VENTAS', {'fecha_desde': '2025-01-01'}),
+        )
+        self.assertNotEqual(
+            jobs.calcular_job_id('VENTAS', {}), jobs.calcular_job_id('CLIENTES', {}),
+        )
+
+    def test_job_en_curso_se_reutiliza_incluso_forzado(self):
+        job_id = jobs.calcular_job_id('INVENTARIO', {})
+        self.assertIsNotNone(jobs._reclamar(job_id, 'INVENTARIO', {}, forzar=False))
+        self.assertIsNone(jobs._reclamar(job_id, 'INVENTARIO', {}, forzar=False))
+        self.assertIsNone(jobs._reclamar(job_id, 'INVENTARIO', {}, forzar=True))
+
+    def test_rango_abierto_expira_y_rango_cerrado_no(self):
+        abierto = {'fecha_hasta': str(date.today())}
+        job_abierto = jobs.calcular_job_id('VENTAS', abierto)
+        jobs._reclamar(job_abierto, 'VENTAS', abierto, forzar=False)
+        self._terminar(job_abierto, hace=10)
+        self.assertIsNone(jobs._reclamar(job_abierto, 'VENTAS', abierto, forzar=False))
+        self._terminar(job_abierto, hace=120)
+        self.assertIsNotNone(jobs._reclamar(job_abierto, 'VENTAS', abierto, forzar=False))
+
+        cerrado = {'fecha_hasta': str(date.today() - timedelta(days=1))}
+        job_cerrado = jobs.calcular_job_id('VENTAS', cerrado)
+        jobs._reclamar(job_cerrado, 'VENTAS', cerrado, forzar=False)
+        self._terminar(job_cerrado, hace=120)
+        self.assertIsNone(jobs._reclamar(job_cerrado, 'VENTAS', cerrado, forzar=False))
+        self.assertIsNotNone(jobs._reclamar(job_cerrado, 'VENTAS', cerrado, forzar=True))
+
+    def test_chunks_y_json_reconstruido(self):
+        job_id = jobs.calcular_job_id('CLIENTES', {})
+        jobs._reclamar(job_id, 'CLIENTES', {}, forzar=False)
+        totales = jobs._escribir_chunks(job_id, ({'n': n, 'nombre': f'ñ{n}'} for n in range(5)), tamano=2)
+        self.assertEqual((totales['total_filas'], totales['chunks']), (5, 3))
+        self.assertEqual(jobs.leer_chunk(job_id, 2), [{'n': 4, 'nombre': 'ñ4'}])
+
+        jobs._escribir_atomico(
+            os.path.join(jobs._dir_job(job_id), 'resumen.json.gz'),
+            gzip.compress(json.dumps({'resumen': {'total': 5}}).encode()),
+        )
+        jobs._guardar_estado(job_id, chunks=totales['chunks'])
+        reporte = json.loads(b''.join(jobs.iterar_json(job_id)))
+        self.assertEqual(reporte['resumen'], {'total': 5})
+        self.assertEqual([fila['n'] for fila in reporte['resultados']], list(range(5)))
+
+
+class EscritoresExportacionTests(SimpleTestCase):
+    ENCABEZADOS = ['id', 'nombre', 'monto', 'fecha']
+    FILAS = [
+        (1, 'Año, "nuevo"', Decimal('10.50'), date(2025, 1, 2)),
+        (2, 'a<b>&\x01c', None, datetime(2025, 1, 3, 4, 5)),
+    ]
+
+    def _filas(self, n):
+        return ((i, f'p{i}', Decimal(i), date(2025, 1, 1)) for i in range(n))
+
+    def test_csv_con_bom_y_comillas(self):
+        contenido = b''.join(exportacion.escribir_csv(self.ENCABEZADOS, iter(self.FILAS))).decode('utf-8')
+        self.assertTrue(contenido.startswith('\ufeff'))
+        filas = list(csv.reader(io.StringIO(contenido[1:])))
+        self.assertEqual(filas[0], self.ENCABEZADOS)
+        self.assertEqual(filas[1], ['1', 'Año, "nuevo"', '10.50', '2025-01-02'])
+        self.assertEqual(filas[2][2], '')
+
+    def test_csv_y_ndjson_escriben_por_lotes(self):
+        partes = list(exportacion.escribir_csv(self.ENCABEZADOS, self._filas(1200)))
+        self.assertEqual(len(partes), 3)  # 500 + 500 + 200 filas
+        lineas = b''.join(exportacion.escribir_ndjson(self.ENCABEZADOS, self._filas(1200))).splitlines()
+        self.assertEqual(len(lineas), 1200)
+        self.assertEqual(
+            json.loads(lineas[7]), {'id': 7, 'nombre': 'p7', 'monto': 7, 'fecha': '2025-01-01'},
+        )
+
+    def test_xlsx_es_un_zip_valido_con_una_fila_por_registro(self):
+        contenido = b''.join(exportacion.escribir_xlsx(self.ENCABEZADOS, iter(self.FILAS), 'Ventas'))
+        with zipfile.ZipFile(io.BytesIO(contenido)) as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertIn('<sheet name="Ventas"', zf.read('xl/workbook.xml').decode())
+            hoja = zf.read('xl/worksheets/sheet1.xml').decode()
+        self.assertEqual(hoja.count('<row>'), 3)
+        self.assertIn('<c><v>10.50</v></c>', hoja)
+        # Caracteres de control fuera, el resto escapado
+        self.assertIn('a&lt;b&gt;&amp;c', hoja)
+        self.assertIn('2025-01-03 04:05:00', hoja)
+
+    def test_nombre_archivo(self):
+        self.assertEqual(
+            exportacion.nombre_archivo('VENTAS', exportacion.ExportFormat.XLSX, '2025-01'),
+            'reporte_ventas_2025-01.xlsx',
+        )
+
+
+class CacheReportesTests(SimpleTestCase):
+
+    def test_cada_acierto_es_una_copia(self):
+        cache = CacheReportes(max_bytes=1 << 20)
+        cache.guardar('a', {'resultados': [1, 2]}, ttl=60)
+        cache.obtener('a')['resultados'].append(3)
+        self.assertEqual(cache.obtener('a'), {'resultados': [1, 2]})
+        self.assertIsNone(cache.obtener('b'))
+        self.assertEqual(cache.estadisticas()['ratio_aciertos'], round(2 / 3, 4))
+
+    def test_expira_por_ttl(self):
+        cache = CacheReportes(max_bytes=1 << 20)
+        cache.guardar('a', 1, ttl=0)
+        self.assertIsNone(cache.obtener('a'))
+        self.assertEqual(cache.estadisticas()['expiradas'], 1)
+
+    def test_expulsa_lo_usado_hace_mas_tiempo(self):
+        valor = 'x' * 200
+        cache = CacheReportes(max_bytes=1000)
+        for clave in 'abcd':
+            cache.guardar(clave, valor, ttl=60)
+        cache.obtener('a')
+        cache.guardar('e', valor, ttl=60)
+        self.assertIsNotNone(cache.obtener('a'))
+        self.assertIsNone(cache.obtener('b'))
+        self.assertLessEqual(cache.estadisticas()['bytes'], 1000)
+        # Más de un cuarto de la caché no se guarda
+        self.assertFalse(cache.guardar('f', 'x' * 400, ttl=60))
+
+    def test_invalida_por_dependencia_y_fecha(self):
+        cache = CacheReportes(max_bytes=1 << 20)
+        enero = dict(desde=date(2025, 1, 1), hasta=date(2025, 1, 31))
+        cache.guardar('ventas_enero', 1, ttl=60, dependencias=(Dependencia.VENTAS,), **enero)
+        cache.guardar('ventas_abierto', 2, ttl=60, dependencias=(Dependencia.VENTAS,), desde=date(2025, 1, 1))
+        cache.guardar('clientes', 3, ttl=60, dependencias=(Dependencia.CLIENTES,))
+
+        # Una venta de febrero no toca enero ni los clientes
+        self.assertEqual(cache.invalidar(Dependencia.VENTAS, date(2025, 2, 10)), 1)
+        self.assertIsNotNone(cache.obtener('ventas_enero'))
+        self.assertIsNone(cache.obtener('ventas_abierto'))
+        # Sin fecha se invalida todo lo que depende de ventas
+        self.assertEqual(cache.invalidar(Dependencia.VENTAS), 1)
+        self.assertIsNone(cache.obtener('ventas_enero'))
+        self.assertEqual(cache.obtener('clientes'), 3)
+
+    def test_otra_generacion_es_un_fallo(self):
+        cache = CacheReportes(max_bytes=1 << 20)
+        cache.guardar('a', 1, ttl=60, generacion=(3, 1))
+        self.assertEqual(cache.obtener('a', (3, 1)), 1)
+        self.assertIsNone(cache.obtener('a', (4, 1)))
+        self.assertIsNone(cache.obtener('a', (3, 1)))
+        self.assertEqual(cache.estadisticas()['invalidadas'], 1)
+
+
+class GeneracionCacheReportesTests(TransactionTestCase):
+    available_apps = ['apps.reportes']
+
+    def setUp(self):
+        self.worker = CacheReportes(max_bytes=1 << 20)
+        original = cache_reportes._cache
+        cache_reportes._cache = self.worker
+        self.addCleanup(setattr, cache_reportes, '_cache', original)
+        generados = iter(range(1, 100))
+        generar = mock.patch.object(
+            ReportesService, 'generar_reporte', side_effect=lambda tipo, filtros: {'n': next(generados)}
+        )
+        generar.start()
+        self.addCleanup(generar.stop)
+
+    def _en_otro_worker(self, dependencia, fecha):
+        cache_reportes._cache = CacheReportes(max_bytes=1 << 20)
+        try:
+            cache_reportes.invalidar(dependencia, fecha)
+        finally:
+            cache_reportes._cache = self.worker
+
+    def test_anular_en_un_rango_cerrado_invalida_los_otros_workers(self):
+        enero = {'fecha_desde': '2025-01-01', 'fecha_hasta': '2025-01-31'}
+        self.assertEqual(cache_reportes.generar_reporte(ReportType.VENTAS, enero), ({'n': 1}, False))
+        self.assertEqual(cache_reportes.generar_reporte(ReportType.VENTAS, enero), ({'n': 1}, True))
+
+        # Una venta de hoy en otro worker no toca los rangos cerrados
+        self._en_otro_worker(Dependencia.VENTAS, timezone.now().date())
+        self.assertEqual(cache_reportes.generar_reporte(ReportType.VENTAS, enero), ({'n': 1}, True))
+
+        # Anular una venta de enero en otro worker sí
+        self._en_otro_worker(Dependencia.VENTAS, date(2025, 1, 10))
+        self.assertEqual(cache_reportes.generar_reporte(ReportType.VENTAS, enero), ({'n': 2}, False))
+        self.assertEqual(cache_reportes.generar_reporte(ReportType.VENTAS, enero), ({'n': 2}, True))
+        self.assertEqual(cache_reportes.generaciones((Dependencia.VENTAS, Dependencia.CLIENTES)), (1, 0))
+
+
+class AnaliticaTests(SimpleTestCase):
+
+    def test_abc_deja_en_la_clase_superior_al_que_cruza_el_umbral(self):
+        montos = np.array([10.0, 70.0, 5.0, 15.0])
+        abc = analitica.clasificar_abc(montos)
+        # Ordenados: 70 (0 previo) A, 15 (70%) A, 10 (85%) B, 5 (95%) C
+        self.assertEqual(abc['clase'].tolist(), ['B', 'A', 'C', 'A'])
+        self.assertAlmostEqual(abc['acumulada'][0], 0.95)
+        self.assertEqual(analitica.clasificar_abc(np.zeros(2))['participacion'].tolist(), [0.0, 0.0])
+
+    def test_ranking_por_cantidad_desempata_por_id(self):
+        ids = np.array(['P3', 'P1', 'P2'], dtype=object)
+        metricas = analitica.metricas_productos(
+            ids, np.array([5, 5, 9]), np.array([1.0, 1.0, 1.0]), top=2,
+        )
+        self.assertEqual(ids[metricas['ranking']].tolist(), ['P2', 'P1'])
+        self.assertEqual(sum(metricas['abc'].values()), 3)
+
+    def test_inventario_sin_ventas_no_tiene_cobertura(self):
+        metricas = analitica.metricas_inventario(np.array([0, 5, 20]), np.array([0, 10, 0]), dias=10)
+        self.assertEqual(analitica._redondear(metricas['cobertura'], 1), [None, 5.0, None])
+        self.assertEqual(analitica._redondear(metricas['rotacion'], 2), [None, 2.0, 0.0])
+        self.assertEqual(metricas['estado'].tolist(), ['SIN_STOCK', 'BAJO', 'OK'])
+
+    def test_alinear_por_clave(self):
+        resultado = analitica.alinear(
+            np.array(['A', 'B', 'C']), np.array(['C', 'A']), np.array([3, 1]),
+        )
+        self.assertEqual(resultado.tolist(), [1, 0, 3])
+
+
+class ContadorFrecuentesTests(SimpleTestCase):
+
+    def test_exacto_mientras_hay_lugar(self):
+        contador = resumen_bitacora.ContadorFrecuentes(capacidad=3)
+        for clave, peso in [('a', 2), ('b', 5), ('a', 4), ('c', 1)]:
+            contador.agregar(clave, peso)
+        self.assertEqual(contador.top(2), [
+            {'clave': 'a', 'total': 6, 'error': 0},
+            {'clave': 'b', 'total': 5, 'error': 0},
+        ])
+
+    def test_cota_de_error_y_claves_frecuentes(self):
+        capacidad = 10
+        contador = resumen_bitacora.ContadorFrecuentes(capacidad=capacidad)
+        reales = {}
+        # Tres claves pesadas mezcladas con 500 claves de una sola aparición
+        for i in range(500):
+            for clave, peso in ((f'raro{i}', 1), ('x', 3), ('y', 2) if i % 2 else ('z', 1)):
+                contador.agregar(clave, peso)
+                reales[clave] = reales.get(clave, 0) + peso
+
+        self.assertEqual(contador.total, sum(reales.values()))
+        top = contador.top(capacidad)
+        self.assertEqual(len(top), capacidad)
+        self.assertEqual([fila['clave'] for fila in top[:3]], ['x', 'y', 'z'])
+        for fila in top:
+            real = reales[fila['clave']]
+            # Nunca subestima y el error está acotado por total / capacidad
+            self.assertGreaterEqual(fila['total'], real)
+            self.assertLessEqual(fila['total'] - fila['error'], real)
+            self.assertLessEqual(fila['error'], contador.total / capacidad)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Requiere PostgreSQL (date_trunc, host(ip))')
+class ResumenBitacoraTests(TransactionTestCase):
+    available_apps = ['apps.reportes', 'apps.bitacora']
+
+    def setUp(self):
+        ahora = timezone.now()
+        self.hoy = ahora.date()
+        hace_dos_dias = datetime.combine(self.hoy - timedelta(days=2), datetime.min.time()).replace(hour=10)
+        # Dos horas cerradas y eventos de la hora en curso (todavía en la cola)
+        self._eventos(hace_dos_dias, 'LOGIN', '10.0.0.1', 3)
+        self._eventos(hace_dos_dias + timedelta(days=1, hours=5), 'LOGOUT', '10.0.0.2', 2)
+        self._eventos(ahora, 'LOGIN', '10.0.0.1', 4)
+
+    def _eventos(self, fecha_hora, accion, ip, cantidad):
+        creados = Bitacora.objects.bulk_create(
+            Bitacora(accion=accion, ip=ip, descripcion='-') for _ in range(cantidad)
+        )
+        Bitacora.objects.filter(pk__in=[b.pk for b in creados]).update(fecha_hora=fecha_hora)
+
+    def _consultas(self, filtros):
+        return (
+            resumen_bitacora.por_accion(filtros),
+            resumen_bitacora.serie(filtros, resumen_bitacora.Granularidad.DIA),
+            resumen_bitacora.mas_frecuentes(filtros, k=2),
+        )
+
+    def test_resumen_mas_cola_da_lo_mismo_que_la_bitacora(self):
+        antes = self._consultas({})
+        self.assertEqual(antes[0], [{'accion': 'LOGIN', 'total': 7}, {'accion': 'LOGOUT', 'total': 2}])
+
+        self.assertEqual(resumen_bitacora.actualizar(), 2)
+        # La hora en curso no se resume: se sigue leyendo de bitacora
+        self.assertEqual(
+            sorted(ResumenBitacoraHora.objects.values_list('accion', 'total')),
+            [('LOGIN', 3), ('LOGOUT', 2)],
+        )
+        self.assertEqual(resumen_bitacora.actualizar(), 0)
+        self.assertEqual(self._consultas({}), antes)
+
+        ips = resumen_bitacora.mas_frecuentes({}, k=2)['ips']
+        self.assertEqual([(f['clave'], f['total']) for f in ips], [('10.0.0.1', 7), ('10.0.0.2', 2)])
+
+        # Una ventana que empieza después del corte lee solo la cola
+        solo_hoy = {'fecha_desde': self.hoy}
+        self.assertEqual(resumen_bitacora.por_accion(solo_hoy), [{'accion': 'LOGIN', 'total': 4}])
+        self.assertEqual(
+            resumen_bitacora.serie({'fecha_hasta': self.hoy - timedelta(days=1)}, resumen_bitacora.Granularidad.DIA),
+            antes[1][:2],
+        )
+
+
+class CalendarioProgramadosTests(SimpleTestCase):
+
+    def test_periodo_cerrado_anterior(self):
+        self.assertEqual(
+            programados.periodo(Frequency.DIARIO, date(2024, 3, 1)), (date(2024, 2, 29), date(2024, 2, 29)),
+        )
+        self.assertEqual(
+            programados.periodo(Frequency.MENSUAL, date(2024, 3, 15)), (date(2024, 2, 1), date(2024, 2, 29)),
+        )
+        self.assertEqual(
+            programados.periodo(Frequency.ANUAL, date(2025, 1, 1)), (date(2024, 1, 1), date(2024, 12, 31)),
+        )
+        with self.assertRaises(ValueError):
+            programados.periodo('SEMANAL', date(2025, 1, 1))
+
+    def test_siguiente_ejecucion_es_estrictamente_posterior(self):
+        tres = hora_del_dia(3, 0)
+        siguiente = programados.siguiente_ejecucion
+        self.assertEqual(siguiente(Frequency.DIARIO, tres, datetime(2025, 1, 31, 2, 59)), datetime(2025, 1, 31, 3))
+        self.assertEqual(siguiente(Frequency.DIARIO, tres, datetime(2025, 1, 31, 3)), datetime(2025, 2, 1, 3))
+        self.assertEqual(siguiente(Frequency.MENSUAL, tres, datetime(2025, 1, 31, 12)), datetime(2025, 2, 1, 3))
+        self.assertEqual(siguiente(Frequency.MENSUAL, tres, datetime(2025, 12, 1, 3)), datetime(2026, 1, 1, 3))
+        self.assertEqual(siguiente(Frequency.ANUAL, tres, datetime(2025, 1, 1, 2)), datetime(2025, 1, 1, 3))
+        self.assertEqual(siguiente(Frequency.ANUAL, tres, datetime(2025, 6, 1)), datetime(2026, 1, 1, 3))
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Requiere PostgreSQL (SKIP LOCKED)')
+class ProgramadorReportesTests(TransactionTestCase):
+    available_apps = ['apps.reportes', 'apps.bitacora']
+
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        ajustes = override_settings(REPORTES_DIR=directorio)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def _programado(self, nombre, filtros):
+        return ReporteProgramado.objects.create(
+            nombre=nombre, tipo_reporte=ReportType.BITACORA, filtros=filtros,
+            frecuencia=Frequency.MENSUAL, hora_ejecucion=hora_del_dia(3, 0),
+            formatos=[programados.FormatoArtefacto.JSON, programados.FormatoArtefacto.CSV],
+            proxima_ejecucion=datetime(2025, 3, 1, 3),
+        )
+
+    def test_filtros_invalidos_quedan_como_error_sin_cortar_el_lote(self):
+        # Por minuto solo se permiten ventanas cortas: un mes completo no valida
+        roto = self._programado('Bitácora por minuto', {'granularidad': 'MINUTO'})
+        sano = self._programado('Bitácora por día', {'granularidad': 'DIA'})
+
+        artefactos = programados.ejecutar_vencidos(ahora=datetime(2025, 3, 1, 4))
+
+        por_definicion = {}
+        for artefacto in artefactos:
+            por_definicion.setdefault(artefacto.programado_id, []).append(artefacto)
+        self.assertEqual(
+            [a.estado for a in por_definicion[roto.pk]],
+            [programados.EstadoArtefacto.ERROR] * 2,
+        )
+        self.assertIn('granularidad', por_definicion[roto.pk][0].mensaje)
+        self.assertEqual((por_definicion[roto.pk][0].periodo_desde, por_definicion[roto.pk][0].periodo_hasta),
+                         (date(2025, 2, 1), date(2025, 2, 28)))
+        self.assertEqual(len(por_definicion[sano.pk]), 2)
+        self.assertNotIn(programados.EstadoArtefacto.ERROR, [a.estado for a in por_definicion[sano.pk]])
+
+        roto.refresh_from_db()
+        self.assertEqual(roto.proxima_ejecucion, datetime(2025, 4, 1, 3))
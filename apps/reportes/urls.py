@@ -1,15 +1,65 @@
 from django.urls import path
 
 from .views import (
+    ArtefactoReporteDescargaView,
+    ArtefactosReporteView,
     BitacoraActionsView,
+    ExportarReporteView,
     GenerarReporteView,
+    ReporteJobDescargaView,
+    ReporteJobDetalleView,
+    ReporteJobsView,
+    ReporteProgramadoDetalleView,
+    ReporteProgramadoEjecutarView,
+    ReporteProgramadoUltimoView,
+    ReportesProgramadosMetricasView,
+    ReportesProgramadosView,
+    ReportesCacheView,
     ReportTypesView,
+    VentasCuboView,
     buscar_usuarios,
 )
 
 urlpatterns = [
     path("tipos/", ReportTypesView.as_view(), name="reportes-tipos"),
     path("generar/", GenerarReporteView.as_view(), name="reportes-generar"),
+    path("exportar/", ExportarReporteView.as_view(), name="reportes-exportar"),
+    path("cache/", ReportesCacheView.as_view(), name="reportes-cache"),
+    path("ventas/cubo/", VentasCuboView.as_view(), name="reportes-ventas-cubo"),
+    path("jobs/", ReporteJobsView.as_view(), name="reportes-jobs"),
+    path("jobs/<str:job_id>/", ReporteJobDetalleView.as_view(), name="reportes-job-detalle"),
+    path(
+        "jobs/<str:job_id>/descargar/",
+        ReporteJobDescargaView.as_view(),
+        name="reportes-job-descarga",
+    ),
+    path("programados/", ReportesProgramadosView.as_view(), name="reportes-programados"),
+    path(
+        "programados/metricas/",
+        ReportesProgramadosMetricasView.as_view(),
+        name="reportes-programados-metricas",
+    ),
+    path(
+        "programados/<int:pk>/",
+        ReporteProgramadoDetalleView.as_view(),
+        name="reportes-programado-detalle",
+    ),
+    path(
+        "programados/<int:pk>/ejecutar/",
+        ReporteProgramadoEjecutarView.as_view(),
+        name="reportes-programado-ejecutar",
+    ),
+    path(
+        "programados/<int:pk>/ultimo/",
+        ReporteProgramadoUltimoView.as_view(),
+        name="reportes-programado-ultimo",
+    ),
+    path("artefactos/", ArtefactosReporteView.as_view(), name="reportes-artefactos"),
+    path(
+        "artefactos/<int:pk>/descargar/",
+        ArtefactoReporteDescargaView.as_view(),
+        name="reportes-artefacto-descarga",
+    ),
     path(
         "bitacora/acciones/",
         BitacoraActionsView.as_view(),
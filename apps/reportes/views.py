@@ -1,15 +1,28 @@
+import gzip
+import os
+
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.db.models import Q
+from django.http import FileResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
 
 from core.constants import APIResponse, BitacoraActions
 from apps.bitacora.services.logger import AuditoriaLogger
 from apps.usuarios.models import Usuario
 
-from .serializers import ReporteFiltroSerializer
-from .services import NoDataForReport, ReportType, ReportesService
+from . import cache, exportacion, hechos, jobs, programados
+from .models import ArtefactoReporte, ReporteProgramado
+from .serializers import (
+    ArtefactoReporteSerializer,
+    CuboVentasSerializer,
+    ReporteFiltroSerializer,
+    ReporteProgramadoSerializer,
+)
+from .services import NoDataForReport, ReportType
 
 
 class ReportTypesView(APIView):
@@ -26,6 +39,7 @@ class ReportTypesView(APIView):
                 "nombre": nombre,
                 "descripcion": nombre,
                 "soporta_exportacion": True,
+                "formatos_exportacion": [f for f, _ in exportacion.ExportFormat.choices()],
             }
             for codigo, nombre in ReportType.choices()
         ]
@@ -57,7 +71,7 @@ class GenerarReporteView(APIView):
         tipo_reporte = filtros.get("tipo_reporte")
 
         try:
-            reporte = ReportesService.generar_reporte(tipo_reporte, filtros)
+            reporte, desde_cache = cache.generar_reporte(tipo_reporte, filtros)
         except NoDataForReport as exc:
             return APIResponse.error(
                 message=str(exc),
@@ -83,10 +97,523 @@ class GenerarReporteView(APIView):
             # La bitácora no debe romper el flujo principal
             pass
 
-        return APIResponse.success(
+        respuesta = APIResponse.success(
             message="Reporte generado correctamente.",
             data=reporte,
         )
+        respuesta["X-Cache"] = "HIT" if desde_cache else "MISS"
+        return respuesta
+
+
+class ReportesCacheView(APIView):
+    """
+    GET    /api/reportes/cache/  estadísticas de la caché de reportes (aciertos,
+           fallos, ratio, bytes, expulsiones...) de este proceso.
+    DELETE /api/reportes/cache/  vacía la caché.
+    """
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        return APIResponse.success(
+            message="Estadísticas de la caché de reportes.",
+            data=cache.get_cache().estadisticas(),
+        )
+
+    def delete(self, request):
+        cache.get_cache().limpiar()
+        return APIResponse.success(message="Caché de reportes vaciada.")
+
+
+class VentasCuboView(APIView):
+    """
+    Agregados de ventas desde hecho_venta_diaria, con agrupación libre.
+
+    GET /api/reportes/ventas/cubo/?dimensiones=categoria,metodo_pago&frecuencia=MENSUAL
+        &fecha_desde=2025-01-01&fecha_hasta=2025-12-31&id_vendedor=3
+
+    Dimensiones: producto, categoria, metodo_pago, vendedor, anulada.
+    Métricas por fila: lineas, cantidad, monto, ventas, monto_ventas.
+    """
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        serializer = CuboVentasSerializer(data=request.query_params)
+
+        if not serializer.is_valid():
+            return APIResponse.bad_request(
+                message="Parámetros inválidos para consultar ventas.",
+                errors=serializer.errors,
+            )
+
+        filtros = serializer.validated_data
+        dimensiones = filtros.pop("dimensiones", [])
+        frecuencia = filtros.pop("frecuencia", None)
+
+        filas = hechos.consultar(filtros, dimensiones=dimensiones, frecuencia=frecuencia)
+
+        return APIResponse.success(
+            message="Consulta de ventas generada correctamente.",
+            data={
+                "dimensiones": dimensiones,
+                "frecuencia": frecuencia,
+                "metricas": list(hechos.METRICAS),
+                "resultados": filas,
+            },
+        )
+
+
+class ExportarReporteView(APIView):
+    """
+    Exporta un reporte en streaming (memoria constante).
+
+    GET  /api/reportes/exportar/?tipo_reporte=VENTAS&formato=CSV&fecha_desde=...
+    POST /api/reportes/exportar/   (mismo body que /generar/)
+
+    formato: CSV, NDJSON o XLSX (EXCEL se acepta como XLSX).
+    """
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        return self._exportar(request, request.query_params)
+
+    def post(self, request):
+        return self._exportar(request, request.data)
+
+    def _exportar(self, request, datos):
+        serializer = ReporteFiltroSerializer(data=datos)
+
+        if not serializer.is_valid():
+            return APIResponse.bad_request(
+                message="Parámetros inválidos para exportar el reporte.",
+                errors=serializer.errors,
+            )
+
+        filtros = serializer.validated_data
+        tipo_reporte = filtros.get("tipo_reporte")
+        formato = "XLSX" if filtros.get("formato") == "EXCEL" else filtros.get("formato")
+
+        if formato not in exportacion.ExportFormat.CONTENT_TYPES:
+            return APIResponse.bad_request(
+                message="Formato de exportación no soportado. Use CSV, NDJSON o XLSX."
+            )
+
+        try:
+            encabezados, filas = exportacion.filas_reporte(tipo_reporte, filtros)
+        except ValueError as exc:
+            return APIResponse.bad_request(message=str(exc))
+
+        try:
+            AuditoriaLogger.registrar_evento(
+                accion=BitacoraActions.VIEW_ACCESS,
+                descripcion=f"Exportación de reporte: {tipo_reporte} ({formato})",
+                ip=request.META.get("REMOTE_ADDR"),
+                usuario=request.user if request.user.is_authenticated else None,
+            )
+        except Exception:
+            # La bitácora no debe romper el flujo principal
+            pass
+
+        response = StreamingHttpResponse(
+            exportacion.exportar(formato, encabezados, filas),
+            content_type=exportacion.ExportFormat.CONTENT_TYPES[formato],
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{exportacion.nombre_archivo(tipo_reporte, formato)}"'
+        )
+        return response
+
+
+def _datos_job(request, estado):
+    job_id = estado["job_id"]
+    data = dict(estado)
+    data["url_estado"] = request.build_absolute_uri(
+        reverse("reportes-job-detalle", args=[job_id])
+    )
+    if estado["estado"] == jobs.JobStatus.COMPLETADO:
+        data["url_descarga"] = request.build_absolute_uri(
+            reverse("reportes-job-descarga", args=[job_id])
+        )
+    return data
+
+
+class ReporteJobsView(APIView):
+    """
+    Encola la generación de un reporte y devuelve el id del job.
+
+    POST /api/reportes/jobs/   (mismo body que /generar/, más "forzar": true opcional)
+
+    Un mismo (tipo_reporte, filtros) reutiliza el job existente salvo que
+    haya fallado o se pida "forzar".
+    """
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def post(self, request):
+        serializer = ReporteFiltroSerializer(data=request.data)
+
+        if not serializer.is_valid():
+            return APIResponse.bad_request(
+                message="Parámetros inválidos para generar el reporte.",
+                errors=serializer.errors,
+            )
+
+        filtros = serializer.validated_data
+        tipo_reporte = filtros.get("tipo_reporte")
+        forzar = str(request.data.get("forzar", "")).lower() in ("1", "true")
+
+        estado = jobs.enviar_job(tipo_reporte, filtros, forzar=forzar)
+
+        if not estado["reutilizado"]:
+            try:
+                AuditoriaLogger.registrar_evento(
+                    accion=BitacoraActions.VIEW_ACCESS,
+                    descripcion=f"Reporte en segundo plano: {tipo_reporte} (job {estado['job_id']})",
+                    ip=request.META.get("REMOTE_ADDR"),
+                    usuario=request.user if request.user.is_authenticated else None,
+                )
+            except Exception:
+                # La bitácora no debe romper el flujo principal
+                pass
+
+        return APIResponse.success(
+            message="Reporte encolado." if not estado["reutilizado"] else "Reporte ya solicitado.",
+            data=_datos_job(request, estado),
+            status_code=202,
+        )
+
+
+class ReporteJobDetalleView(APIView):
+    """
+    Estado de un job de reporte.
+    GET /api/reportes/jobs/<job_id>/
+    """
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request, job_id):
+        try:
+            estado = jobs.obtener_estado(job_id)
+        except jobs.JobNoEncontrado:
+            return APIResponse.not_found(message="Job de reporte no encontrado.")
+
+        return APIResponse.success(
+            message=f"Job {estado['estado']}.",
+            data=_datos_job(request, estado),
+        )
+
+
+class ReporteJobDescargaView(APIView):
+    """
+    Resultado de un job terminado.
+
+    GET /api/reportes/jobs/<job_id>/descargar/           → JSON completo (streaming)
+    GET /api/reportes/jobs/<job_id>/descargar/?chunk=N   → solo las filas del chunk N
+    """
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request, job_id):
+        try:
+            estado = jobs.obtener_estado(job_id)
+        except jobs.JobNoEncontrado:
+            return APIResponse.not_found(message="Job de reporte no encontrado.")
+
+        if estado["estado"] == jobs.JobStatus.SIN_DATOS:
+            return APIResponse.error(message=estado["mensaje"], status_code=404)
+        if estado["estado"] != jobs.JobStatus.COMPLETADO:
+            return APIResponse.error(
+                message=f"El reporte aún no está disponible (estado {estado['estado']}).",
+                status_code=409,
+            )
+
+        chunk = request.query_params.get("chunk")
+        if chunk is not None:
+            try:
+                numero = int(chunk)
+                if not 0 <= numero < estado["chunks"]:
+                    raise ValueError(chunk)
+                filas = jobs.leer_chunk(job_id, numero)
+            except (ValueError, jobs.JobNoEncontrado):
+                return APIResponse.bad_request(
+                    message=f"chunk debe estar entre 0 y {estado['chunks'] - 1}."
+                )
+            return APIResponse.success(
+                message=f"Chunk {numero} de {estado['chunks']}.",
+                data={"chunk": numero, "total_chunks": estado["chunks"], "resultados": filas},
+            )
+
+        response = StreamingHttpResponse(jobs.iterar_json(job_id), content_type="application/json")
+        response["Content-Disposition"] = (
+            f'attachment; filename="reporte_{estado["tipo_reporte"].lower()}_{job_id[:8]}.json"'
+        )
+        return response
+
+
+MAX_ARTEFACTOS = 200
+LECTURA_ARTEFACTO = 64 * 1024
+
+
+def _datos_programado(request, programado, ultimos=None):
+    if ultimos is None:
+        ultimos = programados.ultimos_artefactos([programado.pk])
+    data = ReporteProgramadoSerializer(programado).data
+    data["ultimos"] = {}
+    for formato in programado.formatos:
+        artefacto = ultimos.get((programado.pk, formato))
+        data["ultimos"][formato] = _datos_artefacto(request, artefacto) if artefacto else None
+    return data
+
+
+def _datos_artefacto(request, artefacto):
+    data = ArtefactoReporteSerializer(artefacto).data
+    if artefacto.estado == programados.EstadoArtefacto.COMPLETADO:
+        data["url_descarga"] = request.build_absolute_uri(
+            reverse("reportes-artefacto-descarga", args=[artefacto.pk])
+        )
+    return data
+
+
+def _descargar_artefacto(request, artefacto):
+    """
+    Sirve el archivo tal como está en disco (gzip) si el cliente acepta
+    gzip; si no, lo descomprime en streaming.
+    """
+    ruta = programados.ruta_absoluta(artefacto)
+    if not os.path.exists(ruta):
+        return APIResponse.not_found(message="El archivo del reporte ya no está disponible.")
+
+    content_type = programados.FormatoArtefacto.CONTENT_TYPES[artefacto.formato]
+    extension = programados.FormatoArtefacto.EXTENSIONES[artefacto.formato]
+    nombre = (
+        f"reporte_{artefacto.programado.tipo_reporte.lower()}_"
+        f"{artefacto.periodo_desde:%Y%m%d}-{artefacto.periodo_hasta:%Y%m%d}.{extension}"
+    )
+
+    if "gzip" in request.META.get("HTTP_ACCEPT_ENCODING", ""):
+        response = FileResponse(open(ruta, "rb"), content_type=content_type)
+        response["Content-Encoding"] = "gzip"
+    else:
+        def leer():
+            with gzip.open(ruta, "rb") as fh:
+                while True:
+                    bloque = fh.read(LECTURA_ARTEFACTO)
+                    if not bloque:
+                        break
+                    yield bloque
+
+        response = StreamingHttpResponse(leer(), content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{nombre}"'
+    response["Vary"] = "Accept-Encoding"
+    return response
+
+
+class ReportesProgramadosView(APIView):
+    """
+    GET  /api/reportes/programados/   definiciones con su último artefacto por formato
+    POST /api/reportes/programados/   {"nombre", "tipo_reporte", "frecuencia",
+                                       "hora_ejecucion"?, "formatos"?, "filtros"?}
+    """
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        definiciones = ReporteProgramado.objects.all()
+        if request.query_params.get("activo") in ("true", "false"):
+            definiciones = definiciones.filter(activo=request.query_params["activo"] == "true")
+        definiciones = list(definiciones)
+        ultimos = programados.ultimos_artefactos(p.pk for p in definiciones)
+        return APIResponse.success(
+            message="Reportes programados.",
+            data={"programados": [_datos_programado(request, p, ultimos) for p in definiciones]},
+        )
+
+    def post(self, request):
+        serializer = ReporteProgramadoSerializer(data=request.data)
+        if not serializer.is_valid():
+            return APIResponse.bad_request(
+                message="Parámetros inválidos para programar el reporte.",
+                errors=serializer.errors,
+            )
+        programado = serializer.save(creado_por=request.user)
+
+        try:
+            AuditoriaLogger.registrar_evento(
+                accion=BitacoraActions.VIEW_ACCESS,
+                descripcion=f"Reporte programado: {programado.nombre} ({programado.tipo_reporte}, {programado.frecuencia})",
+                ip=request.META.get("REMOTE_ADDR"),
+                usuario=request.user if request.user.is_authenticated else None,
+            )
+        except Exception:
+            # La bitácora no debe romper el flujo principal
+            pass
+
+        return APIResponse.created(
+            message="Reporte programado.",
+            data=_datos_programado(request, programado),
+        )
+
+
+class ReporteProgramadoDetalleView(APIView):
+    """
+    GET    /api/reportes/programados/<id>/
+    PATCH  /api/reportes/programados/<id>/   (cambiar frecuencia u hora recalcula la próxima ejecución)
+    DELETE /api/reportes/programados/<id>/   (borra también sus artefactos)
+    """
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def _obtener(self, pk):
+        return ReporteProgramado.objects.filter(pk=pk).first()
+
+    def get(self, request, pk):
+        programado = self._obtener(pk)
+        if programado is None:
+            return APIResponse.not_found(message="Reporte programado no encontrado.")
+        return APIResponse.success(
+            message="Reporte programado.",
+            data=_datos_programado(request, programado),
+        )
+
+    def patch(self, request, pk):
+        programado = self._obtener(pk)
+        if programado is None:
+            return APIResponse.not_found(message="Reporte programado no encontrado.")
+        serializer = ReporteProgramadoSerializer(programado, data=request.data, partial=True)
+        if not serializer.is_valid():
+            return APIResponse.bad_request(
+                message="Parámetros inválidos para el reporte programado.",
+                errors=serializer.errors,
+            )
+        programado = serializer.save()
+        return APIResponse.success(
+            message="Reporte programado actualizado.",
+            data=_datos_programado(request, programado),
+        )
+
+    def delete(self, request, pk):
+        programado = self._obtener(pk)
+        if programado is None:
+            return APIResponse.not_found(message="Reporte programado no encontrado.")
+        for artefacto in programado.artefactos.exclude(ruta=""):
+            try:
+                os.remove(programados.ruta_absoluta(artefacto))
+            except FileNotFoundError:
+                pass
+        programado.delete()
+        return APIResponse.success(message="Reporte programado eliminado.")
+
+
+class ReporteProgramadoEjecutarView(APIView):
+    """
+    Adelanta la próxima ejecución a ahora: el programador lo genera en su
+    siguiente pasada (a lo sumo REPORTES_PROGRAMADOS_INTERVALO segundos).
+    POST /api/reportes/programados/<id>/ejecutar/
+    """
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def post(self, request, pk):
+        actualizados = ReporteProgramado.objects.filter(pk=pk).update(proxima_ejecucion=timezone.now())
+        if not actualizados:
+            return APIResponse.not_found(message="Reporte programado no encontrado.")
+        return APIResponse.success(
+            message="Reporte encolado para la próxima pasada del programador.",
+            data=_datos_programado(request, ReporteProgramado.objects.get(pk=pk)),
+            status_code=202,
+        )
+
+
+class ReporteProgramadoUltimoView(APIView):
+    """
+    Descarga el último artefacto completado de una definición.
+    GET /api/reportes/programados/<id>/ultimo/?formato=JSON|CSV
+    """
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request, pk):
+        programado = ReporteProgramado.objects.filter(pk=pk).first()
+        if programado is None:
+            return APIResponse.not_found(message="Reporte programado no encontrado.")
+        formato = (request.query_params.get("formato") or programados.FormatoArtefacto.JSON).upper()
+        if formato not in programados.FormatoArtefacto.EXTENSIONES:
+            return APIResponse.bad_request(message="Formato no soportado. Use JSON o CSV.")
+
+        artefacto = programados.ultimo_artefacto(programado, formato)
+        if artefacto is None:
+            return APIResponse.not_found(message="El reporte todavía no se generó en ese formato.")
+        return _descargar_artefacto(request, artefacto)
+
+
+class ReportesProgramadosMetricasView(APIView):
+    """
+    Tiempos de generación de los reportes programados por tipo y formato.
+    GET /api/reportes/programados/metricas/?dias=30
+    """
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        try:
+            dias = max(1, min(int(request.query_params.get("dias") or 30), 366))
+        except ValueError:
+            return APIResponse.bad_request(message="dias debe ser un entero.")
+        return APIResponse.success(
+            message="Métricas de reportes programados.",
+            data={"dias": dias, "metricas": programados.metricas(dias)},
+        )
+
+
+class ArtefactosReporteView(APIView):
+    """
+    Artefactos generados, del más reciente al más antiguo.
+    GET /api/reportes/artefactos/?programado=&tipo_reporte=&formato=&estado=&limit=
+    """
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        artefactos = ArtefactoReporte.objects.select_related("programado")
+        params = request.query_params
+        if params.get("programado"):
+            artefactos = artefactos.filter(programado_id=params["programado"])
+        if params.get("tipo_reporte"):
+            artefactos = artefactos.filter(programado__tipo_reporte=params["tipo_reporte"])
+        if params.get("formato"):
+            artefactos = artefactos.filter(formato=params["formato"].upper())
+        if params.get("estado"):
+            artefactos = artefactos.filter(estado=params["estado"].upper())
+        try:
+            limite = max(1, min(int(params.get("limit") or 50), MAX_ARTEFACTOS))
+        except ValueError:
+            return APIResponse.bad_request(message="limit debe ser un entero.")
+
+        return APIResponse.success(
+            message="Artefactos de reportes programados.",
+            data={"artefactos": [_datos_artefacto(request, a) for a in artefactos[:limite]]},
+        )
+
+
+class ArtefactoReporteDescargaView(APIView):
+    """
+    GET /api/reportes/artefactos/<id>/descargar/
+    """
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request, pk):
+        artefacto = ArtefactoReporte.objects.select_related("programado").filter(pk=pk).first()
+        if artefacto is None:
+            return APIResponse.not_found(message="Artefacto no encontrado.")
+        if artefacto.estado != programados.EstadoArtefacto.COMPLETADO:
+            return APIResponse.error(
+                message=artefacto.mensaje or f"El artefacto terminó en estado {artefacto.estado}.",
+                status_code=404 if artefacto.estado == programados.EstadoArtefacto.SIN_DATOS else 409,
+            )
+        return _descargar_artefacto(request, artefacto)
 
 
 class BitacoraActionsView(APIView):
@@ -781,9 +781,10 @@ class UsuarioAdminViewSet(viewsets.ModelViewSet):
         GET /api/usuarios/admin/usuarios/{id}/compras/
 
         Lista todas las compras (ventas) asociadas a un cliente.
+        Acepta ?fields= para proyectar columnas (ver listar_ventas).
         """
-        from apps.ventas.models import Venta
         from apps.ventas.serializers import VentaSerializer
+        from apps.ventas.services import listado_service
 
         # Obtener el usuario
         usuario = self.get_object()
@@ -802,10 +803,17 @@ class UsuarioAdminViewSet(viewsets.ModelViewSet):
                 message="El cliente no existe."
             )
 
-        # Obtener ventas
-        ventas = Venta.objects.filter(id_cliente=cliente).order_by('-id_venta')
+        try:
+            campos = listado_service.parsear_campos(request.query_params.get('fields'))
+        except ValueError as e:
+            return APIResponse.bad_request(message=str(e))
+
+        # Obtener ventas (solo se cargan las relaciones de los campos pedidos)
+        ventas = listado_service.construir_queryset_ventas(
+            campos, {'id_cliente': cliente.id_cliente_id}
+        )
 
-        serializer = VentaSerializer(ventas, many=True)
+        serializer = VentaSerializer(ventas, many=True, fields=campos)
 
         return APIResponse.success(
             message="Compras obtenidas correctamente.",
@@ -34,6 +34,14 @@ class VentaSerializer(serializers.ModelSerializer):
         read_only=True
     )
 
+    def __init__(self, *args, **kwargs):
+        # Proyección opcional: VentaSerializer(qs, many=True, fields=['id_venta', 'fecha'])
+        campos = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if campos is not None:
+            for nombre in set(self.fields) - set(campos):
+                self.fields.pop(nombre)
+
     class Meta:
         model = Venta
         fields = [
@@ -0,0 +1,94 @@
+# apps/ventas/services/anulacion_service.py
+from django.db import transaction
+from django.db.models import Sum
+
+from apps.inventario.services import velocidad_service
+from apps.inventario.services.kardex_service import registrar_movimientos
+from apps.reportes import hechos
+from apps.ventas.models import Venta, DetalleVenta
+from core.constants import StockMovementReason
+
+
+ESTADOS_ANULABLES = ("PENDIENTE", "COMPLETADO")
+ESTADO_ANULADA = "ANULADA"
+
+
+def _motivo_rechazo(venta):
+    if venta is None:
+        return "La venta no existe."
+    if venta.estado == ESTADO_ANULADA:
+        return "La venta ya se encuentra anulada."
+    if venta.estado not in ESTADOS_ANULABLES:
+        return f"No se puede anular una venta con estado {venta.estado}"
+    return None
+
+
+@transaction.atomic
+def anular_ventas(ids_venta, usuario=None):
+    """
+    Anula una o varias ventas y devuelve su stock en bloque.
+
+    - Las ventas se bloquean (SELECT ... FOR UPDATE) en orden de id, así una
+      segunda anulación concurrente espera y luego ve el estado ANULADA.
+    - El cambio de estado es un UPDATE condicional: solo pasa a ANULADA lo
+      que sigue en un estado anulable (guarda de idempotencia).
+    - El stock se restaura vía kardex (ANULACION_VENTA): un solo UPDATE
+      por tabla (producto y lote) y un movimiento por venta/producto/lote.
+    - hecho_venta_diaria pasa las ventas a anulada en la misma transacción.
+
+    Returns:
+        tuple: (ventas_anuladas, rechazadas) donde rechazadas es {id_venta: motivo}
+    """
+    ids = sorted({int(i) for i in ids_venta})
+
+    ventas = {
+        v.id_venta: v
+        for v in Venta.objects.select_for_update().filter(id_venta__in=ids).order_by("id_venta")
+    }
+
+    rechazadas = {}
+    candidatas = []
+    for id_venta in ids:
+        motivo = _motivo_rechazo(ventas.get(id_venta))
+        if motivo:
+            rechazadas[id_venta] = motivo
+        else:
+            candidatas.append(id_venta)
+
+    if not candidatas:
+        return [], rechazadas
+
+    Venta.objects.filter(
+        id_venta__in=candidatas,
+        estado__in=ESTADOS_ANULABLES,
+    ).update(estado=ESTADO_ANULADA)
+
+    devoluciones = (
+        DetalleVenta.objects.filter(id_venta__in=candidatas)
+        .values("id_venta", "id_producto", "id_lote")
+        .annotate(total=Sum("cantidad"))
+    )
+    registrar_movimientos(
+        [
+            {
+                "producto": row["id_producto"],
+                "lote": row["id_lote"],
+                "cantidad": row["total"],
+                "referencia": f"VENTA #{row['id_venta']}",
+            }
+            for row in devoluciones
+        ],
+        motivo=StockMovementReason.ANULACION_VENTA,
+        usuario=usuario,
+        permitir_negativo=True,
+    )
+    hechos.registrar_anulaciones(candidatas)
+    velocidad_service.registrar_anulaciones(candidatas)
+
+    anuladas = []
+    for id_venta in candidatas:
+        venta = ventas[id_venta]
+        venta.estado = ESTADO_ANULADA
+        anuladas.append(venta)
+
+    return anuladas, rechazadas
@@ -0,0 +1,138 @@
+# apps/ventas/services/listado_service.py
+import base64
+import json
+from datetime import date
+
+from django.db.models import Prefetch, Q
+from rest_framework.utils.encoders import JSONEncoder
+
+from apps.ventas.models import Venta, DetalleVenta
+
+
+# Campos que se pueden proyectar con ?fields= y las relaciones que necesita cada uno.
+# Solo se hace select_related / prefetch de lo que realmente se va a serializar.
+CAMPOS_SELECT_RELATED = {
+    'id_venta': (),
+    'fecha': (),
+    'monto_total': (),
+    'estado': (),
+    'id_metodo_pago': (),
+    'metodo_pago_tipo': ('id_metodo_pago',),
+    'id_cliente': (),
+    'cliente_nombre': ('id_cliente__id_cliente',),
+    'id_vendedor': (),
+    'vendedor_nombre': ('id_vendedor__id_vendedor',),
+    'detalles': (),
+}
+
+CAMPOS_PREFETCH = {'detalles'}
+
+CHUNK_SIZE_STREAM = 2000
+
+
+def parsear_campos(valor):
+    """
+    Convierte el parámetro ?fields=a,b,c en una lista de campos válidos.
+    Devuelve None si no se pidió proyección (todos los campos).
+    Lanza ValueError si se pide un campo inexistente.
+    """
+    if not valor:
+        return None
+
+    campos = [c.strip() for c in valor.split(',') if c.strip()]
+    invalidos = [c for c in campos if c not in CAMPOS_SELECT_RELATED]
+    if invalidos:
+        raise ValueError(f"Campos no válidos: {', '.join(invalidos)}")
+
+    # id_venta y fecha siempre se incluyen: son la clave del cursor
+    for clave in ('fecha', 'id_venta'):
+        if clave not in campos:
+            campos.insert(0, clave)
+    return campos
+
+
+def construir_queryset_ventas(campos=None, filtros=None):
+    """
+    Arma el queryset de ventas cargando solo las relaciones
+    requeridas por los campos proyectados.
+    """
+    campos = campos or list(CAMPOS_SELECT_RELATED.keys())
+    filtros = filtros or {}
+
+    relaciones = sorted({rel for c in campos for rel in CAMPOS_SELECT_RELATED[c]})
+    qs = Venta.objects.all()
+    if relaciones:
+        qs = qs.select_related(*relaciones)
+
+    if CAMPOS_PREFETCH.intersection(campos):
+        qs = qs.prefetch_related(
+            Prefetch(
+                'detalles',
+                queryset=DetalleVenta.objects.select_related('id_producto').only(
+                    'id_detalle_venta', 'id_venta', 'id_producto', 'cantidad',
+                    'precio', 'sub_total', 'id_producto__nombre',
+                ),
+            )
+        )
+
+    if filtros.get('fecha_desde'):
+        qs = qs.filter(fecha__gte=filtros['fecha_desde'])
+    if filtros.get('fecha_hasta'):
+        qs = qs.filter(fecha__lte=filtros['fecha_hasta'])
+    if filtros.get('estado'):
+        qs = qs.filter(estado=filtros['estado'])
+    if filtros.get('id_cliente'):
+        qs = qs.filter(id_cliente_id=filtros['id_cliente'])
+    if filtros.get('id_vendedor'):
+        qs = qs.filter(id_vendedor_id=filtros['id_vendedor'])
+
+    return qs.order_by('-fecha', '-id_venta')
+
+
+def codificar_cursor(venta):
+    payload = json.dumps([venta.fecha.isoformat(), venta.id_venta]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        fecha, id_venta = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        return date.fromisoformat(fecha), int(id_venta)
+    except Exception:
+        raise ValueError("Cursor inválido.")
+
+
+def aplicar_cursor(queryset, cursor):
+    """
+    Paginación por clave (fecha, id_venta) descendente: la página siguiente
+    empieza justo después de la última fila vista, sin OFFSET.
+    """
+    if not cursor:
+        return queryset
+    fecha, id_venta = decodificar_cursor(cursor)
+    return queryset.filter(
+        Q(fecha__lt=fecha) | Q(fecha=fecha, id_venta__lt=id_venta)
+    )
+
+
+def obtener_pagina(queryset, cursor=None, page_size=15):
+    """
+    Devuelve (ventas, siguiente_cursor). Se lee una fila extra
+    para saber si existe página siguiente sin hacer COUNT(*).
+    """
+    filas = list(aplicar_cursor(queryset, cursor)[:page_size + 1])
+    hay_mas = len(filas) > page_size
+    filas = filas[:page_size]
+    siguiente = codificar_cursor(filas[-1]) if hay_mas and filas else None
+    return filas, siguiente
+
+
+def iterar_ndjson(queryset, serializer_class, campos=None, chunk_size=CHUNK_SIZE_STREAM):
+    """
+    Genera una línea JSON por venta recorriendo el queryset con
+    cursor del lado del servidor (iterator con chunk_size).
+    """
+    for venta in queryset.iterator(chunk_size=chunk_size):
+        data = serializer_class(venta, fields=campos).data
+        yield json.dumps(data, cls=JSONEncoder, ensure_ascii=False) + '\n'
@@ -1,3 +1,490 @@
-from django.test import TestCase
+import shutil
+import tempfile
+import threading
+import unittest
+from datetime import date, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.apps import apps
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from apps.categoria.models import Categoria
+from apps.inventario.models import MovimientoStock, SaldoStock, VelocidadVenta
+from apps.inventario.services import velocidad_service
+from apps.inventario.services.kardex_service import conciliar, stock_a_fecha
+from apps.lotes.models import Lote
+from apps.lotes.services.fefo_service import asignar_lotes
+from apps.pagos.models import MetodoPago
+from apps.productos.models import Producto
+from apps.reportes import exportacion, hechos, jobs
+from apps.reportes.models import HechoVentaDiaria
+from apps.reportes.services import ReportesService, estado_venta_sql
+from apps.usuarios.models import Usuario, Cliente, Vendedor
+from apps.ventas.models import Venta, DetalleVenta
+from apps.ventas.services import listado_service
+from apps.ventas.services.anulacion_service import anular_ventas
+from apps.ventas.serializers import VentaSerializer
+from apps.inventario.services.kardex_service import StockInsuficiente, registrar_movimientos
+from core.constants import StockMovementReason
+
+
+def _crear_tablas_no_administradas():
+    """Las tablas reales no las crean las migraciones (managed=False)."""
+    existentes = set(connection.introspection.table_names())
+    modelos = [
+        m for m in apps.get_models()
+        if not m._meta.managed and m._meta.db_table not in existentes
+    ]
+    with connection.schema_editor() as editor:
+        for modelo in modelos:
+            editor.create_model(modelo)
+    return modelos
+
+
+class ListadoVentasTests(SimpleTestCase):
+
+    def test_campos_proyectados_incluyen_la_clave_del_cursor(self):
+        self.assertIsNone(listado_service.parsear_campos(''))
+        self.assertEqual(
+            listado_service.parsear_campos('monto_total, estado'),
+            ['id_venta', 'fecha', 'monto_total', 'estado'],
+        )
+        with self.assertRaises(ValueError):
+            listado_service.parsear_campos('monto_total,clave')
+
+    def test_cursor_ida_y_vuelta(self):
+        venta = Venta(id_venta=42, fecha=date(2025, 3, 1))
+        cursor = listado_service.codificar_cursor(venta)
+        self.assertEqual(listado_service.decodificar_cursor(cursor), (date(2025, 3, 1), 42))
+        with self.assertRaises(ValueError):
+            listado_service.decodificar_cursor('no-es-un-cursor')
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Requiere PostgreSQL (UPDATE ... FROM VALUES y FOR UPDATE)')
+class AnulacionConcurrenteTests(TransactionTestCase):
+    # El flush de TransactionTestCase solo conoce tablas administradas;
+    # los datos de este caso se limpian a mano en tearDown.
+    available_apps = ['apps.ventas', 'apps.categoria']
+
+    STOCK_INICIAL = 100
+    VENTAS_A_ANULAR = 10
+    VENTAS_NUEVAS = 10
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._modelos = _crear_tablas_no_administradas()
+
+    @classmethod
+    def tearDownClass(cls):
+        with connection.schema_editor() as editor:
+            for modelo in reversed(cls._modelos):
+                editor.delete_model(modelo)
+        super().tearDownClass()
+
+    def setUp(self):
+        usuario_cliente = Usuario.objects.create(
+            nombre_completo='Cliente Test', nombre_usuario='cliente_test',
+            correo='cliente@test.com', sexo='F', password='x',
+        )
+        usuario_vendedor = Usuario.objects.create(
+            nombre_completo='Vendedor Test', nombre_usuario='vendedor_test',
+            correo='vendedor@test.com', sexo='M', password='x',
+        )
+        self.cliente = Cliente.objects.create(id_cliente=usuario_cliente)
+        self.vendedor = Vendedor.objects.create(id_vendedor=usuario_vendedor, tipo_vendedor='TIENDA')
+        self.metodo = MetodoPago.objects.create(tipo='EFECTIVO', categoria='FISICO')
+        categoria = Categoria.objects.create(nombre='Lentes')
+        self.producto = Producto.objects.create(
+            id_producto='P0001', nombre='Lente', precio=Decimal('10.00'),
+            stock=self.STOCK_INICIAL, descripcion='-', estado_producto='ACTIVO',
+            id_categoria=categoria,
+        )
+
+    def tearDown(self):
+        VelocidadVenta.objects.all().delete()
+        HechoVentaDiaria.objects.all().delete()
+        MovimientoStock.objects.all().delete()
+        SaldoStock.objects.all().delete()
+        DetalleVenta.objects.all().delete()
+        Venta.objects.all().delete()
+        Lote.objects.all().delete()
+        Producto.objects.all().delete()
+        Categoria.objects.all().delete()
+        MetodoPago.objects.all().delete()
+        Vendedor.objects.all().delete()
+        Cliente.objects.all().delete()
+        Usuario.objects.all().delete()
+
+    def _crear_venta(self, cantidad, lote=None):
+        venta = Venta.objects.create(
+            fecha=date.today(), monto_total=Decimal('10.00') * cantidad,
+            estado='COMPLETADO', id_metodo_pago=self.metodo,
+            id_cliente=self.cliente, id_vendedor=self.vendedor,
+        )
+        DetalleVenta.objects.create(
+            id_venta=venta, id_producto=self.producto, cantidad=cantidad,
+            precio=Decimal('10.00'), sub_total=Decimal('10.00') * cantidad,
+            id_lote=lote,
+        )
+        return venta
+
+    def _descontar(self, cantidad):
+        return registrar_movimientos(
+            [{'producto': self.producto.id_producto, 'cantidad': -cantidad}],
+            motivo=StockMovementReason.VENTA,
+        )
+
+    def _en_hilos(self, funciones):
+        barrera = threading.Barrier(len(funciones))
+        errores = []
+
+        def ejecutar(funcion):
+            try:
+                barrera.wait()
+                funcion()
+            except Exception as exc:  # pragma: no cover - se reporta abajo
+                errores.append(exc)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=ejecutar, args=(f,)) for f in funciones]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        self.assertEqual(errores, [])
+
+    def test_anulacion_y_ventas_concurrentes_no_pierden_stock(self):
+        # Ventas previas: su stock ya salió del producto
+        ventas = [self._crear_venta(2) for _ in range(self.VENTAS_A_ANULAR)]
+        Producto.objects.filter(pk=self.producto.pk).update(
+            stock=self.STOCK_INICIAL - 2 * self.VENTAS_A_ANULAR
+        )
+
+        def anular(id_venta):
+            return lambda: anular_ventas([id_venta])
+
+        def vender():
+            with transaction.atomic():
+                self._descontar(3)
+
+        funciones = [anular(v.id_venta) for v in ventas]
+        funciones += [vender for _ in range(self.VENTAS_NUEVAS)]
+        self._en_hilos(funciones)
+
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, self.STOCK_INICIAL - 3 * self.VENTAS_NUEVAS)
+        self.assertEqual(
+            Venta.objects.filter(estado='ANULADA').count(), self.VENTAS_A_ANULAR
+        )
+
+    def test_doble_anulacion_concurrente_restaura_una_sola_vez(self):
+        venta = self._crear_venta(5)
+        Producto.objects.filter(pk=self.producto.pk).update(stock=self.STOCK_INICIAL - 5)
+
+        resultados = []
+
+        def anular():
+            resultados.append(anular_ventas([venta.id_venta]))
+
+        self._en_hilos([anular for _ in range(4)])
+
+        exitosas = [anuladas for anuladas, _ in resultados if anuladas]
+        self.assertEqual(len(exitosas), 1)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, self.STOCK_INICIAL)
+
+    def test_anulacion_en_bloque_restaura_lotes_y_productos(self):
+        lote = Lote.objects.create(
+            id_lote='L0001', cantidad=0, fecha_vencimiento=date(2030, 1, 1),
+            producto=self.producto,
+        )
+        v1 = self._crear_venta(4, lote=lote)
+        v2 = self._crear_venta(6)
+        Producto.objects.filter(pk=self.producto.pk).update(stock=0)
+
+        anuladas, rechazadas = anular_ventas([v1.id_venta, v2.id_venta, 999999])
+
+        self.assertEqual({v.id_venta for v in anuladas}, {v1.id_venta, v2.id_venta})
+        self.assertIn(999999, rechazadas)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, 10)
+        lote.refresh_from_db()
+        self.assertEqual(lote.cantidad, 4)
+
+    def test_descuento_sin_stock_suficiente(self):
+        with self.assertRaises(StockInsuficiente):
+            self._descontar(self.STOCK_INICIAL + 1)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, self.STOCK_INICIAL)
+        self.assertFalse(MovimientoStock.objects.exists())
+
+    def test_kardex_explica_el_stock_tras_ventas_y_anulaciones(self):
+        # Stock previo al kardex: la conciliación lo registra como APERTURA
+        conciliar(aplicar=True)
+        venta = self._crear_venta(7)
+        self._descontar(7)
+        anular_ventas([venta.id_venta])
+        corte = timezone.now()
+        self._descontar(5)
+
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, self.STOCK_INICIAL - 5)
+        self.assertEqual(
+            list(MovimientoStock.objects.order_by('id_movimiento').values_list('motivo', 'cantidad')),
+            [
+                (StockMovementReason.APERTURA, self.STOCK_INICIAL),
+                (StockMovementReason.VENTA, -7),
+                (StockMovementReason.ANULACION_VENTA, 7),
+                (StockMovementReason.VENTA, -5),
+            ],
+        )
+        saldo = SaldoStock.objects.get(producto=self.producto, lote__isnull=True)
+        self.assertEqual(saldo.cantidad, self.producto.stock)
+        self.assertEqual(conciliar(), {'productos': [], 'lotes': []})
+        self.assertEqual(stock_a_fecha(self.producto.id_producto, corte), self.STOCK_INICIAL)
+
+    def test_asignacion_fefo_concurrente_no_sobrevende_lotes(self):
+        Lote.objects.create(id_lote='L0002', cantidad=5, fecha_vencimiento=date(2031, 1, 1), producto=self.producto)
+        Lote.objects.create(id_lote='L0001', cantidad=5, fecha_vencimiento=date(2030, 1, 1), producto=self.producto)
+
+        def vender():
+            with transaction.atomic():
+                lineas = asignar_lotes([
+                    {'producto': self.producto, 'cantidad': 2, 'precio': Decimal('10.00')}
+                ])
+                registrar_movimientos(
+                    [
+                        {'producto': l['producto'].id_producto, 'lote': l['lote'], 'cantidad': -l['cantidad']}
+                        for l in lineas
+                    ],
+                    motivo=StockMovementReason.VENTA,
+                )
+
+        self._en_hilos([vender for _ in range(6)])
+
+        self.assertEqual(
+            dict(Lote.objects.values_list('id_lote', 'cantidad')), {'L0001': 0, 'L0002': 0}
+        )
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, self.STOCK_INICIAL - 12)
+        # 10 unidades salieron de lotes (una venta se partió entre L0001 y L0002), 2 sin lote
+        por_lote = dict(
+            MovimientoStock.objects.values('lote_id').annotate(t=Sum('cantidad')).values_list('lote_id', 't')
+        )
+        self.assertEqual(por_lote, {'L0001': -5, 'L0002': -5, None: -2})
+
+    def test_hechos_venta_incrementales_coinciden_con_reconstruccion(self):
+        venta = self._crear_venta(2)
+        otro = Producto.objects.create(
+            id_producto='P0002', nombre='Marco', precio=Decimal('5.00'), stock=10,
+            descripcion='-', estado_producto='ACTIVO', id_categoria=self.producto.id_categoria,
+        )
+        DetalleVenta.objects.create(
+            id_venta=venta, id_producto=otro, cantidad=1,
+            precio=Decimal('5.00'), sub_total=Decimal('5.00'),
+        )
+        segunda = self._crear_venta(3)
+        hechos.registrar_ventas([venta.id_venta, segunda.id_venta])
+
+        # Dos líneas en la primera venta: la venta cuenta una sola vez
+        self.assertEqual(
+            hechos.consultar({}),
+            [{'lineas': 3, 'cantidad': 6, 'monto': Decimal('55.00'),
+              'ventas': 2, 'monto_ventas': Decimal('50.00')}],
+        )
+
+        anular_ventas([venta.id_venta])
+        por_estado = {f['anulada']: f['ventas'] for f in hechos.consultar({}, ['anulada'])}
+        self.assertEqual(por_estado, {False: 1, True: 1})
+
+        campos = ('fecha', 'producto_id', 'anulada', 'lineas', 'cantidad', 'monto', 'ventas', 'monto_ventas')
+        incremental = sorted(HechoVentaDiaria.objects.values_list(*campos))
+        hechos.reconstruir()
+        self.assertEqual(sorted(HechoVentaDiaria.objects.values_list(*campos)), incremental)
+
+    def test_velocidad_venta_incremental_coincide_con_recalculo(self):
+        primera = self._crear_venta(2)
+        hechos.registrar_ventas([primera.id_venta])
+        # Sin fila previa: se recalcula desde los hechos
+        velocidad_service.registrar_ventas([primera.id_venta])
+        segunda = self._crear_venta(4)
+        hechos.registrar_ventas([segunda.id_venta])
+        velocidad_service.registrar_ventas([segunda.id_venta])
+
+        anular_ventas([primera.id_venta])
+        fila = VelocidadVenta.objects.get(producto=self.producto)
+        self.assertEqual((fila.unidades_7d, fila.unidades_30d, fila.unidades_90d), (4, 4, 4))
+
+        velocidad_service.recalcular()
+        fila.refresh_from_db()
+        self.assertEqual((fila.unidades_7d, fila.unidades_30d, fila.unidades_90d), (4, 4, 4))
+
+        # 4 unidades en 30 días: cada unidad de stock cubre 7,5 días
+        producto = Producto.objects.get(pk=self.producto.pk)
+        cobertura, = velocidad_service.cobertura([producto.id_producto])
+        self.assertEqual(cobertura['dias_cobertura'], producto.stock * 7.5)
+        self.assertFalse(producto.stock_bajo)
+
+        # Recorriendo el catálogo por lotes da lo mismo que pedir el producto
+        self.assertEqual(velocidad_service.bajo_cobertura(cobertura['dias_cobertura'] + 1, lote=1), [cobertura])
+        self.assertEqual(velocidad_service.bajo_cobertura(cobertura['dias_cobertura'], lote=1), [])
+
+    def test_proyeccion_de_lotes_por_vencer(self):
+        hoy = date(2025, 1, 1)
+        lotes = [(date(2025, 1, 31), 'L2', 50), (date(2025, 1, 11), 'L1', 30)]
+        # 2 por día: en 10 días se venden 20 de L1 y en 30 días 40 más de L2
+        self.assertEqual(velocidad_service.proyectar_lotes(lotes, 2, hoy=hoy), 10 + 10)
+        self.assertEqual(velocidad_service.proyectar_lotes(lotes, 0, hoy=hoy), 80)
+
+    def test_listado_por_cursor_recorre_todo_sin_repetir(self):
+        # Varias ventas por día: el desempate por id_venta evita saltos
+        hoy = date.today()
+        ids = []
+        for dias in (0, 0, 1, 1, 1, 2, 3):
+            venta = self._crear_venta(1)
+            Venta.objects.filter(pk=venta.pk).update(fecha=hoy - timedelta(days=dias))
+            ids.append(venta.pk)
+        esperado = list(
+            Venta.objects.order_by('-fecha', '-id_venta').values_list('id_venta', flat=True)
+        )
+
+        campos = listado_service.parsear_campos('monto_total')
+        ventas = listado_service.construir_queryset_ventas(campos)
+        vistos, cursor = [], None
+        while True:
+            pagina, cursor = listado_service.obtener_pagina(ventas, cursor, page_size=3)
+            for fila in VentaSerializer(pagina, many=True, fields=campos).data:
+                self.assertEqual(set(fila), {'id_venta', 'fecha', 'monto_total'})
+                vistos.append(fila['id_venta'])
+            if cursor is None:
+                break
+
+        self.assertEqual(vistos, esperado)
+
+    def test_job_de_ventas_escribe_las_filas_en_chunks(self):
+        hechos.registrar_ventas([self._crear_venta(cantidad).pk for cantidad in (1, 2, 3, 4, 5)])
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+
+        with override_settings(REPORTES_DIR=directorio, REPORTES_CHUNK_FILAS=2):
+            job_id = jobs.calcular_job_id('VENTAS', {})
+            jobs._reclamar(job_id, 'VENTAS', {}, forzar=False)
+            jobs._ejecutar(job_id, 'VENTAS', {})
+
+            estado = jobs.obtener_estado(job_id)
+            self.assertEqual(estado['estado'], jobs.JobStatus.COMPLETADO, estado['mensaje'])
+            self.assertEqual((estado['total_filas'], estado['chunks']), (5, 3))
+            resumen = jobs.leer_resumen(job_id)
+            self.assertNotIn('resultados', resumen)
+            self.assertEqual(resumen['resumen']['total_ventas'], 5)
+            self.assertEqual(Decimal(str(resumen['resumen']['monto_total'])), Decimal('150.00'))
+            self.assertEqual(
+                set(jobs.leer_chunk(job_id, 0)[0]),
+                {'id_venta', 'fecha', 'monto_total', 'estado_venta', 'metodo_pago',
+                 'id_cliente', 'nombreCompleto_cliente'},
+            )
+
+    def test_reporte_de_ventas_normaliza_el_estado_en_sql(self):
+        for estado in ('anulado', 'ANULADA', 'Completada', 'COMPLETADO', 'pendiente'):
+            venta = self._crear_venta(1)
+            Venta.objects.filter(pk=venta.pk).update(estado=estado)
+        hechos.reconstruir()
+
+        normalizados = sorted(
+            Venta.objects.annotate(estado_venta=estado_venta_sql()).values_list('estado_venta', flat=True)
+        )
+        self.assertEqual(normalizados, ['ANULADO', 'ANULADO', 'COMPLETADO', 'COMPLETADO', 'PENDIENTE'])
+
+        # Resumen desde los hechos y una página del detalle
+        with self.assertNumQueries(2):
+            reporte = ReportesService.generar_reporte('VENTAS', {})
+        self.assertEqual(
+            sorted(f['estado_venta'] for f in reporte['resultados']),
+            normalizados,
+        )
+        self.assertEqual(reporte['resumen']['total_ventas'], 5)
+
+    def test_resumen_de_ventas_desde_hechos_coincide_con_venta(self):
+        otro_metodo = MetodoPago.objects.create(tipo='TARJETA', categoria='FISICO')
+        ids = []
+        for dias, cantidad, metodo in ((0, 1, self.metodo), (0, 2, otro_metodo), (40, 3, self.metodo),
+                                       (400, 4, otro_metodo), (401, 5, self.metodo)):
+            venta = self._crear_venta(cantidad)
+            Venta.objects.filter(pk=venta.pk).update(
+                fecha=date.today() - timedelta(days=dias), id_metodo_pago=metodo,
+            )
+            ids.append(venta.pk)
+        hechos.registrar_ventas(ids)
+        anular_ventas([ids[2]])
+
+        for frecuencia in ('DIARIO', 'MENSUAL', 'ANUAL'):
+            for filtros in ({}, {'id_metodo_pago': otro_metodo.pk},
+                            {'fecha_desde': date.today() - timedelta(days=45)}):
+                with self.subTest(frecuencia=frecuencia, filtros=filtros):
+                    self.assertEqual(
+                        [(f['periodo'], f['ventas'], f['monto_ventas'])
+                         for f in hechos.consultar(filtros, frecuencia=frecuencia)],
+                        [(f['periodo'], f['ventas'], f['monto_ventas'])
+                         for f in ReportesService._resumen_ventas_oltp(filtros, frecuencia)],
+                    )
+
+        # Con filtro de cliente el resumen sale de venta: mismo resultado
+        desde_hechos = ReportesService.generar_reporte('VENTAS', {'tamano_pagina': 2})
+        desde_venta = ReportesService.generar_reporte(
+            'VENTAS', {'tamano_pagina': 2, 'cliente': str(self.cliente.pk)}
+        )
+        self.assertEqual(desde_hechos['resumen'], desde_venta['resumen'])
+        self.assertEqual(desde_hechos['resumen']['total_ventas'], 5)
+
+        # El detalle va por páginas con el cursor de `siguiente`
+        vistos, filtros = [], {'tamano_pagina': 2}
+        while True:
+            reporte = ReportesService.generar_reporte('VENTAS', filtros)
+            vistos += [fila['id_venta'] for fila in reporte['resultados']]
+            if not reporte['siguiente']:
+                break
+            filtros = {'tamano_pagina': 2, 'cursor': reporte['siguiente']}
+        self.assertEqual(sorted(vistos), sorted(ids))
+
+    def test_anular_tras_cambiar_de_categoria_mueve_la_celda_original(self):
+        venta = self._crear_venta(2)
+        hechos.registrar_ventas([venta.pk])
+        original = self.producto.id_categoria_id
+        nueva = Categoria.objects.create(nombre='Contacto')
+        Producto.objects.filter(pk=self.producto.pk).update(id_categoria=nueva)
+
+        anular_ventas([venta.pk])
+
+        self.assertEqual(
+            list(HechoVentaDiaria.objects.values_list('categoria_id', 'anulada', 'lineas', 'cantidad')),
+            [(original, True, 1, 2)],
+        )
+
+    def test_mas_vendidos_no_cuenta_ventas_anuladas(self):
+        otro = Producto.objects.create(
+            id_producto='P0002', nombre='Estuche', precio=Decimal('10.00'), stock=100,
+            descripcion='-', estado_producto='ACTIVO', id_categoria=self.producto.id_categoria,
+        )
+        ventas = [self._crear_venta(3), self._crear_venta(3)]
+        venta = Venta.objects.create(
+            fecha=date.today(), monto_total=Decimal('40.00'), estado='COMPLETADO',
+            id_metodo_pago=self.metodo, id_cliente=self.cliente, id_vendedor=self.vendedor,
+        )
+        DetalleVenta.objects.create(
+            id_venta=venta, id_producto=otro, cantidad=4, precio=Decimal('10.00'), sub_total=Decimal('40.00'),
+        )
+        hechos.registrar_ventas([v.pk for v in ventas] + [venta.pk])
+        anular_ventas([ventas[0].pk])
+
+        reporte = ReportesService.generar_reporte('PRODUCTOS_MAS_VENDIDOS', {})
+        self.assertEqual(
+            [(f['id_producto'], f['cantidad_vendida']) for f in reporte['resultados']],
+            [('P0002', 4), ('P0001', 3)],
+        )
+        _, filas = exportacion.filas_reporte('PRODUCTOS_MAS_VENDIDOS', {})
+        self.assertEqual([(f[0], f[2]) for f in filas], [('P0002', 4), ('P0001', 3)])
@@ -2,6 +2,7 @@ from django.urls import path
 from .views import (
     crear_venta_presencial,
     anular_venta,
+    anular_ventas_lote,
     obtener_venta,
     listar_ventas,
     confirmar_pago_manual,
@@ -23,6 +24,7 @@ urlpatterns = [
     path("", listar_ventas, name="listar_ventas"),
     path("presencial/", crear_venta_presencial, name="venta_presencial"),
     path("online/", VentaOnlineView.as_view(), name="venta_online"),
+    path("anular/", anular_ventas_lote, name="anular_ventas_lote"),
 
     # ----------- RUTAS DE PAGOS (ANTES DE <int:id_venta>!) -----------
     path("metodos-pago/", PaymentMethodsDBView.as_view(), name="ventas-metodos-pago"),
@@ -1,4 +1,4 @@
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from django.utils import timezone
 from django.conf import settings
 from rest_framework.views import APIView
@@ -17,6 +17,7 @@ import stripe
 
 from rest_framework.decorators import action, api_view
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.utils.urls import replace_query_param
 from rest_framework import viewsets, status
 
 from django.db.models import Sum
@@ -31,6 +32,15 @@ from apps.productos.models import Producto
 from apps.envio.models import Envio, TipoEnvio
 from apps.autenticacion.utils import obtener_ip_cliente
 from apps.bitacora.signals import venta_creada, venta_anulada
+from apps.ventas.services import listado_service, anulacion_service
+from apps.inventario.services import velocidad_service
+from apps.inventario.services.kardex_service import StockInsuficiente, registrar_movimientos
+from apps.lotes.services import fefo_service
+from apps.carrito.services import revalidacion_service
+from apps.carrito.services.revalidacion_service import EstadoLinea
+from apps.promocion.services import precios_service
+from apps.reportes import hechos
+from core.constants import StockMovementReason
 from .serializers import (
     VentaPresencialSerializer,
     VentaOnlineSerializer,
@@ -708,30 +718,30 @@ def crear_venta_presencial(request):
             status=400
         )
 
-    # 5. Validar productos + stock y calcular total
-    items_validos = []
-    monto_total = 0
-
+    # 5. Validar productos + stock (una consulta) y calcular total con promociones
+    productos = Producto.objects.in_bulk({item.get("id_producto") for item in productos_data})
     for item in productos_data:
         id_producto = item.get("id_producto")
         cantidad = item.get("cantidad")
 
-        producto = Producto.objects.filter(id_producto=id_producto).first()
+        producto = productos.get(id_producto)
         if not producto:
             return Response({"error": f"El producto {id_producto} no existe."}, status=400)
 
         if producto.stock < cantidad:
             return Response({"error": f"Stock insuficiente para {producto.nombre}"}, status=400)
 
-        sub_total = producto.precio * cantidad
-        monto_total += sub_total
-
-        items_validos.append({
-            "producto": producto,
-            "cantidad": cantidad,
-            "precio": producto.precio,
-            "sub_total": sub_total
-        })
+    cotizacion = precios_service.cotizar(productos_data, productos=productos)
+    monto_total = cotizacion["total"]
+    items_validos = [
+        {
+            "producto": productos[linea["id_producto"]],
+            "cantidad": linea["cantidad"],
+            "precio": linea["precio_unitario"],
+            "total": linea["total"],
+        }
+        for linea in cotizacion["lineas"]
+    ]
 
     # 6. Crear Venta
     venta = Venta.objects.create(
@@ -741,27 +751,46 @@ def crear_venta_presencial(request):
         id_metodo_pago=metodo_pago,
         id_cliente=cliente,
         id_vendedor=vendedor,
-        id_promocion=None,
+        id_promocion_id=cotizacion["principal"],
         cod_envio=None
     )
 
-    # 7. Crear Detalles + descontar stock
-    for item in items_validos:
+    # 7. Crear Detalles (una línea por lote asignado FEFO)
+    lineas = fefo_service.asignar_lotes(items_validos)
+    for linea in lineas:
         DetalleVenta.objects.create(
             id_venta=venta,
-            id_producto=item["producto"],
-            cantidad=item["cantidad"],
-            precio=item["precio"],
-            sub_total=item["sub_total"],
-            id_lote=None
+            id_producto=linea["producto"],
+            cantidad=linea["cantidad"],
+            precio=linea["precio"],
+            sub_total=linea["sub_total"],
+            id_lote_id=linea["lote"]
         )
 
-        # Actualizar stock del producto
-        p = item["producto"]
-        p.stock -= item["cantidad"]
-        p.save()
+    # 8. Descontar stock de productos y lotes vía kardex (UPDATE condicional)
+    try:
+        registrar_movimientos(
+            [
+                {
+                    "producto": linea["producto"].id_producto,
+                    "lote": linea["lote"],
+                    "cantidad": -linea["cantidad"],
+                }
+                for linea in lineas
+            ],
+            motivo=StockMovementReason.VENTA,
+            usuario=request.user,
+            referencia=f"VENTA #{venta.id_venta}",
+        )
+    except StockInsuficiente as e:
+        transaction.set_rollback(True)
+        return Response({"error": str(e)}, status=400)
 
-    # 8. Registrar bitácora
+    # Tabla de hechos para reportes (misma transacción que la venta)
+    hechos.registrar_ventas([venta.id_venta])
+    velocidad_service.registrar_ventas([venta.id_venta])
+
+    # 9. Registrar bitácora
     ip = obtener_ip_cliente(request)
     venta_creada.send(
         sender=Venta,
@@ -770,7 +799,7 @@ def crear_venta_presencial(request):
         ip=ip
     )
 
-    # 9. Respuesta final
+    # 10. Respuesta final
     from apps.ventas.serializers import VentaSerializer
     return Response(
         {
@@ -784,7 +813,6 @@ def crear_venta_presencial(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
-@transaction.atomic
 def anular_venta(request, id_venta):
 
     # 1 Verificar si es vendedor o admin
@@ -798,33 +826,18 @@ def anular_venta(request, id_venta):
         )
 
     # 2 Obtener la venta
-    venta = get_object_or_404(Venta, id_venta=id_venta)
+    get_object_or_404(Venta, id_venta=id_venta)
 
-    # 3 Validar si ya está anulada
-    if venta.estado == "ANULADA":
-        return Response(
-            {"error": "La venta ya se encuentra anulada."},
-            status=status.HTTP_400_BAD_REQUEST
-        )
+    # 3 Anular + revertir stock (bloqueo de fila y guarda contra doble anulación)
+    anuladas, rechazadas = anulacion_service.anular_ventas([id_venta], usuario=request.user)
 
-    # 4 Validar estados permitidos
-    if venta.estado not in ["PENDIENTE", "COMPLETADO"]:
+    if not anuladas:
         return Response(
-            {"error": f"No se puede anular una venta con estado {venta.estado}"},
+            {"error": rechazadas.get(int(id_venta))},
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    # 5 Revertir stock
-    detalles = venta.detalles.all()
-
-    for det in detalles:
-        producto = det.id_producto
-        producto.stock += det.cantidad
-        producto.save()
-
-    # 6 Cambiar estado de venta
-    venta.estado = "ANULADA"
-    venta.save()
+    venta = anuladas[0]
 
     ip= obtener_ip_cliente(request)
     venta_anulada.send(
@@ -846,6 +859,59 @@ def anular_venta(request, id_venta):
     )
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def anular_ventas_lote(request):
+    """
+    Anula varias ventas en una sola transacción.
+    Body: {"ventas": [1, 2, 3]}
+    """
+    es_admin = request.user.is_superuser or request.user.is_staff
+    es_vendedor = Vendedor.objects.filter(id_vendedor=request.user.id_usuario).exists()
+
+    if not (es_admin or es_vendedor):
+        return Response(
+            {"error": "No tiene permisos para anular ventas."},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    ids = request.data.get("ventas")
+    if not isinstance(ids, list) or not ids:
+        return Response(
+            {"error": "Debe enviar una lista de ventas a anular."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        anuladas, rechazadas = anulacion_service.anular_ventas(ids, usuario=request.user)
+    except (TypeError, ValueError):
+        return Response(
+            {"error": "Los identificadores de venta deben ser numéricos."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    ip = obtener_ip_cliente(request)
+    for venta in anuladas:
+        venta_anulada.send(
+            sender=Venta,
+            venta=venta,
+            usuario=request.user,
+            ip=ip
+        )
+
+    return Response(
+        {
+            "message": f"{len(anuladas)} venta(s) anulada(s).",
+            "anuladas": [v.id_venta for v in anuladas],
+            "rechazadas": [
+                {"id_venta": id_venta, "error": motivo}
+                for id_venta, motivo in rechazadas.items()
+            ],
+        },
+        status=status.HTTP_200_OK
+    )
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def obtener_venta(request, id_venta):
@@ -868,17 +934,56 @@ def listar_ventas(request):
             status=status.HTTP_403_FORBIDDEN
         )
 
-    # Configuración de la paginación
-    paginator = PageNumberPagination()
-    paginator.page_size = 15  # Puedes ajustar este número según tus necesidades
+    params = request.query_params
 
-    ventas = Venta.objects.all().order_by('-id_venta')
-    paginated_ventas = paginator.paginate_queryset(ventas, request)
+    try:
+        campos = listado_service.parsear_campos(params.get('fields'))
+        page_size = max(1, min(int(params.get('page_size') or 15), 200))
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    filtros = {
+        'fecha_desde': params.get('fecha_desde'),
+        'fecha_hasta': params.get('fecha_hasta'),
+        'estado': params.get('estado'),
+        'id_cliente': params.get('id_cliente'),
+        'id_vendedor': params.get('id_vendedor'),
+    }
+    ventas = listado_service.construir_queryset_ventas(campos, filtros)
+
+    # Modo streaming: una venta por línea, sin armar toda la lista en memoria
+    if (params.get('formato') or '').lower() == 'ndjson':
+        response = StreamingHttpResponse(
+            listado_service.iterar_ndjson(ventas, VentaSerializer, campos),
+            content_type='application/x-ndjson',
+        )
+        response['Content-Disposition'] = 'inline; filename="ventas.ndjson"'
+        return response
+
+    # Paginación por clave (fecha, id_venta): ?cursor=<token devuelto en 'next'>
+    try:
+        pagina, siguiente = listado_service.obtener_pagina(
+            ventas, params.get('cursor'), page_size
+        )
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-    serializer = VentaSerializer(paginated_ventas, many=True)
+    serializer = VentaSerializer(pagina, many=True, fields=campos)
 
-    # La respuesta paginada ya incluye 'count', 'next', 'previous' y 'results'
-    return paginator.get_paginated_response(serializer.data)
+    # Mismas claves que la respuesta paginada anterior; el cursor solo
+    # avanza, así que 'previous' es siempre null. El COUNT recorre todo el
+    # filtro: solo se calcula en la primera página o con ?count=1 (en las
+    # demás páginas 'count' es null).
+    contar = not params.get('cursor') or params.get('count') in ('1', 'true')
+    return Response({
+        "count": ventas.count() if contar else None,
+        "next": (
+            replace_query_param(request.build_absolute_uri(), 'cursor', siguiente)
+            if siguiente else None
+        ),
+        "previous": None,
+        "results": serializer.data,
+    })
 
 
 @api_view(['POST'])
@@ -962,30 +1067,30 @@ class VentaOnlineView(APIView):
         
         print(f"🔍 [DEBUG] Validando {len(productos_data)} productos...")
         
-        for idx, item in enumerate(productos_data):
-            print(f"🔍 [DEBUG] Producto {idx+1}: ID={item['id_producto']}, Cantidad={item['cantidad']}")
-            
-            try:
-                producto = Producto.objects.get(id_producto=item['id_producto'])
-                print(f"✅ [DEBUG] Producto encontrado: {producto.nombre}, Stock: {producto.stock}, Precio: {producto.precio}")
-            except Producto.DoesNotExist:
-                print(f"❌ [ERROR] Producto {item['id_producto']} no existe")
-                return Response({"error": f"El producto {item['id_producto']} no existe."}, status=status.HTTP_400_BAD_REQUEST)
-            
-            if producto.stock < item['cantidad']:
-                print(f"❌ [ERROR] Stock insuficiente para {producto.nombre}. Disponible: {producto.stock}, Requerido: {item['cantidad']}")
-                return Response({"error": f"Stock insuficiente para el producto: {producto.nombre}"}, status=status.HTTP_400_BAD_REQUEST)
-            
-            subtotal = producto.precio * item['cantidad']
-            monto_total += subtotal
-            
-            print(f"✅ [DEBUG] Subtotal calculado: {subtotal}, Total acumulado: {monto_total}")
-            
+        # Un solo snapshot (precio, stock, estado, promociones) para todas las líneas
+        revision = revalidacion_service.revalidar(productos_data)
+        if not revision['valido']:
+            bloqueante = next(i for i in revision['cambios'] if i['estado'] in EstadoLinea.BLOQUEANTES)
+            if bloqueante['estado'] == EstadoLinea.NO_EXISTE:
+                error = f"El producto {bloqueante['id_producto']} no existe."
+            elif bloqueante['estado'] == EstadoLinea.NO_DISPONIBLE:
+                error = f"El producto {bloqueante['nombre']} no está disponible."
+            else:
+                error = f"Stock insuficiente para el producto: {bloqueante['nombre']}"
+            return Response(
+                {"error": error, "lineas": revision['cambios']},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        productos = revision['productos']
+        cotizacion = precios_service.cotizar(productos_data, productos=productos)
+        monto_total = cotizacion['total']
+        for linea in cotizacion['lineas']:
             detalles_para_crear.append({
-                "producto": producto,
-                "cantidad": item['cantidad'],
-                "precio": producto.precio,
-                "subtotal": subtotal
+                "producto": productos[linea['id_producto']],
+                "cantidad": linea['cantidad'],
+                "precio": linea['precio_unitario'],
+                "total": linea['total']
             })
 
         print(f"✅ [DEBUG] Monto total de la venta: {monto_total}")
@@ -1013,7 +1118,7 @@ class VentaOnlineView(APIView):
         except TipoEnvio.DoesNotExist:
             print("❌ [ERROR] TipoEnvio con cod_tipo_envio=1 no existe")
             return Response({"error": "El tipo de envío no está configurado."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
+
         print("🔍 [DEBUG] Creando registro de envío...")
         nuevo_envio = Envio.objects.create(
             cod_tipo_envio=tipo_envio_domicilio,
@@ -1032,25 +1137,48 @@ class VentaOnlineView(APIView):
             monto_total=monto_total,
             estado='PENDIENTE',
             id_vendedor=vendedor_online,
-            id_promocion=None,
+            id_promocion_id=cotizacion['principal'],
             cod_envio=nuevo_envio,
             id_metodo_pago=metodo_pago_online, 
         )
         print(f"✅ [DEBUG] Venta creada con ID: {venta.id_venta}")
 
-        # 6. Crear detalles y descontar stock
+        # 6. Crear detalles (una línea por lote asignado FEFO)
         print("🔍 [DEBUG] Creando detalles de venta...")
-        for detalle_data in detalles_para_crear:
+        lineas = fefo_service.asignar_lotes(detalles_para_crear)
+        for linea in lineas:
             DetalleVenta.objects.create(
                 id_venta=venta,
-                id_producto=detalle_data['producto'],
-                cantidad=detalle_data['cantidad'],
-                precio=detalle_data['precio'],
-                sub_total=detalle_data['subtotal']
+                id_producto=linea['producto'],
+                cantidad=linea['cantidad'],
+                precio=linea['precio'],
+                sub_total=linea['sub_total'],
+                id_lote_id=linea['lote']
             )
-            detalle_data['producto'].stock -= detalle_data['cantidad']
-            detalle_data['producto'].save()
-            print(f"✅ [DEBUG] Detalle creado para producto: {detalle_data['producto'].nombre}")
+            print(f"✅ [DEBUG] Detalle creado para producto: {linea['producto'].nombre} (lote {linea['lote']})")
+
+        # Descontar stock de productos y lotes vía kardex antes de iniciar el pago
+        try:
+            registrar_movimientos(
+                [
+                    {"producto": l['producto'].id_producto, "lote": l['lote'], "cantidad": -l['cantidad']}
+                    for l in lineas
+                ],
+                motivo=StockMovementReason.VENTA,
+                usuario=request.user,
+                referencia=f"VENTA #{venta.id_venta}",
+            )
+        except StockInsuficiente as e:
+            transaction.set_rollback(True)
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        hechos.registrar_ventas([venta.id_venta])
+        velocidad_service.registrar_ventas([venta.id_venta])
+        venta_creada.send(
+            sender=Venta,
+            venta=venta,
+            usuario=request.user,
+            ip=obtener_ip_cliente(request)
+        )
 
         # 7. Iniciar el pago con Stripe
         print("🔍 [DEBUG] Iniciando proceso de pago con Stripe...")
@@ -11,6 +11,9 @@ from .catalogo import CatalogConfig, ProductConfig
 from .soporte import TicketStatus, TicketType
 from .promocion import PromotionStatus, PromotionType
 from .resenas import ReviewStatus, ReviewPolicy
+from .inventario import StockMovementReason
+from .compras import PurchaseStatus, ReplenishmentConfig
+from .carrito import CartStatus
 
 __all__ = [
     'UserStatus',
@@ -29,4 +32,8 @@ __all__ = [
     'TicketType',
     'ReviewStatus',
     'ReviewPolicy',
+    'StockMovementReason',
+    'PurchaseStatus',
+    'ReplenishmentConfig',
+    'CartStatus',
 ]
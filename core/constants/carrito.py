@@ -0,0 +1,22 @@
+"""
+Constantes del carrito de compras.
+"""
+
+
+class CartStatus:
+    """Estados de un carrito."""
+
+    ACTIVO = 'ACTIVO'
+    # Sin cambios por más de CARRITO_EXPIRACION_DIAS (líneas archivadas)
+    EXPIRADO = 'EXPIRADO'
+
+    @classmethod
+    def choices(cls):
+        return [
+            (cls.ACTIVO, 'Activo'),
+            (cls.EXPIRADO, 'Expirado'),
+        ]
+
+    @classmethod
+    def all(cls):
+        return [cls.ACTIVO, cls.EXPIRADO]
@@ -45,6 +45,7 @@ class ProductConfig:
     
     # Stock
     STOCK_LOW_THRESHOLD = 10
+    STOCK_LOW_COVER_DAYS = 7  # días de venta que cubre el stock
     
     # Tipos de ajuste de stock
     STOCK_INCREMENT = 'INCREMENTO'
@@ -0,0 +1,43 @@
+"""
+Constantes para compras y reposición.
+"""
+
+
+class PurchaseStatus:
+    """Estados de una orden de compra."""
+
+    BORRADOR = 'BORRADOR'
+    PENDIENTE = 'PENDIENTE'
+    FINALIZADA = 'FINALIZADA'
+
+    @classmethod
+    def choices(cls):
+        return [
+            (cls.BORRADOR, 'Borrador (sugerida)'),
+            (cls.PENDIENTE, 'Pendiente de recepción'),
+            (cls.FINALIZADA, 'Finalizada'),
+        ]
+
+    @classmethod
+    def all(cls):
+        return [cls.BORRADOR, cls.PENDIENTE, cls.FINALIZADA]
+
+
+class ReplenishmentConfig:
+    """Parámetros del motor de reposición."""
+
+    # Factor z del nivel de servicio (1.65 ≈ 95 % de ciclos sin quiebre)
+    NIVEL_SERVICIO_Z = 1.65
+
+    # Días de historia de ventas para la variabilidad de la demanda
+    DIAS_HISTORIA_DEMANDA = 90
+
+    # Días de historia de compras para estimar el lead time de cada proveedor
+    DIAS_HISTORIA_LEAD_TIME = 365
+
+    # Lead time (días) de proveedores sin recepciones registradas
+    LEAD_TIME_DEFECTO = 7
+
+    # Cada cuántos días se revisa/emite una orden: la cantidad sugerida
+    # cubre lead time + revisión
+    DIAS_REVISION = 14
@@ -30,6 +30,10 @@ class UserStatus:
 
 class ProductStatus:
     """Estados posibles de un producto (para futuro uso)."""
+    # Estados que usa hoy producto.estado_producto
+    ACTIVO = 'ACTIVO'
+    INACTIVO = 'INACTIVO'
+
     DISPONIBLE = 'DISPONIBLE'
     AGOTADO = 'AGOTADO'
     DESCONTINUADO = 'DESCONTINUADO'
@@ -71,6 +75,10 @@ class ImageStatus:
     """Estados posibles para imágenes de productos."""
     ACTIVA = 'ACTIVA'
     INACTIVA = 'INACTIVA'
+    # Subida en segundo plano: recibida pero todavía no está en el almacenamiento
+    PENDIENTE = 'PENDIENTE'
+    # La subida agotó sus reintentos
+    ERROR = 'ERROR'
     
     @classmethod
     def choices(cls):
@@ -78,12 +86,14 @@ class ImageStatus:
         return [
             (cls.ACTIVA, 'Activa'),
             (cls.INACTIVA, 'Inactiva'),
+            (cls.PENDIENTE, 'Pendiente de subida'),
+            (cls.ERROR, 'Error de subida'),
         ]
     
     @classmethod
     def all(cls):
         """Retorna lista de todos los estados válidos."""
-        return [cls.ACTIVA, cls.INACTIVA]
+        return [cls.ACTIVA, cls.INACTIVA, cls.PENDIENTE, cls.ERROR]
     
     @classmethod
     def is_valid(cls, estado):
@@ -0,0 +1,37 @@
+"""
+Constantes para el kardex (libro de movimientos de stock).
+"""
+
+
+class StockMovementReason:
+    """Motivos de un movimiento de stock."""
+
+    APERTURA = 'APERTURA'
+    VENTA = 'VENTA'
+    ANULACION_VENTA = 'ANULACION_VENTA'
+    RECEPCION_COMPRA = 'RECEPCION_COMPRA'
+    AJUSTE = 'AJUSTE'
+    CORRECCION = 'CORRECCION'
+    AJUSTE_LOTE = 'AJUSTE_LOTE'
+    CONCILIACION = 'CONCILIACION'
+
+    # Movimientos que solo cambian la cantidad del lote, no el stock del producto
+    # (altas/ediciones de lotes desde el CRUD de lotes).
+    SOLO_LOTE = (AJUSTE_LOTE,)
+
+    @classmethod
+    def choices(cls):
+        return [
+            (cls.APERTURA, 'Saldo inicial'),
+            (cls.VENTA, 'Venta'),
+            (cls.ANULACION_VENTA, 'Anulación de venta'),
+            (cls.RECEPCION_COMPRA, 'Recepción de compra'),
+            (cls.AJUSTE, 'Ajuste manual'),
+            (cls.CORRECCION, 'Corrección de stock'),
+            (cls.AJUSTE_LOTE, 'Ajuste de lote'),
+            (cls.CONCILIACION, 'Conciliación'),
+        ]
+
+    @classmethod
+    def afecta_producto(cls, motivo):
+        return motivo not in cls.SOLO_LOTE
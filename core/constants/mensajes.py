@@ -208,6 +208,10 @@ class Messages:
     IMAGE_RESTORED = 'Imagen restaurada correctamente.'
     IMAGE_UPDATED = 'Imagen actualizada correctamente.'
     IMAGE_REORDERED = 'Imágenes reordenadas correctamente.'
+    IMAGE_UPLOAD_QUEUED = 'Imagen recibida; se está subiendo en segundo plano.'
+    IMAGE_UPLOAD_STATUS = 'Estado de la subida de la imagen.'
+    IMAGE_UPLOAD_RETRIED = 'Subida de imagen reencolada.'
+    IMAGES_BULK_UPLOADED = 'Subida masiva: {subidas} imagen(es) subidas, {fallidas} con error.'
     
     # Imágenes - Errores
     CANNOT_DELETE_PRINCIPAL_IMAGE = 'No se puede eliminar la imagen principal.'
@@ -218,6 +222,11 @@ class Messages:
     DUPLICATE_ORDER_VALUES = 'Hay valores de "orden" duplicados.'
     IMAGES_NOT_BELONG_TO_PRODUCT = 'Las imágenes {ids} no pertenecen al producto o no existen.'
     NO_CHANGES_DETECTED = 'Sin cambios detectados.'
+    IMAGE_ORDER_TAKEN = 'El producto ya tiene una imagen con orden {orden}.'
+    IMAGE_NOT_RETRYABLE = 'Solo se pueden reintentar imágenes con error de subida.'
+    IMAGE_SPOOL_MISSING = 'El archivo temporal de la imagen ya no existe; vuelva a subirla.'
+    BULK_PRODUCTS_MISMATCH = 'Envíe "producto" o un valor de "productos" por cada imagen.'
+    PRODUCTS_NOT_FOUND = 'Productos no encontrados: {ids}.'
     
     # =====================================================
     # MÉTODOS DE PAGO
@@ -249,6 +258,20 @@ class Messages:
     REVIEW_REJECTED = 'Resena rechazada.'
     REVIEW_HIDDEN = 'Resena ocultada.'
 
+    # =====================================================
+    # PROMOCIONES (CU23)
+    # =====================================================
+    PROMO_CREATED = 'Promoción creada correctamente.'
+    PROMOS_BULK_CREATED = '{total} promociones creadas correctamente.'
+    PROMO_ACTIVATED = 'Promoción activada correctamente.'
+    PROMO_DEACTIVATED = 'Promoción desactivada correctamente.'
+    PROMO_ALREADY_ACTIVE = 'La promoción ya está activa.'
+    PROMO_ALREADY_INACTIVE = 'La promoción ya está inactiva.'
+    PROMO_DATE_INVALID = 'La fecha de fin no puede ser anterior a la fecha de inicio.'
+    PROMO_VALUE_REQUIRED = 'Este tipo de promoción requiere un valor de descuento.'
+    PROMO_PRODUCTS_REQUIRED = 'Debe indicar al menos un producto.'
+    PROMO_CONFLICT = 'Hay productos con otra promoción activa en las mismas fechas.'
+
     # MÉTODOS HELPER
     # =====================================================
     @classmethod